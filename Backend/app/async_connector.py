@@ -0,0 +1,418 @@
+import asyncio
+import logging
+import time
+
+from app.serialization import to_json_compatible
+from app.explain import build_explain_command, summarize_explain
+from app.metrics import POOL_LISTENER
+from pymongo.errors import OperationFailure
+from app.connector import (
+    COUNT_MODES, DEFAULT_COUNT_MODE, DISTINCT_TOO_LARGE_CODES, SUBQUERY_CACHE_TTL,
+    SUBQUERY_INLINE_MAX, UNION_BRANCH_BUFFER, UNION_BRANCH_END, UNION_WITH_UNSUPPORTED_CODES, WRITE_OPERATIONS,
+    apply_union_tail, build_distinct_pipeline, document_digest
+)
+from app.translator.pipeline_optimizer import CONCISE_LOOKUP_MIN_VERSION, expand_concise_lookups
+from app.translator.subqueries import inline_subqueries, subquery_values
+
+# El cliente asíncrono nativo de pymongo (4.9+) es opcional para el resto de la aplicación
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # pragma: no cover - depende de la versión de pymongo
+    AsyncMongoClient = None
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+class AsyncMongoDBConnector:
+    """
+    Conector asíncrono para MongoDB con la misma superficie que
+    MongoDBConnector.execute_query (find, aggregate, insert, INSERT_MANY, update,
+    delete y DDL). Las consultas no bloquean un hilo mientras esperan al servidor,
+    por lo que un solo proceso puede mantener muchas agregaciones lentas en curso.
+    """
+
+    def __init__(self, uri=None, database_name=None, client=None):
+        """
+        Inicializa el conector. La conexión se establece de forma perezosa
+        con la primera operación.
+
+        Args:
+            uri (str, optional): URI de conexión a MongoDB.
+            database_name (str, optional): Base de datos por defecto.
+            client (optional): Cliente asíncrono ya creado (por ejemplo, un sustituto
+                en memoria para pruebas). Si se indica, uri se ignora.
+        """
+        if client is None:
+            if AsyncMongoClient is None:
+                raise ImportError("Se requiere pymongo >= 4.9 para el conector asíncrono (AsyncMongoClient)")
+            client = AsyncMongoClient(
+                uri,
+                serverSelectionTimeoutMS=5000,
+                connectTimeoutMS=5000,
+                socketTimeoutMS=30000,
+                maxPoolSize=100,
+                retryWrites=True,
+                event_listeners=[POOL_LISTENER]
+            )
+            logger.info("Conector asíncrono MongoDB creado: %s", uri)
+
+        self.client = client
+        self.database_name = database_name
+        self.count_mode = DEFAULT_COUNT_MODE
+        self._databases = {}
+        self._union_with_supported = None
+        self._concise_lookup_supported = None
+        self._subquery_cache = {}
+
+    def get_database(self, database_name=None):
+        """
+        Obtiene el handle de una base de datos (cacheado por nombre).
+
+        Args:
+            database_name (str, optional): Nombre de la base de datos.
+
+        Returns:
+            Handle de la base de datos.
+
+        Raises:
+            ValueError: Si no se indica base de datos y no hay una por defecto.
+        """
+        database_name = database_name or self.database_name
+        if not database_name:
+            raise ValueError("No se ha seleccionado ninguna base de datos.")
+
+        db = self._databases.get(database_name)
+        if db is None:
+            db = self.client[database_name]
+            self._databases[database_name] = db
+        return db
+
+    async def is_connected(self):
+        """
+        Verifica si la conexión a MongoDB está activa.
+
+        Returns:
+            bool: True si está conectado, False en caso contrario.
+        """
+        try:
+            await self.client.admin.command('ping')
+            return True
+        except Exception as e:
+            logger.error("Error de conexión: %s", e)
+            return False
+
+    async def close(self):
+        """Cierra el cliente y libera el pool de conexiones."""
+        result = self.client.close()
+        if hasattr(result, "__await__"):
+            await result
+
+    async def execute_query(self, collection_name, query, serialize=True, database_name=None):
+        """
+        Ejecuta una consulta traducida en MongoDB.
+
+        Args:
+            collection_name (str): Nombre de la colección.
+            query (dict): Consulta en formato MongoDB.
+            serialize (bool): Convertir los tipos BSON de los resultados de lectura.
+            database_name (str, optional): Base de datos (por defecto, la del conector).
+
+        Returns:
+            Resultado de la operación (lista de documentos o resumen de la escritura).
+        """
+        db = self.get_database(database_name)
+        collection = db[collection_name]
+        operation = query.get("operation")
+        logger.info("Ejecutando operación %s (async) en la colección %s", operation, collection_name)
+
+        if operation in WRITE_OPERATIONS:
+            # Copia de las claves: el diccionario puede cambiar mientras se recorre
+            for key in [key for key in list(self._subquery_cache) if key[:2] == (db.name, collection_name)]:
+                self._subquery_cache.pop(key, None)
+        elif operation in ("aggregate", "explain"):
+            query = await self._adapt_to_server(query)
+
+        if operation == "find":
+            results = await self._execute_find(collection, query)
+        elif operation == "aggregate":
+            if query.get("union"):
+                results = await self._execute_union(db, collection, query)
+            elif query.get("subqueries"):
+                results = await self._execute_with_subqueries(db, collection, query)
+            else:
+                results = await self._execute_aggregate(collection, query)
+        elif operation == "count":
+            return await self._execute_count(collection, query)
+        elif operation == "distinct":
+            results = await self._execute_distinct(collection, query)
+        elif operation == "insert":
+            return await self._execute_insert(collection, query)
+        elif operation == "INSERT_MANY":
+            return await self._execute_insert_many(collection, query)
+        elif operation == "update":
+            return await self._execute_update(collection, query)
+        elif operation == "delete":
+            return await self._execute_delete(collection, query)
+        elif operation in ("create_collection_with_schema", "create_collection"):
+            return await self._execute_create_collection(db, collection_name, query)
+        elif operation == "drop_collection":
+            await collection.drop()
+            return {"dropped": True, "collection_name": collection_name}
+        elif operation == "explain":
+            return await self._execute_explain(db, collection_name, query)
+        else:
+            raise ValueError(f"Operación no soportada: {operation}")
+
+        return to_json_compatible(results) if serialize else results
+
+    async def _execute_find(self, collection, query):
+        """Ejecuta una operación find() y devuelve la lista de documentos."""
+        cursor = collection.find(query.get("query", {}), query.get("projection", None))
+
+        sort = query.get("sort")
+        if sort:
+            cursor = cursor.sort(list(sort.items()))
+        if query.get("skip"):
+            cursor = cursor.skip(query["skip"])
+        if query.get("limit") is not None:
+            cursor = cursor.limit(query["limit"])
+
+        results = await cursor.to_list(None)
+        logger.info("Resultados encontrados: %s", len(results))
+        return results
+
+    async def _execute_aggregate(self, collection, query):
+        """Ejecuta una operación aggregate() y devuelve la lista de documentos."""
+        cursor = await collection.aggregate(query.get("pipeline", []))
+        results = await cursor.to_list(None)
+        logger.info("Resultados de agregación: %s", len(results))
+        return results
+
+    async def _subquery_values(self, db, subquery):
+        """Valores de una subconsulta IN, o None si superan SUBQUERY_INLINE_MAX (ver MongoDBConnector._subquery_values)."""
+        key = (db.name, subquery["collection"], repr(subquery["pipeline"]))
+        cached = self._subquery_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        cursor = await db[subquery["collection"]].aggregate(subquery["pipeline"] + [{"$limit": SUBQUERY_INLINE_MAX + 1}])
+        values = subquery_values(await cursor.to_list(None))
+        if len(values) > SUBQUERY_INLINE_MAX:
+            values = None
+        self._subquery_cache[key] = (time.monotonic() + SUBQUERY_CACHE_TTL, values)
+        return values
+
+    async def _execute_with_subqueries(self, db, collection, query):
+        """Ejecuta un SELECT con subconsultas IN / EXISTS (ver MongoDBConnector._execute_with_subqueries)."""
+        values_by_field = {}
+        for subquery in query["subqueries"]:
+            values = await self._subquery_values(db, subquery)
+            if values is not None:
+                values_by_field[subquery["as"]] = values
+
+        rewritten = inline_subqueries(query, values_by_field)
+        if rewritten["operation"] == "find":
+            return await self._execute_find(collection, rewritten)
+        return await self._execute_aggregate(collection, rewritten)
+
+    async def _adapt_to_server(self, query):
+        """Convierte los $lookup concisos si el servidor es anterior a 5.0 (ver MongoDBConnector._adapt_to_server)."""
+        if self._concise_lookup_supported is None:
+            build_info = await self.client.admin.command("buildInfo")
+            version = tuple(build_info.get("versionArray", [0, 0])[:2])
+            self._concise_lookup_supported = version >= CONCISE_LOOKUP_MIN_VERSION
+            if not self._concise_lookup_supported:
+                logger.warning("MongoDB %s.%s no admite $lookup conciso; se usa la forma con let y $expr", *version)
+        return query if self._concise_lookup_supported else expand_concise_lookups(query)
+
+    async def _execute_union(self, db, collection, query):
+        """Ejecuta un UNION con $unionWith o, si no se admite, rama a rama (ver MongoDBConnector._execute_union)."""
+        if self._union_with_supported is not False:
+            try:
+                return await self._execute_aggregate(collection, query)
+            except OperationFailure as e:
+                if e.code not in UNION_WITH_UNSUPPORTED_CODES:
+                    raise
+                logger.warning("El servidor no admite $unionWith; las ramas de UNION se ejecutan por separado")
+                self._union_with_supported = False
+
+        async def read_branch(branch, buffer):
+            # Cola acotada: la rama solo se adelanta UNION_BRANCH_BUFFER documentos
+            try:
+                cursor = await db[branch["collection"]].aggregate(branch["pipeline"])
+                try:
+                    async for document in cursor:
+                        await buffer.put(document)
+                finally:
+                    await cursor.close()
+                await buffer.put(UNION_BRANCH_END)
+            except Exception as e:
+                await buffer.put(e)
+
+        union = query["union"]
+        branches = [await self._adapt_to_server(branch) for branch in union["branches"]]
+        buffers = [asyncio.Queue(maxsize=UNION_BRANCH_BUFFER) for _ in branches]
+        tasks = [asyncio.create_task(read_branch(branch, buffer)) for branch, buffer in zip(branches, buffers)]
+
+        # Sin ORDER BY basta con las filas que cubren OFFSET + LIMIT
+        wanted = None if union.get("sort") or union.get("limit") is None else (union.get("skip") or 0) + union["limit"]
+        prefix = union.get("distinct_branches", 0)
+        seen = set()
+        documents = []
+        try:
+            # Misma combinación que combine_union_branches, consumiendo las ramas en orden
+            for index, buffer in enumerate(buffers):
+                while wanted is None or len(documents) < wanted:
+                    item = await buffer.get()
+                    if item is UNION_BRANCH_END:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    if index < prefix:
+                        digest = document_digest(item)
+                        if digest in seen:
+                            continue
+                        seen.add(digest)
+                    documents.append(item)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return apply_union_tail(documents, union)
+
+    async def _execute_count(self, collection, query):
+        """Ejecuta un SELECT COUNT(*) con count_documents o estimated_document_count."""
+        filter_query = query.get("query") or {}
+        mode = query.get("mode") or self.count_mode
+        if mode not in COUNT_MODES:
+            raise ValueError(f"Modo de conteo no válido: {mode} (usar {' o '.join(COUNT_MODES)})")
+
+        if not filter_query and mode == "approximate":
+            count = await collection.estimated_document_count()
+        else:
+            count = await collection.count_documents(filter_query)
+        return [{query.get("field", "count"): count}]
+
+    async def _execute_distinct(self, collection, query):
+        """Ejecuta un SELECT DISTINCT de una columna (ver MongoDBConnector._execute_distinct)."""
+        field = query["field"]
+        output = query.get("output", field)
+
+        if not (query.get("sort") or query.get("skip") or query.get("limit")):
+            try:
+                values = await collection.distinct(field, query.get("query") or {})
+                return [{output: value} for value in values]
+            except OperationFailure as e:
+                if e.code not in DISTINCT_TOO_LARGE_CODES:
+                    raise
+                logger.warning("Resultado de distinct sobre %s mayor de 16MB; se usa el pipeline", field)
+
+        cursor = await collection.aggregate(build_distinct_pipeline(query), allowDiskUse=True)
+        return await cursor.to_list(None)
+
+    async def _execute_explain(self, db, collection_name, query):
+        """Ejecuta explain sobre el find o aggregate de una consulta EXPLAIN [ANALYZE]."""
+        command = build_explain_command(collection_name, query["query"])
+        raw = await db.command({"explain": command, "verbosity": query.get("verbosity", "queryPlanner")})
+        result = {
+            "verbosity": query.get("verbosity"),
+            "operation": query["query"].get("operation"),
+            "summary": summarize_explain(raw)
+        }
+        if query.get("include_raw"):
+            result["raw"] = to_json_compatible(raw)
+        return result
+
+    async def _execute_insert(self, collection, query):
+        """Ejecuta una operación insertOne()."""
+        result = await collection.insert_one(query.get("document", {}))
+        return {"inserted_id": str(result.inserted_id)}
+
+    async def _execute_insert_many(self, collection, query):
+        """Ejecuta una operación insertMany()."""
+        documents = query.get("documents", [])
+        if not documents:
+            return {"acknowledged": True, "inserted_ids": [], "insertedCount": 0}
+
+        result = await collection.insert_many(documents)
+        inserted_ids = [str(inserted_id) for inserted_id in result.inserted_ids]
+        logger.info("%s documentos insertados", len(inserted_ids))
+        return {
+            "acknowledged": result.acknowledged,
+            "inserted_ids": inserted_ids,
+            "insertedCount": len(inserted_ids)
+        }
+
+    async def _execute_update(self, collection, query):
+        """Ejecuta una operación updateMany()."""
+        update_query = query.get("query", {})
+        filter_query = update_query.get("query", {})
+        update_data = update_query.get("update", {})
+
+        # Si update_data no tiene operadores de actualización, usar $set (una lista es un update con pipeline)
+        if isinstance(update_data, dict) and update_data and not any(key.startswith("$") for key in update_data.keys()):
+            update_data = {"$set": update_data}
+
+        result = await collection.update_many(filter_query, update_data)
+        return {
+            "matched_count": result.matched_count,
+            "modified_count": result.modified_count,
+            "upserted_id": str(result.upserted_id) if result.upserted_id else None
+        }
+
+    async def _execute_delete(self, collection, query):
+        """Ejecuta una operación deleteMany()."""
+        result = await collection.delete_many(query.get("query", {}))
+        return {"deleted_count": result.deleted_count}
+
+    async def _execute_create_collection(self, db, collection_name, query):
+        """
+        Crea una colección (con validador, índices y documento de ejemplo si la
+        traducción los incluye). Si ya existe, no se modifica.
+        """
+        if collection_name in await db.list_collection_names():
+            logger.warning("La colección '%s' ya existe", collection_name)
+            return {
+                "acknowledged": True,
+                "collection_created": False,
+                "collection_name": collection_name,
+                "already_exists": True,
+                "message": f"La colección '{collection_name}' ya existe"
+            }
+
+        options = query.get("options", {})
+        await db.create_collection(collection_name, **options)
+        collection = db[collection_name]
+
+        indexes_created = []
+        for index_spec in query.get("indexes_to_create", []):
+            try:
+                index_name = await collection.create_index(
+                    list(index_spec["key"].items()),
+                    unique=index_spec.get("unique", False),
+                    name=index_spec.get("name")
+                )
+                indexes_created.append({"name": index_name, "specification": index_spec})
+            except Exception as e:
+                logger.warning("Error creando índice %s: %s", index_spec.get('name', 'unknown'), e)
+
+        result = {
+            "acknowledged": True,
+            "collection_created": True,
+            "collection_name": collection_name,
+            "already_exists": False,
+            "has_validator": "validator" in options,
+            "indexes_created": indexes_created,
+            "total_indexes": len(indexes_created)
+        }
+
+        sample_document = query.get("sample_document")
+        if sample_document:
+            try:
+                inserted = await collection.insert_one(sample_document)
+                result["sample_document_inserted"] = {"inserted_id": str(inserted.inserted_id)}
+            except Exception as e:
+                logger.warning("No se pudo insertar documento de ejemplo: %s", e)
+                result["sample_document_error"] = str(e)
+
+        return result
@@ -0,0 +1,227 @@
+import json
+import logging
+
+import jwt
+
+from app.async_connector import AsyncMongoDBConnector
+from app.auth.middleware import QUERY_TYPE_PERMISSIONS
+from app.serialization import dumps
+from app.translator.cache import TranslationCache, SCHEMA_CHANGING_TYPES
+from app.translator.parameterizer import prepare_statement, translate_prepared
+from app.utils import is_valid_mongo_db_name
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Tamaño máximo del cuerpo de una petición (bytes)
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    """Error que se devuelve al cliente con su código HTTP."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class AsyncTranslatorApp:
+    """
+    Aplicación ASGI mínima que expone /translate sobre el conector asíncrono.
+    Mientras una consulta espera a MongoDB el bucle de eventos atiende otras
+    peticiones, en lugar de ocupar un hilo de trabajo por consulta como Flask.
+
+    La autenticación usa los mismos JWT que emite la API Flask (HS256 con
+    JWT_SECRET_KEY) y los mismos permisos por tipo de consulta.
+    """
+
+    def __init__(self, connector, secret_key, cache=None, allowed_origins=None, auto_parameterize=True):
+        """
+        Args:
+            connector (AsyncMongoDBConnector): Conector asíncrono
+            secret_key (str): Clave con la que se firman los JWT
+            cache (TranslationCache, optional): Cache de traducciones
+            allowed_origins (list, optional): Orígenes permitidos para CORS
+            auto_parameterize (bool): Extraer literales automáticamente por defecto
+        """
+        self.connector = connector
+        self.secret_key = secret_key
+        self.cache = cache if cache is not None else TranslationCache()
+        self.allowed_origins = set(allowed_origins or [])
+        self.auto_parameterize = auto_parameterize
+        self.routes = {
+            ("POST", "/translate"): self.translate,
+            ("GET", "/health"): self.health,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method = scope["method"]
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        origin = headers.get("origin")
+
+        if method == "OPTIONS":
+            await self._send(send, 204, None, origin)
+            return
+
+        handler = self.routes.get((method, scope["path"]))
+        if handler is None:
+            await self._send(send, 404, {"error": "Ruta no encontrada"}, origin)
+            return
+
+        try:
+            body = await self._read_body(receive)
+            status, payload = await handler(headers, body)
+        except HTTPError as e:
+            status, payload = e.status, {"error": e.message}
+        except ValueError as e:
+            logger.error("Error de valor: %s", e)
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            logger.exception("Error inesperado: %s", e)
+            status, payload = 500, {"error": str(e)}
+
+        await self._send(send, status, payload, origin)
+
+    # --- Endpoints ---
+
+    async def health(self, headers, body):
+        """Estado del servicio y de la conexión con MongoDB."""
+        return 200, {"status": "ok", "mongodb": await self.connector.is_connected()}
+
+    async def translate(self, headers, body):
+        """
+        Traduce y ejecuta una consulta SQL. Acepta los mismos campos que el
+        endpoint Flask: query, database, params y parameterize.
+        """
+        claims = self._authenticate(headers)
+
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "El cuerpo de la petición no es JSON válido")
+
+        if not isinstance(data, dict) or 'query' not in data:
+            raise HTTPError(400, "Se requiere una consulta SQL en el campo 'query'")
+        if data.get('page_size') or data.get('cursor') or data.get('stream'):
+            raise HTTPError(400, "La paginación y el streaming solo están disponibles en la API Flask")
+
+        database_name = data.get('database') or self.connector.database_name
+        if not database_name:
+            raise HTTPError(400, "No hay una base de datos seleccionada. Proporcione una base de datos en la solicitud")
+        if not is_valid_mongo_db_name(database_name):
+            raise HTTPError(400, f"Nombre de base de datos no válido: {database_name}")
+
+        prepared = prepare_statement(
+            data['query'],
+            params=data.get('params'),
+            auto_parameterize=data.get('parameterize', self.auto_parameterize)
+        )
+        query_type = prepared.query_type
+
+        required_permission = QUERY_TYPE_PERMISSIONS.get(query_type)
+        if not required_permission:
+            raise HTTPError(400, f"Tipo de consulta no soportado: {query_type}")
+        if not claims.get("permissions", {}).get(required_permission, False):
+            raise HTTPError(403, f"No tienes permisos para realizar operaciones de tipo {query_type}")
+
+        translation = translate_prepared(prepared, database_name, self.cache)
+        collection_name = translation["collection"]
+        if translation["mongo_query"].get("operation") == "count" and data.get('count_mode'):
+            translation["mongo_query"]["mode"] = data['count_mode']
+
+        result = await self.connector.execute_query(
+            collection_name, translation["mongo_query"], serialize=False, database_name=database_name
+        )
+
+        if query_type in SCHEMA_CHANGING_TYPES:
+            self.cache.invalidate_collection(database_name, collection_name)
+
+        return 200, result
+
+    # --- Utilidades ASGI ---
+
+    def _authenticate(self, headers):
+        """Valida el JWT de la cabecera Authorization y devuelve sus claims."""
+        authorization = headers.get("authorization", "")
+        if not authorization.startswith("Bearer "):
+            raise HTTPError(401, "Token de autorización requerido")
+
+        try:
+            claims = jwt.decode(authorization[7:], self.secret_key, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            raise HTTPError(401, "El token ha expirado")
+        except jwt.InvalidTokenError:
+            raise HTTPError(401, "Token inválido")
+
+        if claims.get("type", "access") != "access":
+            raise HTTPError(401, "Token inválido")
+        return claims
+
+    async def _read_body(self, receive):
+        """Lee el cuerpo completo de la petición."""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_SIZE:
+                raise HTTPError(413, "La petición es demasiado grande")
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def _send(self, send, status, payload, origin=None):
+        """Envía una respuesta JSON (o vacía si payload es None)."""
+        body = b"" if payload is None else dumps(payload).encode("utf-8")
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+        if origin and origin in self.allowed_origins:
+            headers += [
+                (b"access-control-allow-origin", origin.encode("latin-1")),
+                (b"access-control-allow-credentials", b"true"),
+                (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+                (b"access-control-allow-headers", b"Content-Type, Authorization, Accept"),
+                (b"vary", b"Origin"),
+            ]
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        """Cierra el cliente de MongoDB al detener el servidor."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.connector.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_asgi_app(uri, secret_key, database_name=None, count_mode=None, **options):
+    """
+    Crea la aplicación ASGI con un conector asíncrono propio.
+
+    Args:
+        uri (str): URI de conexión a MongoDB
+        secret_key (str): Clave de los JWT
+        database_name (str, optional): Base de datos por defecto
+        count_mode (str, optional): Modo de los COUNT(*) sin WHERE ("exact" o "approximate")
+        **options: Parámetros adicionales de AsyncTranslatorApp
+
+    Returns:
+        AsyncTranslatorApp: Aplicación ASGI
+    """
+    connector = AsyncMongoDBConnector(uri, database_name)
+    if count_mode:
+        connector.count_mode = count_mode
+    return AsyncTranslatorApp(connector, secret_key, **options)
@@ -5,6 +5,16 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Permiso requerido para ejecutar cada tipo de sentencia SQL
+QUERY_TYPE_PERMISSIONS = {
+    "SELECT": "select",
+    "INSERT": "insert",
+    "UPDATE": "update",
+    "DELETE": "delete",
+    "CREATE": "create_table",
+    "DROP": "drop_table"
+}
+
 def auth_required(f):
     """
     Decorador que requiere autenticación con JWT.
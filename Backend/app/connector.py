@@ -1,18 +1,259 @@
-from bson import ObjectId
+from bson import ObjectId, encode as bson_encode
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, OperationFailure
 import time
+import hashlib
 import logging
+import functools
+import queue
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.serialization import to_json_compatible
+from app.explain import build_explain_command, summarize_explain
+from app.instrumentation import timed
+from app.metrics import EXECUTION_LATENCY, EXECUTION_RETRIES, RECONNECTS, RESULT_DOCUMENTS, POOL_LISTENER
+from app.log_config import truncated
+from app.translator.pipeline_optimizer import CONCISE_LOOKUP_MIN_VERSION, expand_concise_lookups
+from app.translator.subqueries import inline_subqueries, subquery_values
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
 # Variable global para el patrón singleton
 _instance = None
+_instance_lock = threading.Lock()
+
+# Documentos que se piden al servidor por lote en el modo streaming
+DEFAULT_STREAM_BATCH_SIZE = 500
+
+# Operaciones de lectura que admiten ejecución en streaming
+STREAMABLE_OPERATIONS = ("find", "aggregate")
+
+# Conteos sin filtro: "approximate" lee los metadatos de la colección
+# (estimated_document_count) y "exact" cuenta los documentos (count_documents)
+COUNT_MODES = ("exact", "approximate")
+DEFAULT_COUNT_MODE = "approximate"
+
+# Errores del comando distinct cuando el resultado supera los 16MB de un documento BSON
+DISTINCT_TOO_LARGE_CODES = (17217, 10334)
+
+# Valores máximos de una subconsulta IN que se copian en la consulta como $in;
+# con más se mantiene el semi-join ($lookup) que resuelve MongoDB
+SUBQUERY_INLINE_MAX = 1000
+
+# Segundos que se reutilizan los valores de una subconsulta IN (las escrituras del
+# propio conector en su colección los descartan antes)
+SUBQUERY_CACHE_TTL = 30
+
+# Operaciones que modifican documentos de la colección
+WRITE_OPERATIONS = ("insert", "INSERT_MANY", "update", "delete", "drop_collection")
+
+# Error de un servidor que no reconoce $unionWith (MongoDB < 4.4)
+UNION_WITH_UNSUPPORTED_CODES = (40324,)
+
+# Ramas de un UNION que se ejecutan a la vez cuando el servidor no admite $unionWith
+UNION_MAX_WORKERS = 8
+
+# Documentos que cada rama lee por adelantado mientras se consumen las anteriores
+UNION_BRANCH_BUFFER = 1000
+
+# Marca de fin de una rama en su cola de documentos
+UNION_BRANCH_END = object()
+
+
+def unique_documents(documents):
+    """
+    Elimina los documentos repetidos de una secuencia sin cargarla entera: solo se
+    guarda un resumen (hash) de cada documento ya visto.
+    
+    Args:
+        documents (iterable): Documentos en el orden en que llegan
+        
+    Yields:
+        dict: Primera aparición de cada documento
+    """
+    seen = set()
+    for document in documents:
+        digest = document_digest(document)
+        if digest not in seen:
+            seen.add(digest)
+            yield document
+
+
+def document_digest(document):
+    """Resumen (hash) del contenido BSON de un documento, para detectar repetidos."""
+    return hashlib.blake2b(bson_encode(document), digest_size=16).digest()
+
+
+def combine_union_branches(branch_results, union):
+    """
+    Combina en orden los documentos de las ramas de un UNION. Los operadores se
+    evalúan de izquierda a derecha: se eliminan los duplicados de las primeras
+    distinct_branches ramas (hasta el último UNION) y las ramas UNION ALL
+    posteriores se añaden tal cual.
+    
+    Args:
+        branch_results (iterable): Documentos de cada rama, en el orden de la consulta
+        union (dict): Información "union" de la operación traducida
+        
+    Returns:
+        iterator: Documentos combinados
+    """
+    branch_results = iter(branch_results)
+    prefix = union.get("distinct_branches", 0)
+    documents = itertools.chain.from_iterable(itertools.islice(branch_results, prefix))
+    if prefix:
+        documents = unique_documents(documents)
+    return itertools.chain(documents, itertools.chain.from_iterable(branch_results))
+
+
+def _offer(buffer, item, stop):
+    """Encola item esperando a que haya sitio; devuelve False si se pide parar antes."""
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def read_union_branch(collection, pipeline, buffer, stop):
+    """
+    Lee el cursor de una rama de UNION en una cola acotada, que se llena a medida
+    que se consume. Termina con UNION_BRANCH_END o con la excepción de la rama.
+    
+    Args:
+        collection (Collection): Colección de la rama
+        pipeline (list): Pipeline de la rama
+        buffer (queue.Queue): Cola de documentos (con tamaño máximo)
+        stop (threading.Event): Se activa cuando ya no hacen falta más documentos
+    """
+    if stop.is_set():
+        return
+    try:
+        cursor = collection.aggregate(pipeline)
+        try:
+            for document in cursor:
+                if not _offer(buffer, document, stop):
+                    return
+        finally:
+            cursor.close()
+        item = UNION_BRANCH_END
+    except Exception as e:
+        item = e
+    _offer(buffer, item, stop)
+
+
+def drain_union_branch(buffer):
+    """
+    Entrega los documentos que read_union_branch deja en la cola de una rama.
+    
+    Raises:
+        Exception: El error con el que falló la lectura de la rama
+    """
+    while True:
+        item = buffer.get()
+        if item is UNION_BRANCH_END:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def _sort_value(value):
+    """Clave de orden que admite tipos mezclados (nulos, números, textos y el resto)."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, str(value))
+
+
+def apply_union_tail(documents, union):
+    """
+    Aplica al resultado combinado de un UNION el ORDER BY, OFFSET y LIMIT finales.
+    
+    Args:
+        documents (iterable): Documentos de todas las ramas
+        union (dict): Información "union" de la operación traducida
+        
+    Returns:
+        list: Documentos ordenados y recortados
+    """
+    if union.get("sort"):
+        documents = list(documents)
+        # Ordenaciones estables de la última clave a la primera
+        for field, direction in reversed(list(union["sort"].items())):
+            documents.sort(key=lambda document: _sort_value(document.get(field)), reverse=direction == -1)
+    
+    start = union.get("skip") or 0
+    stop = start + union["limit"] if union.get("limit") is not None else None
+    return list(itertools.islice(documents, start, stop))
+
+
+def build_distinct_pipeline(query):
+    """
+    Pipeline equivalente a una operación distinct. Se usa cuando hace falta ordenar o
+    paginar los valores o cuando el resultado de distinct() superaría el límite de 16MB.
+    
+    Devuelve los mismos valores que el comando distinct: cada elemento de un array es
+    un valor, los documentos sin el campo (o con un array vacío) no aportan ninguno y
+    un null explícito sí.
+    
+    Args:
+        query (dict): Operación distinct (query, field, output, sort, skip, limit)
+        
+    Returns:
+        list: Etapas del pipeline; cada documento resultante es {output: valor}
+    """
+    field = query["field"]
+    pipeline = []
+    if query.get("query"):
+        pipeline.append({"$match": query["query"]})
+    # preserveNullAndEmptyArrays conserva los null; los campos ausentes y los arrays vacíos se descartan después
+    pipeline.append({"$unwind": {"path": f"${field}", "preserveNullAndEmptyArrays": True}})
+    pipeline.append({"$match": {field: {"$exists": True}}})
+    pipeline.append({"$group": {"_id": f"${field}"}})
+    if query.get("sort"):
+        pipeline.append({"$sort": {"_id": query["sort"]}})
+    if query.get("skip"):
+        pipeline.append({"$skip": query["skip"]})
+    if query.get("limit"):
+        pipeline.append({"$limit": query["limit"]})
+    pipeline.append({"$project": {"_id": 0, query.get("output", field): "$_id"}})
+    return pipeline
+
+def _observe_execution(method):
+    """Registra duración, resultado y documentos devueltos de cada consulta ejecutada."""
+    @functools.wraps(method)
+    def wrapper(self, collection_name, query, *args, **kwargs):
+        operation = query.get("operation", "unknown") if isinstance(query, dict) else "unknown"
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = method(self, collection_name, query, *args, **kwargs)
+            status = "ok"
+            if isinstance(result, list):
+                RESULT_DOCUMENTS.observe(len(result), operation=operation)
+            return result
+        finally:
+            EXECUTION_LATENCY.observe(time.perf_counter() - started, operation=operation, status=status)
+    return wrapper
 
 class MongoDBConnector:
     """
     Conector para MongoDB que implementa el patrón singleton.
     Proporciona métodos para interactuar con la base de datos MongoDB.
+    
+    La instancia solo comparte el MongoClient (con su pool de conexiones) y un registro
+    de handles por base de datos. Cada operación recibe la base de datos a usar
+    (database_name), de modo que peticiones concurrentes sobre bases distintas no
+    dependen de la base seleccionada por defecto con set_database().
     """
     
     @staticmethod
@@ -28,11 +269,12 @@ class MongoDBConnector:
             MongoDBConnector: Instancia única del conector.
         """
         global _instance
-        if _instance is None:
-            _instance = MongoDBConnector(uri, database_name)
-        elif database_name and _instance.database_name != database_name:
-            # Si se solicita cambiar la base de datos en la instancia existente
-            _instance.set_database(database_name)
+        with _instance_lock:
+            if _instance is None:
+                _instance = MongoDBConnector(uri, database_name)
+            elif database_name and _instance.database_name != database_name:
+                # Si se solicita cambiar la base de datos en la instancia existente
+                _instance.set_database(database_name)
         return _instance
     
     def __init__(self, uri, database_name=None):
@@ -44,7 +286,7 @@ class MongoDBConnector:
             database_name (str, optional): Nombre de la base de datos.
         """
         try:
-            logger.info(f"Iniciando conexión a MongoDB: {uri}")
+            logger.info("Iniciando conexión a MongoDB: %s", uri)
             # Opciones de conexión para mayor estabilidad
             self.client = MongoClient(
                 uri, 
@@ -52,11 +294,13 @@ class MongoDBConnector:
                 connectTimeoutMS=5000,
                 socketTimeoutMS=30000,
                 maxPoolSize=50,
-                retryWrites=True
+                retryWrites=True,
+                event_listeners=[POOL_LISTENER]
             )
             self.uri = uri
             self.db = None
             self.database_name = None
+            self._init_state()
             
             # Verificar conexión
             self.client.admin.command('ping')
@@ -64,7 +308,7 @@ class MongoDBConnector:
             
             # Listar bases de datos disponibles (excluyendo bases del sistema)
             self.available_databases = self._filter_system_databases(self.client.list_database_names())
-            logger.info(f"Bases de datos disponibles: {self.available_databases}")
+            logger.info("Bases de datos disponibles: %s", self.available_databases)
             
             # Establecer la base de datos si se proporcionó
             if database_name:
@@ -73,11 +317,29 @@ class MongoDBConnector:
                 logger.info("No se ha seleccionado ninguna base de datos. Use set_database() para seleccionar una.")
                 
         except Exception as e:
-            logger.error(f"Error al conectar a MongoDB: {e}")
+            logger.error("Error al conectar a MongoDB: %s", e)
             import traceback
             logger.error(traceback.format_exc())
             raise
     
+    def _init_state(self):
+        """Inicializa el estado compartido entre consultas: cachés y capacidades detectadas del servidor."""
+        self.count_mode = DEFAULT_COUNT_MODE
+        
+        # Handles de base de datos ya resueltos (uno por nombre, compartidos entre hilos)
+        self._databases = {}
+        self._databases_lock = threading.Lock()
+        
+        # False cuando el servidor ha rechazado $unionWith (se ejecutan las ramas por separado)
+        self._union_with_supported = None
+        
+        # Si el servidor admite $lookup conciso (ver _adapt_to_server); se consulta una vez
+        self._concise_lookup_supported = None
+        
+        # Valores de subconsultas IN ya ejecutadas (ver _subquery_values), compartidos entre hilos
+        self._subquery_cache = {}
+        self._subquery_cache_lock = threading.Lock()
+    
     def is_connected(self):
         """
         Verifica si la conexión a MongoDB está activa.
@@ -90,7 +352,7 @@ class MongoDBConnector:
             self.client.admin.command('ping')
             return True
         except Exception as e:
-            logger.error(f"Error de conexión: {e}")
+            logger.error("Error de conexión: %s", e)
             return False
     
     def is_database_selected(self):
@@ -111,6 +373,36 @@ class MongoDBConnector:
         """
         return self.database_name
     
+    def get_database(self, database_name=None):
+        """
+        Obtiene el handle de una base de datos sin modificar el estado compartido.
+        Los handles se guardan en un registro para no reconstruirlos en cada petición;
+        no se consulta al servidor, por lo que es seguro llamarlo por petición.
+        
+        Args:
+            database_name (str, optional): Nombre de la base de datos. Si no se indica,
+                se usa la seleccionada por defecto con set_database().
+            
+        Returns:
+            Database: Handle de la base de datos.
+            
+        Raises:
+            ValueError: Si no se indica base de datos y no hay una por defecto.
+        """
+        if not database_name:
+            database_name = self.database_name
+            if not database_name:
+                raise ValueError("No se ha seleccionado ninguna base de datos. Use set_database() primero.")
+        
+        db = self._databases.get(database_name)
+        if db is None:
+            with self._databases_lock:
+                db = self._databases.get(database_name)
+                if db is None:
+                    db = self.client[database_name]
+                    self._databases[database_name] = db
+        return db
+    
     def _filter_system_databases(self, databases):
         """
         Filtra las bases de datos del sistema.
@@ -136,17 +428,17 @@ class MongoDBConnector:
             list: Lista de colecciones disponibles.
         """
         try:
-            self.db = self.client[database_name]
+            self.db = self.get_database(database_name)
             self.database_name = database_name
             
             # Listar colecciones disponibles
             collections = self.db.list_collection_names()
-            logger.info(f"Conexión establecida con base de datos: {database_name}")
-            logger.info(f"Colecciones disponibles en {database_name}: {collections}")
+            logger.info("Conexión establecida con base de datos: %s", database_name)
+            logger.info("Colecciones disponibles en %s: %s", database_name, collections)
             
             return collections
         except Exception as e:
-            logger.error(f"Error al seleccionar la base de datos {database_name}: {e}")
+            logger.error("Error al seleccionar la base de datos %s: %s", database_name, e)
             import traceback
             logger.error(traceback.format_exc())
             raise
@@ -164,7 +456,7 @@ class MongoDBConnector:
             self.available_databases = self._filter_system_databases(all_databases)
             return self.available_databases
         except Exception as e:
-            logger.error(f"Error al obtener bases de datos disponibles: {e}")
+            logger.error("Error al obtener bases de datos disponibles: %s", e)
             self._try_reconnect()
             # Intentar nuevamente después de reconectar
             try:
@@ -185,16 +477,23 @@ class MongoDBConnector:
                 connectTimeoutMS=5000,
                 socketTimeoutMS=30000,
                 maxPoolSize=50,
-                retryWrites=True
+                retryWrites=True,
+                event_listeners=[POOL_LISTENER]
             )
             self.client.admin.command('ping')
             logger.info("Reconexión exitosa")
+            RECONNECTS.inc(result="success")
+            
+            # Los handles anteriores pertenecen al cliente descartado
+            with self._databases_lock:
+                self._databases = {}
             
             # Si había una base de datos seleccionada, volver a seleccionarla
             if hasattr(self, 'database_name') and self.database_name:
                 self.set_database(self.database_name)
         except Exception as e:
-            logger.error(f"Error al reconectar: {e}")
+            logger.error("Error al reconectar: %s", e)
+            RECONNECTS.inc(result="failure")
     
     def get_collections(self, database_name=None):
         """
@@ -208,30 +507,32 @@ class MongoDBConnector:
         """
         try:
             if database_name:
-                db = self.client[database_name]
-            elif hasattr(self, 'db') and self.db:
-                db = self.db
+                db = self.get_database(database_name)
+            elif self.is_database_selected():
+                db = self.get_database()
             else:
                 return []
             
             return db.list_collection_names()
         except Exception as e:
-            logger.error(f"Error al obtener colecciones: {e}")
+            logger.error("Error al obtener colecciones: %s", e)
             self._try_reconnect()
             # Intentar nuevamente después de reconectar
             try:
                 if database_name:
-                    return self.client[database_name].list_collection_names()
-                elif hasattr(self, 'db') and self.db:
-                    return self.db.list_collection_names()
+                    return self.get_database(database_name).list_collection_names()
+                elif self.is_database_selected():
+                    return self.get_database().list_collection_names()
                 return []
             except:
                 return []
 
     
+    @timed("serialize")
     def _serialize_results(self, results):
         """
-        Serializa los resultados para que sean compatibles con JSON.
+        Serializa los resultados para que sean compatibles con JSON
+        (ObjectId, fechas, Decimal128, Binary...) en una sola pasada.
         
         Args:
             results: Resultados de la consulta.
@@ -239,48 +540,27 @@ class MongoDBConnector:
         Returns:
             Resultados serializados.
         """
-        if isinstance(results, list):
-            for result in results:
-                if isinstance(result, dict):
-                    for key, value in list(result.items()):
-                        if isinstance(value, ObjectId):
-                            result[key] = str(value)
-                        elif isinstance(value, dict):
-                            # Recursivamente procesar subdocumentos
-                            self._serialize_dict(value)
-        elif isinstance(results, dict):
-            self._serialize_dict(results)
-        return results
+        return to_json_compatible(results)
     
     def _serialize_dict(self, document):
         """
-        Serializa un diccionario recursivamente.
+        Serializa un diccionario en sitio.
         
         Args:
             document (dict): Diccionario a serializar.
         """
-        for key, value in list(document.items()):
-            if isinstance(value, ObjectId):
-                document[key] = str(value)
-            elif isinstance(value, dict):
-                self._serialize_dict(value)
-            elif isinstance(value, list):
-                for i, item in enumerate(value):
-                    if isinstance(item, dict):
-                        self._serialize_dict(item)
-                    elif isinstance(item, ObjectId):
-                        value[i] = str(item)
+        to_json_compatible(document)
     
-    def _execute_find(self, collection, query):
+    def _build_find_cursor(self, collection, query):
         """
-        Ejecuta una operación find() en MongoDB.
+        Construye el cursor de una operación find() sin consumirlo.
         
         Args:
             collection (Collection): Colección de MongoDB.
             query (dict): Consulta en formato MongoDB.
             
         Returns:
-            list: Resultados de la consulta.
+            Cursor: Cursor con filtro, proyección, orden, skip y límite aplicados.
         """
         mongo_query = query.get("query", {})
         projection = query.get("projection", None)
@@ -288,53 +568,508 @@ class MongoDBConnector:
         limit = query.get("limit", None)
         skip = query.get("skip", None)
         
-        logger.info(f"Ejecutando find con filtro: {mongo_query}")
+        logger.debug("Ejecutando find con filtro: %s", truncated(mongo_query))
         
         # Preparar la consulta
         cursor = collection.find(mongo_query, projection)
         
         # Aplicar ordenamiento si existe
         if sort:
-            logger.info(f"Ordenamiento: {sort}")
+            logger.debug("Ordenamiento: %s", sort)
             cursor = cursor.sort(list(sort.items()))
         
         # Aplicar skip si existe
         if skip:
-            logger.info(f"Skip: {skip}")
+            logger.debug("Skip: %s", skip)
             cursor = cursor.skip(skip)
         
         # Aplicar límite si existe
         if limit is not None:
-            logger.info(f"Límite: {limit}")
+            logger.debug("Límite: %s", limit)
             cursor = cursor.limit(limit)
         
+        return cursor
+    
+    def _execute_find(self, collection, query, serialize=True):
+        """
+        Ejecuta una operación find() en MongoDB.
+        
+        Args:
+            collection (Collection): Colección de MongoDB.
+            query (dict): Consulta en formato MongoDB.
+            serialize (bool): Convertir los tipos BSON; con False se devuelven los
+                documentos tal cual para codificarlos directamente a JSON.
+            
+        Returns:
+            list: Resultados de la consulta.
+        """
+        cursor = self._build_find_cursor(collection, query)
+        
         # Ejecutar la consulta y convertir el cursor a lista
         results = list(cursor)
-        logger.info(f"Resultados encontrados: {len(results)}")
+        logger.info("Resultados encontrados: %s", len(results))
         
         # Serializar resultados para JSON
-        return self._serialize_results(results)
+        return self._serialize_results(results) if serialize else results
+    
+    def _execute_count(self, collection, query):
+        """
+        Ejecuta un SELECT COUNT(*) sin pasar los documentos por un pipeline. Con filtro
+        se usa count_documents (que aprovecha los índices del filtro); sin filtro y en
+        modo "approximate" se usa estimated_document_count, que lee los metadatos.
+        
+        Args:
+            collection (Collection): Colección de MongoDB.
+            query (dict): Operación count con query, field y, opcionalmente, mode
+                (si no se indica, se usa count_mode del conector).
+            
+        Returns:
+            list: Un documento {field: número de documentos}, como el $group equivalente.
+        """
+        filter_query = query.get("query") or {}
+        mode = query.get("mode") or self.count_mode
+        if mode not in COUNT_MODES:
+            raise ValueError(f"Modo de conteo no válido: {mode} (usar {' o '.join(COUNT_MODES)})")
+        
+        if not filter_query and mode == "approximate":
+            count = collection.estimated_document_count()
+        else:
+            count = collection.count_documents(filter_query)
+        
+        logger.debug("Conteo (%s) en %s: %s", mode, collection.name, count)
+        return [{query.get("field", "count"): count}]
+    
+    def _execute_distinct(self, collection, query, serialize=True):
+        """
+        Ejecuta un SELECT DISTINCT de una columna.
+        
+        Se usa el comando distinct, que recorre el índice del campo (DISTINCT_SCAN)
+        cuando existe; si su resultado supera los 16MB se repite con
+        build_distinct_pipeline, que no tiene ese límite. Si hay que ordenar o paginar
+        los valores se usa directamente el pipeline. Ambos caminos devuelven los mismos
+        valores: los arrays aportan cada uno de sus elementos y los documentos sin el
+        campo se omiten.
+        
+        Args:
+            collection (Collection): Colección de MongoDB.
+            query (dict): Operación distinct (query, field, output, sort, skip, limit).
+            serialize (bool): Convertir los tipos BSON de los valores.
+            
+        Returns:
+            list: Documentos {output: valor}, como el $group equivalente.
+        """
+        field = query["field"]
+        output = query.get("output", field)
+        
+        if query.get("sort") or query.get("skip") or query.get("limit"):
+            logger.debug("DISTINCT de %s con pipeline", field)
+            results = list(collection.aggregate(build_distinct_pipeline(query), allowDiskUse=True))
+        else:
+            try:
+                results = [{output: value} for value in collection.distinct(field, query.get("query") or {})]
+            except OperationFailure as e:
+                if e.code not in DISTINCT_TOO_LARGE_CODES:
+                    raise
+                logger.warning("Resultado de distinct sobre %s mayor de 16MB; se usa el pipeline", field)
+                results = list(collection.aggregate(build_distinct_pipeline(query), allowDiskUse=True))
+        
+        logger.info("Valores distintos: %s", len(results))
+        return self._serialize_results(results) if serialize else results
     
-    def _execute_aggregate(self, collection, query):
+    def _execute_aggregate(self, collection, query, serialize=True):
         """
         Ejecuta una operación aggregate() en MongoDB.
         
         Args:
             collection (Collection): Colección de MongoDB.
             query (dict): Consulta en formato MongoDB.
+            serialize (bool): Convertir los tipos BSON de los resultados.
             
         Returns:
             list: Resultados de la consulta.
         """
         pipeline = query.get("pipeline", [])
-        logger.info(f"Ejecutando aggregate con pipeline: {pipeline}")
+        logger.debug("Ejecutando aggregate con pipeline: %s", truncated(pipeline))
         
         # Ejecutar la agregación
         results = list(collection.aggregate(pipeline))
-        logger.info(f"Resultados de agregación: {len(results)}")
+        logger.info("Resultados de agregación: %s", len(results))
         
         # Serializar resultados para JSON
-        return self._serialize_results(results)
+        return self._serialize_results(results) if serialize else results
+    
+    def _subquery_values(self, db, subquery):
+        """
+        Ejecuta una subconsulta IN sin correlación y guarda sus valores SUBQUERY_CACHE_TTL
+        segundos. Se piden como mucho SUBQUERY_INLINE_MAX + 1 valores: si hay más,
+        se recuerda que la subconsulta es grande y se devuelve None.
+        
+        Args:
+            db (Database): Base de datos de la consulta.
+            subquery (dict): Entrada de "subqueries" (collection y pipeline de valores).
+            
+        Returns:
+            list: Valores distintos, o None si superan SUBQUERY_INLINE_MAX
+        """
+        key = (db.name, subquery["collection"], repr(subquery["pipeline"]))
+        with self._subquery_cache_lock:
+            cached = self._subquery_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        # La subconsulta se ejecuta fuera del lock para no bloquear a los demás hilos
+        pipeline = subquery["pipeline"] + [{"$limit": SUBQUERY_INLINE_MAX + 1}]
+        values = subquery_values(db[subquery["collection"]].aggregate(pipeline))
+        if len(values) > SUBQUERY_INLINE_MAX:
+            values = None
+        with self._subquery_cache_lock:
+            self._subquery_cache[key] = (time.monotonic() + SUBQUERY_CACHE_TTL, values)
+        return values
+    
+    def _forget_subquery_values(self, database_name, collection_name):
+        """Descarta los valores guardados de subconsultas sobre una colección que se modifica."""
+        with self._subquery_cache_lock:
+            for key in [key for key in self._subquery_cache if key[:2] == (database_name, collection_name)]:
+                del self._subquery_cache[key]
+    
+    def _execute_with_subqueries(self, db, collection, query, serialize=True):
+        """
+        Ejecuta un SELECT con subconsultas IN / EXISTS. Las subconsultas IN sin
+        correlación se ejecutan una vez y, si devuelven pocos valores, se copian en la
+        consulta como $in / $nin (que puede pasar a ser un find); el resto se resuelve
+        con el semi-join ($lookup) de la traducción.
+        
+        Args:
+            db (Database): Base de datos de la consulta.
+            collection (Collection): Colección de la consulta externa.
+            query (dict): Operación aggregate con "subqueries".
+            serialize (bool): Convertir los tipos BSON de los resultados.
+            
+        Returns:
+            list: Documentos resultantes.
+        """
+        values_by_field = {}
+        for subquery in query["subqueries"]:
+            values = self._subquery_values(db, subquery)
+            if values is not None:
+                values_by_field[subquery["as"]] = values
+        
+        rewritten = inline_subqueries(query, values_by_field)
+        logger.debug("Subconsultas en línea: %s de %s", len(values_by_field), len(query["subqueries"]))
+        if rewritten["operation"] == "find":
+            return self._execute_find(collection, rewritten, serialize)
+        return self._execute_aggregate(collection, rewritten, serialize)
+    
+    def _execute_union(self, db, collection, query, serialize=True):
+        """
+        Ejecuta un UNION / UNION ALL. Se usa el pipeline con $unionWith; si el servidor
+        no lo admite, las ramas se ejecutan a la vez en un pool de hilos y se combinan
+        aquí, eliminando duplicados (UNION) a medida que se recorren los resultados.
+        Cada rama lee por adelantado como mucho UNION_BRANCH_BUFFER documentos.
+        
+        Args:
+            db (Database): Base de datos de la consulta.
+            collection (Collection): Colección de la primera rama.
+            query (dict): Operación aggregate con la información "union".
+            serialize (bool): Convertir los tipos BSON de los resultados.
+            
+        Returns:
+            list: Filas del UNION.
+        """
+        if self._union_with_supported is not False:
+            try:
+                return self._execute_aggregate(collection, query, serialize)
+            except OperationFailure as e:
+                if e.code not in UNION_WITH_UNSUPPORTED_CODES:
+                    raise
+                logger.warning("El servidor no admite $unionWith; las ramas de UNION se ejecutan por separado")
+                self._union_with_supported = False
+        
+        union = query["union"]
+        branches = [self._adapt_to_server(branch) for branch in union["branches"]]
+        buffers = [queue.Queue(maxsize=UNION_BRANCH_BUFFER) for _ in branches]
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=min(len(branches), UNION_MAX_WORKERS)) as executor:
+            for branch, buffer in zip(branches, buffers):
+                executor.submit(read_union_branch, db[branch["collection"]], branch["pipeline"], buffer, stop)
+            try:
+                # Las ramas se combinan en orden mientras las siguientes se van leyendo
+                documents = combine_union_branches((drain_union_branch(buffer) for buffer in buffers), union)
+                results = apply_union_tail(documents, union)
+            finally:
+                # Sin ORDER BY, el LIMIT puede cumplirse antes de leer todas las ramas
+                stop.set()
+        
+        logger.info("Resultados de UNION (%s ramas): %s", len(branches), len(results))
+        return self._serialize_results(results) if serialize else results
+    
+    def _adapt_to_server(self, query):
+        """
+        Adapta una consulta traducida a la versión del servidor. Las traducciones de
+        JOIN y subconsultas usan $lookup con localField/foreignField y pipeline, que
+        requiere MongoDB CONCISE_LOOKUP_MIN_VERSION; en servidores anteriores se
+        convierten a la forma con let y $expr. La versión se consulta una sola vez.
+        
+        Args:
+            query (dict): Operación traducida.
+            
+        Returns:
+            dict: La misma operación o una copia con los $lookup convertidos.
+        """
+        if self._concise_lookup_supported is None:
+            version = tuple(self.client.admin.command("buildInfo").get("versionArray", [0, 0])[:2])
+            self._concise_lookup_supported = version >= CONCISE_LOOKUP_MIN_VERSION
+            if not self._concise_lookup_supported:
+                logger.warning("MongoDB %s.%s no admite $lookup conciso; se usa la forma con let y $expr", *version)
+        return query if self._concise_lookup_supported else expand_concise_lookups(query)
+    
+    def stream_query(self, collection_name, query, batch_size=DEFAULT_STREAM_BATCH_SIZE, serialize=True,
+                     database_name=None):
+        """
+        Ejecuta una consulta de lectura y entrega los documentos uno a uno a medida
+        que llegan los lotes del cursor, sin materializar el resultado completo.
+        
+        Args:
+            collection_name (str): Nombre de la colección.
+            query (dict): Consulta find o aggregate en formato MongoDB.
+            batch_size (int): Documentos que se piden al servidor por lote.
+            serialize (bool): Convertir los tipos BSON de cada documento.
+            database_name (str, optional): Base de datos (por defecto, la seleccionada).
+            
+        Yields:
+            dict: Documento (serializado para JSON si serialize es True).
+        """
+        db = self.get_database(database_name)
+        
+        operation = query.get("operation")
+        if operation not in STREAMABLE_OPERATIONS:
+            raise ValueError(f"La operación {operation} no admite ejecución en streaming")
+        
+        collection = db[collection_name]
+        logger.info("Ejecutando %s en streaming sobre %s (lotes de %s)", operation, collection_name, batch_size)
+        
+        if operation == "find":
+            cursor = self._build_find_cursor(collection, query).batch_size(batch_size)
+        else:
+            cursor = collection.aggregate(self._adapt_to_server(query).get("pipeline", []), batchSize=batch_size)
+        
+        count = 0
+        try:
+            for document in cursor:
+                if serialize:
+                    self._serialize_dict(document)
+                count += 1
+                yield document
+        finally:
+            # Liberar el cursor del servidor aunque el cliente corte la conexión
+            cursor.close()
+            logger.info("Streaming finalizado: %s documentos enviados", count)
+    
+    @timed("execute")
+    def execute_paginated(self, collection_name, paginator, serialize=True, database_name=None):
+        """
+        Ejecuta una página de una consulta de lectura preparada por un paginador keyset.
+        Los documentos se entregan al paginador antes de serializarlos para que el
+        token de continuación conserve los tipos BSON (ObjectId, fechas...).
+        
+        Args:
+            collection_name (str): Nombre de la colección.
+            paginator (KeysetPaginator): Paginador con la consulta de la página.
+            serialize (bool): Convertir los tipos BSON de los resultados.
+            database_name (str, optional): Base de datos (por defecto, la seleccionada).
+            
+        Returns:
+            dict: Página con results, page_size, has_more y next_cursor.
+        """
+        collection = self.get_database(database_name)[collection_name]
+        query = paginator.query
+        
+        if query.get("operation") == "find":
+            documents = list(self._build_find_cursor(collection, query))
+        else:
+            documents = list(collection.aggregate(self._adapt_to_server(query).get("pipeline", [])))
+        
+        page = paginator.build_page(documents)
+        if serialize:
+            page["results"] = self._serialize_results(page["results"])
+        logger.info("Página obtenida: %s documentos (más páginas: %s)", len(page['results']), page['has_more'])
+        return page
+    
+    def execute_bulk_write(self, collection_name, requests, ordered=True, database_name=None):
+        """
+        Ejecuta un grupo de escrituras (InsertOne/UpdateMany/DeleteMany) en un único
+        bulk_write. Los errores de escritura no se lanzan: se devuelven por operación.
+        
+        Args:
+            collection_name (str): Nombre de la colección.
+            requests (list): Operaciones de escritura de pymongo.
+            ordered (bool): Detenerse en el primer error.
+            database_name (str, optional): Base de datos (por defecto, la seleccionada).
+            
+        Returns:
+            dict: Contadores del bulk_write y lista write_errors (index, code, errmsg).
+        """
+        db = self.get_database(database_name)
+        collection = db[collection_name]
+        logger.info("Ejecutando bulk_write con %s operaciones en %s (ordered=%s)", len(requests), collection_name, ordered)
+        
+        try:
+            result = collection.bulk_write(requests, ordered=ordered)
+            return {
+                "acknowledged": result.acknowledged,
+                "inserted_count": result.inserted_count,
+                "matched_count": result.matched_count,
+                "modified_count": result.modified_count,
+                "deleted_count": result.deleted_count,
+                "upserted_count": result.upserted_count,
+                "write_errors": []
+            }
+        except BulkWriteError as e:
+            details = e.details
+            logger.warning("bulk_write con %s errores en %s", len(details.get('writeErrors', [])), collection_name)
+            return {
+                "acknowledged": True,
+                "inserted_count": details.get("nInserted", 0),
+                "matched_count": details.get("nMatched", 0),
+                "modified_count": details.get("nModified", 0),
+                "deleted_count": details.get("nRemoved", 0),
+                "upserted_count": details.get("nUpserted", 0),
+                "write_errors": [
+                    {"index": error["index"], "code": error.get("code"), "errmsg": error.get("errmsg")}
+                    for error in details.get("writeErrors", [])
+                ]
+            }
+        except Exception as e:
+            logger.error("Error en bulk_write sobre %s: %s", collection_name, e)
+            return {"acknowledged": False, "error": str(e), "write_errors": []}
+        finally:
+            # También tras un error: parte de las escrituras puede haberse aplicado
+            self._forget_subquery_values(db.name, collection_name)
+    
+    def iter_insert_stream(self, collection_name, stream, database_name=None, skip_batches=0):
+        """
+        Inserta los documentos de un InsertStream lote a lote con insert_many no ordenado.
+        Cada lote se lee, se envía y se libera antes de leer el siguiente.
+        
+        Args:
+            collection_name (str): Nombre de la colección.
+            stream (InsertStream): Sentencia INSERT en lectura incremental.
+            database_name (str, optional): Base de datos (por defecto, la seleccionada).
+            skip_batches (int): Lotes iniciales que ya se insertaron (reanudación): se leen
+                pero no se envían.
+            
+        Yields:
+            dict: Progreso de cada lote (filas leídas, insertadas y errores del lote).
+                Si la lectura o el servidor fallan, el último evento incluye error y aborted.
+        """
+        db = self.get_database(database_name)
+        collection = db[collection_name]
+        batches = stream.iter_batches()
+        batch_number = 0
+        inserted_total = 0
+        
+        while True:
+            try:
+                rows, documents = next(batches)
+            except StopIteration:
+                return
+            except ValueError as e:
+                logger.error("Error leyendo el INSERT de %s tras %s filas: %s", collection_name, stream.rows_read, e)
+                yield {"batch": batch_number + 1, "rows_read": stream.rows_read, "inserted_total": inserted_total,
+                       "error": str(e), "aborted": True}
+                return
+            
+            batch_number += 1
+            if batch_number <= skip_batches:
+                continue
+            
+            event = {
+                "batch": batch_number,
+                "first_row": rows[0],
+                "last_row": rows[-1],
+                "documents": len(documents),
+                "inserted": 0,
+                "errors": []
+            }
+            
+            try:
+                result = collection.insert_many(documents, ordered=False)
+                event["inserted"] = len(result.inserted_ids)
+            except BulkWriteError as e:
+                details = e.details
+                event["inserted"] = details.get("nInserted", 0)
+                event["errors"] = [
+                    {"row": rows[error["index"]], "code": error.get("code"), "errmsg": error.get("errmsg")}
+                    for error in details.get("writeErrors", [])
+                ]
+                logger.warning("Lote %s de %s: %s documentos rechazados", batch_number, collection_name, len(event['errors']))
+            except Exception as e:
+                logger.error("Error insertando el lote %s en %s: %s", batch_number, collection_name, e)
+                event["error"] = str(e)
+                event["aborted"] = True
+            finally:
+                self._forget_subquery_values(db.name, collection_name)
+            
+            inserted_total += event["inserted"]
+            event["rows_read"] = stream.rows_read
+            event["inserted_total"] = inserted_total
+            logger.info(
+                "Lote %s insertado en %s: %s/%s documentos (filas leídas: %s, insertadas: %s)",
+                batch_number, collection_name, event['inserted'], len(documents), stream.rows_read, inserted_total
+            )
+            yield event
+            
+            if event.get("aborted"):
+                return
+    
+    def execute_insert_stream(self, collection_name, stream, database_name=None, max_reported_errors=100):
+        """
+        Ejecuta un InsertStream completo y resume el resultado de todos los lotes.
+        
+        Args:
+            collection_name (str): Nombre de la colección.
+            stream (InsertStream): Sentencia INSERT en lectura incremental.
+            database_name (str, optional): Base de datos (por defecto, la seleccionada).
+            max_reported_errors (int): Errores de escritura que se incluyen en el resumen.
+            
+        Returns:
+            dict: Totales, lotes con errores y errores por fila.
+        """
+        summary = {
+            "acknowledged": True,
+            "operation": "insert_stream",
+            "collection": collection_name,
+            "batch_size": stream.batch_size,
+            "batches": 0,
+            "inserted_count": 0,
+            "failed_batches": [],
+            "write_errors": [],
+            "write_error_count": 0
+        }
+        
+        for event in self.iter_insert_stream(collection_name, stream, database_name):
+            if "documents" in event:
+                summary["batches"] += 1
+            summary["inserted_count"] = event["inserted_total"]
+            
+            errors = event.get("errors", [])
+            summary["write_error_count"] += len(errors)
+            room = max_reported_errors - len(summary["write_errors"])
+            if room > 0:
+                summary["write_errors"].extend(errors[:room])
+            
+            if event.get("error"):
+                summary["failed_batches"].append({"batch": event["batch"], "error": event["error"]})
+                summary["aborted"] = True
+        
+        summary["rows_read"] = stream.rows_read
+        summary["rows_rejected"] = stream.rows_rejected
+        summary["row_errors"] = stream.errors
+        logger.info(
+            "INSERT por lotes en %s: %s insertados de %s filas en %s lotes",
+            collection_name, summary['inserted_count'], stream.rows_read, summary['batches']
+        )
+        return summary
     
     def _execute_insert(self, collection, query):
         """
@@ -348,7 +1083,7 @@ class MongoDBConnector:
             dict: Resultado de la operación.
         """
         document = query.get("document", {})
-        logger.info(f"Insertando documento: {document}")
+        logger.debug("Insertando documento con %s campos", len(document))
         
         # Ejecutar la inserción
         result = collection.insert_one(document)
@@ -368,7 +1103,7 @@ class MongoDBConnector:
         documents = query.get("documents", [])
         count = len(documents)
         
-        logger.info(f"Insertando {count} documentos: {documents}")
+        logger.info("Insertando %s documentos", count)
         
         if count == 0:
             return {
@@ -381,7 +1116,7 @@ class MongoDBConnector:
         result = collection.insert_many(documents)
         inserted_ids = [str(id) for id in result.inserted_ids]
         
-        logger.info(f"{len(inserted_ids)} documentos insertados con IDs: {inserted_ids}")
+        logger.info("%s documentos insertados", len(inserted_ids))
         
         return {
             "acknowledged": result.acknowledged,
@@ -405,13 +1140,13 @@ class MongoDBConnector:
         filter_query = update_query.get("query", {})
         update_data = update_query.get("update", {})
         
-        logger.info(f"Actualizando documentos con filtro: {filter_query}")
-        logger.info(f"Datos de actualización: {update_data}")
+        logger.info("Actualizando documentos con filtro: %s", truncated(filter_query))
+        logger.debug("Datos de actualización: %s", truncated(update_data))
         
-        # Si update_data no tiene operadores de actualización, usar $set
-        if update_data and not any(key.startswith("$") for key in update_data.keys()):
+        # Si update_data no tiene operadores de actualización, usar $set (una lista es un update con pipeline)
+        if isinstance(update_data, dict) and update_data and not any(key.startswith("$") for key in update_data.keys()):
             update_data = {"$set": update_data}
-            logger.info(f"Añadiendo operador $set implícito: {update_data}")
+            logger.debug("Añadiendo operador $set implícito: %s", truncated(update_data))
         
         # Ejecutar la actualización
         result = collection.update_many(filter_query, update_data)
@@ -433,14 +1168,14 @@ class MongoDBConnector:
             dict: Resultado de la operación.
         """
         delete_query = query.get("query", {})
-        logger.info(f"Eliminando documentos con filtro: {delete_query}")
+        logger.info("Eliminando documentos con filtro: %s", truncated(delete_query))
         
         # Ejecutar la eliminación
         result = collection.delete_many(delete_query)
         return {"deleted_count": result.deleted_count}
     
 
-    def create_collection_with_schema(self, collection_name, options=None, indexes=None):
+    def create_collection_with_schema(self, collection_name, options=None, indexes=None, database_name=None):
         """
         Crea una colección con validación de esquema e índices.
         🔧 CORREGIDO: Maneja colecciones existentes
@@ -449,20 +1184,20 @@ class MongoDBConnector:
             collection_name (str): Nombre de la colección
             options (dict): Opciones de creación incluyendo validator
             indexes (list): Lista de índices a crear
+            database_name (str, optional): Base de datos (por defecto, la seleccionada)
             
         Returns:
             dict: Resultado de la operación
         """
         try:
-            if not self.is_database_selected():
-                raise Exception("No hay base de datos seleccionada")
+            db = self.get_database(database_name)
             
             # 🔧 NUEVO: Verificar si la colección ya existe
-            existing_collections = self.db.list_collection_names()
+            existing_collections = db.list_collection_names()
             collection_exists = collection_name in existing_collections
             
             if collection_exists:
-                logger.warning(f"La colección '{collection_name}' ya existe")
+                logger.warning("La colección '%s' ya existe", collection_name)
                 
                 # 🔧 OPCIÓN 1: Devolver información de la colección existente
                 result = {
@@ -478,33 +1213,33 @@ class MongoDBConnector:
                 
                 # Obtener información de la colección existente
                 try:
-                    existing_schema = self.get_collection_schema(collection_name)
+                    existing_schema = self.get_collection_schema(collection_name, database_name)
                     if existing_schema and existing_schema.get("has_validator"):
                         result["has_validator"] = True
                         result["existing_validator"] = existing_schema.get("validator")
                 except Exception as e:
-                    logger.warning(f"No se pudo obtener esquema existente: {e}")
+                    logger.warning("No se pudo obtener esquema existente: %s", e)
                 
                 # Obtener índices existentes
                 try:
-                    existing_indexes = self.get_collection_indexes(collection_name)
+                    existing_indexes = self.get_collection_indexes(collection_name, database_name)
                     result["existing_indexes"] = existing_indexes
                     result["total_existing_indexes"] = len(existing_indexes)
                 except Exception as e:
-                    logger.warning(f"No se pudo obtener índices existentes: {e}")
+                    logger.warning("No se pudo obtener índices existentes: %s", e)
                 
                 return result
             
             # 🔧 NUEVO: Solo crear si no existe
             # 1. Crear la colección con opciones
             if options:
-                self.db.create_collection(collection_name, **options)
-                logger.info(f"Colección '{collection_name}' creada con validador de esquema")
+                db.create_collection(collection_name, **options)
+                logger.info("Colección '%s' creada con validador de esquema", collection_name)
             else:
-                self.db.create_collection(collection_name)
-                logger.info(f"Colección '{collection_name}' creada sin esquema")
+                db.create_collection(collection_name)
+                logger.info("Colección '%s' creada sin esquema", collection_name)
             
-            collection = self.db[collection_name]
+            collection = db[collection_name]
             
             # 2. Crear índices si se especificaron
             indexes_created = []
@@ -520,12 +1255,12 @@ class MongoDBConnector:
                             "name": index_name,
                             "specification": index_spec
                         })
-                        logger.info(f"Índice creado: {index_name}")
+                        logger.info("Índice creado: %s", index_name)
                     except Exception as e:
-                        logger.warning(f"Error creando índice {index_spec.get('name', 'unknown')}: {e}")
+                        logger.warning("Error creando índice %s: %s", index_spec.get('name', 'unknown'), e)
             
             # 3. Verificar que la colección fue creada
-            collection_info = self.db.list_collection_names()
+            collection_info = db.list_collection_names()
             created_successfully = collection_name in collection_info
             
             result = {
@@ -547,17 +1282,17 @@ class MongoDBConnector:
                         "has_schema": "$jsonSchema" in options["validator"]
                     }
                 except Exception as e:
-                    logger.warning(f"No se pudo obtener información del validador: {e}")
+                    logger.warning("No se pudo obtener información del validador: %s", e)
             
             return result
             
         except Exception as e:
-            logger.error(f"Error creando colección con esquema: {e}")
+            logger.error("Error creando colección con esquema: %s", e)
             raise e
 
 
     # 🔧 MÉTODO ADICIONAL: Opción para recrear colección
-    def recreate_collection_with_schema(self, collection_name, options=None, indexes=None):
+    def recreate_collection_with_schema(self, collection_name, options=None, indexes=None, database_name=None):
         """
         🔧 NUEVO: Recrea una colección eliminando la existente primero.
         ⚠️ PELIGROSO: Esto eliminará todos los datos existentes.
@@ -566,41 +1301,44 @@ class MongoDBConnector:
             collection_name (str): Nombre de la colección
             options (dict): Opciones de creación
             indexes (list): Lista de índices
+            database_name (str, optional): Base de datos (por defecto, la seleccionada)
             
         Returns:
             dict: Resultado de la operación
         """
         try:
+            db = self.get_database(database_name)
+            
             # 1. Verificar si existe y eliminarla
-            existing_collections = self.db.list_collection_names()
+            existing_collections = db.list_collection_names()
             if collection_name in existing_collections:
-                logger.warning(f"🗑️ Eliminando colección existente '{collection_name}'")
-                self.db.drop_collection(collection_name)
+                logger.warning("🗑️ Eliminando colección existente '%s'", collection_name)
+                db.drop_collection(collection_name)
             
             # 2. Crear nueva colección
-            return self.create_collection_with_schema(collection_name, options, indexes)
+            return self.create_collection_with_schema(collection_name, options, indexes, database_name)
             
         except Exception as e:
-            logger.error(f"Error recreando colección: {e}")
+            logger.error("Error recreando colección: %s", e)
             raise e
 
 
-    def get_collection_schema(self, collection_name):
+    def get_collection_schema(self, collection_name, database_name=None):
         """
         Obtiene el esquema de validación de una colección.
         
         Args:
             collection_name (str): Nombre de la colección
+            database_name (str, optional): Base de datos (por defecto, la seleccionada)
             
         Returns:
             dict: Información del esquema o None si no tiene
         """
         try:
-            if not self.is_database_selected():
-                raise Exception("No hay base de datos seleccionada")
+            db = self.get_database(database_name)
             
             # Obtener información de la colección
-            collections = self.db.list_collections(filter={"name": collection_name})
+            collections = db.list_collections(filter={"name": collection_name})
             collection_info = list(collections)
             
             if not collection_info:
@@ -619,24 +1357,22 @@ class MongoDBConnector:
             return {"has_validator": False}
             
         except Exception as e:
-            logger.error(f"Error obteniendo esquema de colección: {e}")
+            logger.error("Error obteniendo esquema de colección: %s", e)
             return None
 
-    def get_collection_indexes(self, collection_name):
+    def get_collection_indexes(self, collection_name, database_name=None):
         """
         Obtiene los índices de una colección.
         
         Args:
             collection_name (str): Nombre de la colección
+            database_name (str, optional): Base de datos (por defecto, la seleccionada)
             
         Returns:
             list: Lista de índices
         """
         try:
-            if not self.is_database_selected():
-                raise Exception("No hay base de datos seleccionada")
-            
-            collection = self.db[collection_name]
+            collection = self.get_database(database_name)[collection_name]
             indexes = list(collection.list_indexes())
             
             # Limpiar información de índices
@@ -653,28 +1389,26 @@ class MongoDBConnector:
             return cleaned_indexes
             
         except Exception as e:
-            logger.error(f"Error obteniendo índices de colección: {e}")
+            logger.error("Error obteniendo índices de colección: %s", e)
             return []
 
-    def insert_sample_document(self, collection_name, document):
+    def insert_sample_document(self, collection_name, document, database_name=None):
         """
         Inserta un documento de ejemplo en una colección.
         
         Args:
             collection_name (str): Nombre de la colección
             document (dict): Documento a insertar
+            database_name (str, optional): Base de datos (por defecto, la seleccionada)
             
         Returns:
             dict: Resultado de la inserción
         """
         try:
-            if not self.is_database_selected():
-                raise Exception("No hay base de datos seleccionada")
-            
-            collection = self.db[collection_name]
+            collection = self.get_database(database_name)[collection_name]
             result = collection.insert_one(document)
             
-            logger.info(f"Documento de ejemplo insertado con ID: {result.inserted_id}")
+            logger.info("Documento de ejemplo insertado con ID: %s", result.inserted_id)
             
             return {
                 "acknowledged": result.acknowledged,
@@ -683,41 +1417,55 @@ class MongoDBConnector:
             }
             
         except Exception as e:
-            logger.error(f"Error insertando documento de ejemplo: {e}")
+            logger.error("Error insertando documento de ejemplo: %s", e)
             return {
                 "acknowledged": False,
                 "error": str(e)
             }
 
 
-    def execute_query(self, collection_name, query):
+    @timed("execute")
+    @_observe_execution
+    def execute_query(self, collection_name, query, serialize=True, database_name=None):
         """
         Ejecuta una consulta en MongoDB.
-        🔧 ACTUALIZADO: Soporte para UPDATE con aggregate + $merge
+        
+        Con serialize=False las lecturas devuelven los documentos sin convertir, para
+        codificarlos a JSON en una sola pasada (app.serialization.dumps).
+        database_name indica la base de datos de esta consulta; si se omite se usa la
+        seleccionada con set_database().
         """
         max_retries = 3
         retry_count = 0
         
         while retry_count < max_retries:
             try:
-                # Verificar si hay una base de datos seleccionada
-                if not self.is_database_selected():
-                    raise ValueError("No se ha seleccionado ninguna base de datos. Use set_database() primero.")
+                # Resolver la base de datos de esta consulta
+                db = self.get_database(database_name)
                 
-                collection = self.db[collection_name]
+                collection = db[collection_name]
                 operation = query.get("operation")
-                logger.info(f"Ejecutando operación {operation} en la colección {collection_name}")
+                logger.info("Ejecutando operación %s en la colección %s", operation, collection_name)
+                
+                if operation in WRITE_OPERATIONS:
+                    self._forget_subquery_values(db.name, collection_name)
+                elif operation in ("aggregate", "explain"):
+                    query = self._adapt_to_server(query)
                 
                 # Manejar cada tipo de operación
                 if operation == "find":
-                    return self._execute_find(collection, query)
+                    return self._execute_find(collection, query, serialize)
                 elif operation == "aggregate":
-                    # 🔧 NUEVO: Verificar si es un UPDATE con aggregate
-                    if query.get("update_type") == "math_operations":
-                        logger.info("🔢 Ejecutando UPDATE con operaciones matemáticas usando aggregate")
-                        return self._execute_aggregate_update(collection, query)
+                    if query.get("union"):
+                        return self._execute_union(db, collection, query, serialize)
+                    elif query.get("subqueries"):
+                        return self._execute_with_subqueries(db, collection, query, serialize)
                     else:
-                        return self._execute_aggregate(collection, query)
+                        return self._execute_aggregate(collection, query, serialize)
+                elif operation == "count":
+                    return self._execute_count(collection, query)
+                elif operation == "distinct":
+                    return self._execute_distinct(collection, query, serialize)
                 elif operation == "insert":
                     return self._execute_insert(collection, query)
                 elif operation == "INSERT_MANY":
@@ -729,27 +1477,29 @@ class MongoDBConnector:
                 elif operation == "create_collection_with_schema":
                     options = query.get("options", {})
                     indexes = query.get("indexes_to_create", [])
-                    result = self.create_collection_with_schema(collection_name, options, indexes)
+                    result = self.create_collection_with_schema(collection_name, options, indexes, database_name)
                     sample_document = query.get("sample_document")
                     if sample_document:
                         try:
-                            sample_result = self.insert_sample_document(collection_name, sample_document)
+                            sample_result = self.insert_sample_document(collection_name, sample_document, database_name)
                             result["sample_document_inserted"] = sample_result
                         except Exception as e:
-                            logger.warning(f"No se pudo insertar documento de ejemplo: {e}")
+                            logger.warning("No se pudo insertar documento de ejemplo: %s", e)
                             result["sample_document_error"] = str(e)
                     return result
                 elif operation == "create_collection":
                     options = query.get("options", {})
-                    self.db.create_collection(collection_name, **options)
+                    db.create_collection(collection_name, **options)
                     return {"created": True, "collection_name": collection_name}
                 elif operation == "drop_collection":
                     return self._execute_drop_collection(collection)
+                elif operation == "explain":
+                    return self._execute_explain(db, collection_name, query)
                 else:
                     raise ValueError(f"Operación no soportada: {operation}")
                     
             except Exception as e:
-                logger.error(f"Error al ejecutar consulta (intento {retry_count+1}): {e}")
+                logger.error("Error al ejecutar consulta (intento %s): %s", retry_count+1, e)
                 retry_count += 1
                 
                 if "MongoClient after close" in str(e) or "not connected" in str(e).lower():
@@ -762,39 +1512,38 @@ class MongoDBConnector:
                     raise
                 else:
                     time.sleep(0.5)
+                
+                if retry_count < max_retries:
+                    EXECUTION_RETRIES.inc(operation=query.get("operation", "unknown"))
         
         raise Exception("Se excedió el número máximo de intentos de consulta")
 
 
-    def _execute_aggregate_update(self, collection, query):
+    def _execute_explain(self, db, collection_name, query):
         """
-        🔧 NUEVO: Ejecuta UPDATE usando aggregate con $merge.
+        Ejecuta explain sobre el find o aggregate de una consulta EXPLAIN [ANALYZE].
         
         Args:
-            collection: Colección de MongoDB
-            query: Consulta con pipeline de agregación para UPDATE
+            db (Database): Base de datos de la consulta
+            collection_name (str): Nombre de la colección
+            query (dict): Operación explain con la consulta traducida en "query"
             
         Returns:
-            dict: Resultado de la operación
+            dict: Resumen del plan (y la salida completa si include_raw)
         """
-        pipeline = query.get("pipeline", [])
-        logger.info(f" Ejecutando UPDATE con pipeline de agregación: {pipeline}")
-        
-        # Ejecutar el pipeline (el $merge actualiza automáticamente)
-        list(collection.aggregate(pipeline))
+        command = build_explain_command(collection_name, query["query"])
+        raw = db.command({"explain": command, "verbosity": query.get("verbosity", "queryPlanner")})
         
-        # Simular respuesta de update para compatibilidad
-        # En un UPDATE real, deberíamos contar los documentos afectados
-        # pero con aggregate+$merge es más complejo obtener esta información
-        
-        return {
-            "acknowledged": True,
-            "matched_count": "N/A - aggregate operation",
-            "modified_count": "N/A - aggregate operation", 
-            "update_method": "aggregate_with_merge",
-            "message": "UPDATE ejecutado usando aggregate + $merge para operaciones matemáticas"
+        result = {
+            "verbosity": query.get("verbosity"),
+            "operation": query["query"].get("operation"),
+            "summary": summarize_explain(raw)
         }
-
+        if query.get("include_raw"):
+            result["raw"] = to_json_compatible(raw)
+        logger.info("Explain de %s: %s", collection_name, result['summary'].get('winning_plan'))
+        return result
+    
     def _execute_drop_collection(self, collection):
         """
         Ejecuta una operación drop() en una colección de MongoDB.
@@ -805,6 +1554,6 @@ class MongoDBConnector:
         Returns:
             dict: Resultado de la operación.
         """
-        logger.info(f"Eliminando colección: {collection.name}")
+        logger.info("Eliminando colección: %s", collection.name)
         collection.drop()
         return {"dropped": True, "collection_name": collection.name}
\ No newline at end of file
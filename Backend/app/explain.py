@@ -0,0 +1,147 @@
+import logging
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Verbosidad del comando explain para EXPLAIN y EXPLAIN ANALYZE
+EXPLAIN_VERBOSITY = "queryPlanner"
+EXPLAIN_ANALYZE_VERBOSITY = "executionStats"
+
+# Operaciones traducidas que MongoDB puede explicar
+EXPLAINABLE_OPERATIONS = ("find", "aggregate", "count", "distinct")
+
+# Documentos examinados por documento devuelto a partir de los cuales se avisa
+POOR_SELECTIVITY_RATIO = 10
+
+
+def build_explain_command(collection_name, mongo_query):
+    """
+    Construye el comando que se envía dentro de explain para una operación traducida.
+
+    Args:
+        collection_name (str): Colección de la operación
+        mongo_query (dict): Operación find, aggregate, count o distinct traducida
+
+    Returns:
+        dict: Comando find, aggregate, count o distinct en formato del servidor
+
+    Raises:
+        ValueError: Si la operación no se puede explicar
+    """
+    operation = mongo_query.get("operation")
+
+    if operation == "find":
+        command = {"find": collection_name, "filter": mongo_query.get("query") or {}}
+        if mongo_query.get("projection"):
+            command["projection"] = mongo_query["projection"]
+        if mongo_query.get("sort"):
+            command["sort"] = mongo_query["sort"]
+        if mongo_query.get("skip"):
+            command["skip"] = mongo_query["skip"]
+        if mongo_query.get("limit") is not None:
+            command["limit"] = mongo_query["limit"]
+        return command
+
+    if operation == "count":
+        return {"count": collection_name, "query": mongo_query.get("query") or {}}
+
+    if operation == "distinct":
+        return {"distinct": collection_name, "key": mongo_query["field"], "query": mongo_query.get("query") or {}}
+
+    if operation == "aggregate":
+        return {"aggregate": collection_name, "pipeline": mongo_query.get("pipeline", []), "cursor": {}}
+
+    raise ValueError(f"EXPLAIN no está soportado para la operación {operation}")
+
+
+def _plan_stages(plan):
+    """Etapas de un plan (winningPlan o executionStages) desde la raíz hasta las hojas."""
+    stages = []
+    pending = [plan] if plan else []
+    while pending:
+        node = pending.pop(0)
+        # Motor SBE: el plan clásico equivalente está en queryPlan
+        if "queryPlan" in node and "stage" not in node:
+            node = node["queryPlan"]
+        stages.append(node)
+        if "inputStage" in node:
+            pending.append(node["inputStage"])
+        pending.extend(node.get("inputStages", []))
+    return stages
+
+
+def _summarize_query_plan(query_planner, execution_stats=None):
+    """Resumen del plan ganador y, si existen, de sus estadísticas de ejecución."""
+    winning = _plan_stages((query_planner or {}).get("winningPlan"))
+    summary = {
+        "winning_plan": " <- ".join(node.get("stage", "?") for node in winning),
+        "indexes_used": sorted({node["indexName"] for node in winning if node.get("indexName")}),
+        "collection_scan": any(node.get("stage") == "COLLSCAN" for node in winning),
+        "rejected_plans": len((query_planner or {}).get("rejectedPlans", [])),
+    }
+
+    if execution_stats:
+        returned = execution_stats.get("nReturned", 0)
+        keys = execution_stats.get("totalKeysExamined", 0)
+        docs = execution_stats.get("totalDocsExamined", 0)
+        summary.update({
+            "n_returned": returned,
+            "execution_time_ms": execution_stats.get("executionTimeMillis"),
+            "keys_examined": keys,
+            "docs_examined": docs,
+            "docs_examined_per_key": round(docs / keys, 3) if keys else None,
+            "docs_examined_per_returned": round(docs / returned, 3) if returned else None,
+            "stages": [
+                {
+                    "stage": node.get("stage"),
+                    "n_returned": node.get("nReturned"),
+                    "time_ms": node.get("executionTimeMillisEstimate"),
+                    **({"index": node["indexName"]} if node.get("indexName") else {}),
+                }
+                for node in _plan_stages(execution_stats.get("executionStages"))
+            ],
+        })
+    return summary
+
+
+def summarize_explain(raw):
+    """
+    Resume la salida de explain: plan ganador, índices usados, documentos y claves
+    examinados y tiempo por etapa (solo con executionStats).
+
+    Args:
+        raw (dict): Respuesta del comando explain
+
+    Returns:
+        dict: Resumen compacto con una lista de warnings
+    """
+    # Colección fragmentada: cada shard devuelve su propio plan
+    if "shards" in raw and "queryPlanner" not in raw and "stages" not in raw:
+        return {"shards": {name: summarize_explain(shard) for name, shard in raw["shards"].items()}}
+
+    if "stages" in raw:
+        # Agregación con etapas que no se resuelven en la consulta inicial
+        first = raw["stages"][0].get("$cursor", {}) if raw["stages"] else {}
+        summary = _summarize_query_plan(first.get("queryPlanner"), first.get("executionStats"))
+        summary["pipeline_stages"] = [
+            {
+                "stage": next((key for key in stage if key.startswith("$")), "?"),
+                "n_returned": stage.get("nReturned"),
+                "time_ms": stage.get("executionTimeMillisEstimate"),
+            }
+            for stage in raw["stages"]
+        ]
+    else:
+        summary = _summarize_query_plan(raw.get("queryPlanner"), raw.get("executionStats"))
+
+    warnings = []
+    if summary["collection_scan"]:
+        warnings.append("La consulta recorre la colección completa (COLLSCAN); /indexes/advise puede proponer un índice")
+    if "SORT" in summary["winning_plan"].split(" <- "):
+        warnings.append("La ordenación se hace en memoria; un índice con los campos del ORDER BY la evitaría")
+    ratio = summary.get("docs_examined_per_returned")
+    if ratio and ratio > POOR_SELECTIVITY_RATIO:
+        warnings.append(f"Se examinan {ratio} documentos por cada documento devuelto")
+    summary["warnings"] = warnings
+
+    return summary
@@ -0,0 +1,212 @@
+import bisect
+import contextlib
+import contextvars
+import functools
+import logging
+import threading
+import time
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Límites superiores (ms) de los buckets de los histogramas de latencia
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Formas de consulta distintas con histograma propio (las menos usadas se descartan)
+DEFAULT_MAX_SHAPES = 500
+
+# Temporizador de la petición en curso (None fuera de una petición instrumentada)
+_current_timer = contextvars.ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    """
+    Tiempos por etapa de una petición. Cada etapa acumula su duración y el número
+    de veces que se ejecutó; las etapas anidadas (parse.where dentro de translate)
+    se miden por separado, así que sus tiempos no se suman entre sí.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.shape = None
+
+    def add(self, name, elapsed_ms):
+        """Suma una medición a la etapa name."""
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [elapsed_ms, 1]
+        else:
+            stage[0] += elapsed_ms
+            stage[1] += 1
+
+    def total_ms(self):
+        """Milisegundos desde el inicio de la petición."""
+        return (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self):
+        """Tiempos (ms) por etapa más el total de la petición."""
+        timings = {name: round(elapsed, 3) for name, (elapsed, _) in self.stages.items()}
+        timings["total"] = round(self.total_ms(), 3)
+        return timings
+
+    def server_timing(self):
+        """Valor de la cabecera Server-Timing (etapa;dur=ms, ...)."""
+        metrics = [f"{name};dur={elapsed:.3f}" for name, (elapsed, _) in self.stages.items()]
+        metrics.append(f"total;dur={self.total_ms():.3f}")
+        return ", ".join(metrics)
+
+
+def start_request():
+    """
+    Activa un temporizador para la petición (o tarea) actual.
+
+    Returns:
+        tuple: (RequestTimer, token para finish_request)
+    """
+    timer = RequestTimer()
+    return timer, _current_timer.set(timer)
+
+
+def finish_request(token):
+    """Desactiva el temporizador activado con start_request."""
+    _current_timer.reset(token)
+
+
+def current_timer():
+    """Temporizador de la petición en curso o None."""
+    return _current_timer.get()
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    Mide el bloque como la etapa name de la petición en curso. Fuera de una petición
+    instrumentada no mide nada.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, (time.perf_counter() - started) * 1000)
+
+
+def timed(name):
+    """Decorador que mide cada llamada a la función como la etapa name."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _current_timer.get() is None:
+                return function(*args, **kwargs)
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LatencyHistogram:
+    """Histograma de latencias con buckets fijos (LATENCY_BUCKETS_MS)."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+        self.max = max(self.max, value_ms)
+
+    def quantile(self, q):
+        """Estimación del cuantil q: límite superior del bucket que lo contiene."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count, 3) if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max, 3),
+        }
+
+
+class ShapeLatencyStats:
+    """
+    Histogramas de latencia por forma de consulta (consulta normalizada sin literales)
+    y por etapa, para ver qué etapa de qué consulta empeora con la carga.
+    """
+
+    def __init__(self, max_shapes=DEFAULT_MAX_SHAPES):
+        """
+        Args:
+            max_shapes (int): Formas de consulta distintas que se conservan
+        """
+        self.max_shapes = max_shapes
+        self._shapes = {}
+        self._lock = threading.Lock()
+
+    def record(self, timer):
+        """Añade los tiempos de una petición terminada al histograma de su forma."""
+        if timer is None or timer.shape is None or not self.max_shapes:
+            return
+
+        total = timer.total_ms()
+        with self._lock:
+            entry = self._shapes.get(timer.shape)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    # Descartar la forma con menos peticiones
+                    least_used = min(self._shapes, key=lambda shape: self._shapes[shape]["total"].count)
+                    del self._shapes[least_used]
+                entry = self._shapes[timer.shape] = {"total": LatencyHistogram(), "stages": {}}
+
+            entry["total"].observe(total)
+            for name, (elapsed, _) in timer.stages.items():
+                histogram = entry["stages"].get(name)
+                if histogram is None:
+                    histogram = entry["stages"][name] = LatencyHistogram()
+                histogram.observe(elapsed)
+
+    def snapshot(self, limit=None):
+        """
+        Resumen de los histogramas, de la forma con más peticiones a la de menos.
+
+        Args:
+            limit (int, optional): Número máximo de formas devueltas
+
+        Returns:
+            list: Diccionarios con shape, total y stages (count, avg, p50, p95, p99, max)
+        """
+        with self._lock:
+            shapes = sorted(self._shapes.items(), key=lambda item: -item[1]["total"].count)
+            if limit:
+                shapes = shapes[:limit]
+            return [
+                {
+                    "shape": shape,
+                    "total": entry["total"].summary(),
+                    "stages": {name: histogram.summary() for name, histogram in entry["stages"].items()},
+                }
+                for shape, entry in shapes
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._shapes.clear()
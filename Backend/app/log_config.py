@@ -0,0 +1,215 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Caracteres máximos de un valor grande (SQL, filtros, pipelines) en un mensaje de log
+MAX_PAYLOAD_CHARS = int(os.environ.get('LOG_MAX_PAYLOAD', '500'))
+
+# Elementos que se muestran de una lista grande (documentos de un INSERT, valores de IN...)
+MAX_PAYLOAD_ITEMS = 3
+
+# Atributos estándar de LogRecord que no se copian como campos extra en JSON
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+# Listener activo del handler en cola (uno por proceso)
+_listener = None
+_listener_lock = threading.Lock()
+
+
+class Truncated:
+    """
+    Valor grande que se recorta al formatear el mensaje. Como el formateo de logging es
+    perezoso, la representación solo se calcula si el registro supera el nivel activo.
+    """
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit=None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        limit = self.limit or MAX_PAYLOAD_CHARS
+        value = self.value
+        if isinstance(value, (list, tuple)) and len(value) > MAX_PAYLOAD_ITEMS:
+            # No se convierte la lista completa a texto para luego recortarla
+            text = f"{list(value[:MAX_PAYLOAD_ITEMS])!r}... ({len(value)} elementos)"
+        else:
+            text = value if isinstance(value, str) else repr(value)
+        if len(text) > limit:
+            return f"{text[:limit]}... ({len(text)} caracteres)"
+        return text
+
+    __repr__ = __str__
+
+
+def truncated(value, limit=None):
+    """
+    Envuelve un valor para registrarlo recortado: logger.debug("Pipeline: %s", truncated(pipeline)).
+
+    Args:
+        value: SQL, filtro, pipeline o lista de documentos
+        limit (int, optional): Caracteres máximos (default: LOG_MAX_PAYLOAD)
+
+    Returns:
+        Truncated: Objeto que se formatea recortado
+    """
+    return Truncated(value, limit)
+
+
+def parse_logger_settings(spec, convert):
+    """
+    Interpreta una lista "logger=valor,logger=valor" de una variable de entorno.
+
+    Args:
+        spec (str): Texto de la variable (puede ser vacío)
+        convert (callable): Conversión del valor
+
+    Returns:
+        dict: Valor convertido por nombre de logger
+    """
+    settings = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        try:
+            settings[name.strip()] = convert(value.strip())
+        except (TypeError, ValueError):
+            logger.warning("Configuración de logging ignorada: %s", item)
+    return settings
+
+
+def _parse_level(value):
+    level = logging.getLevelName(value.upper())
+    if not isinstance(level, int):
+        raise ValueError(value)
+    return level
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Conserva uno de cada N registros de los loggers de alto volumen. Solo afecta a
+    DEBUG e INFO: los avisos y errores se registran siempre.
+    """
+
+    def __init__(self, rates):
+        """
+        Args:
+            rates (dict): Proporción de registros conservados (0-1) por prefijo de logger
+        """
+        super().__init__()
+        self.every = {name: max(1, round(1 / rate)) if rate > 0 else None for name, rate in rates.items()}
+        self._counters = {name: itertools.count() for name in self.every}
+
+    def _rule(self, name):
+        # El prefijo más largo que coincide con el logger
+        while name:
+            if name in self.every:
+                return name
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        rule = self._rule(record.name)
+        if rule is None:
+            return True
+        every = self.every[rule]
+        if every is None:
+            return False
+        return next(self._counters[rule]) % every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos extra que se pasen en extra={...}."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(log_level=logging.INFO, log_file=None, log_format=None, levels=None, sample_rates=None):
+    """
+    Configura el logging del proceso. Los handlers (consola y archivo) se ejecutan en un
+    hilo aparte detrás de una cola, de modo que las peticiones no esperan a la escritura.
+
+    Args:
+        log_level (int): Nivel del logger raíz
+        log_file (str, optional): Ruta al archivo de log
+        log_format (str, optional): "text" o "json" (default: LOG_FORMAT o "text")
+        levels (dict, optional): Nivel por logger (default: LOG_LEVELS)
+        sample_rates (dict, optional): Muestreo por logger (default: LOG_SAMPLE_RATES)
+
+    Returns:
+        QueueListener: Listener que vacía la cola
+    """
+    global _listener
+
+    log_format = (log_format or os.environ.get('LOG_FORMAT', 'text')).lower()
+    if levels is None:
+        levels = parse_logger_settings(os.environ.get('LOG_LEVELS'), _parse_level)
+    if sample_rates is None:
+        sample_rates = parse_logger_settings(os.environ.get('LOG_SAMPLE_RATES'), float)
+
+    if log_format == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s [%(levelname)s] - %(name)s - %(message)s')
+
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+        _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(log_level)
+
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    return _listener
+
+
+def shutdown_logging():
+    """Vacía la cola pendiente y detiene el hilo de escritura."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,289 @@
+import bisect
+import logging
+import math
+import threading
+
+from pymongo import monitoring
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Tipo MIME del formato de texto de Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets por defecto (segundos) de los histogramas de latencia
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Buckets de los tamaños de resultado (documentos)
+RESULT_SIZE_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas del proceso. Las métricas se agregan en memoria y se
+    exportan en el formato de texto de Prometheus al consultar /metrics.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self):
+        """
+        Exporta todas las métricas.
+
+        Returns:
+            str: Texto en formato de exposición de Prometheus
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                # Una métrica calculada que falla no debe impedir exportar el resto
+                logger.warning("No se pudo calcular la métrica %s: %s", metric.name, e)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Registro por defecto del proceso
+REGISTRY = MetricsRegistry()
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        self._function = None
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} requiere las etiquetas {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels):
+        """Valor actual de la serie con esas etiquetas (para pruebas y diagnóstico)."""
+        return self._values.get(self._key(labels), 0)
+
+    def set_function(self, function):
+        """
+        Calcula la métrica al exportarla a partir de un estado que ya se mantiene en
+        otro sitio (por ejemplo, las estadísticas del cache de traducciones).
+
+        Args:
+            function: Sin argumentos; devuelve un número o una lista de (etiquetas, valor)
+        """
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            result = self._function()
+            if isinstance(result, (int, float)):
+                return [(self.name, "", result)]
+            return [(self.name, _format_labels(self.labelnames, self._key(labels)), value) for labels, value in result]
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in items]
+
+
+class Counter(_Metric):
+    """Contador monótono por combinación de etiquetas (el nombre termina en _total)."""
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Valor que sube y baja."""
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Histograma con buckets acumulativos, suma y número de observaciones."""
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def value(self, **labels):
+        """Número de observaciones de la serie."""
+        series = self._values.get(self._key(labels))
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(series[0]), series[1], series[2]) for key, series in self._values.items()]
+
+        samples = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", _format_labels(self.labelnames, key, ("le", _format_value(float(bound)))), cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+# Métricas compartidas por el traductor, el conector y la aplicación
+HTTP_REQUESTS = Counter(
+    "sqlmongo_http_requests_total", "Peticiones HTTP atendidas", ("endpoint", "method", "status")
+)
+HTTP_LATENCY = Histogram(
+    "sqlmongo_http_request_duration_seconds", "Duración de las peticiones HTTP", ("endpoint",)
+)
+QUERY_REQUESTS = Counter(
+    "sqlmongo_query_requests_total", "Consultas SQL recibidas por tipo y permiso requerido", ("query_type", "permission", "status")
+)
+TRANSLATION_LATENCY = Histogram(
+    "sqlmongo_translation_duration_seconds", "Duración de la traducción SQL a MongoDB", ("query_type",)
+)
+EXECUTION_LATENCY = Histogram(
+    "sqlmongo_execution_duration_seconds", "Duración de execute_query por operación", ("operation", "status")
+)
+EXECUTION_RETRIES = Counter(
+    "sqlmongo_execution_retries_total", "Reintentos del bucle de execute_query", ("operation",)
+)
+RECONNECTS = Counter(
+    "sqlmongo_reconnects_total", "Intentos de reconexión a MongoDB", ("result",)
+)
+RESULT_DOCUMENTS = Histogram(
+    "sqlmongo_result_documents", "Documentos devueltos por consulta", ("operation",), buckets=RESULT_SIZE_BUCKETS
+)
+POOL_CONNECTIONS = Gauge(
+    "sqlmongo_pool_connections", "Conexiones del pool de MongoDB por estado", ("address", "state")
+)
+POOL_MAX_SIZE = Gauge(
+    "sqlmongo_pool_max_size", "Tamaño máximo del pool de conexiones", ("address",)
+)
+POOL_CHECKOUT_FAILURES = Counter(
+    "sqlmongo_pool_checkout_failures_total", "Conexiones que no se pudieron obtener del pool", ("address", "reason")
+)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Listener de pymongo que mantiene las conexiones abiertas y en uso de cada pool.
+    Se pasa al MongoClient en event_listeners.
+    """
+
+    def pool_created(self, event):
+        max_size = (event.options or {}).get("maxPoolSize")
+        if max_size is not None:
+            POOL_MAX_SIZE.set(max_size, address=self._address(event))
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        address = self._address(event)
+        POOL_CONNECTIONS.set(0, address=address, state="open")
+        POOL_CONNECTIONS.set(0, address=address, state="checked_out")
+
+    def connection_created(self, event):
+        POOL_CONNECTIONS.inc(address=self._address(event), state="open")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        POOL_CONNECTIONS.dec(address=self._address(event), state="open")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        POOL_CHECKOUT_FAILURES.inc(address=self._address(event), reason=str(event.reason))
+
+    def connection_checked_out(self, event):
+        POOL_CONNECTIONS.inc(address=self._address(event), state="checked_out")
+
+    def connection_checked_in(self, event):
+        POOL_CONNECTIONS.dec(address=self._address(event), state="checked_out")
+
+    @staticmethod
+    def _address(event):
+        host, port = event.address
+        return f"{host}:{port}"
+
+
+# Una sola instancia compartida por todos los clientes del proceso
+POOL_LISTENER = PoolMetricsListener()
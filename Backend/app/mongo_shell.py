@@ -25,12 +25,15 @@ class MongoShellQueryGenerator:
         generators = {
             "find": MongoShellQueryGenerator._generate_find,
             "aggregate": MongoShellQueryGenerator._generate_aggregate,
+            "count": MongoShellQueryGenerator._generate_count,
+            "distinct": MongoShellQueryGenerator._generate_distinct,
             "insert": MongoShellQueryGenerator._generate_insert,
             "INSERT_MANY": MongoShellQueryGenerator._generate_insert_many,  # 🔧 NUEVO
             "update": MongoShellQueryGenerator._generate_update,
             "delete": MongoShellQueryGenerator._generate_delete,
             "create_collection": MongoShellQueryGenerator._generate_create_collection,
-            "drop_collection": MongoShellQueryGenerator._generate_drop_collection
+            "drop_collection": MongoShellQueryGenerator._generate_drop_collection,
+            "explain": MongoShellQueryGenerator._generate_explain
         }
         
         if operation in generators:
@@ -92,6 +95,70 @@ class MongoShellQueryGenerator:
         query = "// Consulta equivalente a SELECT en MongoDB\n" + query_parts[0]
         return query
     
+    @staticmethod
+    def _generate_explain(collection_name, mongo_query):
+        """
+        Genera la consulta explain() de un EXPLAIN [ANALYZE] para la shell de MongoDB.
+        
+        Args:
+            collection_name (str): Nombre de la colección
+            mongo_query (dict): Operación explain con la consulta traducida en "query"
+            
+        Returns:
+            str: Consulta para la shell de MongoDB
+        """
+        inner = MongoShellQueryGenerator.generate_shell_query(collection_name, mongo_query.get("query", {}))
+        verbosity = mongo_query.get("verbosity", "queryPlanner")
+        
+        # db.coleccion.explain("verbosidad").find(...) / .aggregate(...)
+        query = inner.replace(f"db.{collection_name}.", f'db.{collection_name}.explain("{verbosity}").', 1)
+        if query.endswith(".pretty()"):
+            query = query[:-len(".pretty()")]
+        return query
+    
+    @staticmethod
+    def _generate_count(collection_name, mongo_query):
+        """
+        Genera el conteo de un SELECT COUNT(*) para la shell de MongoDB.
+        
+        Args:
+            collection_name (str): Nombre de la colección
+            mongo_query (dict): Operación count con su filtro
+            
+        Returns:
+            str: Consulta para la shell de MongoDB
+        """
+        query_filter = mongo_query.get("query") or {}
+        
+        if not query_filter and mongo_query.get("mode") != "exact":
+            return (
+                "// Consulta equivalente a SELECT COUNT(*) en MongoDB (conteo por metadatos)\n"
+                f"db.{collection_name}.estimatedDocumentCount()"
+            )
+        return (
+            "// Consulta equivalente a SELECT COUNT(*) en MongoDB\n"
+            f"db.{collection_name}.countDocuments({MongoShellQueryGenerator._format_json(query_filter)})"
+        )
+    
+    @staticmethod
+    def _generate_distinct(collection_name, mongo_query):
+        """
+        Genera el distinct() de un SELECT DISTINCT de una columna para la shell de MongoDB.
+        
+        Args:
+            collection_name (str): Nombre de la colección
+            mongo_query (dict): Operación distinct con campo y filtro
+            
+        Returns:
+            str: Consulta para la shell de MongoDB
+        """
+        query_filter = mongo_query.get("query") or {}
+        return (
+            "// Consulta equivalente a SELECT DISTINCT en MongoDB\n"
+            f"db.{collection_name}.distinct(\"{mongo_query['field']}\", "
+            f"{MongoShellQueryGenerator._format_json(query_filter)})"
+        )
+    
     @staticmethod
     def _generate_aggregate(collection_name, mongo_query):
         """
@@ -193,7 +260,11 @@ class MongoShellQueryGenerator:
         
         # Formatear las partes para mejor legibilidad
         formatted_filter = MongoShellQueryGenerator._format_json(filter_query, indent=2)
-        formatted_update = MongoShellQueryGenerator._format_json(update_query, indent=2)
+        if isinstance(update_query, list):
+            # Update con pipeline (SET con expresiones)
+            formatted_update = MongoShellQueryGenerator._format_json_array(update_query, indent=2)
+        else:
+            formatted_update = MongoShellQueryGenerator._format_json(update_query, indent=2)
         
         # Construir la consulta completa
         query = "// Actualización de documentos en MongoDB\n" + \
@@ -1,6 +1,7 @@
-import re
 import logging
 from .base_parser import BaseParser
+from . import patterns
+from app.log_config import truncated
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -14,12 +15,6 @@ class AdvancedParser(BaseParser):
     def __init__(self):
         """Inicializar el parser con patrones y configuraciones."""
         
-        # Patrones de expresiones regulares para diferentes funcionalidades
-        self.distinct_pattern = r'\bSELECT\s+DISTINCT\s+'
-        self.having_pattern = r'\bHAVING\s+(.*?)(?:\s+ORDER\s+BY|\s+LIMIT|\s+UNION|\s*;|\s*$)'
-        self.union_pattern = r'\bUNION(?:\s+ALL)?\s+'
-        self.subquery_pattern = r'\(\s*SELECT\s+.*?\)'
-        
         # Funciones de agregación para validación con HAVING
         self.aggregate_functions = ['COUNT', 'SUM', 'AVG', 'MIN', 'MAX', 'GROUP_CONCAT']
     
@@ -66,7 +61,7 @@ class AdvancedParser(BaseParser):
         Returns:
             bool: True si contiene DISTINCT, False en caso contrario
         """
-        return bool(re.search(self.distinct_pattern, query, re.IGNORECASE))
+        return bool(patterns.DISTINCT_KEYWORD.search(query))
     
     def parse_distinct(self, query):
         """
@@ -78,24 +73,37 @@ class AdvancedParser(BaseParser):
         Returns:
             dict: Información sobre la consulta DISTINCT
         """
-        logger.info(f"Analizando consulta DISTINCT: {query}")
+        logger.debug("Analizando consulta DISTINCT: %s", truncated(query))
         
         # Extraer los campos después de DISTINCT
-        distinct_match = re.search(
-            r'SELECT\s+DISTINCT\s+(.*?)\s+FROM', 
-            query, 
-            re.IGNORECASE | re.DOTALL
-        )
+        distinct_match = patterns.DISTINCT_FIELDS.search(query)
         
         if not distinct_match:
             logger.warning("No se pudo extraer campos DISTINCT")
             return {"error": "No se pudo extraer campos DISTINCT"}
         
-        fields_str = distinct_match.group(1).strip()
+        return self.build_distinct_info(distinct_match.group(1).strip())
+    
+    def build_distinct_info(self, fields_str):
+        """
+        Construye la información DISTINCT a partir de la lista de campos ya extraída.
         
+        Args:
+            fields_str (str): Campos que siguen a SELECT DISTINCT
+            
+        Returns:
+            dict: Información sobre la consulta DISTINCT
+        """
         # Parsear los campos
         fields = self._parse_select_fields(fields_str)
         
+        # DISTINCT(campo) es lo mismo que DISTINCT campo
+        for field_info in fields:
+            field = field_info.get("field", "")
+            while field.startswith("(") and field.endswith(")"):
+                field = field[1:-1].strip()
+            field_info["field"] = field
+        
         return {
             "operation": "DISTINCT",
             "fields": fields,
@@ -103,18 +111,20 @@ class AdvancedParser(BaseParser):
             "requires_grouping": True
         }
     
-    def translate_distinct_to_mongodb(self, query, base_pipeline=None):
+    def translate_distinct_to_mongodb(self, query, base_pipeline=None, distinct_info=None):
         """
         Traduce SELECT DISTINCT a pipeline de agregación MongoDB.
         
         Args:
             query (str): Consulta SQL con DISTINCT
             base_pipeline (list): Pipeline base opcional
+            distinct_info (dict): Información DISTINCT ya analizada (evita re-analizar la consulta)
             
         Returns:
             list: Pipeline de agregación MongoDB
         """
-        distinct_info = self.parse_distinct(query)
+        if distinct_info is None:
+            distinct_info = self.parse_distinct(query)
         if "error" in distinct_info:
             return []
         
@@ -146,7 +156,7 @@ class AdvancedParser(BaseParser):
         project_stage["$project"]["_id"] = 0
         pipeline.append(project_stage)
         
-        logger.info(f"Pipeline DISTINCT generado: {pipeline}")
+        logger.debug("Pipeline DISTINCT generado: %s", truncated(pipeline))
         return pipeline
     
     # =================== HAVING ===================
@@ -161,7 +171,7 @@ class AdvancedParser(BaseParser):
         Returns:
             bool: True si contiene HAVING, False en caso contrario
         """
-        return bool(re.search(self.having_pattern, query, re.IGNORECASE))
+        return bool(patterns.HAVING_KEYWORD.search(query))
     
     def parse_having(self, query):
         """
@@ -173,22 +183,31 @@ class AdvancedParser(BaseParser):
         Returns:
             dict: Condiciones HAVING en formato MongoDB
         """
-        logger.info(f"Analizando cláusula HAVING: {query}")
+        logger.debug("Analizando cláusula HAVING: %s", truncated(query))
         
         # Extraer la cláusula HAVING
-        having_match = re.search(self.having_pattern, query, re.IGNORECASE | re.DOTALL)
+        having_match = patterns.HAVING_CLAUSE.search(query)
         
         if not having_match:
             logger.warning("No se pudo extraer cláusula HAVING")
             return {}
         
-        having_clause = having_match.group(1).strip()
-        logger.debug(f"Cláusula HAVING extraída: {having_clause}")
+        return self.parse_having_clause(having_match.group(1).strip())
+    
+    def parse_having_clause(self, having_clause):
+        """
+        Convierte el texto de una cláusula HAVING ya extraída a formato MongoDB.
         
-        # Analizar las condiciones HAVING
-        conditions = self._parse_having_conditions(having_clause)
+        Args:
+            having_clause (str): Condiciones HAVING sin la palabra clave
+            
+        Returns:
+            dict: Condiciones HAVING en formato MongoDB
+        """
+        logger.debug("Cláusula HAVING extraída: %s", having_clause)
         
-        return conditions
+        # Analizar las condiciones HAVING
+        return self._parse_having_conditions(having_clause)
     
     def _parse_having_conditions(self, having_clause):
         """
@@ -287,8 +306,7 @@ class AdvancedParser(BaseParser):
         """
         # Si es una función de agregación, extraer el alias o generar uno
         for func in self.aggregate_functions:
-            pattern = rf'{func}\s*\((.*?)\)'
-            match = re.search(pattern, field_expr, re.IGNORECASE)
+            match = patterns.function_arguments(func, word_boundary=False).search(field_expr)
             if match:
                 inner_field = match.group(1).strip()
                 if inner_field == "*":
@@ -311,7 +329,7 @@ class AdvancedParser(BaseParser):
         Returns:
             bool: True si contiene UNION, False en caso contrario
         """
-        return bool(re.search(self.union_pattern, query, re.IGNORECASE))
+        return bool(patterns.UNION_KEYWORD.search(query))
     
     def parse_union(self, query):
         """
@@ -323,21 +341,37 @@ class AdvancedParser(BaseParser):
         Returns:
             dict: Información sobre la consulta UNION
         """
-        logger.info(f"Analizando consulta UNION: {query}")
+        logger.debug("Analizando consulta UNION: %s", truncated(query))
         
         # Dividir por UNION
-        union_parts = re.split(self.union_pattern, query, flags=re.IGNORECASE)
+        union_parts = patterns.UNION_KEYWORD.split(query)
         
         if len(union_parts) < 2:
             return {"error": "No se pudieron extraer partes de UNION"}
         
         # Verificar si es UNION ALL
-        is_union_all = bool(re.search(r'\bUNION\s+ALL\s+', query, re.IGNORECASE))
+        is_union_all = bool(patterns.UNION_ALL_KEYWORD.search(query))
         
+        return self.build_union_info(union_parts, is_union_all)
+    
+    def build_union_info(self, queries, union_all, union_all_flags=None):
+        """
+        Construye la información UNION a partir de las ramas ya separadas.
+        
+        Args:
+            queries (list): Consultas SELECT de cada rama
+            union_all (bool): True si es UNION ALL
+            union_all_flags (list, optional): UNION ALL (True) o UNION (False) entre
+                cada par de ramas; por defecto todos según union_all
+            
+        Returns:
+            dict: Información sobre la consulta UNION
+        """
         return {
             "operation": "UNION",
-            "union_all": is_union_all,
-            "queries": [part.strip() for part in union_parts],
+            "union_all": union_all,
+            "union_all_flags": list(union_all_flags) if union_all_flags is not None else [union_all] * (len(queries) - 1),
+            "queries": [part.strip() for part in queries],
             "mongo_operation": "aggregate",
             "requires_union_pipeline": True
         }
@@ -379,7 +413,7 @@ class AdvancedParser(BaseParser):
         Returns:
             bool: True si contiene subqueries, False en caso contrario
         """
-        return bool(re.search(self.subquery_pattern, query, re.IGNORECASE | re.DOTALL))
+        return bool(patterns.SUBQUERY.search(query))
     
     def parse_subqueries(self, query):
         """
@@ -391,26 +425,39 @@ class AdvancedParser(BaseParser):
         Returns:
             list: Lista de subqueries encontradas
         """
-        logger.info(f"Analizando subqueries: {query}")
+        logger.debug("Analizando subqueries: %s", truncated(query))
         
-        subqueries = []
-        matches = re.finditer(self.subquery_pattern, query, re.IGNORECASE | re.DOTALL)
+        matches = patterns.SUBQUERY.finditer(query)
+        spans = [(match.start(), match.end()) for match in matches]
         
-        for i, match in enumerate(matches):
-            subquery_text = match.group(0)
+        return self.build_subquery_info(query, spans)
+    
+    def build_subquery_info(self, query, spans):
+        """
+        Construye la lista de subqueries a partir de sus posiciones en la consulta.
+        
+        Args:
+            query (str): Consulta SQL completa
+            spans (list): Tuplas (inicio, fin) de cada subquery, paréntesis incluidos
             
+        Returns:
+            list: Lista de subqueries encontradas
+        """
+        subqueries = []
+        
+        for i, (start, end) in enumerate(spans):
             # Limpiar paréntesis externos
-            clean_subquery = subquery_text.strip('()')
+            clean_subquery = query[start:end].strip()[1:-1]
             
             # Determinar el contexto de la subquery
-            context = self._determine_subquery_context(query, match.start(), match.end())
+            context = self._determine_subquery_context(query, start, end)
             
             subqueries.append({
                 "index": i,
                 "subquery": clean_subquery.strip(),
                 "context": context,
-                "start_pos": match.start(),
-                "end_pos": match.end()
+                "start_pos": start,
+                "end_pos": end
             })
         
         return subqueries
@@ -520,9 +567,9 @@ class AdvancedParser(BaseParser):
             field = field.strip()
             
             # Detectar alias
-            alias_match = re.search(r'(.*?)\s+AS\s+([\w]+)$', field, re.IGNORECASE)
+            alias_match = patterns.FIELD_ALIAS_AS.search(field)
             if not alias_match:
-                alias_match = re.search(r'(.*?)\s+([\w]+)$', field)
+                alias_match = patterns.FIELD_ALIAS_IMPLICIT.search(field)
             
             if alias_match:
                 field_name = alias_match.group(1).strip()
@@ -565,7 +612,7 @@ class AdvancedParser(BaseParser):
     
     def _has_top_level_operator(self, text, operator):
         """Verifica operadores a nivel superior (fuera de paréntesis)."""
-        pattern = r'\s' + operator + r'\s'
+        pattern = patterns.spaced_operator(operator)
         level = 0
         
         for i in range(len(text) - len(operator)):
@@ -573,7 +620,7 @@ class AdvancedParser(BaseParser):
                 level += 1
             elif text[i] == ')':
                 level -= 1
-            elif level == 0 and re.match(pattern, text[i:i+len(operator)+2], re.IGNORECASE):
+            elif level == 0 and pattern.match(text, i, i + len(operator) + 2):
                 return True
         
         return False
@@ -585,7 +632,7 @@ class AdvancedParser(BaseParser):
         level = 0
         i = 0
         
-        op_pattern = r'\s' + operator + r'\s'
+        op_pattern = patterns.spaced_operator(operator)
         text = " " + text + " "
         
         while i < len(text):
@@ -596,8 +643,7 @@ class AdvancedParser(BaseParser):
                 level -= 1
                 current += text[i]
             elif level == 0 and i <= len(text) - len(operator) - 2:
-                part = text[i:i+len(operator)+2]
-                if re.match(op_pattern, part, re.IGNORECASE):
+                if op_pattern.match(text, i, i + len(operator) + 2):
                     if current.strip():
                         result.append(current.strip())
                     current = ""
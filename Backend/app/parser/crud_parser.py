@@ -1,6 +1,7 @@
-import re
 import logging
 from .base_parser import BaseParser
+from . import patterns
+from app.log_config import truncated
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -46,14 +47,13 @@ class CRUDParser(BaseParser):
         Returns:
             dict: Diccionario con tabla y valores a insertar
         """
-        logger.info(f"Analizando consulta INSERT: {query}")
+        logger.debug("Analizando consulta INSERT (%s caracteres)", len(query))
         
         # Normalizar la consulta
         query = query.strip()
         
         # Extraer nombre de tabla
-        table_pattern = r'INSERT\s+INTO\s+([^\s(]+)'
-        table_match = re.search(table_pattern, query, re.IGNORECASE)
+        table_match = patterns.INSERT_TABLE.search(query)
         
         if not table_match:
             logger.error("No se pudo extraer tabla de INSERT")
@@ -62,104 +62,88 @@ class CRUDParser(BaseParser):
         table_name = table_match.group(1).strip('`[]"\'').lower()
         
         # 🔧 NUEVO: Extraer columnas y múltiples valores
-        columns_pattern = r'INSERT\s+INTO\s+[^\s(]+\s*\((.*?)\)\s*VALUES\s*(.*?)(?:;|$)'
-        columns_match = re.search(columns_pattern, query, re.IGNORECASE | re.DOTALL)
+        columns_match = patterns.INSERT_WITH_COLUMNS.search(query)
         
         if columns_match:
             # INSERT INTO tabla (col1, col2) VALUES (val1, val2), (val3, val4), ...
-            columns_str = columns_match.group(1).strip()
-            values_section = columns_match.group(2).strip()
+            return self.build_insert(table_name, columns_match.group(1).strip(), columns_match.group(2).strip())
+        
+        # Intentar con formato sin columnas: INSERT INTO tabla VALUES (val1, val2)
+        simple_match = patterns.INSERT_WITHOUT_COLUMNS.search(query)
+        
+        if simple_match:
+            return self.build_insert(table_name, None, simple_match.group(1).strip())
+        
+        logger.error("No se pudo extraer valores de INSERT")
+        return {"error": "No se pudo extraer valores"}
+    
+    def build_insert(self, table_name, columns_str, values_section):
+        """
+        Construye el resultado de un INSERT a partir de sus partes ya extraídas.
+        
+        Args:
+            table_name (str): Nombre de la tabla destino
+            columns_str (str or None): Lista de columnas sin paréntesis, o None si no se indicaron
+            values_section (str): Texto que sigue a VALUES
             
+        Returns:
+            dict: Diccionario con tabla y valores a insertar
+        """
+        # 🔧 NUEVO: Extraer TODOS los conjuntos de valores
+        all_values = self._extract_all_value_sets(values_section)
+        logger.debug("Conjuntos de valores encontrados: %s", len(all_values))
+        
+        if not all_values:
+            logger.error("No se pudieron extraer valores de INSERT")
+            return {"error": "No se pudieron extraer valores"}
+        
+        insert_documents = []
+        
+        if columns_str:
             # Parsear columnas
             columns = [col.strip().strip('`[]"\'') for col in self._split_values(columns_str)]
-            logger.info(f"Columnas extraídas: {columns}")
-            
-            # 🔧 NUEVO: Extraer TODOS los conjuntos de valores
-            all_values = self._extract_all_value_sets(values_section)
-            logger.info(f"Conjuntos de valores encontrados: {len(all_values)}")
-            
-            if not all_values:
-                logger.error("No se pudieron extraer valores de INSERT")
-                return {"error": "No se pudieron extraer valores"}
+            logger.debug("Columnas extraídas: %s", columns)
             
             # 🔧 NUEVO: Procesar múltiples registros
-            insert_documents = []
-            
             for i, value_set in enumerate(all_values):
-                logger.debug(f"Procesando conjunto {i+1}: {value_set}")
                 values = [self._parse_value(val) for val in value_set]
                 
                 if len(columns) != len(values):
-                    logger.error(f"Número de columnas ({len(columns)}) no coincide con número de valores ({len(values)}) en conjunto {i+1}: {values}")
+                    logger.error("Número de columnas (%s) no coincide con número de valores (%s) en conjunto %s: %s", len(columns), len(values), i+1, values)
                     continue  # Saltar este conjunto y continuar con los demás
                 
                 # Crear diccionario de valores para este registro
                 document = dict(zip(columns, values))
                 insert_documents.append(document)
-                logger.debug(f"Documento {i+1} creado: {document}")
             
             if not insert_documents:
                 return {"error": "No se pudo procesar ningún conjunto de valores válido"}
-            
-            logger.info(f"Total de documentos procesados exitosamente: {len(insert_documents)}")
-            
-            # 🔧 NUEVO: Retornar múltiples documentos o uno solo según el caso
-            if len(insert_documents) == 1:
-                # Un solo documento - mantener compatibilidad con formato anterior
-                return {
-                    "operation": "INSERT",
-                    "table": table_name,
-                    "values": insert_documents[0]
-                }
-            else:
-                # Múltiples documentos - nuevo formato
-                return {
-                    "operation": "INSERT_MANY",
-                    "table": table_name,
-                    "documents": insert_documents,
-                    "count": len(insert_documents)
-                }
         else:
-            # Intentar con formato sin columnas: INSERT INTO tabla VALUES (val1, val2)
-            simple_pattern = r'INSERT\s+INTO\s+[^\s(]+\s+VALUES\s*(.*?)(?:;|$)'
-            simple_match = re.search(simple_pattern, query, re.IGNORECASE | re.DOTALL)
-            
-            if simple_match:
-                values_section = simple_match.group(1).strip()
-                
-                # 🔧 NUEVO: Extraer múltiples conjuntos de valores
-                all_values = self._extract_all_value_sets(values_section)
-                
-                if not all_values:
-                    logger.error("No se pudieron extraer valores de INSERT simple")
-                    return {"error": "No se pudieron extraer valores"}
-                
-                insert_documents = []
-                
-                for i, value_set in enumerate(all_values):
-                    values = [self._parse_value(val) for val in value_set]
-                    
-                    # Usar nombres genéricos de columnas
-                    columns = [f"column_{i+1}" for i in range(len(values))]
-                    document = dict(zip(columns, values))
-                    insert_documents.append(document)
+            for value_set in all_values:
+                values = [self._parse_value(val) for val in value_set]
                 
-                if len(insert_documents) == 1:
-                    return {
-                        "operation": "INSERT",
-                        "table": table_name,
-                        "values": insert_documents[0]
-                    }
-                else:
-                    return {
-                        "operation": "INSERT_MANY",
-                        "table": table_name,
-                        "documents": insert_documents,
-                        "count": len(insert_documents)
-                    }
-            
-            logger.error("No se pudo extraer valores de INSERT")
-            return {"error": "No se pudo extraer valores"}
+                # Usar nombres genéricos de columnas
+                columns = [f"column_{i+1}" for i in range(len(values))]
+                insert_documents.append(dict(zip(columns, values)))
+        
+        logger.debug("Total de documentos procesados exitosamente: %s", len(insert_documents))
+        
+        # 🔧 NUEVO: Retornar múltiples documentos o uno solo según el caso
+        if len(insert_documents) == 1:
+            # Un solo documento - mantener compatibilidad con formato anterior
+            return {
+                "operation": "INSERT",
+                "table": table_name,
+                "values": insert_documents[0]
+            }
+        
+        # Múltiples documentos - nuevo formato
+        return {
+            "operation": "INSERT_MANY",
+            "table": table_name,
+            "documents": insert_documents,
+            "count": len(insert_documents)
+        }
 
     def _extract_all_value_sets(self, values_section):
         """
@@ -176,20 +160,17 @@ class CRUDParser(BaseParser):
         
         # Buscar todos los conjuntos entre paréntesis
         # Patrón: \(([^)]+)\) - busca contenido entre paréntesis
-        value_sets_pattern = r'\(([^)]+)\)'
-        matches = re.finditer(value_sets_pattern, values_section)
+        matches = patterns.VALUE_SETS.finditer(values_section)
         
         for match in matches:
             values_str = match.group(1).strip()
-            logger.debug(f"Conjunto de valores encontrado: {values_str}")
-            
             # Dividir por comas respetando comillas
             value_set = self._split_values(values_str)
             
             if value_set:  # Solo agregar si no está vacío
                 all_value_sets.append(value_set)
         
-        logger.info(f"Total de conjuntos de valores extraídos: {len(all_value_sets)}")
+        logger.debug("Total de conjuntos de valores extraídos: %s", len(all_value_sets))
         return all_value_sets
     
     def parse_update(self, query):
@@ -202,14 +183,13 @@ class CRUDParser(BaseParser):
         Returns:
             dict: Diccionario con tabla, valores y condición
         """
-        logger.info(f"Analizando consulta UPDATE: {query}")
+        logger.debug("Analizando consulta UPDATE: %s", truncated(query))
         
         # Normalizar la consulta
         query = query.strip()
         
         # Extraer nombre de tabla
-        table_pattern = r'UPDATE\s+([^\s,;()]+)'
-        table_match = re.search(table_pattern, query, re.IGNORECASE)
+        table_match = patterns.UPDATE_TABLE.search(query)
         
         if not table_match:
             logger.error("No se pudo extraer tabla de UPDATE")
@@ -218,15 +198,34 @@ class CRUDParser(BaseParser):
         table_name = table_match.group(1).strip('`[]"\'').lower()
         
         # Extraer valores a actualizar (SET)
-        set_pattern = r'SET\s+(.*?)(?:\sWHERE|\s;|\Z)'
-        set_match = re.search(set_pattern, query, re.IGNORECASE | re.DOTALL)
+        set_match = patterns.UPDATE_SET.search(query)
         
         if not set_match:
             logger.error("No se pudo extraer cláusula SET de UPDATE")
             return {"error": "No se pudo extraer valores a actualizar"}
             
-        set_str = set_match.group(1).strip()
+        update_values = self.parse_set_clause(set_match.group(1).strip())
+        
+        # Extraer condición WHERE
+        where_match = patterns.STATEMENT_WHERE.search(query)
         
+        return {
+            "operation": "UPDATE",
+            "table": table_name,
+            "values": update_values,
+            "condition": self.parse_simple_condition(where_match.group(1) if where_match else None)
+        }
+    
+    def parse_set_clause(self, set_str):
+        """
+        Convierte las asignaciones de una cláusula SET ya extraída en un diccionario.
+        
+        Args:
+            set_str (str): Asignaciones sin la palabra clave SET
+            
+        Returns:
+            dict: Campos y valores a actualizar
+        """
         # Dividir las asignaciones por comas
         assignments = self._split_values(set_str)
         update_values = {}
@@ -237,28 +236,33 @@ class CRUDParser(BaseParser):
                 value = self._parse_value(value_str)
                 update_values[field.lower()] = value
         
-        # Extraer condición WHERE
-        where_pattern = r'WHERE\s+(.*?)(?:\s;|\Z)'
-        where_match = re.search(where_pattern, query, re.IGNORECASE | re.DOTALL)
+        return update_values
+    
+    def parse_simple_condition(self, where_str):
+        """
+        Analiza una condición WHERE simple (campo = valor).
+        Utilizaríamos WhereParser, pero para evitar dependencias circulares,
+        implementamos una versión simplificada aquí.
         
-        where_condition = {}
-        if where_match:
-            # Utilizaríamos WhereParser, pero para evitar dependencias circulares,
-            # implementamos una versión simplificada aquí.
-            where_str = where_match.group(1).strip()
+        Args:
+            where_str (str or None): Condición sin la palabra clave WHERE
             
-            # Procesamiento básico de condición (para consultas simples)
-            if '=' in where_str and 'AND' not in where_str.upper() and 'OR' not in where_str.upper():
-                field, value_str = [part.strip() for part in where_str.split('=', 1)]
-                value = self._parse_value(value_str)
-                where_condition[field.lower()] = value
+        Returns:
+            dict: Condición en formato MongoDB (vacía si no es una igualdad simple)
+        """
+        where_condition = {}
+        if not where_str:
+            return where_condition
         
-        return {
-            "operation": "UPDATE",
-            "table": table_name,
-            "values": update_values,
-            "condition": where_condition
-        }
+        where_str = where_str.strip()
+        
+        # Procesamiento básico de condición (para consultas simples)
+        if '=' in where_str and 'AND' not in where_str.upper() and 'OR' not in where_str.upper():
+            field, value_str = [part.strip() for part in where_str.split('=', 1)]
+            value = self._parse_value(value_str)
+            where_condition[field.lower()] = value
+        
+        return where_condition
     
     def parse_delete(self, query):
         """
@@ -270,14 +274,13 @@ class CRUDParser(BaseParser):
         Returns:
             dict: Diccionario con tabla y condición
         """
-        logger.info(f"Analizando consulta DELETE: {query}")
+        logger.debug("Analizando consulta DELETE: %s", truncated(query))
         
         # Normalizar la consulta
         query = query.strip()
         
         # Extraer nombre de tabla
-        table_pattern = r'DELETE\s+FROM\s+([^\s,;()]+)'
-        table_match = re.search(table_pattern, query, re.IGNORECASE)
+        table_match = patterns.DELETE_TABLE.search(query)
         
         if not table_match:
             logger.error("No se pudo extraer tabla de DELETE")
@@ -286,25 +289,12 @@ class CRUDParser(BaseParser):
         table_name = table_match.group(1).strip('`[]"\'').lower()
         
         # Extraer condición WHERE
-        where_pattern = r'WHERE\s+(.*?)(?:\s;|\Z)'
-        where_match = re.search(where_pattern, query, re.IGNORECASE | re.DOTALL)
-        
-        where_condition = {}
-        if where_match:
-            # Utilizaríamos WhereParser, pero para evitar dependencias circulares,
-            # implementamos una versión simplificada aquí.
-            where_str = where_match.group(1).strip()
-            
-            # Procesamiento básico de condición (para consultas simples)
-            if '=' in where_str and 'AND' not in where_str.upper() and 'OR' not in where_str.upper():
-                field, value_str = [part.strip() for part in where_str.split('=', 1)]
-                value = self._parse_value(value_str)
-                where_condition[field.lower()] = value
+        where_match = patterns.STATEMENT_WHERE.search(query)
         
         return {
             "operation": "DELETE",
             "table": table_name,
-            "condition": where_condition
+            "condition": self.parse_simple_condition(where_match.group(1) if where_match else None)
         }
     
     def _split_values(self, values_str):
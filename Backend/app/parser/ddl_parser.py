@@ -1,6 +1,7 @@
-import re
 import logging
 from .base_parser import BaseParser
+from . import patterns
+from app.log_config import truncated
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -87,14 +88,10 @@ class DDLParser(BaseParser):
         Returns:
             dict: Estructura de la tabla con columnas y tipos
         """
-        logger.info(f"Analizando CREATE TABLE: {query}")
+        logger.debug("Analizando CREATE TABLE: %s", truncated(query))
         
         # Extraer nombre de tabla
-        table_match = re.search(
-            r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([^\s(]+)', 
-            query, 
-            re.IGNORECASE
-        )
+        table_match = patterns.DDL_CREATE_TABLE_NAME.search(query)
         
         if not table_match:
             raise ValueError("No se pudo extraer nombre de tabla")
@@ -102,11 +99,7 @@ class DDLParser(BaseParser):
         table_name = table_match.group(1).strip('`[]"\'')
         
         # Extraer definición de columnas
-        columns_match = re.search(
-            r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?[^\s(]+\s*\((.*)\)',
-            query,
-            re.IGNORECASE | re.DOTALL
-        )
+        columns_match = patterns.DDL_CREATE_TABLE_COLUMNS.search(query)
         
         if not columns_match:
             raise ValueError("No se pudo extraer definición de columnas")
@@ -137,11 +130,7 @@ class DDLParser(BaseParser):
         Returns:
             dict: Información sobre DROP TABLE
         """
-        table_match = re.search(
-            r'DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?([^\s;]+)',
-            query,
-            re.IGNORECASE
-        )
+        table_match = patterns.DDL_DROP_TABLE_NAME.search(query)
         
         if not table_match:
             raise ValueError("No se pudo extraer nombre de tabla para DROP")
@@ -209,11 +198,10 @@ class DDLParser(BaseParser):
         """
         # Patrón para extraer nombre, tipo y constraints
         # Ejemplo: nombre VARCHAR(100) NOT NULL DEFAULT 'valor'
-        pattern = r'^(\w+)\s+(\w+)(?:\(([^)]+)\))?\s*(.*)?$'
-        match = re.match(pattern, column_definition.strip(), re.IGNORECASE)
+        match = patterns.DDL_COLUMN_DEFINITION.match(column_definition.strip())
         
         if not match:
-            logger.warning(f"No se pudo parsear columna: {column_definition}")
+            logger.warning("No se pudo parsear columna: %s", column_definition)
             return None
         
         column_name = match.group(1)
@@ -241,7 +229,7 @@ class DDLParser(BaseParser):
             column_info["size"] = self._parse_size_info(size_info, data_type)
         
         # Procesar valor por defecto
-        default_match = re.search(r'DEFAULT\s+(.+?)(?:\s|$)', constraints, re.IGNORECASE)
+        default_match = patterns.DDL_COLUMN_DEFAULT.search(constraints)
         if default_match:
             default_value = default_match.group(1).strip()
             column_info["default"] = self._parse_default_value(default_value, data_type)
@@ -331,21 +319,13 @@ class DDLParser(BaseParser):
         }
         
         # Buscar PRIMARY KEY constraint
-        pk_match = re.search(
-            r'PRIMARY\s+KEY\s*\(([^)]+)\)',
-            columns_definition,
-            re.IGNORECASE
-        )
+        pk_match = patterns.PRIMARY_KEY.search(columns_definition)
         if pk_match:
             pk_fields = [f.strip().strip('`[]"\'') for f in pk_match.group(1).split(',')]
             constraints["primary_keys"] = pk_fields
         
         # Buscar FOREIGN KEY constraints
-        fk_matches = re.finditer(
-            r'FOREIGN\s+KEY\s*\(([^)]+)\)\s+REFERENCES\s+(\w+)\s*\(([^)]+)\)',
-            columns_definition,
-            re.IGNORECASE
-        )
+        fk_matches = patterns.FOREIGN_KEY.finditer(columns_definition)
         for fk_match in fk_matches:
             local_fields = [f.strip().strip('`[]"\'') for f in fk_match.group(1).split(',')]
             ref_table = fk_match.group(2).strip('`[]"\'')
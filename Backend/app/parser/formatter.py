@@ -3,6 +3,8 @@ import time
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
 
+from app.services.index_advisor import extract_access_patterns, build_esr_key
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -394,16 +396,14 @@ class ResponseFormatter:
         hints = []
         
         if isinstance(mongo_operation, dict):
-            # Hints para queries simples
-            if mongo_operation.get("operation") == "find":
-                if "query" in mongo_operation and mongo_operation["query"]:
-                    hints.append("Considera crear índices en los campos de filtro")
-                
-                if "sort" in mongo_operation:
-                    hints.append("Los índices compuestos pueden mejorar el rendimiento del ORDER BY")
+            # Índices compuestos (igualdad, orden, rango) que resolverían la consulta
+            collection = mongo_operation.get("collection")
+            for pattern in extract_access_patterns(collection, mongo_operation):
+                key = ", ".join(f"{field}: {direction}" for field, direction in build_esr_key(pattern))
+                hints.append(f"Índice recomendado en {pattern['collection']}: {{{key}}}")
             
             # Hints para agregaciones
-            elif mongo_operation.get("operation") == "aggregate":
+            if mongo_operation.get("operation") == "aggregate":
                 pipeline = mongo_operation.get("pipeline", [])
                 
                 # Buscar $match al inicio
@@ -1,6 +1,6 @@
-import re
 import logging
 from .base_parser import BaseParser
+from . import patterns
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -80,6 +80,9 @@ class FunctionParser(BaseParser):
             **self.string_functions, 
             **self.math_functions
         }
+        
+        # Una sola alternativa para localizar cualquier función del catálogo en una pasada
+        self.function_call_pattern = patterns.function_call_detector(tuple(self.all_functions))
     
     def parse(self, query_or_clause):
         """
@@ -103,44 +106,72 @@ class FunctionParser(BaseParser):
         Returns:
             bool: True si contiene funciones, False en caso contrario
         """
-        query_upper = query.upper()
-        
-        # Buscar patrones de funciones con paréntesis
-        for func_name in self.all_functions.keys():
-            pattern = rf'\b{func_name}\s*\('
-            if re.search(pattern, query_upper):
-                logger.debug(f"Función detectada: {func_name}")
-                return True
+        # Buscar cualquier llamada a función del catálogo en una sola pasada
+        match = self.function_call_pattern.search(query)
+        if match:
+            logger.debug("Función detectada: %s", match.group(1).upper())
+            return True
         
         return False
     
-    def parse_functions(self, query):
+    def find_function_names(self, query):
+        """
+        Obtiene los nombres de las funciones del catálogo llamadas en una consulta.
+        
+        Args:
+            query (str): Consulta SQL a analizar
+            
+        Returns:
+            set: Nombres de funciones (en mayúsculas)
+        """
+        return {match.group(1).upper() for match in self.function_call_pattern.finditer(query)}
+    
+    def contains_functions(self, function_names):
+        """
+        Verifica si alguno de los nombres de llamadas detectados es una función soportada.
+        
+        Args:
+            function_names (set): Nombres (en mayúsculas) de llamadas encontradas por el AST
+            
+        Returns:
+            bool: True si hay funciones soportadas, False en caso contrario
+        """
+        return any(name in self.all_functions for name in function_names)
+    
+    def parse_functions(self, query, names=None):
         """
         Extrae y analiza todas las funciones de una consulta SQL.
         
         Args:
             query (str): Consulta SQL a analizar
+            names (set, optional): Nombres de funciones presentes en la consulta. Si se
+                indica, solo se buscan esas funciones en lugar de todo el catálogo.
             
         Returns:
             list: Lista de diccionarios con información de funciones
         """
         functions = []
         
+        # Limitar la extracción a las funciones que realmente aparecen
+        if names is None:
+            names = self.find_function_names(query)
+        
         # Buscar cada tipo de función
-        functions.extend(self._find_date_functions(query))
-        functions.extend(self._find_string_functions(query))
-        functions.extend(self._find_math_functions(query))
+        functions.extend(self._find_date_functions(query, names))
+        functions.extend(self._find_string_functions(query, names))
+        functions.extend(self._find_math_functions(query, names))
         
-        logger.info(f"Funciones encontradas: {len(functions)}")
+        logger.debug("Funciones encontradas: %s", len(functions))
         return functions
     
-    def _find_date_functions(self, query):
+    def _find_date_functions(self, query, names=None):
         """Encuentra funciones de fecha en la consulta."""
         functions = []
         
         for func_name, func_info in self.date_functions.items():
-            pattern = rf'\b{func_name}\s*\((.*?)\)'
-            matches = re.finditer(pattern, query, re.IGNORECASE)
+            if names is not None and func_name not in names:
+                continue
+            matches = patterns.function_arguments(func_name).finditer(query)
             
             for match in matches:
                 args = match.group(1).strip() if match.group(1) else ""
@@ -157,13 +188,14 @@ class FunctionParser(BaseParser):
         
         return functions
     
-    def _find_string_functions(self, query):
+    def _find_string_functions(self, query, names=None):
         """Encuentra funciones de string en la consulta."""
         functions = []
         
         for func_name, func_info in self.string_functions.items():
-            pattern = rf'\b{func_name}\s*\((.*?)\)'
-            matches = re.finditer(pattern, query, re.IGNORECASE)
+            if names is not None and func_name not in names:
+                continue
+            matches = patterns.function_arguments(func_name).finditer(query)
             
             for match in matches:
                 args = match.group(1).strip() if match.group(1) else ""
@@ -180,13 +212,14 @@ class FunctionParser(BaseParser):
         
         return functions
     
-    def _find_math_functions(self, query):
+    def _find_math_functions(self, query, names=None):
         """Encuentra funciones matemáticas en la consulta."""
         functions = []
         
         for func_name, func_info in self.math_functions.items():
-            pattern = rf'\b{func_name}\s*\((.*?)\)'
-            matches = re.finditer(pattern, query, re.IGNORECASE)
+            if names is not None and func_name not in names:
+                continue
+            matches = patterns.function_arguments(func_name).finditer(query)
             
             for match in matches:
                 args = match.group(1).strip() if match.group(1) else ""
@@ -473,7 +506,7 @@ class FunctionParser(BaseParser):
         elif len(functions) > 1:
             # Múltiples funciones, necesita manejo más complejo
             # Por ahora, devolver la primera función
-            logger.warning(f"Múltiples funciones en una expresión no completamente soportado: {field_expression}")
+            logger.warning("Múltiples funciones en una expresión no completamente soportado: %s", field_expression)
             return functions[0]['mongo_expression']
         
         return field_expression
\ No newline at end of file
@@ -0,0 +1,235 @@
+import logging
+from .crud_parser import CRUDParser
+from . import patterns
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Documentos por lote cuando no se indica otro tamaño
+DEFAULT_INSERT_BATCH_SIZE = 1000
+
+# Errores por fila que se conservan para el informe (el resto solo se cuentan)
+MAX_REPORTED_ERRORS = 100
+
+# Caracteres de las secuencias de escape de MySQL (\\n, \\t, ...); el resto se copian tal cual
+_BACKSLASH_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+# Modos de interpretación de los literales de cadena
+STRING_ESCAPE_MODES = (None, "standard", "mysql")
+
+
+def unescape_string(literal, mode="mysql"):
+    """
+    Convierte un literal de cadena SQL (con sus comillas) en su valor.
+
+    Args:
+        literal (str): Literal entre comillas simples o dobles
+        mode (str): "standard" (solo comilla duplicada) o "mysql" (también barra invertida)
+
+    Returns:
+        str: Valor de la cadena
+    """
+    quote = literal[0]
+    pattern = patterns.string_escape(quote, mode == "mysql")
+
+    def replace(match):
+        if match.lastindex:
+            return _BACKSLASH_ESCAPES.get(match.group(1), match.group(1))
+        return quote
+
+    return pattern.sub(replace, literal[1:-1])
+
+
+def iter_value_tuples(sql, position=0, backslash_escapes=True):
+    """
+    Recorre la sección VALUES de un INSERT y devuelve cada tupla en cuanto se cierra,
+    sin capturar la sección completa ni crear la lista de todas las filas.
+
+    Args:
+        sql (str): Texto de la sentencia
+        position (int): Posición donde empieza la primera tupla
+        backslash_escapes (bool): La barra invertida escapa comillas dentro de las cadenas
+
+    Yields:
+        list: Valores (texto SQL) de una tupla, en orden
+
+    Raises:
+        ValueError: Si hay una cadena o una tupla sin cerrar
+    """
+    length = len(sql)
+    if backslash_escapes:
+        token_pattern, item_pattern = patterns.VALUES_TOKEN, patterns.VALUES_FLAT_ITEM
+    else:
+        token_pattern, item_pattern = patterns.VALUES_TOKEN_STANDARD, patterns.VALUES_FLAT_ITEM_STANDARD
+
+    while position < length:
+        match = token_pattern.match(sql, position)
+        if match is None:
+            raise ValueError(f"Cadena sin cerrar en VALUES (posición {position})")
+        token = match.group()
+        position = match.end()
+
+        if token == '(':
+            # Caso habitual: valores simples sin paréntesis anidados
+            flat = _read_flat_tuple(sql, position, item_pattern)
+            values, position = flat if flat else _read_nested_tuple(sql, position, token_pattern)
+            yield values
+        elif token == ';':
+            return
+        elif token != ',' and not token.isspace():
+            # Cláusulas posteriores (ON DUPLICATE KEY, RETURNING...) no se traducen
+            logger.warning("Contenido no soportado tras VALUES ignorado (posición %s)", match.start())
+            return
+
+
+def _read_flat_tuple(sql, position, item_pattern):
+    """
+    Lee una tupla sin paréntesis anidados con una coincidencia por valor.
+
+    Returns:
+        tuple: (valores, posición tras el ')') o None si la tupla necesita el lector general
+    """
+    values = []
+    while True:
+        match = item_pattern.match(sql, position)
+        if match is None:
+            return None
+        values.append(match.group(1).strip())
+        position = match.end()
+        if match.group(2) == ')':
+            return values, position
+
+
+def _read_nested_tuple(sql, position, token_pattern):
+    """
+    Lee una tupla token a token, admitiendo paréntesis anidados (llamadas a funciones).
+
+    Returns:
+        tuple: (valores, posición tras el ')' de cierre)
+    """
+    depth = 1
+    values = []
+    current = []
+
+    while position < len(sql):
+        match = token_pattern.match(sql, position)
+        if match is None:
+            raise ValueError(f"Cadena sin cerrar en VALUES (posición {position})")
+        token = match.group()
+        position = match.end()
+
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+            if depth == 0:
+                values.append(''.join(current).strip())
+                return values, position
+        elif token == ',' and depth == 1:
+            values.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(token)
+
+    raise ValueError("Tupla de VALUES sin cerrar al final de la sentencia")
+
+
+class InsertStream:
+    """
+    Lectura incremental de un INSERT multi-fila. Las tuplas se convierten en documentos
+    a medida que se recorren y se entregan en lotes, de modo que un INSERT con cientos
+    de miles de filas no necesita tener todos sus documentos en memoria a la vez.
+
+    Las filas cuyo número de valores no coincide con las columnas se descartan y se
+    registran en errors, igual que en CRUDParser.build_insert.
+
+    Por defecto los literales de cadena se toman como CRUDParser (sin interpretar
+    escapes); con string_escapes="standard" o "mysql" se deshacen las comillas
+    duplicadas y, en el modo mysql, las secuencias con barra invertida de mysqldump.
+    """
+
+    def __init__(self, sql, batch_size=DEFAULT_INSERT_BATCH_SIZE, string_escapes=None):
+        """
+        Args:
+            sql (str): Sentencia INSERT INTO tabla [(columnas)] VALUES (...), (...)
+            batch_size (int): Documentos por lote
+            string_escapes (str, optional): None, "standard" o "mysql"
+
+        Raises:
+            ValueError: Si la sentencia no es un INSERT ... VALUES o algún parámetro no es válido
+        """
+        header = patterns.INSERT_HEADER.match(sql)
+        if not header:
+            raise ValueError("La sentencia no es un INSERT INTO ... VALUES")
+        if not isinstance(batch_size, int) or batch_size <= 0:
+            raise ValueError("batch_size debe ser un entero positivo")
+        if string_escapes not in STRING_ESCAPE_MODES:
+            raise ValueError(f"Modo de escape no soportado: {string_escapes}")
+
+        self.sql = sql
+        self.batch_size = batch_size
+        self.string_escapes = string_escapes
+        self._value_parser = CRUDParser()
+        self._values_start = header.end()
+        self.table = header.group(1).strip('`[]"\'').lower()
+        self.columns = None
+        if header.group(2) is not None:
+            self.columns = [col.strip().strip('`[]"\'') for col in self._value_parser._split_values(header.group(2))]
+
+        # Progreso de la lectura
+        self.rows_read = 0
+        self.rows_rejected = 0
+        self.errors = []
+
+    def iter_documents(self):
+        """
+        Genera los documentos del INSERT con el número de fila (1..n) del que proceden.
+
+        Yields:
+            tuple: (número de fila, documento)
+        """
+        parse_value = self._value_parser._parse_value
+        if self.string_escapes:
+            escapes = self.string_escapes
+
+            def parse_value(value, _parse=parse_value):
+                if len(value) > 1 and value[0] in "'\"" and value[-1] == value[0]:
+                    return unescape_string(value, escapes)
+                return _parse(value)
+
+        backslash_escapes = self.string_escapes != "standard"
+        for raw_values in iter_value_tuples(self.sql, self._values_start, backslash_escapes):
+            self.rows_read += 1
+            values = [parse_value(value) for value in raw_values]
+
+            columns = self.columns or [f"column_{i+1}" for i in range(len(values))]
+            if len(columns) != len(values):
+                self._reject(self.rows_read, f"Número de columnas ({len(columns)}) no coincide con número de valores ({len(values)})")
+                continue
+
+            yield self.rows_read, dict(zip(columns, values))
+
+    def iter_batches(self):
+        """
+        Agrupa los documentos en lotes de batch_size.
+
+        Yields:
+            tuple: (números de fila, documentos) de cada lote
+        """
+        rows, documents = [], []
+        for row, document in self.iter_documents():
+            rows.append(row)
+            documents.append(document)
+            if len(documents) >= self.batch_size:
+                yield rows, documents
+                rows, documents = [], []
+
+        if documents:
+            yield rows, documents
+
+    def _reject(self, row, message):
+        """Registra una fila descartada."""
+        self.rows_rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+        logger.debug("Fila %s descartada: %s", row, message)
@@ -1,6 +1,8 @@
-import re
 import logging
 from .base_parser import BaseParser
+from . import patterns
+from app.translator.pipeline_optimizer import optimize_pipeline
+from app.log_config import truncated
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -28,10 +30,10 @@ class JoinParser(BaseParser):
         }
         
         # Patrón general para detectar JOINs
-        self.join_pattern = r'\b(?:INNER\s+)?(?:LEFT\s+(?:OUTER\s+)?|RIGHT\s+(?:OUTER\s+)?|FULL\s+(?:OUTER\s+)?|CROSS\s+)?JOIN\s+'
+        self.join_pattern = patterns.JOIN_KEYWORD
         
         # Patrón para extraer información completa de JOIN
-        self.full_join_pattern = r'(?P<join_type>(?:INNER\s+)?(?:LEFT\s+(?:OUTER\s+)?|RIGHT\s+(?:OUTER\s+)?|FULL\s+(?:OUTER\s+)?|CROSS\s+)?JOIN)\s+(?P<table>[\w`\[\]"\'\.]+)(?:\s+(?:AS\s+)?(?P<alias>[\w]+))?\s+ON\s+(?P<condition>.*?)(?=\s+(?:INNER\s+)?(?:LEFT\s+(?:OUTER\s+)?|RIGHT\s+(?:OUTER\s+)?|FULL\s+(?:OUTER\s+)?|CROSS\s+)?JOIN\s+|\s+WHERE\s+|\s+GROUP\s+BY\s+|\s+ORDER\s+BY\s+|\s+HAVING\s+|\s+LIMIT\s+|\s*;|\s*$)'
+        self.full_join_pattern = patterns.JOIN_CLAUSE
     
     def parse(self, query_or_clause):
         """
@@ -61,7 +63,7 @@ class JoinParser(BaseParser):
         Returns:
             bool: True si contiene JOINs, False en caso contrario
         """
-        return bool(re.search(self.join_pattern, query, re.IGNORECASE))
+        return bool(self.join_pattern.search(query))
     
     def parse_joins(self, query):
         """
@@ -73,19 +75,19 @@ class JoinParser(BaseParser):
         Returns:
             list: Lista de diccionarios con información de cada JOIN
         """
-        logger.info(f"Analizando JOINs en consulta: {query}")
+        logger.debug("Analizando JOINs en consulta: %s", truncated(query))
         
         joins = []
         
         # Buscar todos los JOINs en la consulta
-        matches = re.finditer(self.full_join_pattern, query, re.IGNORECASE | re.DOTALL)
+        matches = self.full_join_pattern.finditer(query)
         
         for i, match in enumerate(matches):
             join_info = self._parse_single_join(match, i)
             if join_info:
                 joins.append(join_info)
         
-        logger.info(f"JOINs encontrados: {len(joins)}")
+        logger.debug("JOINs encontrados: %s", len(joins))
         return joins
     
     def _parse_single_join(self, match, index):
@@ -123,7 +125,7 @@ class JoinParser(BaseParser):
             'mongo_strategy': self._get_mongo_strategy(join_type)
         }
         
-        logger.debug(f"JOIN analizado: {join_info}")
+        logger.debug("JOIN analizado: %s", join_info)
         return join_info
     
     def _determine_join_type(self, join_type_str):
@@ -157,8 +159,7 @@ class JoinParser(BaseParser):
             dict: Información de la condición parseada
         """
         # Patrón básico: tabla1.campo = tabla2.campo
-        basic_pattern = r'(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)'
-        match = re.search(basic_pattern, condition, re.IGNORECASE)
+        match = patterns.JOIN_EQUALITY.search(condition)
         
         if match:
             left_table = match.group(1)
@@ -176,8 +177,7 @@ class JoinParser(BaseParser):
             }
         
         # Patrón con alias: alias.campo = tabla.campo
-        alias_pattern = r'(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)'
-        match = re.search(alias_pattern, condition, re.IGNORECASE)
+        match = patterns.JOIN_EQUALITY.search(condition)
         
         if match:
             return {
@@ -216,13 +216,16 @@ class JoinParser(BaseParser):
         
         return strategies.get(join_type, 'lookup_with_match')
     
-    def translate_joins_to_mongodb(self, query, joins_info=None):
+    def translate_joins_to_mongodb(self, query, joins_info=None, main_alias=None):
         """
         Traduce JOINs a pipeline de agregación MongoDB.
         
         Args:
             query (str): Consulta SQL original
             joins_info (list): Información de JOINs (opcional)
+            main_alias (str, optional): Alias de la tabla del FROM; si se indica, los campos
+                                        locales de tablas ya unidas se leen de su array
+                                        (p_joined.campo) y se admite la condición en cualquier orden
             
         Returns:
             list: Pipeline de agregación MongoDB
@@ -237,18 +240,19 @@ class JoinParser(BaseParser):
         
         # Procesar cada JOIN secuencialmente
         for join in joins_info:
-            join_stages = self._create_lookup_stages(join)
+            join_stages = self._create_lookup_stages(join, main_alias)
             pipeline.extend(join_stages)
         
-        logger.info(f"Pipeline de JOINs generado con {len(pipeline)} etapas")
+        logger.debug("Pipeline de JOINs generado con %s etapas", len(pipeline))
         return pipeline
     
-    def _create_lookup_stages(self, join_info):
+    def _create_lookup_stages(self, join_info, main_alias=None):
         """
         Crea las etapas de $lookup para un JOIN específico.
         
         Args:
             join_info (dict): Información del JOIN
+            main_alias (str, optional): Alias de la tabla principal
             
         Returns:
             list: Lista de etapas del pipeline
@@ -258,15 +262,17 @@ class JoinParser(BaseParser):
         condition = join_info['condition']
         
         if condition['type'] != 'equality':
-            logger.warning(f"Condición de JOIN compleja no completamente soportada: {condition}")
+            logger.warning("Condición de JOIN compleja no completamente soportada: %s", condition)
             return []
         
+        local_field, foreign_field = self._resolve_lookup_fields(join_info, main_alias)
+        
         # Crear etapa $lookup básica
         lookup_stage = {
             "$lookup": {
                 "from": join_info['table'],
-                "localField": condition['left_field'],
-                "foreignField": condition['right_field'],
+                "localField": local_field,
+                "foreignField": foreign_field,
                 "as": join_info['alias'] + "_joined"
             }
         }
@@ -309,6 +315,35 @@ class JoinParser(BaseParser):
         
         return stages
     
+    def _resolve_lookup_fields(self, join_info, main_alias=None):
+        """
+        Determina localField y foreignField de un $lookup a partir de la condición del JOIN.
+        
+        Args:
+            join_info (dict): Información del JOIN
+            main_alias (str, optional): Alias de la tabla principal
+            
+        Returns:
+            tuple: (localField, foreignField)
+        """
+        condition = join_info['condition']
+        if main_alias is None:
+            return condition['left_field'], condition['right_field']
+        
+        # La tabla unida puede estar a cualquier lado del '=' (ON p.usuario_id = u.id)
+        if condition['left_table'] == join_info['alias'] and condition['right_table'] != join_info['alias']:
+            local_table, local_field = condition['right_table'], condition['right_field']
+            foreign_field = condition['left_field']
+        else:
+            local_table, local_field = condition['left_table'], condition['left_field']
+            foreign_field = condition['right_field']
+        
+        # Campo de una tabla unida antes: está dentro de su array desenrollado
+        if local_table and local_table != main_alias:
+            local_field = f"{local_table}_joined.{local_field}"
+        
+        return local_field, foreign_field
+    
     def get_main_table_from_query(self, query):
         """
         Extrae la tabla principal (FROM) de una consulta con JOINs.
@@ -320,9 +355,7 @@ class JoinParser(BaseParser):
             dict: Información de la tabla principal
         """
         # Buscar la cláusula FROM
-        from_pattern = r'FROM\s+([\w`\[\]"\'\.]+)(?:\s+(?:AS\s+)?([\w]+))?\s*(?:(?:INNER\s+)?(?:LEFT\s+(?:OUTER\s+)?|RIGHT\s+(?:OUTER\s+)?|FULL\s+(?:OUTER\s+)?|CROSS\s+)?JOIN|WHERE|GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|$)'
-        
-        match = re.search(from_pattern, query, re.IGNORECASE)
+        match = patterns.JOIN_FROM_TABLE.search(query)
         
         if match:
             table = match.group(1).strip('`[]"\'')
@@ -346,18 +379,7 @@ class JoinParser(BaseParser):
         Returns:
             list: Pipeline optimizado
         """
-        optimized = []
-        
-        for stage in pipeline:
-            # Optimización 1: Agregar hint sobre índices
-            if "$lookup" in stage:
-                lookup = stage["$lookup"]
-                # Sugerir índice en el campo de lookup
-                lookup["_index_hint"] = f"Consider index on {lookup['from']}.{lookup['foreignField']}"
-            
-            optimized.append(stage)
-        
-        return optimized
+        return optimize_pipeline(pipeline)
     
     def generate_join_explanation(self, joins_info):
         """
@@ -0,0 +1,181 @@
+"""
+Registro central de expresiones regulares precompiladas de los parsers.
+
+Cada patrón se compila una sola vez al importar el módulo (o la primera vez que se
+pide, en los patrones que dependen de un parámetro) en lugar de pasar la cadena a
+re.search/re.finditer en cada llamada.
+"""
+import re
+from functools import lru_cache
+
+_I = re.IGNORECASE
+_ID = re.IGNORECASE | re.DOTALL
+
+# --- Comunes ---
+
+# Separación "expresión AS alias" / "expresión alias" de un campo del SELECT
+FIELD_ALIAS_AS = re.compile(r'(.*?)\s+AS\s+([\w]+)$', _I)
+FIELD_ALIAS_IMPLICIT = re.compile(r'(.*?)\s+([\w]+)$')
+
+# Definición de tablas (CREATE TABLE)
+CREATE_TABLE_COLUMNS = re.compile(r'CREATE\s+TABLE\s+\w+\s*\((.*)\)', _ID)
+COLUMN_DEFAULT_TOKEN = re.compile(r'DEFAULT\s+(\S+)', _I)
+PRIMARY_KEY = re.compile(r'PRIMARY\s+KEY\s*\(([^)]+)\)', _I)
+FOREIGN_KEY = re.compile(r'FOREIGN\s+KEY\s*\(([^)]+)\)\s+REFERENCES\s+(\w+)\s*\(([^)]+)\)', _I)
+
+# --- WhereParser ---
+
+WHERE_CLAUSE = re.compile(r'\sWHERE\s+(.*?)(?:\s+GROUP\s+BY|\s+HAVING|\s+ORDER\s+BY|\s+LIMIT|\s+OFFSET|\s*;|\s*$)', _ID)
+WHERE_HAS_BETWEEN = re.compile(r'\w+\s+BETWEEN\s+.+?\s+AND\s+.+?(?:\s*;|\s*$)', _I)
+WHERE_BETWEEN = re.compile(r'(\w+)\s+BETWEEN\s+([^A]+?)\s+AND\s+(.+?)(?:\s*;|\s*$)', _I)
+WHERE_IN = re.compile(r'([\w.]+)\s+IN\s+\((.*?)\)', _I)
+WHERE_NOT_IN = re.compile(r'([\w.]+)\s+NOT\s+IN\s+\((.*?)\)', _I)
+WHERE_LIKE = re.compile(r'([\w.]+)\s+LIKE\s+(.*?)(?:\s*;|\s*$)', _I)
+WHERE_IS_NULL = re.compile(r'([\w.]+)\s+IS\s+NULL(?:\s*;|\s*$)', _I)
+WHERE_IS_NOT_NULL = re.compile(r'([\w.]+)\s+IS\s+NOT\s+NULL(?:\s*;|\s*$)', _I)
+FLOAT_LITERAL = re.compile(r'^-?\d+\.\d+$')
+INTEGER_LITERAL = re.compile(r'^-?\d+$')
+
+# --- SelectParser ---
+
+SELECT_FIELDS = re.compile(r'SELECT\s+(.*?)\s+FROM', _ID)
+SELECT_FROM_TABLE = re.compile(r'FROM\s+([^\s,;()]+)(?:\s+(?:WHERE|GROUP BY|HAVING|ORDER BY|LIMIT|JOIN)|\s*$)', _I)
+SELECT_FROM_SIMPLE = re.compile(r'FROM\s+([^\s,;()]+)', _I)
+
+# --- CRUDParser ---
+
+INSERT_TABLE = re.compile(r'INSERT\s+INTO\s+([^\s(]+)', _I)
+INSERT_WITH_COLUMNS = re.compile(r'INSERT\s+INTO\s+[^\s(]+\s*\((.*?)\)\s*VALUES\s*(.*?)(?:;|$)', _ID)
+INSERT_WITHOUT_COLUMNS = re.compile(r'INSERT\s+INTO\s+[^\s(]+\s+VALUES\s*(.*?)(?:;|$)', _ID)
+VALUE_SETS = re.compile(r'\(([^)]+)\)')
+UPDATE_TABLE = re.compile(r'UPDATE\s+([^\s,;()]+)', _I)
+UPDATE_SET = re.compile(r'SET\s+(.*?)(?:\sWHERE|\s;|\Z)', _ID)
+STATEMENT_WHERE = re.compile(r'WHERE\s+(.*?)(?:\s;|\Z)', _ID)
+DELETE_TABLE = re.compile(r'DELETE\s+FROM\s+([^\s,;()]+)', _I)
+
+# Cabecera de un INSERT (tabla, columnas opcionales y VALUES) para la lectura incremental
+INSERT_HEADER = re.compile(r'\s*INSERT\s+INTO\s+([^\s(]+)\s*(?:\(([^)]*)\))?\s*VALUES\s*', _I)
+# Tokens de la sección VALUES: cadenas (con '' o \' escapadas), delimitadores y el resto
+VALUES_TOKEN = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|[(),;]|[^'\"(),;]+", re.DOTALL)
+# Un valor de una tupla sin paréntesis anidados seguido de su separador (',' o ')')
+VALUES_FLAT_ITEM = re.compile(r"\s*('(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|[^'\"(),]*)\s*([,)])", re.DOTALL)
+# Variantes sin escapes con barra invertida (cadenas SQL estándar, p. ej. PostgreSQL)
+VALUES_TOKEN_STANDARD = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|[(),;]|[^'\"(),;]+")
+VALUES_FLAT_ITEM_STANDARD = re.compile(r"\s*('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|[^'\"(),]*)\s*([,)])")
+
+# --- DDLParser ---
+
+DDL_CREATE_TABLE_NAME = re.compile(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([^\s(]+)', _I)
+DDL_CREATE_TABLE_COLUMNS = re.compile(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?[^\s(]+\s*\((.*)\)', _ID)
+DDL_DROP_TABLE_NAME = re.compile(r'DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?([^\s;]+)', _I)
+DDL_COLUMN_DEFINITION = re.compile(r'^(\w+)\s+(\w+)(?:\(([^)]+)\))?\s*(.*)?$', _I)
+DDL_COLUMN_DEFAULT = re.compile(r'DEFAULT\s+(.+?)(?:\s|$)', _I)
+
+# --- JoinParser ---
+
+_JOIN_KEYWORD = r'(?:INNER\s+)?(?:LEFT\s+(?:OUTER\s+)?|RIGHT\s+(?:OUTER\s+)?|FULL\s+(?:OUTER\s+)?|CROSS\s+)?JOIN'
+
+JOIN_KEYWORD = re.compile(r'\b' + _JOIN_KEYWORD + r'\s+', _I)
+JOIN_CLAUSE = re.compile(
+    r'(?P<join_type>' + _JOIN_KEYWORD + r')\s+(?P<table>[\w`\[\]"\'\.]+)(?:\s+(?:AS\s+)?(?P<alias>[\w]+))?'
+    r'\s+ON\s+(?P<condition>.*?)(?=\s+' + _JOIN_KEYWORD + r'\s+|\s+WHERE\s+|\s+GROUP\s+BY\s+|\s+ORDER\s+BY\s+'
+    r'|\s+HAVING\s+|\s+LIMIT\s+|\s*;|\s*$)',
+    _ID
+)
+JOIN_EQUALITY = re.compile(r'(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)', _I)
+JOIN_FROM_TABLE = re.compile(
+    r'FROM\s+([\w`\[\]"\'\.]+)(?:\s+(?:AS\s+)?([\w]+))?\s*(?:' + _JOIN_KEYWORD
+    + r'|WHERE|GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|$)',
+    _I
+)
+
+# --- AdvancedParser ---
+
+DISTINCT_KEYWORD = re.compile(r'\bSELECT\s+DISTINCT\s+', _I)
+DISTINCT_FIELDS = re.compile(r'SELECT\s+DISTINCT\s+(.*?)\s+FROM', _ID)
+HAVING_KEYWORD = re.compile(r'\bHAVING\s+(.*?)(?:\s+ORDER\s+BY|\s+LIMIT|\s+UNION|\s*;|\s*$)', _I)
+HAVING_CLAUSE = re.compile(r'\bHAVING\s+(.*?)(?:\s+ORDER\s+BY|\s+LIMIT|\s+UNION|\s*;|\s*$)', _ID)
+UNION_KEYWORD = re.compile(r'\bUNION(?:\s+ALL)?\s+', _I)
+UNION_ALL_KEYWORD = re.compile(r'\bUNION\s+ALL\s+', _I)
+SUBQUERY = re.compile(r'\(\s*SELECT\s+.*?\)', _ID)
+
+
+# --- Scripts SQL (volcados) ---
+
+# Avanza sobre texto normal, cadenas e identificadores completos hasta el siguiente ';',
+# comentario o comilla sin cerrar (grupo 1). Bucle desenrollado: normal* (especial normal*)*
+_SCRIPT_NORMAL = r"[^;'\"`\-/]*"
+_SCRIPT_QUOTED = {
+    True: r"'[^'\\]*(?:\\.[^'\\]*)*'|\"[^\"\\]*(?:\\.[^\"\\]*)*\"",
+    False: r"'[^']*'|\"[^\"]*\"",
+}
+SCRIPT_SCAN = {
+    backslash: re.compile(
+        _SCRIPT_NORMAL + r"(?:(?:" + quoted + r"|`[^`]*`|-(?!-)|/(?!\*))" + _SCRIPT_NORMAL + r")*"
+        r"(;|--|/\*|['\"`])",
+        re.DOTALL
+    )
+    for backslash, quoted in _SCRIPT_QUOTED.items()
+}
+SCRIPT_LINE_COMMENT_END = re.compile(r'\n')
+SCRIPT_BLOCK_COMMENT_END = re.compile(r'\*/')
+SCRIPT_QUOTE_END = {
+    (quote, backslash): re.compile((r'\\.|' if backslash else '') + re.escape(quote), re.DOTALL)
+    for quote in ("'", '"')
+    for backslash in (True, False)
+}
+SCRIPT_BACKTICK_END = re.compile('`')
+# Primera palabra de una sentencia (y la segunda, para CREATE TABLE / DROP TABLE...)
+STATEMENT_KEYWORDS = re.compile(r'\s*(\w+)(?:\s+(\w+))?')
+STANDARD_CONFORMING_STRINGS_ON = re.compile(r'SET\s+standard_conforming_strings\s*=\s*\'?on\'?', _I)
+
+
+# --- Patrones parametrizados (se compilan una vez por parámetro) ---
+
+@lru_cache(maxsize=None)
+def spaced_operator(operator):
+    """Operador lógico rodeado por un espacio a cada lado (r'\\sAND\\s')."""
+    return re.compile(r'\s' + operator + r'\s', _I)
+
+
+@lru_cache(maxsize=None)
+def spaced_operator_run(operator):
+    """Operador lógico rodeado por uno o más espacios (r'\\s+AND\\s+')."""
+    return re.compile(rf'\s+{operator}\s+', _I)
+
+
+@lru_cache(maxsize=None)
+def function_arguments(function_name, word_boundary=True):
+    """Llamada a una función con sus argumentos en el grupo 1 (NOMBRE(...))."""
+    prefix = r'\b' if word_boundary else ''
+    return re.compile(rf'{prefix}{function_name}\s*\((.*?)\)', _I)
+
+
+@lru_cache(maxsize=None)
+def string_escape(quote, backslash=True):
+    """
+    Secuencias de escape dentro de un literal delimitado por quote: la comilla
+    duplicada y, si backslash es True, las barras invertidas al estilo MySQL (\\n, \\').
+    El carácter escapado por la barra queda en el grupo 1.
+    """
+    doubled = re.escape(quote * 2)
+    if backslash:
+        return re.compile(r'\\(.)|' + doubled, re.DOTALL)
+    return re.compile(doubled)
+
+
+@lru_cache(maxsize=None)
+def function_call_detector(function_names):
+    """
+    Alternativa única que localiza en una sola pasada las llamadas a cualquiera de
+    las funciones indicadas. Los nombres más largos van primero para que, por ejemplo,
+    LOG10( no se reconozca como LOG.
+
+    Args:
+        function_names (tuple): Nombres de funciones en mayúsculas
+
+    Returns:
+        Pattern: Patrón con el nombre de la función en el grupo 1
+    """
+    names = sorted(function_names, key=len, reverse=True)
+    return re.compile(r'\b(' + '|'.join(re.escape(name) for name in names) + r')\s*\(', _I)
@@ -0,0 +1,123 @@
+import logging
+from . import patterns
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Caracteres leídos del fichero en cada bloque
+DEFAULT_READ_SIZE = 1024 * 1024
+
+# Estados del lector fuera de una sentencia normal
+_LINE_COMMENT = "--"
+_BLOCK_COMMENT = "/*"
+
+
+class SQLScriptSplitter:
+    """
+    Divide un script SQL (por ejemplo, un volcado de mysqldump o pg_dump en modo plain)
+    en sentencias leyendo el fichero por bloques. Solo se mantiene en memoria la
+    sentencia en curso.
+
+    Los ';' dentro de cadenas, identificadores entre comillas o comentarios no separan
+    sentencias. Los comentarios (-- y /* */, incluidos los condicionales de MySQL
+    /*!40101 ... */) se eliminan del texto devuelto.
+
+    El atributo backslash_escapes indica si la barra invertida escapa comillas dentro de
+    las cadenas (MySQL); puede cambiarse mientras se recorre el script, por ejemplo al
+    encontrar SET standard_conforming_strings = on en un volcado de PostgreSQL.
+    """
+
+    def __init__(self, source, backslash_escapes=True, read_size=DEFAULT_READ_SIZE):
+        """
+        Args:
+            source: Fichero de texto (cualquier objeto con read(size))
+            backslash_escapes (bool): La barra invertida escapa caracteres en las cadenas
+            read_size (int): Caracteres por lectura
+        """
+        self.source = source
+        self.backslash_escapes = backslash_escapes
+        self.read_size = read_size
+
+    def __iter__(self):
+        buffer = ""
+        pieces = []     # Texto de la sentencia en curso ya consumido del buffer
+        start = 0       # Inicio del texto pendiente de copiar a pieces
+        position = 0    # Posición desde la que se busca el siguiente token
+        state = None    # None, comilla abierta, _LINE_COMMENT o _BLOCK_COMMENT
+        eof = False
+
+        while True:
+            # Sin llegar al final, el último carácter no se examina: puede ser el primero
+            # de un token de dos caracteres (--, /*, */) o el carácter tras una barra
+            end = len(buffer) if eof else max(len(buffer) - 1, 0)
+            if state is None:
+                match = patterns.SCRIPT_SCAN[self.backslash_escapes].match(buffer, position, end)
+            else:
+                match = self._pattern(state).search(buffer, position, end)
+
+            if match is None:
+                if eof:
+                    break
+                chunk = self.source.read(self.read_size)
+                if not chunk:
+                    eof = True
+                    continue
+
+                # Descartar lo ya procesado para que el buffer no crezca con el fichero
+                position = max(position, len(buffer) - 2, start)
+                if state in (_LINE_COMMENT, _BLOCK_COMMENT):
+                    start = position
+                else:
+                    pieces.append(buffer[start:position])
+                buffer = buffer[position:] + chunk
+                position = start = 0
+                continue
+
+            position = match.end()
+
+            if state is None:
+                token = match.group(1)
+                if token == ';':
+                    pieces.append(buffer[start:match.start(1)])
+                    statement = "".join(pieces).strip()
+                    pieces = []
+                    start = position
+                    if statement:
+                        yield statement
+                elif token in (_LINE_COMMENT, _BLOCK_COMMENT):
+                    pieces.append(buffer[start:match.start(1)])
+                    state = token
+                else:
+                    # Comilla que no se cierra dentro del buffer: seguir leyendo
+                    state = token
+                continue
+
+            token = match.group()
+            if state == _LINE_COMMENT:
+                # El salto de línea se conserva como separador
+                state = None
+                start = match.start()
+            elif state == _BLOCK_COMMENT:
+                state = None
+                pieces.append(" ")
+                start = position
+            elif token == state:
+                state = None
+
+        if state not in (None, _LINE_COMMENT, _BLOCK_COMMENT):
+            raise ValueError(f"Cadena o identificador sin cerrar ({state}) al final del script")
+        if state is None:
+            pieces.append(buffer[start:])
+        statement = "".join(pieces).strip()
+        if statement:
+            yield statement
+
+    def _pattern(self, state):
+        """Patrón que localiza el final de una cadena, identificador o comentario."""
+        if state == _LINE_COMMENT:
+            return patterns.SCRIPT_LINE_COMMENT_END
+        if state == _BLOCK_COMMENT:
+            return patterns.SCRIPT_BLOCK_COMMENT_END
+        if state == '`':
+            return patterns.SCRIPT_BACKTICK_END
+        return patterns.SCRIPT_QUOTE_END[(state, self.backslash_escapes)]
@@ -1,6 +1,7 @@
-import re
 import logging
 from .base_parser import BaseParser
+from . import patterns
+from app.log_config import truncated
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -21,7 +22,7 @@ class SelectParser(BaseParser):
         Returns:
             dict: Diccionario con información de los campos SELECT
         """
-        logger.info(f"Analizando consulta SELECT: {query}")
+        logger.debug("Analizando consulta SELECT: %s", truncated(query))
         
         # Extraer los campos a seleccionar
         fields = self.get_select_fields(query)
@@ -49,15 +50,24 @@ class SelectParser(BaseParser):
         query = query.strip()
         
         # Obtener la parte entre SELECT y FROM
-        select_pattern = r'SELECT\s+(.*?)\s+FROM'
-        select_match = re.search(select_pattern, query, re.IGNORECASE | re.DOTALL)
+        select_match = patterns.SELECT_FIELDS.search(query)
         
         if not select_match:
             logger.warning("No se pudo extraer campos SELECT")
             return [{"field": "*"}]  # Asumir SELECT * si no se puede analizar
         
-        fields_str = select_match.group(1).strip()
+        return self.parse_fields(select_match.group(1).strip())
+    
+    def parse_fields(self, fields_str):
+        """
+        Analiza la lista de campos de una cláusula SELECT ya extraída.
         
+        Args:
+            fields_str (str): Texto entre SELECT y FROM
+            
+        Returns:
+            list: Lista de diccionarios con campos y alias
+        """
         # Si es SELECT *, devolver un indicador especial
         if fields_str == "*":
             return [{"field": "*"}]
@@ -70,10 +80,10 @@ class SelectParser(BaseParser):
             field = field.strip()
             
             # Detectar alias (campo AS alias o campo alias)
-            alias_match = re.search(r'(.*?)\s+AS\s+([\w]+)$', field, re.IGNORECASE)
+            alias_match = patterns.FIELD_ALIAS_AS.search(field)
             if not alias_match:
                 # Intentar con formato sin AS (campo alias)
-                alias_match = re.search(r'(.*?)\s+([\w]+)$', field)
+                alias_match = patterns.FIELD_ALIAS_IMPLICIT.search(field)
             
             if alias_match:
                 field_name = alias_match.group(1).strip()
@@ -82,7 +92,7 @@ class SelectParser(BaseParser):
             else:
                 select_fields.append({"field": field})
         
-        logger.info(f"Campos SELECT extraídos: {select_fields}")
+        logger.debug("Campos SELECT extraídos: %s", truncated(select_fields))
         return select_fields
     
     def get_table_name(self, query):
@@ -99,21 +109,19 @@ class SelectParser(BaseParser):
         query = query.strip()
         
         # Extraer la parte después de FROM y antes de la siguiente cláusula
-        from_pattern = r'FROM\s+([^\s,;()]+)(?:\s+(?:WHERE|GROUP BY|HAVING|ORDER BY|LIMIT|JOIN)|\s*$)'
-        from_match = re.search(from_pattern, query, re.IGNORECASE)
+        from_match = patterns.SELECT_FROM_TABLE.search(query)
         
         if from_match:
             table_name = from_match.group(1).strip('`[]"\'')
-            logger.info(f"Tabla extraída: {table_name}")
+            logger.debug("Tabla extraída: %s", table_name)
             return table_name.lower()
         
         # Si el patrón anterior falla, intentar un patrón más simple
-        simple_pattern = r'FROM\s+([^\s,;()]+)'
-        simple_match = re.search(simple_pattern, query, re.IGNORECASE)
+        simple_match = patterns.SELECT_FROM_SIMPLE.search(query)
         
         if simple_match:
             table_name = simple_match.group(1).strip('`[]"\'')
-            logger.info(f"Tabla extraída (patrón simple): {table_name}")
+            logger.debug("Tabla extraída (patrón simple): %s", table_name)
             return table_name.lower()
         
         logger.warning("No se pudo extraer tabla de SELECT")
@@ -201,7 +209,7 @@ class SelectParser(BaseParser):
             table_name = self.get_table_name()
             
             # Extraer definición de columnas entre paréntesis
-            columns_match = re.search(r'CREATE\s+TABLE\s+\w+\s*\((.*)\)', self.query, re.IGNORECASE | re.DOTALL)
+            columns_match = patterns.CREATE_TABLE_COLUMNS.search(self.query)
             if not columns_match:
                 raise ValueError("No se encontró definición de columnas en CREATE TABLE")
             
@@ -223,11 +231,11 @@ class SelectParser(BaseParser):
                 'original_definition': columns_str
             }
             
-            logger.info(f"Información de CREATE TABLE extraída: {table_name} con {len(columns)} columnas")
+            logger.debug("Información de CREATE TABLE extraída: %s con %s columnas", table_name, len(columns))
             return create_info
             
         except Exception as e:
-            logger.error(f"Error extrayendo información de CREATE TABLE: {e}")
+            logger.error("Error extrayendo información de CREATE TABLE: %s", e)
             return {
                 'table_name': self.get_table_name(),
                 'columns': [],
@@ -310,7 +318,7 @@ class SelectParser(BaseParser):
             
             # Extraer valor por defecto
             default_value = None
-            default_match = re.search(r'DEFAULT\s+(\S+)', col_def, re.IGNORECASE)
+            default_match = patterns.COLUMN_DEFAULT_TOKEN.search(col_def)
             if default_match:
                 default_value = default_match.group(1)
             
@@ -325,7 +333,7 @@ class SelectParser(BaseParser):
             }
             
         except Exception as e:
-            logger.warning(f"Error parseando columna '{col_def}': {e}")
+            logger.warning("Error parseando columna '%s': %s", col_def, e)
             return None
 
 
@@ -360,13 +368,13 @@ class SelectParser(BaseParser):
         }
         
         # Buscar PRIMARY KEY
-        pk_match = re.search(r'PRIMARY\s+KEY\s*\(([^)]+)\)', columns_str, re.IGNORECASE)
+        pk_match = patterns.PRIMARY_KEY.search(columns_str)
         if pk_match:
             pk_fields = [field.strip() for field in pk_match.group(1).split(',')]
             constraints['primary_keys'] = pk_fields
         
         # Buscar FOREIGN KEY
-        fk_matches = re.finditer(r'FOREIGN\s+KEY\s*\(([^)]+)\)\s+REFERENCES\s+(\w+)\s*\(([^)]+)\)', columns_str, re.IGNORECASE)
+        fk_matches = patterns.FOREIGN_KEY.finditer(columns_str)
         for fk_match in fk_matches:
             constraints['foreign_keys'].append({
                 'columns': [col.strip() for col in fk_match.group(1).split(',')],
@@ -418,8 +426,7 @@ class SelectParser(BaseParser):
             alias = field_info.get("alias", "")
             
             for func in agg_functions:
-                func_pattern = fr'{func}\s*\((.*?)\)'
-                match = re.search(func_pattern, field, re.IGNORECASE)
+                match = patterns.function_arguments(func, word_boundary=False).search(field)
                 
                 if match:
                     inner_field = match.group(1).strip()
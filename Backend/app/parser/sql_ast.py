@@ -0,0 +1,432 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.explain import EXPLAIN_VERBOSITY, EXPLAIN_ANALYZE_VERBOSITY
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+# Expresión única del tokenizador: se recorre la consulta una sola vez
+_TOKEN_REGEX = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+  | (?P<ident>`[^`]*`|\[[^\]]*\])
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+)
+  | (?P<param>\?|:[A-Za-z_]\w*)
+  | (?P<word>[A-Za-z_][\w$]*)
+  | (?P<op><>|!=|>=|<=|\|\||[=<>+\-*/%])
+  | (?P<punct>[(),;.])
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+# Palabras clave que abren una cláusula según el tipo de sentencia
+_CLAUSE_KEYWORDS = {
+    "SELECT": ("SELECT", "FROM", "WHERE", "GROUP BY", "HAVING", "ORDER BY", "LIMIT", "OFFSET"),
+    "INSERT": ("INSERT", "INTO", "VALUES", "SELECT"),
+    "UPDATE": ("UPDATE", "SET", "WHERE", "ORDER BY", "LIMIT"),
+    "DELETE": ("DELETE", "FROM", "WHERE", "ORDER BY", "LIMIT"),
+}
+
+_STATEMENT_TYPES = ("SELECT", "INSERT", "UPDATE", "DELETE", "CREATE", "DROP", "ALTER")
+
+# Palabras que pueden ir seguidas de "(" sin ser una llamada a función
+_NON_FUNCTION_WORDS = {
+    "IN", "VALUES", "EXISTS", "ON", "AND", "OR", "NOT", "AS", "SELECT", "FROM",
+    "WHERE", "INTO", "TABLE", "JOIN", "USING", "ANY", "ALL", "SOME", "KEY", "UNION",
+    "BY", "HAVING", "SET", "REFERENCES",
+}
+
+# Palabras tras las cuales viene un nombre de tabla (nunca una función)
+_TABLE_INTRODUCERS = {"INTO", "TABLE", "JOIN", "FROM", "UPDATE", "REFERENCES", "EXISTS"}
+
+_JOIN_WORDS = {"JOIN"}
+
+
+@dataclass
+class Token:
+    """Token léxico de una consulta SQL."""
+    kind: str
+    value: str
+    upper: str
+    start: int
+    end: int
+    depth: int
+
+
+@dataclass
+class Clause:
+    """Cláusula de nivel superior (SELECT, FROM, WHERE...) con su texto original."""
+    keyword: str
+    text: str
+    start: int
+    end: int
+    tokens: List[Token] = field(default_factory=list)
+
+
+@dataclass
+class SQLStatement:
+    """
+    Árbol sintáctico simplificado de una sentencia SQL.
+    Se construye una sola vez por consulta y todos los accesores de SQLParser leen de él.
+    """
+    sql: str
+    query_type: Optional[str] = None
+    tokens: List[Token] = field(default_factory=list)
+    clauses: Dict[str, Clause] = field(default_factory=dict)
+    table: Optional[str] = None
+    distinct: bool = False
+    has_joins: bool = False
+    function_names: Set[str] = field(default_factory=set)
+    subquery_spans: List[Tuple[int, int]] = field(default_factory=list)
+    union_branches: List[str] = field(default_factory=list)
+    # True si todos los operadores son UNION ALL
+    union_all: bool = False
+    # Por cada operador entre dos ramas: True para UNION ALL, False para UNION
+    union_all_flags: List[bool] = field(default_factory=list)
+    insert_columns: Optional[str] = None
+    explain: Optional[str] = None
+
+    def clause(self, keyword):
+        """Devuelve la cláusula indicada o None."""
+        return self.clauses.get(keyword)
+
+    def clause_text(self, keyword):
+        """Devuelve el texto de la cláusula indicada o None si no existe."""
+        clause = self.clauses.get(keyword)
+        return clause.text if clause else None
+
+    def has_clause(self, keyword):
+        """Indica si la sentencia contiene la cláusula."""
+        return keyword in self.clauses
+
+    @property
+    def has_union(self):
+        return len(self.union_branches) > 1
+
+    @property
+    def has_subquery(self):
+        return len(self.subquery_spans) > 0
+
+
+def tokenize(sql):
+    """
+    Divide una consulta SQL en tokens en una única pasada.
+
+    Args:
+        sql (str): Consulta SQL
+
+    Returns:
+        list: Lista de Token significativos (sin espacios ni comentarios)
+    """
+    tokens = []
+    depth = 0
+
+    for match in _TOKEN_REGEX.finditer(sql):
+        kind = match.lastgroup
+        if kind in ("ws", "comment"):
+            continue
+
+        value = match.group()
+        if value == ")":
+            depth = max(depth - 1, 0)
+
+        tokens.append(Token(kind, value, value.upper(), match.start(), match.end(), depth))
+
+        if value == "(":
+            depth += 1
+
+    return tokens
+
+
+def clean_identifier(name):
+    """Elimina comillas y delimitadores de un identificador SQL."""
+    if name is None:
+        return None
+    return name.strip('`[]"\'')
+
+
+def _read_identifier(tokens, index):
+    """
+    Lee un identificador (posiblemente calificado: esquema.tabla) a partir de index.
+
+    Returns:
+        tuple: (texto del identificador o None, índice siguiente)
+    """
+    if index >= len(tokens):
+        return None, index
+
+    first = tokens[index]
+    if first.kind not in ("word", "ident", "string"):
+        return None, index
+
+    parts = [first.value]
+    prev_end = first.end
+    i = index + 1
+
+    # Concatenar tokens contiguos (sin espacios) como esquema.tabla
+    while i < len(tokens) and tokens[i].start == prev_end and \
+            (tokens[i].value == "." or tokens[i].kind in ("word", "ident")):
+        parts.append(tokens[i].value)
+        prev_end = tokens[i].end
+        i += 1
+
+    return "".join(parts), i
+
+
+def _match_keyword(tokens, index, keywords):
+    """
+    Comprueba si en la posición index empieza alguna palabra clave (simple o compuesta).
+
+    Returns:
+        tuple: (palabra clave normalizada o None, número de tokens que ocupa)
+    """
+    token = tokens[index]
+    if token.kind != "word":
+        return None, 0
+
+    for keyword in keywords:
+        parts = keyword.split(" ")
+        if token.upper != parts[0]:
+            continue
+        if len(parts) == 1:
+            return keyword, 1
+        if index + len(parts) <= len(tokens) and all(
+            tokens[index + k].kind == "word" and tokens[index + k].upper == parts[k]
+            for k in range(1, len(parts))
+        ):
+            return keyword, len(parts)
+
+    return None, 0
+
+
+def _detect_query_type(tokens):
+    """Determina el tipo de sentencia a partir del primer token significativo."""
+    for token in tokens:
+        if token.value == "(":
+            continue
+        if token.kind == "word" and token.upper in _STATEMENT_TYPES:
+            return token.upper
+        return "UNKNOWN"
+    return None
+
+
+def _strip_explain(tokens):
+    """
+    Detecta el prefijo EXPLAIN [ANALYZE] de una sentencia.
+
+    Returns:
+        tuple: (verbosidad de explain o None, tokens de la sentencia explicada)
+    """
+    if not tokens or tokens[0].upper != "EXPLAIN":
+        return None, tokens
+
+    if len(tokens) > 1 and tokens[1].upper == "ANALYZE":
+        return EXPLAIN_ANALYZE_VERBOSITY, tokens[2:]
+    return EXPLAIN_VERBOSITY, tokens[1:]
+
+
+def _split_clauses(sql, tokens, keywords, statement):
+    """
+    Recorre los tokens de nivel superior y los agrupa por cláusula.
+    Para SELECT también separa las ramas de UNION.
+    """
+    clauses = {}
+    branches = []
+    branch_start = tokens[0].start if tokens else 0
+    current_kw = None
+    current_body_start = None
+    current_start = None
+    current_tokens = []
+    in_first_branch = True
+    end_of_statement = len(sql)
+
+    def close_clause(end_pos):
+        if current_kw and in_first_branch and current_kw not in clauses:
+            clauses[current_kw] = Clause(
+                keyword=current_kw,
+                text=sql[current_body_start:end_pos].strip(),
+                start=current_start,
+                end=end_pos,
+                tokens=list(current_tokens)
+            )
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+
+        # Fin de la sentencia
+        if token.value == ";" and token.depth == 0:
+            end_of_statement = token.start
+            break
+
+        if token.depth == 0 and token.kind == "word":
+            # UNION / UNION ALL separa ramas en consultas SELECT
+            if statement.query_type == "SELECT" and token.upper == "UNION":
+                close_clause(token.start)
+                branches.append(sql[branch_start:token.start].strip())
+                in_first_branch = False
+                current_kw = None
+                current_tokens = []
+                step = 2 if i + 1 < len(tokens) and tokens[i + 1].upper == "ALL" else 1
+                statement.union_all_flags.append(step == 2)
+                branch_start = tokens[i + step].start if i + step < len(tokens) else len(sql)
+                i += step
+                continue
+
+            keyword, width = _match_keyword(tokens, i, keywords)
+            if keyword:
+                close_clause(token.start)
+                current_kw = keyword
+                current_start = token.start
+                current_body_start = tokens[i + width - 1].end
+                current_tokens = []
+                i += width
+                continue
+
+        if current_kw:
+            current_tokens.append(token)
+        i += 1
+
+    close_clause(end_of_statement)
+    branches.append(sql[branch_start:end_of_statement].strip())
+
+    statement.clauses = clauses
+    statement.union_branches = branches if len(branches) > 1 else []
+    statement.union_all = bool(statement.union_all_flags) and all(statement.union_all_flags)
+
+
+def _collect_functions_and_subqueries(tokens, statement):
+    """Detecta llamadas a funciones y subconsultas en una sola pasada."""
+    open_stack = []
+    previous = None
+
+    for i, token in enumerate(tokens):
+        if token.value == "(":
+            is_subquery = i + 1 < len(tokens) and tokens[i + 1].upper == "SELECT"
+            open_stack.append((token.start, is_subquery))
+
+            if previous is not None and previous.kind == "word" and \
+                    previous.upper not in _NON_FUNCTION_WORDS:
+                before = tokens[i - 2] if i >= 2 else None
+                if before is None or before.upper not in _TABLE_INTRODUCERS:
+                    statement.function_names.add(previous.upper)
+
+        elif token.value == ")" and open_stack:
+            start, is_subquery = open_stack.pop()
+            if is_subquery:
+                statement.subquery_spans.append((start, token.end))
+
+        previous = token
+
+    statement.subquery_spans.sort()
+
+
+def _extract_table(statement):
+    """Obtiene el nombre de la tabla principal según el tipo de sentencia."""
+    tokens = statement.tokens
+    query_type = statement.query_type
+
+    if query_type == "SELECT":
+        from_clause = statement.clause("FROM")
+        if not from_clause or not from_clause.tokens:
+            return None
+        from_tokens = from_clause.tokens
+        name, _ = _read_identifier(from_tokens, 0)
+        if name:
+            return name
+        # Tabla derivada: usar la primera tabla de la subconsulta
+        for i, token in enumerate(from_tokens):
+            if token.upper == "FROM":
+                name, _ = _read_identifier(from_tokens, i + 1)
+                if name:
+                    return name
+        return None
+
+    if query_type == "INSERT":
+        into = statement.clause("INTO")
+        if into and into.tokens:
+            name, next_index = _read_identifier(into.tokens, 0)
+            # Columnas explícitas: INSERT INTO tabla (col1, col2)
+            rest = into.tokens[next_index:]
+            if rest and rest[0].value == "(":
+                closing = next((t for t in rest[1:] if t.value == ")" and t.depth == rest[0].depth), None)
+                if closing:
+                    statement.insert_columns = statement.sql[rest[0].end:closing.start].strip()
+            return name
+        return None
+
+    if query_type == "UPDATE":
+        update = statement.clause("UPDATE")
+        if update and update.tokens:
+            name, _ = _read_identifier(update.tokens, 0)
+            return name
+        return None
+
+    if query_type == "DELETE":
+        from_clause = statement.clause("FROM")
+        if from_clause and from_clause.tokens:
+            name, _ = _read_identifier(from_clause.tokens, 0)
+            return name
+        return None
+
+    if query_type in ("CREATE", "DROP", "ALTER"):
+        # CREATE [TEMPORARY] TABLE [IF NOT EXISTS] nombre / DROP TABLE [IF EXISTS] nombre
+        for i, token in enumerate(tokens):
+            if token.kind == "word" and token.upper == "TABLE":
+                j = i + 1
+                while j < len(tokens) and tokens[j].kind == "word" and tokens[j].upper in ("IF", "NOT", "EXISTS"):
+                    j += 1
+                name, _ = _read_identifier(tokens, j)
+                return name
+        return None
+
+    return None
+
+
+def parse_sql(sql):
+    """
+    Construye el árbol sintáctico de una consulta SQL en una sola pasada de tokenización.
+
+    Args:
+        sql (str): Consulta SQL
+
+    Returns:
+        SQLStatement: Árbol con las cláusulas, tabla y características detectadas
+    """
+    sql = sql or ""
+    statement = SQLStatement(sql=sql)
+    statement.explain, statement.tokens = _strip_explain(tokenize(sql))
+
+    if not statement.tokens:
+        return statement
+
+    statement.query_type = _detect_query_type(statement.tokens)
+
+    keywords = _CLAUSE_KEYWORDS.get(statement.query_type)
+    if keywords:
+        _split_clauses(sql, statement.tokens, keywords, statement)
+
+    _collect_functions_and_subqueries(statement.tokens, statement)
+
+    if statement.query_type == "SELECT":
+        select_clause = statement.clause("SELECT")
+        if select_clause and select_clause.tokens and select_clause.tokens[0].upper == "DISTINCT":
+            statement.distinct = True
+
+        from_clause = statement.clause("FROM")
+        if from_clause:
+            statement.has_joins = any(
+                t.depth == 0 and t.kind == "word" and t.upper in _JOIN_WORDS
+                for t in from_clause.tokens
+            )
+
+    table = _extract_table(statement)
+    statement.table = clean_identifier(table).lower() if table else None
+
+    logger.debug("AST construido: tipo=%s tabla=%s cláusulas=%s",
+                 statement.query_type, statement.table, list(statement.clauses))
+    return statement
@@ -1,11 +1,52 @@
 import sqlparse
-import re
+import copy
 import logging
+import functools
 from .base_parser import BaseParser
+from .sql_ast import parse_sql
+from . import patterns
+from app.instrumentation import current_timer, stage, timed
+from app.log_config import truncated
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
+
+def _memoize(method):
+    """
+    Cachea por instancia el resultado de un accesor sin argumentos de SQLParser.
+    Los resultados mutables se copian al devolverlos para que quien los modifique
+    no altere el valor cacheado.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        stats = self._cache_stats.setdefault(name, {"hits": 0, "misses": 0})
+        if name in self._cache:
+            stats["hits"] += 1
+            value = self._cache[name]
+        else:
+            stats["misses"] += 1
+            if current_timer() is None:
+                value = method(self)
+            else:
+                # Cada accesor se mide como una sub-etapa del análisis (parse.where...)
+                with stage(f"parse.{name[4:] if name.startswith('get_') else name}"):
+                    value = method(self)
+            self._cache[name] = value
+
+        if isinstance(value, (dict, list, set)):
+            return copy.deepcopy(value)
+        return value
+
+    return wrapper
+
+
+# Construcción del árbol sintáctico medida como la etapa "parse"
+_timed_parse_sql = timed("parse")(parse_sql)
+
+
 class SQLParser:
     """
     Parser principal que coordina el análisis de consultas SQL.
@@ -20,8 +61,17 @@ class SQLParser:
             sql_query (str): La consulta SQL a analizar
         """
         self.sql_query = sql_query
-        self.parsed = sqlparse.parse(sql_query)
-        logger.info(f"Consulta SQL recibida para analizar: {sql_query}")
+        logger.debug("Consulta SQL recibida para analizar: %s", truncated(sql_query))
+        
+        # Árbol sintáctico construido una sola vez; todos los accesores leen de él
+        self.ast = _timed_parse_sql(sql_query)
+        self._parsed = None
+        
+        # EXPLAIN [ANALYZE]: los parsers especializados trabajan con la sentencia explicada
+        self.explain_mode = self.ast.explain
+        if self.explain_mode and self.ast.tokens:
+            self.sql_query = sql_query[self.ast.tokens[0].start:]
+            self.ast = _timed_parse_sql(self.sql_query)
         
         # Los parsers especializados se importarán y configurarán según sea necesario
         # 🆕 Nuevos parsers (lazy loading para evitar dependencias circulares)
@@ -29,6 +79,30 @@ class SQLParser:
         self._advanced_parser = None
         self._join_parser = None
         self._formatter = None
+        self._where_parser = None
+        self._select_parser = None
+        self._crud_parser = None
+        
+        # Cache de resultados derivados (un análisis por accesor y consulta)
+        self._cache = {}
+        self._cache_stats = {}
+    
+    @property
+    def parsed(self):
+        """Resultado de sqlparse, calculado solo si algún consumidor lo solicita."""
+        if self._parsed is None:
+            self._parsed = sqlparse.parse(self.sql_query)
+        return self._parsed
+    
+    def _get_from_text(self):
+        """
+        Devuelve la cláusula FROM (incluidos sus JOINs) con la palabra clave.
+        
+        Returns:
+            str: Texto "FROM ..." o cadena vacía si no hay cláusula FROM
+        """
+        from_text = self.ast.clause_text("FROM")
+        return f"FROM {from_text}" if from_text else ""
     
     def get_tokens(self):
         """
@@ -41,39 +115,34 @@ class SQLParser:
             return self.parsed[0].tokens
         return []
     
+    @_memoize
     def get_query_type(self):
         """
         Determina el tipo de consulta SQL (SELECT, INSERT, UPDATE, DELETE).
+        Con EXPLAIN [ANALYZE] devuelve el tipo de la sentencia explicada
+        (ver get_explain_mode).
         
         Returns:
             str: Tipo de consulta en mayúsculas.
         """
-        if not self.parsed:
-            return None
-            
-        # Obtener el tipo directamente de sqlparse
-        query_type = self.parsed[0].get_type()
-        
-        # Si sqlparse no pudo determinar el tipo, hacer un análisis manual
-        if not query_type:
-            sql_upper = self.sql_query.upper().strip()
-            if sql_upper.startswith("SELECT"):
-                query_type = "SELECT"
-            elif sql_upper.startswith("INSERT"):
-                query_type = "INSERT"
-            elif sql_upper.startswith("UPDATE"):
-                query_type = "UPDATE"
-            elif sql_upper.startswith("DELETE"):
-                query_type = "DELETE"
-            elif sql_upper.startswith("CREATE"):
-                query_type = "CREATE"
-            elif sql_upper.startswith("DROP"):
-                query_type = "DROP"
-            elif sql_upper.startswith("ALTER"):
-                query_type = "ALTER"
+        query_type = self.ast.query_type
+        
+        # Sentencias fuera del conjunto conocido: delegar en sqlparse
+        if query_type == "UNKNOWN" and self.parsed:
+            query_type = self.parsed[0].get_type()
         
         return query_type
     
+    def get_explain_mode(self):
+        """
+        Indica si la consulta lleva el prefijo EXPLAIN [ANALYZE].
+        
+        Returns:
+            str: Verbosidad de explain ("queryPlanner" o "executionStats") o None
+        """
+        return self.explain_mode
+    
+    @_memoize
     def get_table_name(self):
         """
         Obtiene el nombre de la tabla (colección) de la consulta SQL.
@@ -82,77 +151,18 @@ class SQLParser:
             str: Nombre de la tabla como cadena (str).
         """
         query_type = self.get_query_type()
-        logger.info(f"Tipo de consulta detectado: {query_type}")
-        
-        # Normalizar la consulta para el análisis
-        sql = " " + self.sql_query.strip() + " "
-        
-        # Patrones de expresiones regulares para diferentes tipos de consultas
-        patterns = {
-            "SELECT": [
-                r"FROM\s+([^\s,;()]+)",  # FROM tabla
-                r"FROM\s+([^\s]+)\s+",   # FROM tabla WHERE/GROUP/ORDER/etc
-            ],
-            "INSERT": [
-                r"INSERT\s+INTO\s+([^\s(]+)",  # INSERT INTO tabla
-                r"INSERT\s+INTO\s+([^\s]+)\s+", # INSERT INTO tabla VALUES/SELECT
-            ],
-            "UPDATE": [
-                r"UPDATE\s+([^\s,;()]+)",  # UPDATE tabla
-                r"UPDATE\s+([^\s]+)\s+",   # UPDATE tabla SET
-            ],
-            "DELETE": [
-                r"DELETE\s+FROM\s+([^\s,;()]+)",  # DELETE FROM tabla
-                r"DELETE\s+FROM\s+([^\s]+)\s+",   # DELETE FROM tabla WHERE
-            ],
-            "CREATE": [
-                r"CREATE\s+TABLE\s+([^\s(]+)",  # CREATE TABLE tabla
-                r"CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+([^\s(]+)",  # CREATE TABLE IF NOT EXISTS tabla
-            ],
-            "DROP": [
-                r"DROP\s+TABLE\s+([^\s;]+)",  # DROP TABLE tabla
-            ],
-            "ALTER": [
-                r"ALTER\s+TABLE\s+([^\s;]+)",  # ALTER TABLE tabla
-            ]
-        }
+        logger.debug("Tipo de consulta detectado: %s", query_type)
         
-        # Buscar patrones según el tipo de consulta
-        if query_type in patterns:
-            for pattern in patterns[query_type]:
-                match = re.search(pattern, sql, re.IGNORECASE)
-                if match:
-                    table_name = match.group(1).strip('`[]"\'')
-                    # Limpiar cualquier otra sintaxis SQL (como alias)
-                    if ' ' in table_name:
-                        table_name = table_name.split(' ')[0]
-                    logger.info(f"Nombre de tabla extraído con regex: {table_name}")
-                    return table_name.lower()
-        
-        # Si no se encontró con regex, intentar con un enfoque basado en tokens
-        try:
-            if query_type == "SELECT":
-                for i, token in enumerate(self.get_tokens()):
-                    if token.ttype is sqlparse.tokens.Keyword and token.value.upper() == "FROM":
-                        # El siguiente token después de FROM debería ser la tabla
-                        j = i + 1
-                        while j < len(self.get_tokens()):
-                            table_token = self.get_tokens()[j]
-                            if table_token.ttype is not sqlparse.tokens.Whitespace:
-                                if isinstance(table_token, sqlparse.sql.Identifier):
-                                    table_name = table_token.get_real_name()
-                                else:
-                                    table_name = str(table_token).strip('`[]"\'')
-                                logger.info(f"Nombre de tabla extraído con tokens: {table_name}")
-                                return table_name.lower()
-                            j += 1
-        except Exception as e:
-            logger.error(f"Error al extraer nombre de tabla con tokens: {e}")
+        table_name = self.ast.table
+        if table_name:
+            logger.debug("Nombre de tabla extraído: %s", table_name)
+            return table_name
         
         logger.warning("No se pudo determinar el nombre de la tabla")
         return None
 
 
+    @_memoize
     def get_order_by(self):
         """
         Extrae ORDER BY de la consulta SQL
@@ -161,26 +171,20 @@ class SQLParser:
             dict: Diccionario con los campos y direcciones de ordenamiento
             Ejemplo: {'edad': -1, 'nombre': 1}
         """
-        logger.info("Extrayendo cláusula ORDER BY de la consulta")
+        logger.debug("Extrayendo cláusula ORDER BY de la consulta")
         
-        # Limpiar y normalizar la consulta
-        query = " " + self.sql_query.strip() + " "
+        order_clause = self.ast.clause_text("ORDER BY")
         
-        # Regex que captura ORDER BY hasta el final o antes de LIMIT
-        pattern = r'\sORDER\s+BY\s+(.*?)(?:\s+LIMIT|\s*;|\s*$)'
-        match = re.search(pattern, query, re.IGNORECASE | re.DOTALL)
-        
-        if not match:
-            logger.info("No se encontró cláusula ORDER BY en la consulta")
+        if not order_clause:
+            logger.debug("No se encontró cláusula ORDER BY en la consulta")
             return {}
         
-        order_clause = match.group(1).strip()
-        logger.info(f"Cláusula ORDER BY extraída: '{order_clause}'")
+        logger.debug("Cláusula ORDER BY extraída: '%s'", order_clause)
         
         # Parsear campos de ordenamiento
         order_dict = self._parse_order_fields(order_clause)
         
-        logger.info(f"ORDER BY parseado: {order_dict}")
+        logger.debug("ORDER BY parseado: %s", order_dict)
         return order_dict
 
     def _parse_order_fields(self, order_clause):
@@ -217,18 +221,19 @@ class SQLParser:
                 elif direction_str == "ASC":
                     direction = 1   # ASC en MongoDB
                 else:
-                    logger.warning(f"Dirección de orden desconocida: {direction_str}, usando ASC")
+                    logger.warning("Dirección de orden desconocida: %s, usando ASC", direction_str)
                     direction = 1
             else:
-                logger.warning(f"Formato de campo ORDER BY inválido: {field}")
+                logger.warning("Formato de campo ORDER BY inválido: %s", field)
                 continue
             
             order_dict[field_name] = direction
-            logger.debug(f"Campo de orden parseado: {field_name} -> {direction}")
+            logger.debug("Campo de orden parseado: %s -> %s", field_name, direction)
         
         return order_dict
 
 
+    @_memoize
     def get_where_clause(self):
         """
         Obtiene la cláusula WHERE de una consulta SQL.
@@ -237,12 +242,9 @@ class SQLParser:
         Returns:
             dict: Diccionario con las condiciones.
         """
-        # Importación perezosa para evitar dependencias circulares
-        from .where_parser import WhereParser
-        
-        where_parser = WhereParser()
-        return where_parser.parse(self.sql_query)
+        return self._get_where_parser().parse_clause(self.ast.clause_text("WHERE"))
     
+    @_memoize
     def get_select_fields(self):
         """
         Obtiene los campos a seleccionar de una consulta SELECT.
@@ -251,12 +253,14 @@ class SQLParser:
         Returns:
             list: Lista de campos a seleccionar.
         """
-        # Importación perezosa para evitar dependencias circulares
-        from .select_parser import SelectParser
+        fields_str = self.ast.clause_text("SELECT")
+        if not fields_str or not self.ast.has_clause("FROM"):
+            logger.warning("No se pudo extraer campos SELECT")
+            return [{"field": "*"}]  # Asumir SELECT * si no se puede analizar
         
-        select_parser = SelectParser()
-        return select_parser.get_select_fields(self.sql_query)
+        return self._get_select_parser().parse_fields(fields_str)
     
+    @_memoize
     def get_insert_values(self):
         """
         Obtiene los valores a insertar de una consulta INSERT INTO.
@@ -265,12 +269,15 @@ class SQLParser:
         Returns:
             dict: Diccionario con los valores a insertar.
         """
-        # Importación perezosa para evitar dependencias circulares
-        from .crud_parser import CRUDParser
+        crud_parser = self._get_crud_parser()
+        values_section = self.ast.clause_text("VALUES")
+        if not self.ast.table or not values_section:
+            # INSERT ... SELECT u otras formas: delegar en el análisis textual
+            return crud_parser.parse_insert(self.sql_query)
         
-        crud_parser = CRUDParser()
-        return crud_parser.parse_insert(self.sql_query)
+        return crud_parser.build_insert(self.ast.table, self.ast.insert_columns, values_section)
     
+    @_memoize
     def get_update_values(self):
         """
         Obtiene los valores a actualizar de una consulta UPDATE.
@@ -279,12 +286,20 @@ class SQLParser:
         Returns:
             dict: Diccionario con los valores a actualizar.
         """
-        # Importación perezosa para evitar dependencias circulares
-        from .crud_parser import CRUDParser
+        crud_parser = self._get_crud_parser()
+        set_clause = self.ast.clause_text("SET")
+        if not self.ast.table or not set_clause:
+            logger.error("No se pudo extraer cláusula SET de UPDATE")
+            return {"error": "No se pudo extraer valores a actualizar"}
         
-        crud_parser = CRUDParser()
-        return crud_parser.parse_update(self.sql_query)
+        return {
+            "operation": "UPDATE",
+            "table": self.ast.table,
+            "values": crud_parser.parse_set_clause(set_clause),
+            "condition": crud_parser.parse_simple_condition(self.ast.clause_text("WHERE"))
+        }
     
+    @_memoize
     def get_delete_condition(self):
         """
         Obtiene la condición para eliminar de una consulta DELETE.
@@ -293,37 +308,88 @@ class SQLParser:
         Returns:
             dict: Diccionario con la condición para eliminar.
         """
-        # Importación perezosa para evitar dependencias circulares
-        from .crud_parser import CRUDParser
+        crud_parser = self._get_crud_parser()
+        if not self.ast.table:
+            logger.error("No se pudo extraer tabla de DELETE")
+            return {"error": "No se pudo extraer tabla"}
         
-        crud_parser = CRUDParser()
-        return crud_parser.parse_delete(self.sql_query)
+        return {
+            "operation": "DELETE",
+            "table": self.ast.table,
+            "condition": crud_parser.parse_simple_condition(self.ast.clause_text("WHERE"))
+        }
 
+    def _get_limit_numbers(self):
+        """
+        Lee los números de la cláusula LIMIT: "LIMIT n" o la forma MySQL "LIMIT m, n".
+        
+        Returns:
+            list: Valores enteros de la cláusula (vacía si no hay LIMIT válido)
+        """
+        limit_clause = self.ast.clause("LIMIT")
+        if not limit_clause:
+            return []
+        
+        tokens = limit_clause.tokens
+        if len(tokens) == 1 and tokens[0].kind == "number":
+            return [tokens[0].value]
+        if len(tokens) == 3 and tokens[1].value == "," and \
+                tokens[0].kind == "number" and tokens[2].kind == "number":
+            return [tokens[0].value, tokens[2].value]
+        
+        logger.warning("Cláusula LIMIT no reconocida: %s", limit_clause.text)
+        return []
+    
+    @_memoize
     def get_limit(self):
         """
         Obtiene el valor de LIMIT de una consulta SQL.
+        Soporta "LIMIT n" y "LIMIT m, n" (en cuyo caso el límite es n).
         
         Returns:
             int or None: Valor numérico del límite, o None si no hay cláusula LIMIT.
         """
-        # Normalizar la consulta
-        query = " " + self.sql_query.strip() + " "
-        
-        # Expresión regular para extraer la cláusula LIMIT
-        pattern = r'\sLIMIT\s+(\d+)(?:\s|;|$)'
-        match = re.search(pattern, query, re.IGNORECASE)
-        
-        if match:
-            limit_str = match.group(1).strip()
+        numbers = self._get_limit_numbers()
+        if numbers:
+            limit_str = numbers[-1]
             try:
                 limit = int(limit_str)
-                logger.info(f"Límite extraído: {limit}")
+                logger.debug("Límite extraído: %s", limit)
                 return limit
             except ValueError:
-                logger.error(f"No se pudo convertir el límite '{limit_str}' a entero")
+                logger.error("No se pudo convertir el límite '%s' a entero", limit_str)
         
-        logger.info("No se encontró cláusula LIMIT en la consulta")
+        logger.debug("No se encontró cláusula LIMIT en la consulta")
         return None
+    
+    @_memoize
+    def get_offset(self):
+        """
+        Obtiene el desplazamiento de una consulta SQL ("OFFSET m" o "LIMIT m, n").
+        
+        Returns:
+            int or None: Número de filas a saltar, o None si no se indicó.
+        """
+        offset_clause = self.ast.clause("OFFSET")
+        if offset_clause:
+            offset_str = offset_clause.text.strip().rstrip(';').strip()
+            # Forma estándar: OFFSET m ROWS
+            offset_str = offset_str.split()[0] if offset_str else offset_str
+        else:
+            numbers = self._get_limit_numbers()
+            offset_str = numbers[0] if len(numbers) == 2 else None
+        
+        if offset_str is None:
+            return None
+        
+        try:
+            offset = int(offset_str)
+        except ValueError:
+            logger.error("No se pudo convertir el desplazamiento '%s' a entero", offset_str)
+            return None
+        
+        logger.debug("Desplazamiento extraído: %s", offset)
+        return offset
 
     # =================== 🆕 NUEVOS MÉTODOS AGREGADOS ===================
     
@@ -362,6 +428,28 @@ class SQLParser:
                 self._join_parser = None
         return self._join_parser
     
+    def _get_where_parser(self):
+        """Obtiene el parser WHERE (lazy loading)."""
+        if not self._where_parser:
+            # Importación perezosa para evitar dependencias circulares
+            from .where_parser import WhereParser
+            self._where_parser = WhereParser()
+        return self._where_parser
+    
+    def _get_select_parser(self):
+        """Obtiene el parser SELECT (lazy loading)."""
+        if not self._select_parser:
+            from .select_parser import SelectParser
+            self._select_parser = SelectParser()
+        return self._select_parser
+    
+    def _get_crud_parser(self):
+        """Obtiene el parser CRUD (lazy loading)."""
+        if not self._crud_parser:
+            from .crud_parser import CRUDParser
+            self._crud_parser = CRUDParser()
+        return self._crud_parser
+    
     def _get_formatter(self):
         """Obtiene el formateador de respuestas (lazy loading)."""
         if not self._formatter:
@@ -373,8 +461,35 @@ class SQLParser:
                 self._formatter = None
         return self._formatter
     
+    # --- Cache de Accesores ---
+    
+    def get_cache_stats(self):
+        """
+        Obtiene las estadísticas del cache de accesores de esta instancia.
+        
+        Returns:
+            dict: Aciertos, fallos y tasa de acierto, totales y por accesor
+        """
+        hits = sum(stats["hits"] for stats in self._cache_stats.values())
+        misses = sum(stats["misses"] for stats in self._cache_stats.values())
+        total = hits + misses
+        
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "cached_entries": len(self._cache),
+            "by_accessor": copy.deepcopy(self._cache_stats)
+        }
+    
+    def clear_cache(self):
+        """Vacía el cache de accesores y reinicia sus estadísticas."""
+        self._cache.clear()
+        self._cache_stats.clear()
+    
     # --- Métodos de Funciones SQL ---
     
+    @_memoize
     def has_functions(self):
         """
         Verifica si la consulta contiene funciones SQL.
@@ -384,9 +499,10 @@ class SQLParser:
         """
         parser = self._get_function_parser()
         if parser:
-            return parser.has_functions(self.sql_query)
+            return parser.contains_functions(self.ast.function_names)
         return False
     
+    @_memoize
     def get_functions(self):
         """
         Obtiene información sobre las funciones en la consulta.
@@ -396,7 +512,7 @@ class SQLParser:
         """
         parser = self._get_function_parser()
         if parser:
-            return parser.parse_functions(self.sql_query)
+            return parser.parse_functions(self.sql_query, names=self.ast.function_names)
         return []
     
     def get_supported_functions(self):
@@ -413,6 +529,7 @@ class SQLParser:
     
     # --- Métodos de Características Avanzadas ---
     
+    @_memoize
     def has_distinct(self):
         """
         Verifica si la consulta contiene SELECT DISTINCT.
@@ -420,11 +537,9 @@ class SQLParser:
         Returns:
             bool: True si hay DISTINCT, False en caso contrario
         """
-        parser = self._get_advanced_parser()
-        if parser:
-            return parser.has_distinct(self.sql_query)
-        return False
+        return self.ast.distinct
     
+    @_memoize
     def get_distinct_info(self):
         """
         Obtiene información sobre SELECT DISTINCT.
@@ -433,10 +548,29 @@ class SQLParser:
             dict: Información sobre la consulta DISTINCT
         """
         parser = self._get_advanced_parser()
-        if parser:
-            return parser.parse_distinct(self.sql_query)
-        return {}
+        if not parser:
+            return {}
+        
+        select_clause = self.ast.clause("SELECT")
+        if not self.ast.distinct or not self.ast.has_clause("FROM"):
+            logger.warning("No se pudo extraer campos DISTINCT")
+            return {"error": "No se pudo extraer campos DISTINCT"}
+        
+        # Texto que sigue a la palabra DISTINCT dentro de la cláusula SELECT
+        fields_str = self.sql_query[select_clause.tokens[0].end:select_clause.end].strip()
+        return parser.build_distinct_info(fields_str)
     
+    @_memoize
+    def has_group_by(self):
+        """
+        Verifica si la consulta contiene cláusula GROUP BY.
+        
+        Returns:
+            bool: True si hay GROUP BY, False en caso contrario
+        """
+        return self.ast.has_clause("GROUP BY")
+    
+    @_memoize
     def has_having(self):
         """
         Verifica si la consulta contiene cláusula HAVING.
@@ -444,11 +578,9 @@ class SQLParser:
         Returns:
             bool: True si hay HAVING, False en caso contrario
         """
-        parser = self._get_advanced_parser()
-        if parser:
-            return parser.has_having(self.sql_query)
-        return False
+        return self.ast.has_clause("HAVING")
     
+    @_memoize
     def get_having_clause(self):
         """
         Obtiene la cláusula HAVING parseada.
@@ -457,10 +589,12 @@ class SQLParser:
             dict: Condiciones HAVING en formato MongoDB
         """
         parser = self._get_advanced_parser()
-        if parser:
-            return parser.parse_having(self.sql_query)
+        having_clause = self.ast.clause_text("HAVING")
+        if parser and having_clause:
+            return parser.parse_having_clause(having_clause)
         return {}
     
+    @_memoize
     def has_union(self):
         """
         Verifica si la consulta contiene UNION.
@@ -468,11 +602,9 @@ class SQLParser:
         Returns:
             bool: True si hay UNION, False en caso contrario
         """
-        parser = self._get_advanced_parser()
-        if parser:
-            return parser.has_union(self.sql_query)
-        return False
+        return self.ast.has_union
     
+    @_memoize
     def get_union_info(self):
         """
         Obtiene información sobre UNION.
@@ -481,10 +613,13 @@ class SQLParser:
             dict: Información sobre la consulta UNION
         """
         parser = self._get_advanced_parser()
-        if parser:
-            return parser.parse_union(self.sql_query)
-        return {}
+        if not parser:
+            return {}
+        if not self.ast.has_union:
+            return {"error": "No se pudieron extraer partes de UNION"}
+        return parser.build_union_info(self.ast.union_branches, self.ast.union_all, self.ast.union_all_flags)
     
+    @_memoize
     def has_subquery(self):
         """
         Verifica si la consulta contiene subqueries.
@@ -492,11 +627,9 @@ class SQLParser:
         Returns:
             bool: True si hay subqueries, False en caso contrario
         """
-        parser = self._get_advanced_parser()
-        if parser:
-            return parser.has_subquery(self.sql_query)
-        return False
+        return self.ast.has_subquery
     
+    @_memoize
     def get_subqueries(self):
         """
         Obtiene información sobre subqueries.
@@ -506,11 +639,12 @@ class SQLParser:
         """
         parser = self._get_advanced_parser()
         if parser:
-            return parser.parse_subqueries(self.sql_query)
+            return parser.build_subquery_info(self.sql_query, self.ast.subquery_spans)
         return []
     
     # --- Métodos de JOINs ---
     
+    @_memoize
     def has_joins(self):
         """
         Verifica si la consulta contiene operaciones JOIN.
@@ -518,11 +652,9 @@ class SQLParser:
         Returns:
             bool: True si hay JOINs, False en caso contrario
         """
-        parser = self._get_join_parser()
-        if parser:
-            return parser.has_joins(self.sql_query)
-        return False
+        return self.ast.has_joins
     
+    @_memoize
     def get_joins(self):
         """
         Obtiene información sobre los JOINs.
@@ -532,9 +664,10 @@ class SQLParser:
         """
         parser = self._get_join_parser()
         if parser:
-            return parser.parse_joins(self.sql_query)
+            return parser.parse_joins(self._get_from_text())
         return []
     
+    @_memoize
     def get_main_table(self):
         """
         Obtiene información sobre la tabla principal (FROM).
@@ -544,9 +677,10 @@ class SQLParser:
         """
         parser = self._get_join_parser()
         if parser:
-            return parser.get_main_table_from_query(self.sql_query)
+            return parser.get_main_table_from_query(self._get_from_text())
         return None
     
+    @_memoize
     def validate_joins(self):
         """
         Valida si los JOINs en la consulta son traducibles.
@@ -556,7 +690,7 @@ class SQLParser:
         """
         parser = self._get_join_parser()
         if parser:
-            return parser.validate_join_query(self.sql_query)
+            return parser.validate_join_query(self._get_from_text())
         return {"is_valid": True, "issues": [], "warnings": []}
     
     # --- Métodos de Formateo de Respuestas ---
@@ -621,6 +755,7 @@ class SQLParser:
     
     # --- Métodos de Análisis Integral ---
     
+    @_memoize
     def analyze_query_complexity(self):
         """
         Analiza la complejidad general de la consulta.
@@ -668,6 +803,7 @@ class SQLParser:
             "requires_advanced_translation": score > 0
         }
     
+    @_memoize
     def get_all_features_used(self):
         """
         Obtiene todas las características SQL utilizadas en la consulta.
@@ -702,6 +838,7 @@ class SQLParser:
         return features
     
 
+    @_memoize
     def get_create_table_info(self):
         """
         ✅ NUEVO: Extrae información detallada de CREATE TABLE
@@ -713,7 +850,7 @@ class SQLParser:
             table_name = self.get_table_name()
             
             # Extraer definición de columnas entre paréntesis
-            columns_match = re.search(r'CREATE\s+TABLE\s+\w+\s*\((.*)\)', self.sql_query, re.IGNORECASE | re.DOTALL)
+            columns_match = patterns.CREATE_TABLE_COLUMNS.search(self.sql_query)
             if not columns_match:
                 raise ValueError("No se encontró definición de columnas en CREATE TABLE")
             
@@ -735,11 +872,11 @@ class SQLParser:
                 'original_definition': columns_str
             }
             
-            logger.info(f"Información de CREATE TABLE extraída: {table_name} con {len(columns)} columnas")
+            logger.debug("Información de CREATE TABLE extraída: %s con %s columnas", table_name, len(columns))
             return create_info
             
         except Exception as e:
-            logger.error(f"Error extrayendo información de CREATE TABLE: {e}")
+            logger.error("Error extrayendo información de CREATE TABLE: %s", e)
             return {
                 'table_name': self.get_table_name(),
                 'columns': [],
@@ -819,7 +956,7 @@ class SQLParser:
             
             # Extraer valor por defecto
             default_value = None
-            default_match = re.search(r'DEFAULT\s+(\S+)', col_def, re.IGNORECASE)
+            default_match = patterns.COLUMN_DEFAULT_TOKEN.search(col_def)
             if default_match:
                 default_value = default_match.group(1)
             
@@ -834,7 +971,7 @@ class SQLParser:
             }
             
         except Exception as e:
-            logger.warning(f"Error parseando columna '{col_def}': {e}")
+            logger.warning("Error parseando columna '%s': %s", col_def, e)
             return None
 
     def map_sql_to_mongo_type(self, sql_type):
@@ -868,13 +1005,13 @@ class SQLParser:
         }
         
         # Buscar PRIMARY KEY
-        pk_match = re.search(r'PRIMARY\s+KEY\s*\(([^)]+)\)', columns_str, re.IGNORECASE)
+        pk_match = patterns.PRIMARY_KEY.search(columns_str)
         if pk_match:
             pk_fields = [field.strip() for field in pk_match.group(1).split(',')]
             constraints['primary_keys'] = pk_fields
         
         # Buscar FOREIGN KEY
-        fk_matches = re.finditer(r'FOREIGN\s+KEY\s*\(([^)]+)\)\s+REFERENCES\s+(\w+)\s*\(([^)]+)\)', columns_str, re.IGNORECASE)
+        fk_matches = patterns.FOREIGN_KEY.finditer(columns_str)
         for fk_match in fk_matches:
             constraints['foreign_keys'].append({
                 'columns': [col.strip() for col in fk_match.group(1).split(',')],
@@ -1,6 +1,8 @@
-import re
 import logging
 
+from . import patterns
+from app.log_config import truncated
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -21,11 +23,23 @@ class WhereParser:
         Returns:
             dict: Diccionario con las condiciones en formato MongoDB
         """
-        logger.info(f"Analizando cláusula WHERE de consulta: {query}")
+        logger.debug("Analizando cláusula WHERE de consulta: %s", truncated(query))
         
         # Extraer la parte WHERE
         where_clause = self.extract_where_clause(query)
         
+        return self.parse_clause(where_clause)
+    
+    def parse_clause(self, where_clause):
+        """
+        Analiza el texto de una cláusula WHERE ya extraída.
+        
+        Args:
+            where_clause (str): Condiciones sin la palabra clave WHERE
+            
+        Returns:
+            dict: Diccionario con las condiciones en formato MongoDB
+        """
         if not where_clause:
             return {}
         
@@ -33,7 +47,7 @@ class WhereParser:
         conditions = {}
         self._parse_conditions(where_clause, conditions)
         
-        logger.info(f"Condiciones WHERE traducidas: {conditions}")
+        logger.debug("Condiciones WHERE traducidas: %s", truncated(conditions))
         return conditions
     
 
@@ -44,8 +58,7 @@ class WhereParser:
         query = " " + query.strip() + " "
         
         # Regex corregido que excluye el punto y coma
-        pattern = r'\sWHERE\s+(.*?)(?:\s+GROUP\s+BY|\s+HAVING|\s+ORDER\s+BY|\s+LIMIT|\s+OFFSET|\s*;|\s*$)'
-        match = re.search(pattern, query, re.IGNORECASE | re.DOTALL)
+        match = patterns.WHERE_CLAUSE.search(query)
         
         if match:
             where_clause = match.group(1).strip()
@@ -54,7 +67,7 @@ class WhereParser:
             if where_clause.endswith(';'):
                 where_clause = where_clause[:-1].strip()
             
-            logger.info(f"Cláusula WHERE extraída y limpia: '{where_clause}'")
+            logger.debug("Cláusula WHERE extraída y limpia: '%s'", truncated(where_clause))
             return where_clause
         
         return None
@@ -71,15 +84,14 @@ class WhereParser:
         conditions_str = self._remove_outer_parentheses(conditions_str)
         
         # 🔧 CRÍTICO: Verificar si es una condición BETWEEN completa PRIMERO
-        between_pattern = r'\w+\s+BETWEEN\s+.+?\s+AND\s+.+?(?:\s*;|\s*$)'
-        if re.search(between_pattern, conditions_str, re.IGNORECASE):
+        if patterns.WHERE_HAS_BETWEEN.search(conditions_str):
             logger.debug("🔍 Condición BETWEEN detectada, procesando como condición simple")
             self._parse_simple_condition(conditions_str, result)
             return
         
         # 🔧 MEJORADO: Solo si NO es BETWEEN, proceder con la lógica de AND/OR
         if self._has_top_level_operator(conditions_str, "OR"):
-            logger.debug(f"🔄 Procesando condiciones OR: {conditions_str}")
+            logger.debug("🔄 Procesando condiciones OR: %s", truncated(conditions_str))
             # Manejar condiciones OR
             parts = self._split_by_top_level_operator(conditions_str, "OR")
             or_conditions = []
@@ -95,7 +107,7 @@ class WhereParser:
             return
             
         if self._has_top_level_operator(conditions_str, "AND"):
-            logger.debug(f"🔄 Procesando condiciones AND: {conditions_str}")
+            logger.debug("🔄 Procesando condiciones AND: %s", truncated(conditions_str))
             # Manejar condiciones AND
             parts = self._split_by_top_level_operator(conditions_str, "AND")
             
@@ -144,7 +156,7 @@ class WhereParser:
             condition_str (str): String con la condición simple
             result (dict): Diccionario donde se almacenará la condición
         """
-        logger.debug(f"Parseando condición simple: '{condition_str}'")
+        logger.debug("Parseando condición simple: '%s'", truncated(condition_str))
         
         # 🆕 LIMPIEZA INICIAL: Remover punto y coma de toda la condición
         condition_str = condition_str.strip()
@@ -153,15 +165,14 @@ class WhereParser:
         
         # 🔧 CRÍTICO: Manejo mejorado de BETWEEN
         # Patrón más robusto que captura correctamente los valores
-        between_pattern = r'(\w+)\s+BETWEEN\s+([^A]+?)\s+AND\s+(.+?)(?:\s*;|\s*$)'
-        between_match = re.search(between_pattern, condition_str, re.IGNORECASE)
+        between_match = patterns.WHERE_BETWEEN.search(condition_str)
         
         if between_match:
             field = between_match.group(1).strip()
             min_val_str = between_match.group(2).strip()
             max_val_str = between_match.group(3).strip()
             
-            logger.debug(f"🔍 BETWEEN detectado - Campo: '{field}', Min: '{min_val_str}', Max: '{max_val_str}'")
+            logger.debug("🔍 BETWEEN detectado - Campo: '%s', Min: '%s', Max: '%s'", field, min_val_str, max_val_str)
             
             # 🔧 LIMPIAR Y PARSEAR VALORES
             min_val = self._parse_value(self._clean_value(min_val_str))
@@ -175,10 +186,10 @@ class WhereParser:
                 if isinstance(max_val, str) and max_val.replace('.', '').replace('-', '').isdigit():
                     max_val = float(max_val) if '.' in max_val else int(max_val)
             except (ValueError, TypeError):
-                logger.warning(f"⚠️ Valores BETWEEN no numéricos: min={min_val}, max={max_val}")
+                logger.warning("⚠️ Valores BETWEEN no numéricos: min=%s, max=%s", min_val, max_val)
             
             result[field] = {"$gte": min_val, "$lte": max_val}
-            logger.debug(f"✅ BETWEEN parseado: {field} BETWEEN {min_val} AND {max_val}")
+            logger.debug("✅ BETWEEN parseado: %s BETWEEN %s AND %s", field, min_val, max_val)
             return
         
         # Operadores de comparación estándar
@@ -193,7 +204,7 @@ class WhereParser:
         }
         
         # IN
-        in_match = re.search(r'([\w.]+)\s+IN\s+\((.*?)\)', condition_str, re.IGNORECASE)
+        in_match = patterns.WHERE_IN.search(condition_str)
         if in_match:
             field = in_match.group(1).strip()
             values_str = in_match.group(2).strip()
@@ -206,11 +217,11 @@ class WhereParser:
                 values.append(parsed_value)
             
             result[field] = {"$in": values}
-            logger.debug(f"IN parseado: {field} IN {values}")
+            logger.debug("IN parseado: %s IN %s", field, truncated(values))
             return
         
         # NOT IN - Corregido para usar $nin
-        not_in_match = re.search(r'([\w.]+)\s+NOT\s+IN\s+\((.*?)\)', condition_str, re.IGNORECASE)
+        not_in_match = patterns.WHERE_NOT_IN.search(condition_str)
         if not_in_match:
             field = not_in_match.group(1).strip()
             values_str = not_in_match.group(2).strip()
@@ -223,11 +234,11 @@ class WhereParser:
                 values.append(parsed_value)
             
             result[field] = {"$nin": values}
-            logger.debug(f"NOT IN parseado: {field} NOT IN {values}")
+            logger.debug("NOT IN parseado: %s NOT IN %s", field, truncated(values))
             return
         
         # LIKE
-        like_match = re.search(r'([\w.]+)\s+LIKE\s+(.*?)(?:\s*;|\s*$)', condition_str, re.IGNORECASE)
+        like_match = patterns.WHERE_LIKE.search(condition_str)
         if like_match:
             field = like_match.group(1).strip()
             pattern_str = like_match.group(2).strip()
@@ -253,23 +264,23 @@ class WhereParser:
                 # Otros patrones LIKE mantienen case-insensitive
                 result[field] = {"$regex": mongo_pattern, "$options": "i"}
             
-            logger.debug(f"LIKE parseado: {field} LIKE '{pattern}' -> regex: {mongo_pattern}")
+            logger.debug("LIKE parseado: %s LIKE '%s' -> regex: %s", field, pattern, mongo_pattern)
             return
         
         # IS NULL
-        is_null_match = re.search(r'([\w.]+)\s+IS\s+NULL(?:\s*;|\s*$)', condition_str, re.IGNORECASE)
+        is_null_match = patterns.WHERE_IS_NULL.search(condition_str)
         if is_null_match:
             field = is_null_match.group(1).strip()
             result[field] = {"$exists": False}
-            logger.debug(f"IS NULL parseado: {field}")
+            logger.debug("IS NULL parseado: %s", field)
             return
         
         # IS NOT NULL
-        is_not_null_match = re.search(r'([\w.]+)\s+IS\s+NOT\s+NULL(?:\s*;|\s*$)', condition_str, re.IGNORECASE)
+        is_not_null_match = patterns.WHERE_IS_NOT_NULL.search(condition_str)
         if is_not_null_match:
             field = is_not_null_match.group(1).strip()
             result[field] = {"$exists": True}
-            logger.debug(f"IS NOT NULL parseado: {field}")
+            logger.debug("IS NOT NULL parseado: %s", field)
             return
         
         # Operadores de comparación estándar
@@ -290,10 +301,10 @@ class WhereParser:
                     else:
                         result[field] = {operators[op]: value}
                     
-                    logger.debug(f"Condición parseada: {field} {op} '{cleaned_value_str}' -> {value}")
+                    logger.debug("Condición parseada: %s %s '%s' -> %s", field, op, cleaned_value_str, value)
                     return
         
-        logger.warning(f"No se pudo analizar la condición: {condition_str}")
+        logger.warning("No se pudo analizar la condición: %s", condition_str)
 
     def _clean_value(self, value_str):
         """
@@ -322,7 +333,7 @@ class WhereParser:
                (quote_count_double == 0 or quote_count_double % 2 == 0):
                 cleaned = cleaned[:-1].strip()
         
-        logger.debug(f"🧹 Valor limpio: '{value_str}' -> '{cleaned}'")
+        logger.debug("🧹 Valor limpio: '%s' -> '%s'", value_str, cleaned)
         return cleaned
 
     def _has_top_level_operator(self, text, operator):
@@ -336,7 +347,7 @@ class WhereParser:
         Returns:
             bool: True si hay operador a nivel superior, False en caso contrario
         """
-        pattern = r'\s' + operator + r'\s'
+        pattern = patterns.spaced_operator(operator)
         level = 0
         
         for i in range(len(text) - len(operator)):
@@ -344,7 +355,7 @@ class WhereParser:
                 level += 1
             elif text[i] == ')':
                 level -= 1
-            elif level == 0 and re.match(pattern, text[i:i+len(operator)+2], re.IGNORECASE):
+            elif level == 0 and pattern.match(text, i, i + len(operator) + 2):
                 return True
         
         return False
@@ -360,7 +371,7 @@ class WhereParser:
         i = 0
         
         # Patrón del operador con espacios alrededor
-        op_pattern = rf'\s+{operator}\s+'
+        op_pattern = patterns.spaced_operator_run(operator)
         
         while i < len(text):
             char = text[i]
@@ -374,8 +385,7 @@ class WhereParser:
             # Solo buscar operador si estamos a nivel 0 (fuera de paréntesis)
             if paren_level == 0:
                 # Verificar si encontramos el operador en esta posición
-                remaining = text[i:]
-                match = re.match(op_pattern, remaining, re.IGNORECASE)
+                match = op_pattern.match(text, i)
                 
                 if match:
                     # Encontramos el operador a nivel superior
@@ -393,7 +403,7 @@ class WhereParser:
         if current.strip():
             result.append(current.strip())
         
-        logger.debug(f"🔧 División por {operator}: {result}")
+        logger.debug("🔧 División por %s: %s", operator, truncated(result))
         return result
     
     def _split_values(self, values_str):
@@ -463,14 +473,14 @@ class WhereParser:
         
         # 🔧 MEJORADO: Manejo más robusto de números
         # Verificar si es un número decimal
-        if re.match(r'^-?\d+\.\d+$', value_str):
+        if patterns.FLOAT_LITERAL.match(value_str):
             try:
                 return float(value_str)
             except ValueError:
                 pass
         
         # Verificar si es un número entero
-        if re.match(r'^-?\d+$', value_str):
+        if patterns.INTEGER_LITERAL.match(value_str):
             try:
                 return int(value_str)
             except ValueError:
@@ -489,10 +499,10 @@ class WhereParser:
         Returns:
             dict: Resultado del parsing
         """
-        logger.info(f"🧪 Probando BETWEEN: '{condition_str}'")
+        logger.debug("🧪 Probando BETWEEN: '%s'", truncated(condition_str))
         
         result = {}
         self._parse_simple_condition(condition_str, result)
         
-        logger.info(f"🧪 Resultado: {result}")
+        logger.debug("🧪 Resultado: %s", truncated(result))
         return result
\ No newline at end of file
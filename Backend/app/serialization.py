@@ -0,0 +1,146 @@
+import json
+import uuid
+import base64
+import logging
+import datetime
+import decimal
+
+from bson import ObjectId, Decimal128, Binary, Timestamp, Regex, Code, DBRef, MinKey, MaxKey
+from bson.binary import UUID_SUBTYPE, UuidRepresentation
+from flask.json.provider import DefaultJSONProvider
+
+# orjson es opcional: si está instalado se usa como codificador compilado
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+# Tipos que no necesitan conversión (se comprueba por tipo exacto)
+_JSON_NATIVE_TYPES = {str, int, float, bool, type(None)}
+
+
+def _encode_binary(value):
+    """Binary con subtipo UUID se representa como UUID; el resto en base64."""
+    if value.subtype == UUID_SUBTYPE:
+        return str(value.as_uuid(UuidRepresentation.STANDARD))
+    return base64.b64encode(value).decode("ascii")
+
+
+# Tabla de conversión de tipos BSON/Python sin representación JSON nativa.
+# Se consulta por tipo exacto; las subclases se resuelven recorriendo su MRO.
+_ENCODERS = {
+    ObjectId: str,
+    datetime.datetime: lambda value: value.isoformat(),
+    datetime.date: lambda value: value.isoformat(),
+    datetime.time: lambda value: value.isoformat(),
+    Decimal128: str,
+    decimal.Decimal: str,
+    Binary: _encode_binary,
+    bytes: lambda value: base64.b64encode(value).decode("ascii"),
+    uuid.UUID: str,
+    Timestamp: lambda value: {"t": value.time, "i": value.inc},
+    Regex: lambda value: value.pattern,
+    Code: str,
+    DBRef: lambda value: {"$ref": value.collection, "$id": json_default(value.id)},
+    MinKey: lambda value: "MinKey",
+    MaxKey: lambda value: "MaxKey",
+    set: list,
+    frozenset: list,
+}
+
+
+def json_default(value):
+    """
+    Convierte un valor no serializable a JSON usando la tabla de tipos.
+    Se usa como parámetro default de json.dumps/orjson.dumps.
+
+    Args:
+        value: Valor a convertir
+
+    Returns:
+        Valor equivalente representable en JSON
+    """
+    encoder = _ENCODERS.get(type(value))
+    if encoder is None:
+        for base in type(value).__mro__[1:]:
+            encoder = _ENCODERS.get(base)
+            if encoder is not None:
+                # Recordar la subclase para no recorrer el MRO de nuevo
+                _ENCODERS[type(value)] = encoder
+                break
+        else:
+            return str(value)
+    return encoder(value)
+
+
+def dumps(value, sort_keys=False):
+    """
+    Codifica resultados de MongoDB a JSON en una sola pasada, sin copiar ni recorrer
+    antes los documentos. Usa orjson si está disponible y json estándar si no.
+
+    Args:
+        value: Documento, lista de documentos o cualquier valor serializable
+        sort_keys (bool): Ordenar las claves de los objetos
+
+    Returns:
+        str: Texto JSON
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(value, default=json_default, option=option).decode("utf-8")
+        except TypeError as e:
+            # Enteros fuera de 64 bits u otros casos no soportados por orjson
+            logger.debug("orjson no pudo codificar el valor, se usa json estándar: %s", e)
+
+    return json.dumps(value, default=json_default, sort_keys=sort_keys, ensure_ascii=False, separators=(",", ":"))
+
+
+def to_json_compatible(value):
+    """
+    Convierte en sitio un resultado de MongoDB a tipos representables en JSON.
+    Para las respuestas HTTP es preferible dumps(), que evita este recorrido.
+
+    Args:
+        value: Documento, lista de documentos o valor
+
+    Returns:
+        El mismo valor con los tipos BSON convertidos
+    """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if type(item) not in _JSON_NATIVE_TYPES:
+                value[key] = to_json_compatible(item)
+        return value
+    if isinstance(value, list):
+        for index, item in enumerate(value):
+            if type(item) not in _JSON_NATIVE_TYPES:
+                value[index] = to_json_compatible(item)
+        return value
+    if isinstance(value, (str, int, float)) or value is None:
+        return value
+    if isinstance(value, tuple):
+        return [to_json_compatible(item) for item in value]
+    return to_json_compatible(json_default(value))
+
+
+class BSONJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask que entiende los tipos BSON, de modo que jsonify()
+    puede recibir documentos de MongoDB sin serializarlos previamente.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if "indent" in kwargs or "cls" in kwargs:
+            # Salida legible (modo debug): json estándar con la tabla de tipos
+            kwargs.setdefault("default", json_default)
+            kwargs.setdefault("sort_keys", self.sort_keys)
+            kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+            return json.dumps(obj, **kwargs)
+        return dumps(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys))
@@ -0,0 +1,263 @@
+import logging
+
+from pymongo import InsertOne, UpdateMany, DeleteMany
+
+from app.auth.middleware import QUERY_TYPE_PERMISSIONS
+from app.translator.cache import SCHEMA_CHANGING_TYPES
+from app.translator.parameterizer import prepare_statement, translate_prepared
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+def to_write_models(mongo_query):
+    """
+    Convierte una escritura traducida en operaciones de bulk_write.
+
+    Args:
+        mongo_query (dict): Operación insert, INSERT_MANY, update o delete
+
+    Returns:
+        list: Operaciones InsertOne/UpdateMany/DeleteMany, o None si no es agrupable
+    """
+    operation = mongo_query.get("operation")
+
+    if operation == "insert":
+        return [InsertOne(mongo_query.get("document", {}))]
+    if operation == "INSERT_MANY":
+        return [InsertOne(document) for document in mongo_query.get("documents", [])]
+    if operation == "update":
+        update_query = mongo_query.get("query", {})
+        update_data = update_query.get("update", {})
+        # Igual que el conector: sin operadores se aplica un $set implícito
+        if isinstance(update_data, dict) and update_data and not any(key.startswith("$") for key in update_data.keys()):
+            update_data = {"$set": update_data}
+        return [UpdateMany(update_query.get("query", {}), update_data)]
+    if operation == "delete":
+        return [DeleteMany(mongo_query.get("query", {}))]
+    return None
+
+
+def plan_batch(entries):
+    """
+    Agrupa las sentencias en pasos de ejecución. Las escrituras consecutivas sobre la
+    misma colección forman un único paso bulk; el resto se ejecuta individualmente.
+
+    Args:
+        entries (list): Sentencias traducidas (dict con index, collection, mongo_query,
+            write_models y error)
+
+    Returns:
+        list: Pasos {"type": "bulk"|"single"|"error", "entries": [...]}
+    """
+    steps = []
+
+    for entry in entries:
+        if entry.get("error"):
+            steps.append({"type": "error", "entries": [entry]})
+            continue
+
+        if entry.get("write_models") is None:
+            steps.append({"type": "single", "entries": [entry]})
+            continue
+
+        previous = steps[-1] if steps else None
+        if previous and previous["type"] == "bulk" and previous["collection"] == entry["collection"]:
+            previous["entries"].append(entry)
+        else:
+            steps.append({"type": "bulk", "collection": entry["collection"], "entries": [entry]})
+
+    return steps
+
+
+class BatchExecutor:
+    """
+    Traduce y ejecuta un lote de sentencias SQL en una sola petición.
+
+    En modo ordenado el lote se detiene en el primer error y las sentencias restantes
+    se marcan como omitidas; en modo no ordenado todas se intentan y los bulk_write se
+    envían con ordered=False.
+    """
+
+    def __init__(self, connector, cache, auto_parameterize=True):
+        """
+        Args:
+            connector (MongoDBConnector): Conector con el que se ejecutan las sentencias
+            cache (TranslationCache): Cache de traducciones compartido
+            auto_parameterize (bool): Extraer literales automáticamente
+        """
+        self.connector = connector
+        self.cache = cache
+        self.auto_parameterize = auto_parameterize
+
+    def run(self, statements, database_name, permissions, ordered=True):
+        """
+        Ejecuta el lote.
+
+        Args:
+            statements (list): Sentencias (str o dict con query y params)
+            database_name (str): Base de datos destino
+            permissions (dict): Permisos del usuario (claim "permissions" del JWT)
+            ordered (bool): Detener el lote en el primer error
+
+        Returns:
+            dict: Resultados por sentencia y resumen del lote
+        """
+        entries = [self._translate(index, statement, database_name, permissions)
+                   for index, statement in enumerate(statements)]
+        steps = plan_batch(entries)
+
+        results = [None] * len(entries)
+        bulk_groups = 0
+        failed = False
+
+        for step in steps:
+            if failed and ordered:
+                for entry in step["entries"]:
+                    results[entry["index"]] = self._result(entry, "skipped")
+                continue
+
+            if step["type"] == "error":
+                entry = step["entries"][0]
+                results[entry["index"]] = self._result(entry, "error", error=entry["error"])
+                failed = True
+            elif step["type"] == "single":
+                failed = not self._execute_single(step["entries"][0], database_name, results) or failed
+            else:
+                bulk_groups += 1
+                failed = not self._execute_bulk(step, database_name, ordered, bulk_groups, results) or failed
+
+        summary = {status: 0 for status in ("ok", "error", "skipped")}
+        for result in results:
+            summary[result["status"]] += 1
+
+        logger.info(
+            "Lote ejecutado: %s sentencias, %s bulk_write, %s errores, %s omitidas",
+            len(entries), bulk_groups, summary['error'], summary['skipped']
+        )
+        return {
+            "ordered": ordered,
+            "total": len(entries),
+            "bulk_writes": bulk_groups,
+            "summary": summary,
+            "results": results,
+        }
+
+    def _translate(self, index, statement, database_name, permissions):
+        """Prepara, comprueba permisos y traduce una sentencia del lote."""
+        if isinstance(statement, dict):
+            sql_query, params = statement.get("query"), statement.get("params")
+        else:
+            sql_query, params = statement, None
+
+        entry = {
+            "index": index,
+            "query_type": None,
+            "collection": None,
+            "mongo_query": None,
+            "write_models": None,
+            "documents": [],
+        }
+
+        try:
+            if not isinstance(sql_query, str) or not sql_query.strip():
+                raise ValueError("La sentencia debe ser un texto SQL no vacío")
+
+            prepared = prepare_statement(sql_query, params=params, auto_parameterize=self.auto_parameterize)
+            entry["query_type"] = prepared.query_type
+
+            required_permission = QUERY_TYPE_PERMISSIONS.get(prepared.query_type)
+            if not required_permission:
+                raise ValueError(f"Tipo de consulta no soportado: {prepared.query_type}")
+            if not permissions.get(required_permission, False):
+                raise PermissionError(f"No tienes permisos para realizar operaciones de tipo {prepared.query_type}")
+
+            translation = translate_prepared(prepared, database_name, self.cache)
+            entry["collection"] = translation["collection"]
+            entry["mongo_query"] = translation["mongo_query"]
+            entry["write_models"] = to_write_models(translation["mongo_query"])
+            entry["documents"] = translation["mongo_query"].get("documents") or (
+                [translation["mongo_query"]["document"]] if "document" in translation["mongo_query"] else []
+            )
+        except Exception as e:
+            logger.warning("Sentencia %s del lote no traducida: %s", index, e)
+            entry["error"] = str(e)
+
+        return entry
+
+    def _execute_single(self, entry, database_name, results):
+        """Ejecuta una sentencia no agrupable (lecturas, DDL, UPDATE con expresiones)."""
+        try:
+            result = self.connector.execute_query(
+                entry["collection"], entry["mongo_query"], serialize=False, database_name=database_name
+            )
+        except Exception as e:
+            logger.error("Error en la sentencia %s del lote: %s", entry['index'], e)
+            results[entry["index"]] = self._result(entry, "error", error=str(e))
+            return False
+
+        if entry["query_type"] in SCHEMA_CHANGING_TYPES:
+            self.cache.invalidate_collection(database_name, entry["collection"])
+
+        results[entry["index"]] = self._result(entry, "ok", result=result)
+        return True
+
+    def _execute_bulk(self, step, database_name, ordered, group, results):
+        """Ejecuta un grupo de escrituras con un único bulk_write."""
+        requests, owners = [], []
+        for entry in step["entries"]:
+            requests.extend(entry["write_models"])
+            owners.extend([entry["index"]] * len(entry["write_models"]))
+
+        outcome = self.connector.execute_bulk_write(
+            step["collection"], requests, ordered=ordered, database_name=database_name
+        )
+
+        bulk_summary = {key: value for key, value in outcome.items() if key != "write_errors"}
+        bulk_summary["bulk_write"] = group
+        bulk_summary["statements"] = len(step["entries"])
+
+        if outcome.get("error"):
+            # Error que no corresponde a una operación concreta (p. ej. conexión)
+            for entry in step["entries"]:
+                results[entry["index"]] = self._result(entry, "error", error=outcome["error"], bulk=bulk_summary)
+            return False
+
+        # Errores por operación, mapeados a la sentencia que la originó
+        errors = {}
+        for write_error in outcome["write_errors"]:
+            errors.setdefault(owners[write_error["index"]], write_error["errmsg"])
+
+        # En modo ordenado, las operaciones posteriores al primer error no se ejecutaron
+        first_failed = min(outcome["write_errors"][0]["index"], len(owners)) if ordered and errors else None
+
+        position = 0
+        for entry in step["entries"]:
+            if entry["index"] in errors:
+                results[entry["index"]] = self._result(entry, "error", error=errors[entry["index"]], bulk=bulk_summary)
+            elif first_failed is not None and position > first_failed:
+                results[entry["index"]] = self._result(entry, "skipped", bulk=bulk_summary)
+            else:
+                result = {}
+                if entry["documents"]:
+                    # bulk_write asigna el _id en los propios documentos insertados
+                    result["inserted_ids"] = [str(document.get("_id")) for document in entry["documents"]]
+                results[entry["index"]] = self._result(entry, "ok", result=result, bulk=bulk_summary)
+            position += len(entry["write_models"])
+
+        return not errors
+
+    def _result(self, entry, status, result=None, error=None, bulk=None):
+        """Construye el resultado de una sentencia."""
+        item = {
+            "index": entry["index"],
+            "status": status,
+            "query_type": entry.get("query_type"),
+            "collection": entry.get("collection"),
+        }
+        if result is not None:
+            item["result"] = result
+        if error is not None:
+            item["error"] = error
+        if bulk is not None:
+            item["bulk"] = bulk
+        return item
@@ -0,0 +1,380 @@
+import logging
+import threading
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Formas de consulta distintas que se conservan por proceso (las menos usadas se descartan)
+DEFAULT_MAX_SHAPES = 2000
+
+# Operadores de filtro que fijan un valor (o un conjunto pequeño) y cuentan como igualdad
+_EQUALITY_OPERATORS = {"$eq", "$in"}
+
+# Operadores de filtro que recorren un rango del índice
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$exists", "$options"}
+
+
+def classify_filter(condition):
+    """
+    Separa los campos de un filtro en igualdades y rangos.
+
+    Solo se usan las condiciones de primer nivel y las de $and; las de $or, $nor,
+    $expr o $where no pueden resolverse con un único índice compuesto.
+
+    Args:
+        condition (dict): Filtro de consulta de MongoDB
+
+    Returns:
+        tuple: (campos de igualdad, campos de rango)
+    """
+    equality, ranges = [], []
+
+    for key, value in (condition or {}).items():
+        if key == "$and" and isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    item_equality, item_ranges = classify_filter(item)
+                    equality.extend(item_equality)
+                    ranges.extend(item_ranges)
+            continue
+        if key.startswith("$"):
+            continue
+
+        if isinstance(value, dict) and any(op.startswith("$") for op in value):
+            operators = set(value)
+            if operators <= _EQUALITY_OPERATORS:
+                equality.append(key)
+            elif operators & (_EQUALITY_OPERATORS | _RANGE_OPERATORS):
+                ranges.append(key)
+        else:
+            equality.append(key)
+
+    return equality, ranges
+
+
+def extract_access_patterns(collection, mongo_query):
+    """
+    Obtiene los patrones de acceso (filtro y orden) de una operación traducida.
+
+    Para find, count, update y delete se usa su filtro y orden; en distinct el campo
+    se trata como orden, ya que un índice que lo incluye tras las igualdades permite
+    recorrer solo sus claves. En aggregate se usan los
+    $match iniciales y el $sort que los sigue, que son las etapas que MongoDB puede
+    resolver con un índice, cada $lookup aporta un acceso por igualdad a su
+    foreignField (o a los campos que compara con $eq en su $expr) en la colección
+    unida y cada rama $unionWith se analiza igual sobre su propia colección.
+
+    Args:
+        collection (str): Colección de la operación
+        mongo_query (dict): Operación MongoDB traducida
+
+    Returns:
+        list: Diccionarios con collection, equality, sort (lista de [campo, dirección]) y range
+    """
+    patterns = []
+    operation = mongo_query.get("operation")
+
+    if operation == "find":
+        patterns.append(_make_pattern(collection, mongo_query.get("query"), mongo_query.get("sort")))
+    elif operation == "update":
+        patterns.append(_make_pattern(collection, (mongo_query.get("query") or {}).get("query")))
+    elif operation in ("delete", "count"):
+        patterns.append(_make_pattern(collection, mongo_query.get("query")))
+    elif operation == "distinct":
+        patterns.append(_make_pattern(collection, mongo_query.get("query"), {mongo_query["field"]: 1}))
+    elif operation == "aggregate":
+        patterns.extend(_pipeline_patterns(collection, mongo_query.get("pipeline") or []))
+
+    return [pattern for pattern in patterns if pattern["equality"] or pattern["sort"] or pattern["range"]]
+
+
+def _pipeline_patterns(collection, pipeline):
+    """Accesos de un pipeline: $match/$sort iniciales, $lookup y ramas $unionWith."""
+    conditions, sort = [], None
+    for stage in pipeline:
+        if "$match" in stage and sort is None:
+            conditions.append(stage["$match"])
+        elif "$sort" in stage and sort is None:
+            sort = stage["$sort"]
+        else:
+            break
+    patterns = [_make_pattern(collection, {"$and": conditions} if conditions else {}, sort)]
+    patterns.extend(_lookup_patterns(pipeline))
+    for stage in pipeline:
+        union_with = stage.get("$unionWith")
+        if isinstance(union_with, dict) and union_with.get("coll"):
+            patterns.extend(_pipeline_patterns(union_with["coll"], union_with.get("pipeline") or []))
+    return patterns
+
+
+def _lookup_patterns(pipeline):
+    """Accesos por igualdad de cada $lookup a su colección unida."""
+    patterns = []
+    for stage in pipeline:
+        lookup = stage.get("$lookup")
+        if not isinstance(lookup, dict) or "from" not in lookup:
+            continue
+        conditions = [{lookup["foreignField"]: {"$eq": None}}] if "foreignField" in lookup else []
+        # Filtros que el optimizador (o un semi-join de subconsulta) puso en la sub-pipeline
+        for sub_stage in lookup.get("pipeline", []):
+            if "$match" not in sub_stage:
+                break
+            match = dict(sub_stage["$match"])
+            conditions.extend({field: {"$eq": None}} for field in _expr_equality_fields(match.pop("$expr", None)))
+            if match:
+                conditions.append(match)
+        if conditions:
+            patterns.append(_make_pattern(lookup["from"], {"$and": conditions} if len(conditions) > 1 else conditions[0]))
+    return patterns
+
+
+def _expr_equality_fields(expression):
+    """Campos comparados con una variable de let en {$eq: ["$campo", "$$var"]} (o un $and de ellos)."""
+    if not isinstance(expression, dict):
+        return []
+    if isinstance(expression.get("$and"), list):
+        return [field for item in expression["$and"] for field in _expr_equality_fields(item)]
+    operands = expression.get("$eq")
+    if isinstance(operands, list) and len(operands) == 2:
+        fields = [item[1:] for item in operands if isinstance(item, str) and item.startswith("$") and not item.startswith("$$")]
+        if len(fields) == 1 and any(isinstance(item, str) and item.startswith("$$") for item in operands):
+            return fields
+    return []
+
+
+def _make_pattern(collection, condition, sort=None):
+    equality, ranges = classify_filter(condition)
+    return {
+        "collection": collection,
+        "equality": equality,
+        "sort": [[field, direction] for field, direction in (sort or {}).items()],
+        "range": ranges,
+    }
+
+
+def build_esr_key(pattern):
+    """
+    Construye la clave de un índice compuesto siguiendo la regla ESR: primero los
+    campos de igualdad, después los de ordenación y por último los de rango.
+
+    Args:
+        pattern (dict): Patrón de acceso de extract_access_patterns
+
+    Returns:
+        list: Pares [campo, dirección]
+    """
+    key = []
+    seen = set()
+
+    # Las igualdades se ordenan para que la misma consulta escrita en otro orden dé el mismo índice
+    for field in sorted(set(pattern["equality"])):
+        key.append([field, 1])
+        seen.add(field)
+    for field, direction in pattern["sort"]:
+        if field not in seen:
+            key.append([field, direction])
+            seen.add(field)
+    for field in sorted(set(pattern["range"])):
+        if field not in seen:
+            key.append([field, 1])
+            seen.add(field)
+
+    return key
+
+
+def index_serves(index_key, candidate_key):
+    """
+    Indica si un índice existente sirve para una clave candidata: la candidata debe ser
+    un prefijo del índice con las mismas direcciones o con todas invertidas.
+
+    Args:
+        index_key (list): Pares [campo, dirección] del índice existente
+        candidate_key (list): Pares [campo, dirección] propuestos
+
+    Returns:
+        bool: True si el índice existente cubre la candidata
+    """
+    if len(candidate_key) > len(index_key):
+        return False
+
+    prefix = [list(pair) for pair in index_key[:len(candidate_key)]]
+    if [field for field, _ in prefix] != [field for field, _ in candidate_key]:
+        return False
+
+    same = all(_direction(a) == _direction(b) for (_, a), (_, b) in zip(prefix, candidate_key))
+    inverted = all(_direction(a) == -_direction(b) for (_, a), (_, b) in zip(prefix, candidate_key))
+    return same or inverted
+
+
+def _direction(value):
+    """Dirección numérica de un campo de índice (los índices especiales no tienen orden)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 1 if value > 0 else -1
+    return 0
+
+
+def index_name(key):
+    """Nombre de índice con la convención de MongoDB (campo_1_otro_-1)."""
+    return "_".join(f"{field}_{direction}" for field, direction in key)
+
+
+class IndexAdvisor:
+    """
+    Registra la carga de trabajo de las consultas traducidas y propone índices
+    compuestos para las colecciones consultadas.
+
+    Cada forma de acceso (colección, igualdades, orden, rangos) se cuenta por base de
+    datos; advise() convierte las formas en claves ESR, agrupa las que son prefijo de
+    otra y descarta las que ya cubre un índice existente.
+    """
+
+    def __init__(self, max_shapes=DEFAULT_MAX_SHAPES):
+        """
+        Args:
+            max_shapes (int): Formas de acceso distintas que se conservan
+        """
+        self.max_shapes = max_shapes
+        self._workload = {}
+        self._lock = threading.Lock()
+
+    def record(self, database_name, collection, mongo_query):
+        """
+        Añade una operación traducida a la carga de trabajo.
+
+        Args:
+            database_name (str): Base de datos de la consulta
+            collection (str): Colección de la operación
+            mongo_query (dict): Operación MongoDB traducida
+        """
+        if not collection or not isinstance(mongo_query, dict):
+            return
+
+        for pattern in extract_access_patterns(collection, mongo_query):
+            key = build_esr_key(pattern)
+            if key == [["_id", 1]]:
+                # Siempre cubierto por el índice _id
+                continue
+            shape = (database_name or "", pattern["collection"], tuple(map(tuple, key)))
+            with self._lock:
+                entry = self._workload.get(shape)
+                if entry is None:
+                    if len(self._workload) >= self.max_shapes:
+                        self._evict()
+                    entry = self._workload[shape] = {"pattern": pattern, "count": 0}
+                entry["count"] += 1
+
+    def _evict(self):
+        """Descarta la forma menos usada para dejar sitio a una nueva."""
+        shape = min(self._workload, key=lambda item: self._workload[item]["count"])
+        del self._workload[shape]
+
+    def workload(self, database_name, collection=None):
+        """
+        Formas de acceso registradas para una base de datos.
+
+        Returns:
+            list: Diccionarios con collection, key, count y pattern
+        """
+        with self._lock:
+            entries = [
+                {"collection": shape[1], "key": [list(pair) for pair in shape[2]], "count": entry["count"], "pattern": entry["pattern"]}
+                for shape, entry in self._workload.items()
+                if shape[0] == (database_name or "") and (collection is None or shape[1] == collection)
+            ]
+        return sorted(entries, key=lambda entry: -entry["count"])
+
+    def reset(self, database_name=None):
+        """Olvida la carga de trabajo registrada (de una base de datos o completa)."""
+        with self._lock:
+            if database_name is None:
+                self._workload.clear()
+            else:
+                for shape in [shape for shape in self._workload if shape[0] == database_name]:
+                    del self._workload[shape]
+
+    def advise(self, connector, database_name, collection=None, min_count=1, extra=None):
+        """
+        Propone índices para la carga de trabajo registrada.
+
+        Args:
+            connector (MongoDBConnector): Conector usado para leer los índices existentes
+            database_name (str): Base de datos a analizar
+            collection (str, optional): Limitar el análisis a una colección
+            min_count (int): Veces que debe haberse visto una forma para proponer su índice
+            extra (list, optional): Pares (colección, operación MongoDB) analizados además
+                                    de la carga registrada (no se guardan)
+
+        Returns:
+            dict: recommendations (índices que faltan) y covered (formas ya cubiertas)
+        """
+        entries = self.workload(database_name, collection)
+        for extra_collection, mongo_query in extra or []:
+            for pattern in extract_access_patterns(extra_collection, mongo_query):
+                if collection is None or pattern["collection"] == collection:
+                    entries.append({"collection": pattern["collection"], "key": build_esr_key(pattern), "count": min_count, "pattern": pattern})
+
+        # Agrupar: una clave que es prefijo de otra de la misma colección la usa también
+        candidates = {}
+        for entry in sorted(entries, key=lambda item: -len(item["key"])):
+            if entry["count"] < min_count:
+                continue
+            group = candidates.setdefault(entry["collection"], [])
+            for candidate in group:
+                if index_serves(candidate["key"], entry["key"]):
+                    candidate["queries"] += entry["count"]
+                    break
+            else:
+                group.append({"key": entry["key"], "queries": entry["count"], "pattern": entry["pattern"]})
+
+        recommendations, covered = [], []
+        for collection_name, group in candidates.items():
+            existing = connector.get_collection_indexes(collection_name, database_name)
+            for candidate in group:
+                serving = next(
+                    (index for index in existing if index.get("key") and index_serves(list(index["key"].items()), candidate["key"])),
+                    None
+                )
+                item = {
+                    "collection": collection_name,
+                    "key": candidate["key"],
+                    "name": index_name(candidate["key"]),
+                    "queries": candidate["queries"],
+                    "equality": sorted(set(candidate["pattern"]["equality"])),
+                    "sort": candidate["pattern"]["sort"],
+                    "range": sorted(set(candidate["pattern"]["range"])),
+                }
+                if serving:
+                    item["covered_by"] = serving.get("name")
+                    covered.append(item)
+                else:
+                    recommendations.append(item)
+
+        recommendations.sort(key=lambda item: -item["queries"])
+        logger.info("Asesor de índices: %s índices propuestos para %s", len(recommendations), database_name)
+        return {"database": database_name, "recommendations": recommendations, "covered": covered}
+
+    def create_indexes(self, connector, database_name, recommendations):
+        """
+        Crea los índices propuestos.
+
+        Args:
+            connector (MongoDBConnector): Conector con la conexión a MongoDB
+            database_name (str): Base de datos
+            recommendations (list): Elementos de advise()["recommendations"]
+
+        Returns:
+            list: Resultado por índice (name, created y error si falló)
+        """
+        results = []
+        database = connector.get_database(database_name)
+        for item in recommendations:
+            try:
+                name = database[item["collection"]].create_index(
+                    [(field, direction) for field, direction in item["key"]], name=item["name"]
+                )
+                results.append({"collection": item["collection"], "name": name, "created": True})
+                logger.info("Índice %s creado en %s.%s", name, database_name, item['collection'])
+            except Exception as e:
+                logger.warning("No se pudo crear el índice %s: %s", item['name'], e)
+                results.append({"collection": item["collection"], "name": item["name"], "created": False, "error": str(e)})
+        return results
@@ -0,0 +1,473 @@
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.parser import patterns
+from app.parser.insert_stream import InsertStream, DEFAULT_INSERT_BATCH_SIZE
+from app.parser.script_splitter import SQLScriptSplitter
+from app.translator.parameterizer import translate_sql
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Sentencias INSERT que se cargan a la vez por defecto
+DEFAULT_IMPORT_WORKERS = 4
+
+# Segundos mínimos entre dos escrituras del checkpoint por errores de fila (los lotes
+# y las sentencias completadas se guardan siempre: al reanudar no deben repetirse)
+CHECKPOINT_INTERVAL = 2.0
+
+# Errores que se conservan en el estado del trabajo
+MAX_REPORTED_ERRORS = 100
+
+_JOB_ID_REGEX = re.compile(r'^[0-9a-f]{32}$')
+
+
+def compress_ranges(indices):
+    """
+    Representa un conjunto de enteros como rangos cerrados [[inicio, fin], ...].
+
+    Args:
+        indices (iterable): Enteros sin repetir
+
+    Returns:
+        list: Rangos ordenados
+    """
+    ranges = []
+    for index in sorted(indices):
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return ranges
+
+
+def expand_ranges(ranges):
+    """Operación inversa de compress_ranges."""
+    return {index for first, last in ranges for index in range(first, last + 1)}
+
+
+class ImportCheckpoint:
+    """
+    Estado persistente de un trabajo de importación. Se guarda como JSON junto al
+    script y registra qué sentencias INSERT terminaron y cuántos lotes se insertaron
+    de las que quedaron a medias, de modo que una importación interrumpida se puede
+    reanudar sin repetir lo ya cargado.
+
+    Los métodos son seguros para llamarse desde los hilos de carga.
+    """
+
+    def __init__(self, path, state):
+        """
+        Args:
+            path (str): Fichero JSON del checkpoint
+            state (dict): Estado del trabajo
+        """
+        self.path = path
+        self.state = state
+        self._completed = expand_ranges(state.get("completed", []))
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+
+    @classmethod
+    def create(cls, path, job_id, database_name, owner=None, options=None):
+        """Crea el checkpoint de un trabajo nuevo y lo guarda."""
+        checkpoint = cls(path, {
+            "job_id": job_id,
+            "database": database_name,
+            "owner": owner,
+            "options": options or {},
+            "status": "pending",
+            "created_at": time.time(),
+            "updated_at": time.time(),
+            "statements": 0,
+            "inserted_count": 0,
+            "write_error_count": 0,
+            "rows_rejected": 0,
+            "tables": {},
+            "completed": [],
+            "partial": {},
+            "skipped": {},
+            "failed_statements": 0,
+            "errors": [],
+        })
+        checkpoint.save(force=True)
+        return checkpoint
+
+    @classmethod
+    def load(cls, path):
+        """
+        Carga un checkpoint guardado.
+
+        Raises:
+            FileNotFoundError: Si no existe
+        """
+        with open(path, encoding="utf-8") as checkpoint_file:
+            return cls(path, json.load(checkpoint_file))
+
+    # --- Consultas ---
+
+    def is_completed(self, index):
+        with self._lock:
+            return index in self._completed
+
+    def batches_done(self, index):
+        with self._lock:
+            return self.state["partial"].get(str(index), 0)
+
+    def table_columns(self, table):
+        with self._lock:
+            return self.state["tables"].get(table, {}).get("columns")
+
+    def table_created(self, table):
+        with self._lock:
+            return self.state["tables"].get(table, {}).get("created", False)
+
+    def snapshot(self):
+        """Copia del estado para devolverla como respuesta."""
+        with self._lock:
+            state = json.loads(json.dumps(self.state))
+        state["completed_statements"] = len(self._completed)
+        state.pop("completed", None)
+        return state
+
+    # --- Actualizaciones ---
+
+    def begin(self):
+        """Marca el inicio de una ejecución (nueva o reanudada)."""
+        with self._lock:
+            self.state["status"] = "running"
+            # Se recalculan al recorrer el script de nuevo
+            self.state["statements"] = 0
+            self.state["skipped"] = {}
+            self.state["failed_statements"] = 0
+            self.state["errors"] = []
+        self.save(force=True)
+
+    def count_statement(self, keyword=None):
+        """Cuenta una sentencia del script; si se indica keyword, como omitida."""
+        with self._lock:
+            self.state["statements"] += 1
+            if keyword:
+                self.state["skipped"][keyword] = self.state["skipped"].get(keyword, 0) + 1
+
+    def record_table(self, table, columns):
+        with self._lock:
+            entry = self._table(table)
+            entry["created"] = True
+            entry["columns"] = columns
+        self.save(force=True)
+
+    def record_batch(self, index, batch):
+        # Cada lote confirmado se guarda al momento: un lote que el checkpoint no
+        # recuerda se vuelve a insertar al reanudar (documentos duplicados)
+        with self._lock:
+            self.state["partial"][str(index)] = batch
+        self.save(force=True)
+
+    def complete_statement(self, index, table, inserted, write_errors, rows_rejected):
+        with self._lock:
+            self._completed.add(index)
+            self.state["partial"].pop(str(index), None)
+            self.state["inserted_count"] += inserted
+            self.state["write_error_count"] += write_errors
+            self.state["rows_rejected"] += rows_rejected
+            entry = self._table(table)
+            entry["statements"] += 1
+            entry["inserted"] += inserted
+        self.save(force=True)
+
+    def record_error(self, index, error, table=None, failed=True):
+        with self._lock:
+            if failed:
+                self.state["failed_statements"] += 1
+            if len(self.state["errors"]) < MAX_REPORTED_ERRORS:
+                self.state["errors"].append({"statement": index, "table": table, "error": error})
+        self.save()
+
+    def finish(self, error=None):
+        with self._lock:
+            if error:
+                self.state["fatal_error"] = error
+            else:
+                self.state.pop("fatal_error", None)
+            failed = error or self.state["failed_statements"]
+            self.state["status"] = "failed" if failed else "completed"
+        self.save(force=True)
+
+    def save(self, force=False):
+        """Escribe el checkpoint de forma atómica (como mucho cada CHECKPOINT_INTERVAL)."""
+        with self._lock:
+            now = time.time()
+            if not force and now - self._last_save < CHECKPOINT_INTERVAL:
+                return
+            self._last_save = now
+            self.state["updated_at"] = now
+            self.state["completed"] = compress_ranges(self._completed)
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as checkpoint_file:
+                json.dump(self.state, checkpoint_file)
+            os.replace(temporary_path, self.path)
+
+    def _table(self, table):
+        return self.state["tables"].setdefault(
+            table, {"created": False, "columns": None, "statements": 0, "inserted": 0}
+        )
+
+
+class SQLDumpImporter:
+    """
+    Importa un script SQL (CREATE TABLE + INSERT, como los volcados de mysqldump o de
+    pg_dump --inserts) en una base de datos MongoDB.
+
+    El script se recorre una sola vez con SQLScriptSplitter. Cada CREATE TABLE se
+    ejecuta en el hilo lector, antes de despachar cualquier INSERT posterior, con la
+    misma traducción que /translate. Los INSERT se cargan en un ThreadPoolExecutor
+    (insert_many no ordenado por lotes); el número de sentencias pendientes está
+    acotado para no leer el script más rápido de lo que se carga.
+
+    El resto de sentencias (SET, LOCK TABLES, DROP TABLE...) se cuentan como omitidas.
+    """
+
+    def __init__(self, connector, checkpoint, script_path, workers=DEFAULT_IMPORT_WORKERS,
+                 batch_size=DEFAULT_INSERT_BATCH_SIZE):
+        """
+        Args:
+            connector (MongoDBConnector): Conector con el que se escribe
+            checkpoint (ImportCheckpoint): Estado del trabajo
+            script_path (str): Ruta del script SQL
+            workers (int): Sentencias INSERT que se cargan en paralelo
+            batch_size (int): Documentos por insert_many
+        """
+        if not isinstance(workers, int) or workers <= 0:
+            raise ValueError("workers debe ser un entero positivo")
+
+        self.connector = connector
+        self.checkpoint = checkpoint
+        self.script_path = script_path
+        self.database_name = checkpoint.state["database"]
+        self.workers = workers
+        self.batch_size = batch_size
+        self.string_escapes = "mysql"
+
+    def run(self):
+        """
+        Ejecuta (o reanuda) la importación.
+
+        Returns:
+            dict: Estado final del trabajo
+        """
+        self.checkpoint.begin()
+        logger.info("Importación %s iniciada sobre %s", self.checkpoint.state['job_id'], self.database_name)
+
+        pending = threading.BoundedSemaphore(self.workers * 2)
+        fatal_error = None
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sql-import") as executor:
+            try:
+                with open(self.script_path, encoding="utf-8", errors="replace", newline="") as source:
+                    splitter = SQLScriptSplitter(source)
+                    for index, statement in enumerate(splitter):
+                        self._dispatch(index, statement, splitter, executor, pending)
+            except Exception as e:
+                logger.error("Importación %s interrumpida: %s", self.checkpoint.state['job_id'], e)
+                fatal_error = str(e)
+
+        self.checkpoint.finish(fatal_error)
+        state = self.checkpoint.snapshot()
+        logger.info(
+            "Importación %s %s: %s documentos, %s sentencias con error",
+            state['job_id'], state['status'], state['inserted_count'], state['failed_statements']
+        )
+        return state
+
+    def _dispatch(self, index, statement, splitter, executor, pending):
+        """Ejecuta o encola una sentencia del script."""
+        keywords = patterns.STATEMENT_KEYWORDS.match(statement)
+        first = keywords.group(1).upper() if keywords else ""
+        second = (keywords.group(2) or "").upper() if keywords else ""
+
+        if first == "INSERT":
+            self.checkpoint.count_statement()
+            if self.checkpoint.is_completed(index):
+                return
+            pending.acquire()
+            executor.submit(self._load, index, statement, self.string_escapes, pending)
+        elif first == "CREATE" and second == "TABLE":
+            self.checkpoint.count_statement()
+            self._create_table(index, statement)
+        else:
+            if patterns.STANDARD_CONFORMING_STRINGS_ON.match(statement):
+                # pg_dump: la barra invertida es un carácter normal dentro de las cadenas
+                splitter.backslash_escapes = False
+                self.string_escapes = "standard"
+            self.checkpoint.count_statement(first or "UNKNOWN")
+
+    def _create_table(self, index, statement):
+        """Crea la colección de un CREATE TABLE y recuerda el orden de sus columnas."""
+        try:
+            # Los parsers DDL no admiten identificadores entre acentos graves (mysqldump)
+            collection_name, mongo_query = translate_sql(statement.replace("`", ""))
+            columns = [column["name"] for column in mongo_query.get("schema_info", {}).get("columns", [])]
+
+            if not self.checkpoint.table_created(collection_name):
+                self.connector.execute_query(collection_name, mongo_query, database_name=self.database_name)
+            self.checkpoint.record_table(collection_name, columns or None)
+        except Exception as e:
+            logger.error("CREATE TABLE de la sentencia %s no ejecutado: %s", index, e)
+            self.checkpoint.record_error(index, str(e))
+
+    def _load(self, index, statement, string_escapes, pending):
+        """Carga una sentencia INSERT por lotes (se ejecuta en el pool)."""
+        table = None
+        try:
+            stream = InsertStream(statement, self.batch_size, string_escapes=string_escapes)
+            table = stream.table
+            if stream.columns is None:
+                # mysqldump sin --complete-insert: columnas en el orden del CREATE TABLE
+                stream.columns = self.checkpoint.table_columns(table)
+
+            inserted = write_errors = 0
+            events = self.connector.iter_insert_stream(
+                table, stream, self.database_name, skip_batches=self.checkpoint.batches_done(index)
+            )
+            for event in events:
+                if event.get("aborted"):
+                    self.checkpoint.record_error(index, event["error"], table)
+                    return
+                inserted += event["inserted"]
+                write_errors += len(event["errors"])
+                for error in event["errors"][:1]:
+                    self.checkpoint.record_error(index, f"Fila {error['row']}: {error['errmsg']}", table, failed=False)
+                self.checkpoint.record_batch(index, event["batch"])
+
+            self.checkpoint.complete_statement(index, table, inserted, write_errors, stream.rows_rejected)
+        except Exception as e:
+            logger.error("Error cargando la sentencia %s: %s", index, e)
+            self.checkpoint.record_error(index, str(e), table)
+        finally:
+            pending.release()
+
+
+class ImportJobManager:
+    """
+    Ejecuta las importaciones en segundo plano y guarda en un directorio el script y el
+    checkpoint de cada trabajo, para consultarlos o reanudarlos por job_id.
+    """
+
+    def __init__(self, connector, directory, workers=DEFAULT_IMPORT_WORKERS, batch_size=DEFAULT_INSERT_BATCH_SIZE):
+        """
+        Args:
+            connector (MongoDBConnector): Conector con el que se escribe
+            directory (str): Directorio de trabajos (se crea si no existe)
+            workers (int): Paralelismo por defecto
+            batch_size (int): Documentos por insert_many por defecto
+        """
+        self.connector = connector
+        self.directory = directory
+        self.workers = workers
+        self.batch_size = batch_size
+        self._running = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self, database_name, upload=None, job_id=None, owner=None, workers=None, batch_size=None):
+        """
+        Inicia un trabajo nuevo (con upload) o reanuda uno existente (con job_id).
+
+        Args:
+            database_name (str): Base de datos destino (trabajos nuevos)
+            upload: Fichero subido (objeto con save(ruta), como FileStorage de Flask)
+            job_id (str, optional): Trabajo a reanudar
+            owner (str, optional): Usuario que lanza el trabajo
+            workers (int, optional): Sentencias en paralelo
+            batch_size (int, optional): Documentos por insert_many
+
+        Returns:
+            dict: Estado inicial del trabajo
+
+        Raises:
+            ValueError: Si el trabajo no existe, ya está en curso o ya terminó
+            PermissionError: Si el trabajo pertenece a otro usuario
+        """
+        if job_id:
+            checkpoint = self._load_checkpoint(job_id, owner)
+            if checkpoint.state["status"] == "completed":
+                raise ValueError(f"El trabajo {job_id} ya se completó")
+            options = checkpoint.state.get("options", {})
+        elif upload is not None:
+            job_id = uuid.uuid4().hex
+            upload.save(self._script_path(job_id))
+            options = {
+                "workers": workers or self.workers,
+                "batch_size": batch_size or self.batch_size,
+            }
+            checkpoint = ImportCheckpoint.create(
+                self._checkpoint_path(job_id), job_id, database_name, owner=owner, options=options
+            )
+        else:
+            raise ValueError("Se requiere un fichero SQL o el job_id de un trabajo a reanudar")
+
+        importer = SQLDumpImporter(
+            self.connector,
+            checkpoint,
+            self._script_path(job_id),
+            workers=workers or options.get("workers", self.workers),
+            batch_size=batch_size or options.get("batch_size", self.batch_size),
+        )
+
+        with self._lock:
+            if job_id in self._running:
+                raise ValueError(f"El trabajo {job_id} ya está en curso")
+            self._running[job_id] = importer
+
+        thread = threading.Thread(target=self._run, args=(job_id, importer), name=f"sql-import-{job_id}", daemon=True)
+        thread.start()
+        return checkpoint.snapshot()
+
+    def status(self, job_id, owner=None):
+        """
+        Estado de un trabajo (en curso o guardado).
+
+        Raises:
+            ValueError: Si el trabajo no existe
+            PermissionError: Si el trabajo pertenece a otro usuario
+        """
+        with self._lock:
+            importer = self._running.get(job_id)
+        checkpoint = importer.checkpoint if importer else self._load_checkpoint(job_id, owner)
+        if owner is not None and checkpoint.state.get("owner") not in (None, owner):
+            raise PermissionError("No tienes acceso a este trabajo de importación")
+        return checkpoint.snapshot()
+
+    def _run(self, job_id, importer):
+        try:
+            importer.run()
+        except Exception as e:
+            logger.exception("Error inesperado en la importación %s: %s", job_id, e)
+            importer.checkpoint.finish(str(e))
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+
+    def _load_checkpoint(self, job_id, owner=None):
+        if not isinstance(job_id, str) or not _JOB_ID_REGEX.match(job_id):
+            raise ValueError(f"Identificador de trabajo no válido: {job_id}")
+        try:
+            checkpoint = ImportCheckpoint.load(self._checkpoint_path(job_id))
+        except FileNotFoundError:
+            raise ValueError(f"No existe el trabajo de importación {job_id}")
+        if owner is not None and checkpoint.state.get("owner") not in (None, owner):
+            raise PermissionError("No tienes acceso a este trabajo de importación")
+        return checkpoint
+
+    def _script_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.sql")
+
+    def _checkpoint_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
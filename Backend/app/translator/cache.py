@@ -0,0 +1,229 @@
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from app.parser.sql_ast import tokenize
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Palabras reservadas cuyo uso de mayúsculas no afecta a la traducción.
+# Los identificadores se conservan tal cual porque MongoDB distingue mayúsculas.
+SQL_KEYWORDS = {
+    "SELECT", "DISTINCT", "FROM", "WHERE", "AND", "OR", "NOT", "IN", "IS", "NULL",
+    "LIKE", "BETWEEN", "EXISTS", "AS", "ON", "JOIN", "INNER", "LEFT", "RIGHT", "FULL",
+    "OUTER", "CROSS", "GROUP", "BY", "HAVING", "ORDER", "ASC", "DESC", "LIMIT", "OFFSET",
+    "UNION", "ALL", "INSERT", "INTO", "VALUES", "UPDATE", "SET", "DELETE", "CREATE",
+    "DROP", "ALTER", "TABLE", "IF", "COUNT", "SUM", "AVG", "MIN", "MAX", "TRUE", "FALSE",
+}
+
+# Sentencias que modifican el esquema: nunca se cachean e invalidan su colección
+SCHEMA_CHANGING_TYPES = {"CREATE", "DROP", "ALTER"}
+
+
+def normalize_sql(sql_query):
+    """
+    Normaliza una consulta SQL para usarla como clave de cache.
+    Colapsa espacios y comentarios, pasa las palabras reservadas a mayúsculas y
+    elimina el punto y coma final. Los literales y los identificadores se conservan.
+
+    Args:
+        sql_query (str): Consulta SQL original
+
+    Returns:
+        str: Consulta normalizada
+    """
+    parts = []
+    previous = None
+
+    for token in tokenize(sql_query or ""):
+        if previous is not None and previous.end != token.start:
+            parts.append(" ")
+
+        if token.kind == "word" and token.upper in SQL_KEYWORDS:
+            parts.append(token.upper)
+        else:
+            parts.append(token.value)
+        previous = token
+
+    normalized = "".join(parts).strip()
+    while normalized.endswith(";"):
+        normalized = normalized[:-1].rstrip()
+    return normalized
+
+
+class TranslationCache:
+    """
+    Cache LRU con expiración (TTL) de traducciones SQL→MongoDB compartido por todo el proceso.
+    La clave es la consulta normalizada más la base de datos destino; el valor contiene
+    el tipo de consulta, la colección, la operación MongoDB y, si se generó, la consulta shell.
+    """
+
+    def __init__(self, max_size=512, ttl=300):
+        """
+        Inicializa el cache.
+
+        Args:
+            max_size (int): Número máximo de entradas (0 desactiva el cache)
+            ttl (float): Segundos de validez de cada entrada (0 o None = sin expiración)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def make_key(self, sql_query, database_name):
+        """Construye la clave de cache para una consulta y base de datos."""
+        return (database_name or "", normalize_sql(sql_query))
+
+    def get(self, sql_query, database_name):
+        """
+        Busca una traducción en el cache.
+
+        Args:
+            sql_query (str): Consulta SQL
+            database_name (str): Base de datos destino
+
+        Returns:
+            dict or None: Copia de la entrada cacheada, o None si no existe o expiró
+        """
+        if not self.enabled:
+            return None
+
+        key = self.make_key(sql_query, database_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            if self._is_expired(entry):
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return copy.deepcopy(entry["value"])
+
+    def put(self, sql_query, database_name, query_type, collection, mongo_query, shell_query=None, **metadata):
+        """
+        Guarda una traducción en el cache. Las sentencias que cambian el esquema no se guardan.
+
+        Args:
+            sql_query (str): Consulta SQL
+            database_name (str): Base de datos destino
+            query_type (str): Tipo de consulta (SELECT, INSERT...)
+            collection (str): Colección destino
+            mongo_query (dict): Operación MongoDB traducida
+            shell_query (str, optional): Consulta para la shell de MongoDB
+            **metadata: Datos adicionales que se guardan junto a la entrada
+
+        Returns:
+            dict: La entrada con los valores indicados
+        """
+        value = {
+            "query_type": query_type,
+            "collection": collection,
+            "mongo_query": mongo_query,
+            "shell_query": shell_query,
+        }
+        value.update(metadata)
+
+        if not self.enabled or query_type in SCHEMA_CHANGING_TYPES:
+            return value
+
+        key = self.make_key(sql_query, database_name)
+        with self._lock:
+            self._entries[key] = {
+                "value": copy.deepcopy(value),
+                "created_at": time.monotonic(),
+                "database": database_name or "",
+                "collection": collection,
+            }
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+        return value
+
+    def set_shell_query(self, sql_query, database_name, shell_query):
+        """Completa una entrada existente con su consulta para la shell."""
+        if not self.enabled:
+            return
+
+        key = self.make_key(sql_query, database_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["value"]["shell_query"] = shell_query
+
+    def invalidate_collection(self, database_name, collection):
+        """
+        Elimina todas las traducciones que apuntan a una colección.
+        Se usa cuando CREATE TABLE o DROP TABLE cambian su esquema.
+
+        Args:
+            database_name (str): Base de datos de la colección
+            collection (str): Nombre de la colección
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        with self._lock:
+            keys = [
+                key for key, entry in self._entries.items()
+                if entry["collection"] == collection and entry["database"] == (database_name or "")
+            ]
+            for key in keys:
+                del self._entries[key]
+            self._stats["invalidations"] += len(keys)
+
+        if keys:
+            logger.info("Cache de traducciones: %s entradas invalidadas para %s.%s", len(keys), database_name, collection)
+        return len(keys)
+
+    def clear(self):
+        """Vacía el cache completo."""
+        with self._lock:
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+
+    def get_stats(self):
+        """
+        Obtiene las estadísticas del cache.
+
+        Returns:
+            dict: Tamaño, límites, aciertos, fallos, desalojos, expiraciones e invalidaciones
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["max_size"] = self.max_size
+        stats["ttl"] = self.ttl
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _is_expired(self, entry):
+        """Indica si una entrada superó su TTL."""
+        if not self.ttl:
+            return False
+        return time.monotonic() - entry["created_at"] > self.ttl
@@ -0,0 +1,247 @@
+import logging
+
+from app.parser.sql_ast import clean_identifier, tokenize
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Operadores binarios por nivel de precedencia (de menor a mayor)
+_BINARY_LEVELS = (
+    {"||": "$concat"},
+    {"+": "$add", "-": "$subtract"},
+    {"*": "$multiply", "/": "$divide", "%": "$mod"},
+)
+
+# Operadores que admiten más de dos argumentos: a + b + c -> {"$add": [a, b, c]}
+_VARIADIC = ("$add", "$multiply", "$concat")
+
+# Operadores aritméticos cuyos campos se convierten a número, como en el resto de traducciones de UPDATE
+_NUMERIC = ("$add", "$subtract", "$multiply", "$divide", "$mod")
+
+# Funciones SQL con un operador de agregación equivalente que recibe la lista de argumentos
+_FUNCTIONS = {
+    "UPPER": ("$toUpper", 1, 1),
+    "UCASE": ("$toUpper", 1, 1),
+    "LOWER": ("$toLower", 1, 1),
+    "LCASE": ("$toLower", 1, 1),
+    "LENGTH": ("$strLenCP", 1, 1),
+    "CHAR_LENGTH": ("$strLenCP", 1, 1),
+    "CONCAT": ("$concat", 1, None),
+    "ABS": ("$abs", 1, 1),
+    "CEIL": ("$ceil", 1, 1),
+    "CEILING": ("$ceil", 1, 1),
+    "FLOOR": ("$floor", 1, 1),
+    "ROUND": ("$round", 1, 2),
+    "MOD": ("$mod", 2, 2),
+    "COALESCE": ("$ifNull", 2, None),
+    "IFNULL": ("$ifNull", 2, 2),
+    "GREATEST": ("$max", 1, None),
+    "LEAST": ("$min", 1, None),
+}
+
+# Funciones de texto que reciben {"input": ...}
+_TRIM_FUNCTIONS = {"TRIM": "$trim", "LTRIM": "$ltrim", "RTRIM": "$rtrim"}
+
+# Valores del momento de ejecución
+_NOW_WORDS = {"NOW", "CURRENT_TIMESTAMP", "SYSDATE"}
+
+_CONSTANTS = {"NULL": None, "TRUE": True, "FALSE": False}
+
+
+class _Parser:
+    """Analizador descendente recursivo de una expresión SQL ya tokenizada."""
+
+    def __init__(self, sql, tokens):
+        self.sql = sql
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def take(self, value=None):
+        token = self.peek()
+        if token is None or (value is not None and token.value != value):
+            expected = f"'{value}'" if value else "una expresión"
+            raise ValueError(f"Expresión SET no válida: se esperaba {expected} en '{self.sql}'")
+        self.position += 1
+        return token
+
+    def parse(self):
+        expression = self.binary(0)
+        if self.peek() is not None:
+            raise ValueError(f"Expresión SET no válida: '{self.peek().value}' inesperado en '{self.sql}'")
+        return expression
+
+    def binary(self, level):
+        if level == len(_BINARY_LEVELS):
+            return self.unary()
+        operators = _BINARY_LEVELS[level]
+        left = self.binary(level + 1)
+        while self.peek() is not None and self.peek().value in operators:
+            operator = operators[self.take().value]
+            right = self.binary(level + 1)
+            if operator in _VARIADIC and isinstance(left, _Operation) and left.operator == operator:
+                left.arguments.append(right)
+            else:
+                left = _Operation(operator, [left, right])
+        return left
+
+    def unary(self):
+        token = self.peek()
+        if token is not None and token.value in ("-", "+"):
+            self.take()
+            operand = self.unary()
+            if token.value == "+":
+                return operand
+            if isinstance(operand, (int, float)) and not isinstance(operand, bool):
+                return -operand
+            return _Operation("$multiply", [-1, operand])
+        return self.primary()
+
+    def primary(self):
+        token = self.take()
+        if token.value == "(":
+            expression = self.binary(0)
+            self.take(")")
+            return expression
+        if token.kind == "number":
+            text = token.value
+            return float(text) if any(char in text for char in ".eE") else int(text)
+        if token.kind == "string":
+            quote = token.value[0]
+            return _Literal(token.value[1:-1].replace(quote * 2, quote))
+        if token.kind == "word" and token.upper in _CONSTANTS:
+            return _CONSTANTS[token.upper]
+        if token.kind == "word" and self.peek() is not None and self.peek().value == "(":
+            return self.function(token.upper)
+        if token.kind == "word" and token.upper in _NOW_WORDS:
+            return "$$NOW"
+        if token.kind in ("word", "ident"):
+            path = [clean_identifier(token.value)]
+            while self.peek() is not None and self.peek().value == ".":
+                self.take()
+                path.append(clean_identifier(self.take().value))
+            return _Field(".".join(path))
+        raise ValueError(f"Expresión SET no válida: '{token.value}' inesperado en '{self.sql}'")
+
+    def function(self, name):
+        self.take("(")
+        arguments = []
+        if self.peek() is not None and self.peek().value != ")":
+            arguments.append(self.binary(0))
+            while self.peek() is not None and self.peek().value == ",":
+                self.take()
+                arguments.append(self.binary(0))
+        self.take(")")
+
+        if name in _NOW_WORDS and not arguments:
+            return "$$NOW"
+        if name in _TRIM_FUNCTIONS and len(arguments) == 1:
+            return {_TRIM_FUNCTIONS[name]: {"input": arguments[0]}}
+        if name in ("SUBSTRING", "SUBSTR") and len(arguments) in (2, 3):
+            # SQL cuenta desde 1; sin longitud se toma el resto del texto
+            start = arguments[1] - 1 if isinstance(arguments[1], int) else _Operation("$subtract", [arguments[1], 1])
+            length = arguments[2] if len(arguments) == 3 else {"$strLenCP": arguments[0]}
+            return {"$substrCP": [arguments[0], start, length]}
+        if name not in _FUNCTIONS:
+            raise ValueError(f"Función no soportada en UPDATE SET: {name}")
+
+        operator, minimum, maximum = _FUNCTIONS[name]
+        if len(arguments) < minimum or (maximum is not None and len(arguments) > maximum):
+            raise ValueError(f"Número de argumentos no válido para {name}: {len(arguments)}")
+        if operator in ("$toUpper", "$toLower", "$strLenCP", "$abs", "$ceil", "$floor"):
+            return {operator: arguments[0]}
+        return _Operation(operator, arguments)
+
+
+class _Field(str):
+    """Referencia a un campo del documento."""
+
+
+class _Literal(str):
+    """Texto literal de la consulta."""
+
+
+class _Operation:
+    """Operador con argumentos pendiente de convertir (permite acumular a + b + c)."""
+
+    def __init__(self, operator, arguments):
+        self.operator = operator
+        self.arguments = arguments
+
+
+def _to_mongo(expression, numeric=False):
+    """Convierte el árbol analizado en una expresión de agregación de MongoDB."""
+    if isinstance(expression, _Operation):
+        is_numeric = expression.operator in _NUMERIC
+        return {expression.operator: [_to_mongo(argument, is_numeric) for argument in expression.arguments]}
+    if isinstance(expression, _Field):
+        # Los valores numéricos pueden estar guardados como texto
+        return {"$toDouble": f"${expression}"} if numeric else f"${expression}"
+    if isinstance(expression, _Literal):
+        text = str(expression)
+        # Un texto que empieza por $ se interpretaría como ruta de campo
+        return {"$literal": text} if text.startswith("$") else text
+    if isinstance(expression, dict):
+        return {key: _to_mongo(value) for key, value in expression.items()}
+    if isinstance(expression, list):
+        return [_to_mongo(item) for item in expression]
+    return expression
+
+
+def compile_expression(text):
+    """
+    Compila una expresión SQL (aritmética, concatenación, funciones, campos y
+    literales) a una expresión de agregación de MongoDB.
+
+    Args:
+        text (str): Expresión SQL, por ejemplo "precio * 1.1" o "UPPER(nombre)"
+
+    Returns:
+        Expresión de MongoDB ({"$multiply": [...]}, "$campo", literal...)
+
+    Raises:
+        ValueError: Si la expresión no es válida o usa una función no soportada
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        raise ValueError("Expresión SET vacía")
+    return _to_mongo(_Parser(text, tokens).parse())
+
+
+def is_constant(expression):
+    """True si la expresión compilada es un valor fijo (no depende del documento)."""
+    return not isinstance(expression, (dict, list)) and not (isinstance(expression, str) and expression.startswith("$"))
+
+
+def compile_set_clause(set_clause):
+    """
+    Compila las asignaciones de la cláusula SET de un UPDATE.
+
+    Args:
+        set_clause (str): Texto de la cláusula sin la palabra SET ("a = a + 1, b = 'x'")
+
+    Returns:
+        dict: Expresión de MongoDB por campo
+
+    Raises:
+        ValueError: Si alguna asignación no es válida
+    """
+    assignments = {}
+    current = []
+    for token in tokenize(set_clause) + [None]:
+        if token is not None and not (token.value == "," and token.depth == 0):
+            current.append(token)
+            continue
+        equals = next((i for i, item in enumerate(current) if item.value == "=" and item.depth == 0), None)
+        if not equals or equals == len(current) - 1:
+            raise ValueError(f"Asignación SET no válida: {set_clause}")
+        field = clean_identifier(set_clause[current[0].start:current[equals - 1].end])
+        expression = set_clause[current[equals + 1].start:current[-1].end]
+        assignments[field] = compile_expression(expression)
+        current = []
+
+    logger.debug("Asignaciones SET compiladas: %s", list(assignments))
+    return assignments
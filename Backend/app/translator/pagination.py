@@ -0,0 +1,361 @@
+import copy
+import base64
+import hashlib
+import logging
+
+from bson import json_util
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Versión del formato del token de continuación
+CURSOR_VERSION = 1
+
+# Etapas que pueden ir tras $sort sin alterar el orden ni el número de documentos
+_TRAILING_PAGE_STAGES = ("$skip", "$limit")
+
+
+def encode_cursor(payload):
+    """
+    Codifica el estado de paginación como token opaco (base64 de Extended JSON,
+    para conservar tipos BSON como ObjectId o fechas).
+
+    Args:
+        payload (dict): Estado de la página
+
+    Returns:
+        str: Token de continuación
+    """
+    raw = json_util.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decodifica un token de continuación.
+
+    Args:
+        token (str): Token recibido del cliente
+
+    Returns:
+        dict: Estado de la página
+
+    Raises:
+        ValueError: Si el token no es válido
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise ValueError("Token de paginación inválido")
+
+    if not isinstance(payload, dict) or payload.get("v") != CURSOR_VERSION:
+        raise ValueError("Token de paginación inválido o de una versión no soportada")
+    return payload
+
+
+def query_shape(collection_name, mongo_query):
+    """Huella de la consulta para rechazar tokens emitidos para otra consulta."""
+    raw = json_util.dumps({"c": collection_name, "q": mongo_query}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def build_keyset_match(sort_keys, last_values):
+    """
+    Construye el filtro de rango que selecciona los documentos posteriores a la
+    última fila devuelta, según el orden (compuesto) indicado.
+
+    Para claves (k1, k2, ..., kn) genera:
+        k1 > v1  OR  (k1 = v1 AND k2 > v2)  OR ...
+    usando $lt en claves descendentes. Los nulos se ordenan primero en MongoDB,
+    por lo que en orden descendente se incluyen explícitamente al final.
+
+    Args:
+        sort_keys (list): Pares [campo, dirección]
+        last_values (list): Valores de la última fila para cada campo
+
+    Returns:
+        dict: Filtro MongoDB
+    """
+    branches = []
+
+    for i, (field, direction) in enumerate(sort_keys):
+        value = last_values[i]
+
+        if value is None:
+            if direction == -1:
+                # Nada se ordena después de null en orden descendente
+                continue
+            condition = {field: {"$ne": None}}
+        elif direction == 1:
+            condition = {field: {"$gt": value}}
+        else:
+            condition = {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+        prefix = [{prev_field: last_values[j]} for j, (prev_field, _) in enumerate(sort_keys[:i])]
+        branches.append({"$and": prefix + [condition]} if prefix else condition)
+
+    if not branches:
+        # No quedan documentos después de la última fila
+        return {"_id": {"$in": []}}
+    if len(branches) == 1:
+        return branches[0]
+    return {"$or": branches}
+
+
+def _get_path(document, path):
+    """Obtiene un valor anidado (a.b.c) de un documento."""
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _strip_path(document, path):
+    """
+    Elimina un campo (posiblemente anidado) de un documento, junto con los
+    subdocumentos que quedan vacíos al quitarlo.
+    """
+    head, _, rest = path.partition(".")
+    if not isinstance(document, dict) or head not in document:
+        return
+    if not rest:
+        del document[head]
+        return
+    _strip_path(document[head], rest)
+    if document[head] == {}:
+        del document[head]
+
+
+def _keeps_path(projection, field):
+    """
+    Indica si un $project posterior al orden conserva el campo tal cual.
+
+    Returns:
+        bool: True si el campo (o un campo que lo contiene) se incluye sin cambios,
+            False si la proyección no lo menciona
+
+    Raises:
+        ValueError: Si la proyección redefine o excluye el campo o parte de él
+    """
+    for key, value in projection.items():
+        if key == field or field.startswith(key + "."):
+            if value in (1, True) or value == "$" + key:
+                return True
+            raise ValueError(f"No se puede paginar: el campo de orden {field} se modifica después de $sort")
+        if key.startswith(field + "."):
+            raise ValueError(f"No se puede paginar: el campo de orden {field} se modifica después de $sort")
+    return False
+
+
+class KeysetPaginator:
+    """
+    Pagina una consulta find/aggregate traducida usando la última clave de ordenación
+    (más _id como desempate) en lugar de skip. Cada página siguiente se obtiene con un
+    filtro de rango que puede aprovechar los índices, por lo que su coste no crece
+    con el número de página.
+    """
+
+    def __init__(self, collection_name, mongo_query, page_size, cursor=None):
+        """
+        Prepara la consulta paginada.
+
+        Args:
+            collection_name (str): Colección consultada
+            mongo_query (dict): Operación find o aggregate traducida
+            page_size (int): Documentos por página
+            cursor (str, optional): Token de continuación de la página anterior
+
+        Raises:
+            ValueError: Si la operación no es paginable o el token no corresponde
+        """
+        operation = mongo_query.get("operation")
+        if operation not in ("find", "aggregate") or mongo_query.get("union"):
+            raise ValueError(f"La operación {operation} no admite paginación")
+
+        page_size = int(page_size)
+        if page_size <= 0:
+            raise ValueError("page_size debe ser un entero positivo")
+
+        self.collection_name = collection_name
+        self.page_size = page_size
+        self.shape = query_shape(collection_name, mongo_query)
+        self.hidden_fields = set()
+
+        state = decode_cursor(cursor) if cursor else None
+        if state and state.get("shape") != self.shape:
+            raise ValueError("El token de paginación no corresponde a esta consulta")
+
+        if operation == "find":
+            self.query, self.sort_keys, sql_limit, sql_offset = self._prepare_find(mongo_query)
+        else:
+            self.query, self.sort_keys, sql_limit, sql_offset = self._prepare_aggregate(mongo_query)
+
+        # Filas que aún puede devolver la consulta si el SQL tenía LIMIT
+        self.remaining = state.get("remaining") if state else sql_limit
+        fetch = page_size if self.remaining is None else min(page_size, self.remaining)
+        self.fetch_size = fetch
+
+        skip = sql_offset if not state else 0
+        keyset_filter = build_keyset_match(self.sort_keys, state["last"]) if state else None
+        self._apply_page_window(keyset_filter, skip, fetch + 1)
+
+        logger.info(
+            "Paginación keyset en %s: orden=%s, página=%s, continuación=%s",
+            collection_name, self.sort_keys, page_size, 'sí' if state else 'no'
+        )
+
+    # --- Preparación de consultas ---
+
+    def _prepare_find(self, mongo_query):
+        """Añade el desempate por _id y asegura que las claves de orden se proyectan."""
+        query = copy.deepcopy(mongo_query)
+
+        sort = dict(query.get("sort") or {})
+        if "_id" not in sort:
+            sort["_id"] = 1
+        query["sort"] = sort
+        sort_keys = [[field, direction] for field, direction in sort.items()]
+
+        projection = query.get("projection")
+        if projection:
+            inclusion = any(v for k, v in projection.items() if k != "_id")
+            for field, _ in sort_keys:
+                if inclusion and field != "_id" and field not in projection:
+                    projection[field] = 1
+                    self.hidden_fields.add(field)
+                elif not projection.get(field, 1):
+                    del projection[field]
+                    self.hidden_fields.add(field)
+
+        limit = query.pop("limit", None)
+        offset = query.pop("skip", None) or 0
+        return query, sort_keys, limit, offset
+
+    def _prepare_aggregate(self, mongo_query):
+        """
+        Sitúa el orden compuesto en el pipeline y elimina las etapas que impedirían
+        leer las claves de la última fila ($unset de campos de orden, _id excluido).
+        Un $project posterior al orden (el de los JOIN) se amplía con las claves de
+        orden, que se ocultan después en la respuesta.
+
+        Raises:
+            ValueError: Si un $project posterior al orden redefine una clave de orden
+        """
+        query = copy.deepcopy(mongo_query)
+        pipeline = query.get("pipeline", [])
+
+        # $skip/$limit finales del SQL: se sustituyen por la ventana de la página
+        limit, offset = None, 0
+        while pipeline and next(iter(pipeline[-1])) in _TRAILING_PAGE_STAGES:
+            stage = pipeline.pop()
+            if "$limit" in stage:
+                limit = stage["$limit"]
+            else:
+                offset = stage["$skip"]
+
+        sort_index = None
+        for index, stage in enumerate(pipeline):
+            if "$sort" in stage:
+                sort_index = index
+
+        if sort_index is None:
+            pipeline.append({"$sort": {"_id": 1}})
+            sort_index = len(pipeline) - 1
+        elif "_id" not in pipeline[sort_index]["$sort"]:
+            pipeline[sort_index]["$sort"]["_id"] = 1
+
+        sort = pipeline[sort_index]["$sort"]
+        sort_keys = [[field, direction] for field, direction in sort.items()]
+        key_fields = {field for field, _ in sort_keys}
+
+        for index, stage in enumerate(pipeline):
+            if "$project" in stage and stage["$project"].get("_id") == 0 and index < sort_index:
+                # Conservar _id para el desempate y ocultarlo en la respuesta
+                del stage["$project"]["_id"]
+                self.hidden_fields.add("_id")
+            elif "$project" in stage and index > sort_index:
+                self._keep_sort_keys(stage["$project"], sort_keys)
+            elif "$unset" in stage and index > sort_index:
+                fields = stage["$unset"] if isinstance(stage["$unset"], list) else [stage["$unset"]]
+                removed = [field for field in fields if field in key_fields]
+                stage["$unset"] = [field for field in fields if field not in key_fields]
+                self.hidden_fields.update(removed)
+
+        query["pipeline"] = [stage for stage in pipeline if stage.get("$unset") != []]
+        self._sort_index = sort_index
+        return query, sort_keys, limit, offset
+
+    def _keep_sort_keys(self, projection, sort_keys):
+        """Añade a un $project posterior al orden las claves de orden que descarta."""
+        inclusion = any(value not in (0, False) for key, value in projection.items() if key != "_id")
+        for field, _ in sort_keys:
+            if projection.get(field, 1) in (0, False):
+                del projection[field]
+                self.hidden_fields.add(field)
+            elif not _keeps_path(projection, field) and inclusion:
+                projection[field] = 1
+                self.hidden_fields.add(field)
+
+    def _apply_page_window(self, keyset_filter, skip, fetch):
+        """Añade el filtro de rango, el salto inicial y el tamaño de la ventana."""
+        if self.query["operation"] == "find":
+            if keyset_filter:
+                base = self.query.get("query") or {}
+                self.query["query"] = {"$and": [base, keyset_filter]} if base else keyset_filter
+            if skip:
+                self.query["skip"] = skip
+            self.query["limit"] = fetch
+            return
+
+        pipeline = self.query["pipeline"]
+        if keyset_filter:
+            # El rango va justo antes de $sort, sobre los campos tal como existen ahí
+            pipeline.insert(self._sort_index, {"$match": keyset_filter})
+        if skip:
+            pipeline.append({"$skip": skip})
+        pipeline.append({"$limit": fetch})
+
+    # --- Construcción de la página ---
+
+    def build_page(self, documents):
+        """
+        Recorta los documentos a la página, genera el token siguiente y oculta los
+        campos añadidos solo para paginar. Debe recibir documentos sin serializar
+        para que el token conserve los tipos BSON de las claves.
+
+        Args:
+            documents (list): Documentos devueltos por la consulta paginada
+
+        Returns:
+            dict: results, page_size, has_more y next_cursor
+        """
+        has_more = len(documents) > self.fetch_size
+        page = documents[:self.fetch_size]
+
+        remaining = None if self.remaining is None else self.remaining - len(page)
+        if remaining is not None and remaining <= 0:
+            has_more = False
+
+        next_cursor = None
+        if has_more and page:
+            last = page[-1]
+            next_cursor = encode_cursor({
+                "v": CURSOR_VERSION,
+                "shape": self.shape,
+                "last": [_get_path(last, field) for field, _ in self.sort_keys],
+                "remaining": remaining,
+            })
+
+        for document in page:
+            for field in self.hidden_fields:
+                _strip_path(document, field)
+
+        return {
+            "results": page,
+            "page_size": self.page_size,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
+        }
@@ -0,0 +1,327 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.parser.sql_ast import parse_sql
+from app.parser.sql_parser import SQLParser
+from app.translator.sql_to_mongodb import SQLToMongoDBTranslator
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Marcador que sustituye a cada literal en la plantilla (se traduce como un string)
+SENTINEL_FORMAT = "__qp{}__"
+_SENTINEL_PREFIX = "__qp"
+
+# Cláusulas cuyos literales se extraen automáticamente
+_LIFTABLE_CLAUSES = ("WHERE", "SET", "VALUES")
+
+_COMPARISON_OPERATORS = {"=", "<>", "!=", ">", "<", ">=", "<="}
+
+# Tokens que pueden seguir a un literal extraído sin formar parte de una expresión
+_LITERAL_FOLLOWERS = {",", ")", ";"}
+
+_NUMBER_REGEX = re.compile(r'^\d+(?:\.\d+)?$')
+_NUMERIC_STRING_REGEX = re.compile(r'^-?[\d.]+$')
+
+
+@dataclass
+class PreparedStatement:
+    """
+    Consulta SQL separada en plantilla (con marcadores) y valores ligados.
+    """
+    sql: str
+    template_sql: str
+    inline_sql: str
+    query_type: Optional[str]
+    values: List[Any] = field(default_factory=list)
+    sentinels: List[str] = field(default_factory=list)
+
+    @property
+    def is_parameterized(self):
+        return len(self.values) > 0
+
+
+def _literal_value(token):
+    """Convierte un token literal al valor que produciría el parser."""
+    if token.kind == "string":
+        return token.value[1:-1]
+    if "." in token.value:
+        return float(token.value)
+    return int(token.value)
+
+
+def _render_literal(value):
+    """Representa un parámetro enviado por el cliente como literal SQL."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _is_liftable_literal(token):
+    """Indica si el literal puede sustituirse sin cambiar la traducción."""
+    if token.kind == "number":
+        return bool(_NUMBER_REGEX.match(token.value))
+    if token.kind == "string":
+        inner = token.value[1:-1]
+        # BETWEEN convierte cadenas numéricas a números: se dejan en línea
+        return _SENTINEL_PREFIX not in inner and not _NUMERIC_STRING_REGEX.match(inner)
+    return False
+
+
+def _find_liftable_tokens(statement):
+    """
+    Localiza los literales de WHERE/SET/VALUES que están en posición de valor:
+    tras un operador de comparación, dentro de listas IN, en BETWEEN ... AND ... o en
+    las tuplas de VALUES. Los patrones LIKE y las expresiones aritméticas no se tocan.
+    """
+    lifted = []
+
+    for clause_name in _LIFTABLE_CLAUSES:
+        clause = statement.clause(clause_name)
+        if not clause:
+            continue
+
+        tokens = clause.tokens
+        paren_stack = []
+        lifted_indexes = set()
+
+        for i, token in enumerate(tokens):
+            if token.value == "(":
+                opener = tokens[i - 1].upper if i > 0 else ""
+                paren_stack.append(opener)
+                continue
+            if token.value == ")":
+                if paren_stack:
+                    paren_stack.pop()
+                continue
+
+            if i == 0 or not _is_liftable_literal(token):
+                continue
+
+            following = tokens[i + 1] if i + 1 < len(tokens) else None
+            if following is not None and following.value not in _LITERAL_FOLLOWERS and following.kind != "word":
+                continue
+
+            previous = tokens[i - 1]
+            in_list = previous.value in ("(", ",") and paren_stack and (
+                clause_name == "VALUES" or paren_stack[-1] == "IN"
+            )
+            after_comparison = previous.value in _COMPARISON_OPERATORS and clause_name != "VALUES"
+            between_low = previous.upper == "BETWEEN"
+            between_high = (
+                previous.upper == "AND" and i >= 3 and (i - 2) in lifted_indexes
+                and tokens[i - 3].upper == "BETWEEN"
+            )
+
+            if in_list or after_comparison or between_low or between_high:
+                lifted_indexes.add(i)
+                lifted.append(token)
+
+    return lifted
+
+
+def prepare_statement(sql_query, params=None, auto_parameterize=True):
+    """
+    Separa una consulta en plantilla y valores.
+
+    Los marcadores "?" y ":nombre" se ligan con params (lista o diccionario). Además,
+    si auto_parameterize está activo, los literales de WHERE/SET/VALUES se extraen
+    automáticamente para que consultas que solo difieren en valores compartan plantilla.
+
+    Args:
+        sql_query (str): Consulta SQL
+        params (list or dict, optional): Valores para los marcadores
+        auto_parameterize (bool): Extraer literales automáticamente
+
+    Returns:
+        PreparedStatement: Consulta preparada
+
+    Raises:
+        ValueError: Si los parámetros no coinciden con los marcadores
+    """
+    statement = parse_sql(sql_query)
+    replacements = []  # (inicio, fin, valor, texto en línea)
+
+    # 1. Marcadores enviados por el cliente
+    placeholders = [token for token in statement.tokens if token.kind == "param"]
+    if placeholders:
+        if params is None:
+            raise ValueError("La consulta contiene marcadores pero no se enviaron 'params'")
+
+        positional = iter(params) if isinstance(params, list) else None
+        for token in placeholders:
+            if token.value == "?":
+                if positional is None:
+                    raise ValueError("Los marcadores '?' requieren 'params' como lista")
+                try:
+                    value = next(positional)
+                except StopIteration:
+                    raise ValueError("Faltan valores en 'params' para los marcadores '?'")
+            else:
+                if not isinstance(params, dict) or token.value[1:] not in params:
+                    raise ValueError(f"Falta el parámetro '{token.value[1:]}' en 'params'")
+                value = params[token.value[1:]]
+
+            if value is not None and not isinstance(value, (str, int, float, bool)):
+                raise ValueError(f"Tipo de parámetro no soportado: {type(value).__name__}")
+            replacements.append((token.start, token.end, value, _render_literal(value)))
+
+        if positional is not None and next(positional, None) is not None:
+            raise ValueError("Se enviaron más valores en 'params' que marcadores '?'")
+    elif params:
+        raise ValueError("Se enviaron 'params' pero la consulta no contiene marcadores")
+
+    # 2. Literales extraídos automáticamente
+    if auto_parameterize and _SENTINEL_PREFIX not in sql_query:
+        for token in _find_liftable_tokens(statement):
+            replacements.append((token.start, token.end, _literal_value(token), token.value))
+
+    replacements.sort(key=lambda item: item[0])
+
+    template_parts, inline_parts = [], []
+    values, sentinels = [], []
+    cursor = 0
+    for index, (start, end, value, inline_text) in enumerate(replacements):
+        sentinel = SENTINEL_FORMAT.format(index)
+        template_parts.append(sql_query[cursor:start])
+        template_parts.append(f"'{sentinel}'")
+        inline_parts.append(sql_query[cursor:start])
+        inline_parts.append(inline_text)
+        values.append(value)
+        sentinels.append(sentinel)
+        cursor = end
+
+    template_parts.append(sql_query[cursor:])
+    inline_parts.append(sql_query[cursor:])
+
+    return PreparedStatement(
+        sql=sql_query,
+        template_sql="".join(template_parts),
+        inline_sql="".join(inline_parts),
+        query_type=statement.query_type,
+        values=values,
+        sentinels=sentinels
+    )
+
+
+def bind_parameters(template, prepared):
+    """
+    Sustituye los marcadores de una traducción plantilla por los valores ligados.
+
+    Args:
+        template: Operación MongoDB traducida a partir de la plantilla
+        prepared (PreparedStatement): Consulta preparada con los valores
+
+    Returns:
+        tuple: (operación con valores, bool indicando si la plantilla era reutilizable).
+        La plantilla no es reutilizable si algún marcador no aparece como valor
+        completo (por ejemplo, quedó embebido en un texto o una expresión regular).
+    """
+    lookup = dict(zip(prepared.sentinels, prepared.values))
+    consumed = set()
+    valid = True
+
+    def substitute(node):
+        nonlocal valid
+        if isinstance(node, dict):
+            result = {}
+            for key, value in node.items():
+                if isinstance(key, str) and _SENTINEL_PREFIX in key:
+                    valid = False
+                result[key] = substitute(value)
+            return result
+        if isinstance(node, list):
+            return [substitute(item) for item in node]
+        if isinstance(node, tuple):
+            return tuple(substitute(item) for item in node)
+        if isinstance(node, str):
+            if node in lookup:
+                consumed.add(node)
+                return lookup[node]
+            if _SENTINEL_PREFIX in node:
+                valid = False
+        return node
+
+    bound = substitute(template)
+    if consumed != set(prepared.sentinels):
+        valid = False
+    return bound, valid
+
+
+def translate_sql(sql_query):
+    """
+    Traduce una consulta SQL completa.
+
+    Returns:
+        tuple: (colección, operación MongoDB)
+
+    Raises:
+        ValueError: Si no se puede determinar la colección
+    """
+    parser = SQLParser(sql_query)
+    collection_name = parser.get_table_name()
+    if not collection_name:
+        logger.error("Error: No se pudo determinar el nombre de la colección")
+        raise ValueError("No se pudo determinar el nombre de la colección")
+
+    mongo_query = SQLToMongoDBTranslator(parser).translate()
+    return collection_name, mongo_query
+
+
+def translate_prepared(prepared, database_name, cache):
+    """
+    Traduce una consulta preparada reutilizando la plantilla cacheada por forma de consulta.
+
+    Args:
+        prepared (PreparedStatement): Consulta preparada
+        database_name (str): Base de datos destino (parte de la clave de cache)
+        cache (TranslationCache): Cache de traducciones
+
+    Returns:
+        dict: Entrada con query_type, collection, mongo_query, shell_query y from_cache
+    """
+    if prepared.is_parameterized:
+        entry = cache.get(prepared.template_sql, database_name)
+
+        if entry is None:
+            try:
+                collection_name, template = translate_sql(prepared.template_sql)
+                _, reusable = bind_parameters(template, prepared)
+            except Exception as e:
+                logger.debug("Plantilla no traducible, se usarán literales en línea: %s", e)
+                collection_name, template, reusable = None, None, False
+
+            entry = cache.put(
+                prepared.template_sql, database_name, prepared.query_type,
+                collection_name, template if reusable else None,
+                parameterizable=reusable
+            )
+            entry["from_cache"] = False
+        else:
+            entry["from_cache"] = True
+
+        if entry.get("parameterizable"):
+            mongo_query, _ = bind_parameters(entry["mongo_query"], prepared)
+            entry["mongo_query"] = mongo_query
+            entry["shell_query"] = None
+            return entry
+
+        logger.debug("Forma de consulta no parametrizable, traduciendo con literales en línea")
+
+    # Consulta sin parámetros (o plantilla no reutilizable): cache por texto completo
+    sql_query = prepared.inline_sql
+    entry = cache.get(sql_query, database_name)
+    if entry is not None:
+        entry["from_cache"] = True
+        return entry
+
+    collection_name, mongo_query = translate_sql(sql_query)
+    entry = cache.put(sql_query, database_name, prepared.query_type, collection_name, mongo_query)
+    entry["from_cache"] = False
+    return entry
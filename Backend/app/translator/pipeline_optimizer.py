@@ -0,0 +1,696 @@
+import copy
+import logging
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Etapas que devuelven exactamente un documento por cada documento de entrada, en orden
+_ONE_TO_ONE_STAGES = ("$lookup", "$project", "$addFields", "$set", "$unset")
+
+# Etapas sin efecto cuando su especificación está vacía
+_EMPTY_NOOP_STAGES = ("$match", "$project", "$addFields", "$set", "$unset", "$sort")
+
+# Máximo de pasadas completas de las reglas (se detiene antes si nada cambia)
+MAX_PASSES = 5
+
+# Posición de cada etapa en el orden en que find() aplica sus opciones
+_FIND_STAGE_ORDER = {"$match": 0, "$sort": 1, "$skip": 2, "$limit": 3}
+
+# Versión mínima del servidor que admite $lookup con localField/foreignField y pipeline a la vez
+CONCISE_LOOKUP_MIN_VERSION = (5, 0)
+
+
+def _stage_name(stage):
+    """Nombre del operador de una etapa ($match, $lookup...) o None si no es válida."""
+    if isinstance(stage, dict) and len(stage) == 1:
+        return next(iter(stage))
+    return None
+
+
+def _match_conjuncts(condition):
+    """Divide un filtro $match en condiciones que se combinan con AND."""
+    conjuncts = []
+    for key, value in condition.items():
+        if key == "$and" and isinstance(value, list):
+            for item in value:
+                conjuncts.extend(_match_conjuncts(item))
+        else:
+            conjuncts.append({key: value})
+    return conjuncts
+
+
+def _combine_conjuncts(conjuncts):
+    """Une condiciones en un filtro: un solo dict si las claves no se repiten, $and si no."""
+    combined = {}
+    for conjunct in conjuncts:
+        if any(key in combined for key in conjunct):
+            return {"$and": conjuncts}
+        combined.update(conjunct)
+    return combined
+
+
+def _filter_fields(condition):
+    """
+    Rutas de campo que usa un filtro de consulta (claves que no son operadores).
+    Devuelve None si el filtro usa $expr, $where u otros operadores que pueden
+    referirse a cualquier campo.
+    """
+    fields = set()
+    for key, value in condition.items():
+        if key in ("$and", "$or", "$nor"):
+            if not isinstance(value, list):
+                return None
+            for item in value:
+                nested = _filter_fields(item) if isinstance(item, dict) else None
+                if nested is None:
+                    return None
+                fields |= nested
+        elif key.startswith("$"):
+            return None
+        else:
+            fields.add(key)
+    return fields
+
+
+def _strip_prefix_in_filter(condition, prefix):
+    """Quita prefix de las rutas de campo de un filtro (p_joined.total -> total)."""
+    stripped = {}
+    for key, value in condition.items():
+        if key in ("$and", "$or", "$nor"):
+            stripped[key] = [_strip_prefix_in_filter(item, prefix) for item in value]
+        else:
+            stripped[key[len(prefix):] if key.startswith(prefix) else key] = value
+    return stripped
+
+
+def _collect_references(value, field, references):
+    """
+    Añade a references las subrutas de field usadas en value ("$field.x" o claves
+    "field.x"). Devuelve False si field se usa completo o por una variable de sistema.
+    """
+    if isinstance(value, str):
+        if value == f"${field}" or value.startswith("$$ROOT") or value.startswith("$$CURRENT"):
+            return False
+        if value.startswith(f"${field}."):
+            references.add(value[len(field) + 2:])
+        return True
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == field:
+                return False
+            if key.startswith(f"{field}."):
+                references.add(key[len(field) + 1:])
+            if not _collect_references(item, field, references):
+                return False
+        return True
+    if isinstance(value, list):
+        return all(_collect_references(item, field, references) for item in value)
+    return True
+
+
+def _is_inner_unwind(stage, field):
+    """$unwind del campo field que descarta los documentos sin coincidencias."""
+    if _stage_name(stage) != "$unwind":
+        return False
+    spec = stage["$unwind"]
+    if isinstance(spec, str):
+        return spec == f"${field}"
+    return spec.get("path") == f"${field}" and not spec.get("preserveNullAndEmptyArrays", False) \
+        and "includeArrayIndex" not in spec
+
+
+def _is_non_empty_match(stage, field):
+    """$match {field: {"$ne": []}} que añade la traducción de INNER JOIN."""
+    return _stage_name(stage) == "$match" and stage["$match"] == {field: {"$ne": []}}
+
+
+def drop_noop_stages(pipeline):
+    """
+    Elimina etapas sin efecto ($match/$project/$sort/... vacíos, $skip 0) y las claves
+    auxiliares de $lookup que no forman parte de la especificación (_index_hint...).
+    """
+    optimized = []
+    for stage in pipeline:
+        name = _stage_name(stage)
+        spec = stage.get(name) if name else None
+
+        if name in _EMPTY_NOOP_STAGES and not spec:
+            continue
+        if name == "$skip" and spec == 0:
+            continue
+        if name == "$lookup" and isinstance(spec, dict) and any(key.startswith("_") for key in spec):
+            stage = {"$lookup": {key: value for key, value in spec.items() if not key.startswith("_")}}
+
+        optimized.append(stage)
+    return optimized
+
+
+def fuse_adjacent_stages(pipeline):
+    """
+    Fusiona etapas consecutivas equivalentes a una sola: $match + $match,
+    $project + $project (cuando la segunda solo selecciona o renombra campos de la
+    primera), $unset + $unset, $limit + $limit y $skip + $skip.
+    """
+    optimized = []
+    for stage in pipeline:
+        previous = optimized[-1] if optimized else None
+        fused = _fuse_pair(previous, stage) if previous is not None else None
+        if fused is not None:
+            optimized[-1] = fused
+        else:
+            optimized.append(stage)
+    return optimized
+
+
+def _fuse_pair(first, second):
+    """Etapa equivalente a first seguida de second, o None si no se pueden fusionar."""
+    name = _stage_name(first)
+    if name is None or name != _stage_name(second):
+        return None
+
+    if name == "$match":
+        return {"$match": _combine_conjuncts(_match_conjuncts(first["$match"]) + _match_conjuncts(second["$match"]))}
+    if name == "$limit":
+        return {"$limit": min(first["$limit"], second["$limit"])}
+    if name == "$skip":
+        return {"$skip": first["$skip"] + second["$skip"]}
+    if name == "$unset":
+        fields = [first["$unset"]] if isinstance(first["$unset"], str) else list(first["$unset"])
+        for field in [second["$unset"]] if isinstance(second["$unset"], str) else second["$unset"]:
+            if field not in fields:
+                fields.append(field)
+        return {"$unset": fields}
+    if name == "$project":
+        return _fuse_projects(first["$project"], second["$project"])
+    return None
+
+
+def _fuse_projects(first, second):
+    """
+    Compone dos proyecciones de inclusión. La segunda solo puede incluir (1/True),
+    excluir _id o referenciar con "$campo" campos de nivel superior que la primera
+    produce; cualquier otro caso no se fusiona.
+    """
+    def is_inclusion(value):
+        return value is True or (isinstance(value, int) and not isinstance(value, bool) and value == 1)
+
+    if any(value in (0, False) for key, value in first.items() if key != "_id"):
+        return None
+
+    fused = {}
+    for key, value in second.items():
+        if key == "_id":
+            if value in (0, False):
+                fused["_id"] = 0
+            elif is_inclusion(value):
+                if "_id" in first:
+                    fused["_id"] = first["_id"]
+            else:
+                return None
+            continue
+
+        if is_inclusion(value):
+            source = key
+        elif isinstance(value, str) and value.startswith("$") and not value.startswith("$$") and "." not in value:
+            source = value[1:]
+        else:
+            return None
+
+        if source not in first or source == "_id":
+            return None
+        expression = first[source]
+        fused[key] = f"${source}" if is_inclusion(expression) and key != source else expression
+
+    if "_id" not in second:
+        # La segunda proyección conserva el _id que produzca la primera
+        if "_id" in first:
+            fused["_id"] = first["_id"]
+    return {"$project": fused}
+
+
+def push_match_into_lookup(pipeline):
+    """
+    Mueve a la sub-pipeline de un $lookup las condiciones de un $match posterior que
+    solo usan campos del array unido, cuando entre ambos hay un $unwind de ese array
+    sin preserveNullAndEmptyArrays (INNER JOIN). Filtrar antes de unir equivale a
+    filtrar los documentos desenrollados y evita traer filas que se descartan.
+
+    Usa la sintaxis concisa de $lookup (localField/foreignField con pipeline), que
+    requiere MongoDB 5.0+; en servidores anteriores el conector la convierte con
+    expand_concise_lookups.
+    """
+    optimized = list(pipeline)
+
+    for index, stage in enumerate(optimized):
+        if _stage_name(stage) != "$match":
+            continue
+
+        remaining = _match_conjuncts(stage["$match"])
+        for lookup_index in _lookups_before(optimized, index):
+            lookup = optimized[lookup_index]["$lookup"]
+            field = lookup["as"]
+            between = optimized[lookup_index + 1:index]
+            if not any(_is_inner_unwind(item, field) for item in between):
+                continue
+
+            prefix = f"{field}."
+            pushed, kept = [], []
+            for conjunct in remaining:
+                fields = _filter_fields(conjunct)
+                if fields and all(path.startswith(prefix) for path in fields):
+                    pushed.append(_strip_prefix_in_filter(conjunct, prefix))
+                else:
+                    kept.append(conjunct)
+
+            if pushed:
+                sub_pipeline = list(lookup.get("pipeline", []))
+                sub_pipeline.append({"$match": _combine_conjuncts(pushed)})
+                optimized[lookup_index] = {"$lookup": {**lookup, "pipeline": fuse_adjacent_stages(sub_pipeline)}}
+                remaining = kept
+
+        if len(remaining) != len(_match_conjuncts(stage["$match"])):
+            optimized[index] = {"$match": _combine_conjuncts(remaining) if remaining else {}}
+
+    return optimized
+
+
+def _lookups_before(pipeline, index):
+    """
+    Índices de los $lookup con localField/foreignField que preceden a index y de los
+    que solo los separan etapas de la propia traducción de JOIN ($lookup, $unwind,
+    $match de arrays no vacíos u otros $match).
+    """
+    lookups = []
+    for position in range(index - 1, -1, -1):
+        name = _stage_name(pipeline[position])
+        if name == "$lookup":
+            spec = pipeline[position]["$lookup"]
+            if "localField" in spec and "foreignField" in spec and isinstance(spec.get("as"), str):
+                lookups.append(position)
+        elif name not in ("$unwind", "$match"):
+            break
+    return lookups
+
+
+def push_project_into_lookup(pipeline):
+    """
+    Añade a la sub-pipeline de cada $lookup un $project con solo los campos del
+    documento unido que usan las etapas posteriores. Si alguna etapa usa el array
+    completo (por ejemplo, SELECT * con "p_data": "$p_joined") no se modifica.
+    """
+    optimized = list(pipeline)
+
+    for index, stage in enumerate(optimized):
+        if _stage_name(stage) != "$lookup":
+            continue
+        lookup = stage["$lookup"]
+        field = lookup.get("as")
+        if not isinstance(field, str) or "localField" not in lookup or "foreignField" not in lookup:
+            continue
+        if any(_stage_name(item) == "$project" for item in lookup.get("pipeline", [])):
+            continue
+
+        references = set()
+        usable = True
+        later = optimized[index + 1:]
+        for item in later:
+            if _is_inner_unwind(item, field) or _is_non_empty_match(item, field):
+                continue
+            if _stage_name(item) == "$unwind" and _unwind_path(item) == f"${field}":
+                continue
+            if _stage_name(item) == "$lookup":
+                # localField es una ruta sin '$' (JOIN encadenado: p_joined.producto_id)
+                local_field = item["$lookup"].get("localField")
+                if local_field == field:
+                    usable = False
+                    break
+                if isinstance(local_field, str) and local_field.startswith(f"{field}."):
+                    references.add(local_field[len(field) + 1:])
+            if not _collect_references(item, field, references):
+                usable = False
+                break
+
+        # Sin referencias no se sabe qué campos hacen falta (p. ej. el resultado final es el documento)
+        if not usable or not references or not _ends_with_project(later):
+            continue
+
+        # Una ruta y su prefijo no pueden proyectarse a la vez
+        paths = sorted(references)
+        projection = {}
+        for path in paths:
+            if not any(path.startswith(f"{kept}.") for kept in projection):
+                projection[path] = 1
+        if not any(path == "_id" or path.startswith("_id.") for path in projection):
+            projection["_id"] = 0
+
+        sub_pipeline = list(lookup.get("pipeline", [])) + [{"$project": projection}]
+        optimized[index] = {"$lookup": {**lookup, "pipeline": sub_pipeline}}
+
+    return optimized
+
+
+def _unwind_path(stage):
+    spec = stage["$unwind"]
+    return spec if isinstance(spec, str) else spec.get("path")
+
+
+def _ends_with_project(stages):
+    """True si un $project posterior define por completo la forma de los resultados."""
+    for stage in stages:
+        name = _stage_name(stage)
+        if name == "$project":
+            return True
+        if name in ("$group", "$replaceRoot", "$replaceWith"):
+            return True
+    return False
+
+
+def move_limit_before_lookup(pipeline):
+    """
+    Adelanta $limit (con su $skip) por delante de los $lookup cuando las etapas que
+    cruza no cambian el orden ni eliminan documentos. Si cruza un $unwind con
+    preserveNullAndEmptyArrays (que puede multiplicar documentos), se deja además el
+    $limit original tras él.
+    """
+    optimized = list(pipeline)
+    index = 0
+    while index < len(optimized):
+        if _stage_name(optimized[index]) != "$limit":
+            index += 1
+            continue
+
+        limit = optimized[index]["$limit"]
+        skip = 0
+        block_start = index
+        if index > 0 and _stage_name(optimized[index - 1]) == "$skip":
+            skip = optimized[index - 1]["$skip"]
+            block_start = index - 1
+
+        target = block_start
+        multiplies = False
+        crosses_lookup = False
+        while target > 0:
+            previous = optimized[target - 1]
+            name = _stage_name(previous)
+            if name in _ONE_TO_ONE_STAGES:
+                crosses_lookup = crosses_lookup or name == "$lookup"
+            elif name == "$unwind" and isinstance(previous["$unwind"], dict) \
+                    and previous["$unwind"].get("preserveNullAndEmptyArrays") \
+                    and "includeArrayIndex" not in previous["$unwind"]:
+                multiplies = True
+            else:
+                break
+            target -= 1
+
+        if not crosses_lookup:
+            index += 1
+            continue
+
+        if multiplies:
+            # Cada documento produce al menos uno: bastan los skip + limit primeros
+            optimized.insert(target, {"$limit": skip + limit})
+            index += 2
+        else:
+            block = optimized[block_start:index + 1]
+            del optimized[block_start:index + 1]
+            optimized[target:target] = block
+            index += 1
+
+    return optimized
+
+
+# Reglas en el orden en que se aplican en cada pasada
+RULES = (
+    ("drop_noop_stages", drop_noop_stages),
+    ("push_match_into_lookup", push_match_into_lookup),
+    ("push_project_into_lookup", push_project_into_lookup),
+    ("move_limit_before_lookup", move_limit_before_lookup),
+    ("fuse_adjacent_stages", fuse_adjacent_stages),
+)
+
+
+def _expand_lookup(lookup):
+    """$lookup conciso equivalente con let y $expr (los valores del campo se comparan con $eq)."""
+    let = dict(lookup.get("let", {}))
+    variable = "local_key"
+    while variable in let:
+        variable += "_"
+    let[variable] = f"${lookup['localField']}"
+
+    key_match = {"$match": {"$expr": {"$eq": [f"${lookup['foreignField']}", f"$${variable}"]}}}
+    return {
+        "from": lookup["from"],
+        "let": let,
+        "pipeline": [key_match] + expand_concise_lookups(lookup["pipeline"]),
+        "as": lookup["as"]
+    }
+
+
+def expand_concise_lookups(node):
+    """
+    Sustituye los $lookup con localField/foreignField y pipeline (sintaxis concisa,
+    MongoDB 5.0+) por la forma con let y $expr que admiten los servidores anteriores.
+    Recorre cualquier estructura (pipelines, ramas de $unionWith, sub-pipelines,
+    operaciones traducidas completas) y devuelve una copia; los $lookup sin pipeline
+    se dejan igual.
+
+    Args:
+        node: Pipeline, etapa u operación traducida
+
+    Returns:
+        Copia con los $lookup convertidos
+    """
+    if isinstance(node, list):
+        return [expand_concise_lookups(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+
+    expanded = {}
+    for key, value in node.items():
+        if key == "$lookup" and isinstance(value, dict) and "pipeline" in value \
+                and "localField" in value and "foreignField" in value:
+            expanded[key] = _expand_lookup(value)
+        else:
+            expanded[key] = expand_concise_lookups(value)
+    return expanded
+
+
+def optimize_pipeline(pipeline):
+    """
+    Aplica las reglas de optimización a un pipeline de agregación hasta que deja de
+    cambiar. El pipeline recibido no se modifica.
+
+    Args:
+        pipeline (list): Etapas generadas por el traductor
+
+    Returns:
+        list: Pipeline equivalente optimizado
+    """
+    optimized = copy.deepcopy(pipeline)
+
+    for _ in range(MAX_PASSES):
+        previous = optimized
+        for name, rule in RULES:
+            result = rule(optimized)
+            if result != optimized:
+                logger.debug("Regla de optimización aplicada: %s", name)
+            optimized = result
+        if optimized == previous:
+            break
+
+    return optimized
+
+
+def _is_plain_projection(projection):
+    """Proyección de campos sin expresiones: solo inclusiones o exclusiones (1/0)."""
+    return isinstance(projection, dict) and projection and all(
+        not key.startswith("$") and (value is True or value is False or value in (0, 1))
+        for key, value in projection.items()
+    )
+
+
+def _projection_keeps(projection, field):
+    """Indica si field sigue disponible después de aplicar una proyección simple."""
+    included = [key for key, value in projection.items() if value and key != "_id"]
+    if field == "_id" or field.startswith("_id."):
+        return bool(projection.get("_id", 1))
+    if not included:
+        # Proyección de exclusión
+        return not any(field == key or field.startswith(key + ".") for key, value in projection.items() if not value)
+    return any(field == key or field.startswith(key + ".") for key in included)
+
+
+def pipeline_as_find(pipeline):
+    """
+    Comprueba si un pipeline equivale a una consulta find() y devuelve sus opciones.
+    Solo se aceptan $match, $sort, $skip y $limit (en ese orden, como los aplica find)
+    y un $project de campos simples; el $project puede ir antes del $sort si conserva
+    los campos de ordenación.
+
+    Args:
+        pipeline (list): Pipeline ya optimizado
+
+    Returns:
+        dict: query, projection, sort, skip y limit para find(), o None si no es posible
+    """
+    find_spec = {"query": {}}
+    last_position = -1
+    projected = None
+
+    for stage in pipeline:
+        name = _stage_name(stage)
+        spec = stage.get(name) if name else None
+
+        if name == "$project":
+            if projected is not None or not _is_plain_projection(spec):
+                return None
+            projected = spec
+            find_spec["projection"] = spec
+            continue
+
+        position = _FIND_STAGE_ORDER.get(name)
+        if position is None or position <= last_position:
+            return None
+        last_position = position
+
+        if name == "$match":
+            if projected is not None or not isinstance(spec, dict):
+                return None
+            find_spec["query"] = spec
+        elif name == "$sort":
+            if not isinstance(spec, dict) or any(direction not in (1, -1) for direction in spec.values()):
+                return None
+            if projected is not None and not all(_projection_keeps(projected, field) for field in spec):
+                return None
+            find_spec["sort"] = spec
+        elif name == "$skip":
+            if not isinstance(spec, int) or spec < 0:
+                return None
+            find_spec["skip"] = spec
+        elif name == "$limit":
+            if not isinstance(spec, int) or spec <= 0:
+                return None
+            find_spec["limit"] = spec
+
+    return find_spec
+
+
+def pipeline_as_count(pipeline):
+    """
+    Comprueba si un pipeline es un SELECT COUNT(*) [WHERE ...] sin agrupar: un $match
+    opcional, un $group con _id null que suma 1 y el $project del alias.
+
+    Args:
+        pipeline (list): Pipeline ya optimizado
+
+    Returns:
+        dict: query (filtro) y field (nombre del resultado), o None si no es un conteo simple
+    """
+    stages = list(pipeline)
+
+    # Un $limit final no cambia un resultado de un solo documento
+    if stages and _stage_name(stages[-1]) == "$limit" and isinstance(stages[-1]["$limit"], int) \
+            and stages[-1]["$limit"] >= 1:
+        stages.pop()
+
+    query = {}
+    if stages and _stage_name(stages[0]) == "$match":
+        query = stages.pop(0)["$match"]
+
+    if [_stage_name(stage) for stage in stages] != ["$group", "$project"]:
+        return None
+
+    group, project = stages[0]["$group"], stages[1]["$project"]
+    if len(group) != 2 or group.get("_id", 0) is not None:
+        return None
+    counter = next(key for key in group if key != "_id")
+    if group[counter] != {"$sum": 1}:
+        return None
+
+    outputs = [key for key in project if key != "_id"]
+    if project.get("_id", 1) or len(outputs) != 1 or project[outputs[0]] != f"${counter}":
+        return None
+
+    return {"query": query, "field": outputs[0]}
+
+
+def pipeline_as_distinct(pipeline):
+    """
+    Comprueba si un pipeline es un SELECT DISTINCT de una sola columna: un $match
+    opcional, el $group por el campo, el $project de su alias y, opcionalmente,
+    $sort por ese alias, $skip y $limit.
+
+    Args:
+        pipeline (list): Pipeline ya optimizado
+
+    Returns:
+        dict: query, field, output y, si existen, sort (1/-1), skip y limit;
+            None si no es un DISTINCT de una columna
+    """
+    stages = list(pipeline)
+
+    distinct_spec = {"query": {}}
+    if stages and _stage_name(stages[0]) == "$match":
+        distinct_spec["query"] = stages.pop(0)["$match"]
+
+    if len(stages) < 2 or _stage_name(stages[0]) != "$group" or _stage_name(stages[1]) != "$project":
+        return None
+    group, project = stages[0]["$group"], stages[1]["$project"]
+
+    group_key = group.get("_id")
+    if len(group) != 1 or not isinstance(group_key, dict) or len(group_key) != 1:
+        return None
+    field, source = next(iter(group_key.items()))
+    if source != f"${field}":
+        return None
+
+    outputs = [key for key in project if key != "_id"]
+    if project.get("_id", 1) or len(outputs) != 1 or project[outputs[0]] != f"$_id.{field}":
+        return None
+    distinct_spec.update(field=field, output=outputs[0])
+
+    # Opciones posteriores, en el orden en que se aplican
+    last_position = -1
+    for stage in stages[2:]:
+        name = _stage_name(stage)
+        position = {"$sort": 0, "$skip": 1, "$limit": 2}.get(name)
+        if position is None or position <= last_position:
+            return None
+        last_position = position
+
+        spec = stage[name]
+        if name == "$sort":
+            if list(spec) != [distinct_spec["output"]] or spec[distinct_spec["output"]] not in (1, -1):
+                return None
+            distinct_spec["sort"] = spec[distinct_spec["output"]]
+        elif not isinstance(spec, int) or spec < (0 if name == "$skip" else 1):
+            return None
+        else:
+            distinct_spec[name[1:]] = spec
+
+    return distinct_spec
+
+
+def find_as_pipeline(find_query):
+    """
+    Pipeline equivalente a una operación find (inverso de pipeline_as_find), para
+    combinarla con otras etapas, por ejemplo como rama de $unionWith.
+
+    Args:
+        find_query (dict): Operación find con query, projection, sort, skip y limit
+
+    Returns:
+        list: Etapas del pipeline
+    """
+    pipeline = []
+    if find_query.get("query"):
+        pipeline.append({"$match": find_query["query"]})
+    if find_query.get("sort"):
+        pipeline.append({"$sort": find_query["sort"]})
+    if find_query.get("skip"):
+        pipeline.append({"$skip": find_query["skip"]})
+    if find_query.get("limit"):
+        pipeline.append({"$limit": find_query["limit"]})
+    if find_query.get("projection"):
+        pipeline.append({"$project": find_query["projection"]})
+    return pipeline
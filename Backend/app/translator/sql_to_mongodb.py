@@ -1,10 +1,40 @@
+import time
 import logging
+import functools
 import re as regex
 from app.parser.sql_parser import SQLParser
+from app.parser.sql_ast import parse_sql
+from app.translator.pipeline_optimizer import (
+    find_as_pipeline, optimize_pipeline, pipeline_as_count, pipeline_as_distinct, pipeline_as_find
+)
+from app.translator.expression_compiler import compile_set_clause, is_constant
+from app.translator.subqueries import (
+    build_semi_join, insert_semi_joins, parse_subquery_predicate, split_conjuncts, strip_filter_qualifiers,
+    table_qualifiers
+)
+from app.explain import EXPLAINABLE_OPERATIONS
+from app.instrumentation import timed
+from app.metrics import TRANSLATION_LATENCY
+from app.log_config import truncated
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
+# Etapas que eliminan los documentos repetidos del resultado acumulado de un UNION
+UNION_DEDUP_STAGES = ({"$group": {"_id": "$$ROOT"}}, {"$replaceRoot": {"newRoot": "$_id"}})
+
+
+def _observe_translation(method):
+    """Registra la duración de cada traducción completada por tipo de consulta."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        TRANSLATION_LATENCY.observe(time.perf_counter() - started, query_type=self.sql_parser.get_query_type() or "UNKNOWN")
+        return result
+    return wrapper
+
+
 class SQLToMongoDBTranslator:
     """
     Traductor de consultas SQL a operaciones MongoDB.
@@ -23,6 +53,8 @@ class SQLToMongoDBTranslator:
         # 🆕 Lista para almacenar advertencias durante la traducción
         self.warnings = []
     
+    @timed("translate")
+    @_observe_translation
     def translate(self, sql_query=None):
         """
         Traduce una consulta SQL a formato MongoDB.
@@ -47,14 +79,18 @@ class SQLToMongoDBTranslator:
         
         # 🆕 Analizar complejidad de la consulta
         complexity_info = self.sql_parser.analyze_query_complexity()
-        logger.info(f"Complejidad de consulta: {complexity_info['complexity_level']}")
+        logger.debug("Complejidad de consulta: %s", complexity_info['complexity_level'])
         
         # Determinar el tipo de consulta y llamar al método de traducción adecuado
         query_type = self.sql_parser.get_query_type()
-        logger.info(f"Traduciendo consulta de tipo: {query_type}")
+        logger.debug("Traduciendo consulta de tipo: %s", query_type)
+        
+        explain_mode = self.sql_parser.get_explain_mode()
+        if explain_mode:
+            return self._translate_explain(query_type, explain_mode)
         
         if query_type == "SELECT":
-            return self.translate_select()
+            return self._optimize_result(self.translate_select())
         elif query_type == "INSERT":
             return self.translate_insert()
         elif query_type == "UPDATE":
@@ -69,6 +105,73 @@ class SQLToMongoDBTranslator:
             raise ValueError(f"Tipo de consulta no soportado: {query_type}")
     
 
+    def _translate_explain(self, query_type, verbosity):
+        """
+        Traduce EXPLAIN [ANALYZE] SELECT ... a una operación explain sobre el find o
+        aggregate que genera la consulta.
+        
+        Args:
+            query_type (str): Tipo de la sentencia explicada
+            verbosity (str): "queryPlanner" (EXPLAIN) o "executionStats" (EXPLAIN ANALYZE)
+            
+        Returns:
+            dict: Operación explain con la consulta traducida en "query"
+        """
+        if query_type != "SELECT":
+            raise ValueError(f"EXPLAIN solo está soportado para consultas SELECT (recibido: {query_type})")
+        
+        explained = self._optimize_result(self.translate_select())
+        if explained.get("operation") not in EXPLAINABLE_OPERATIONS:
+            raise ValueError(f"EXPLAIN no está soportado para la operación {explained.get('operation')}")
+        
+        return {
+            "operation": "explain",
+            "collection": explained.get("collection", self.sql_parser.get_table_name()),
+            "verbosity": verbosity,
+            "query": explained
+        }
+
+    def _optimize_result(self, result):
+        """
+        Aplica el optimizador de pipelines a las traducciones que usan aggregate y,
+        si el pipeline resultante es una consulta simple, lo convierte en find()
+        (más barato y compatible con índices que cubren la consulta). Un COUNT(*)
+        sin GROUP BY ni HAVING se convierte en la operación count y un DISTINCT de
+        una columna en la operación distinct, que no recorren los documentos por el
+        pipeline.
+        
+        Args:
+            result (dict): Operación MongoDB traducida
+            
+        Returns:
+            dict: La misma operación con el pipeline optimizado, o la operación find, count o distinct equivalente
+        """
+        if not (isinstance(result, dict) and result.get("operation") == "aggregate" and result.get("pipeline")):
+            return result
+        
+        result["pipeline"] = optimize_pipeline(result["pipeline"])
+        
+        # Con GROUP BY o HAVING el conteo no es un único total de la colección
+        grouped = self.sql_parser.has_group_by() or self.sql_parser.has_having()
+        for operation, as_operation in (("count", pipeline_as_count), ("distinct", pipeline_as_distinct)):
+            if operation == "count" and grouped:
+                continue
+            spec = as_operation(result["pipeline"])
+            if spec is not None:
+                logger.debug("Pipeline convertido en %s", operation)
+                downgraded = {key: value for key, value in result.items() if key != "pipeline"}
+                downgraded.update(spec, operation=operation)
+                return downgraded
+        
+        find_spec = pipeline_as_find(result["pipeline"])
+        if find_spec is None:
+            return result
+        
+        logger.debug("Pipeline de %s etapas convertido en find", len(result["pipeline"]))
+        downgraded = {key: value for key, value in result.items() if key != "pipeline"}
+        downgraded.update(find_spec, operation="find")
+        return downgraded
+
     def translate_select(self):
         """
         Traduce una consulta SELECT a operaciones de MongoDB.
@@ -102,7 +205,7 @@ class SQLToMongoDBTranslator:
                 func_name = func.get('function_name', '').upper()
                 if func_name in aggregate_function_names:
                     has_aggregate = True
-                    logger.info(f"🔢 Función de agregación detectada: {func_name}")
+                    logger.debug("🔢 Función de agregación detectada: %s", func_name)
                     break
         
         # ✅ NUEVO: Detectar GROUP BY
@@ -111,27 +214,34 @@ class SQLToMongoDBTranslator:
             group_by = self.sql_parser.get_group_by()
             has_group_by = len(group_by) > 0 if group_by else False
         
-        logger.info(f"Características detectadas - Agregaciones: {has_aggregate}, GROUP BY: {has_group_by}, ORDER BY: {has_order_by}")
+        logger.debug("Características detectadas - Agregaciones: %s, GROUP BY: %s, ORDER BY: %s", has_aggregate, has_group_by, has_order_by)
+        
+        # Subconsultas [NOT] IN / [NOT] EXISTS en WHERE: semi-join con $lookup
+        if has_subquery and not has_union and not has_joins:
+            translated = self._translate_select_with_subqueries()
+            if translated is not None:
+                return translated
+            self.warnings.append("Subconsulta no soportada: solo se traducen condiciones [NOT] IN / [NOT] EXISTS (SELECT ...) del WHERE unidas con AND")
         
         # ✅ CORREGIDA: Lógica de decisión para determinar el tipo de operación
         if has_union:
-            # UNION requiere manejo especial
-            self.warnings.append("UNION detectado - requiere MongoDB 4.4+ o queries separadas")
+            # UNION se combina con $unionWith (MongoDB 4.4+); el conector ejecuta las ramas por separado en servidores anteriores
+            self.warnings.append("UNION se ejecuta con $unionWith (MongoDB 4.4+) o, si no está disponible, rama a rama")
             return self._translate_select_union()
         
         elif has_joins:
             # JOINs requieren pipeline de agregación con $lookup
-            logger.info("JOINs detectados - usando pipeline de agregación")
+            logger.debug("JOINs detectados - usando pipeline de agregación")
             return self._translate_select_with_joins()
         
         elif has_aggregate or has_group_by or has_having or has_distinct or has_order_by:
             # ✅ CRÍTICO: Usar aggregate para consultas con funciones agregadas
-            logger.info("Características avanzadas detectadas (agregaciones/ORDER BY) - usando pipeline de agregación")
+            logger.debug("Características avanzadas detectadas (agregaciones/ORDER BY) - usando pipeline de agregación")
             return self._translate_select_aggregate()
         
         else:
             # Usar find para consultas simples
-            logger.info("Consulta simple - usando operación find")
+            logger.debug("Consulta simple - usando operación find")
             return self._translate_select_find()
 
 
@@ -174,7 +284,7 @@ class SQLToMongoDBTranslator:
                     ]
                     
                     if any(func in field_upper for func in sql_functions):
-                        logger.info(f" Función SQL detectada en '{field}' - redirigiendo a aggregate")
+                        logger.debug(" Función SQL detectada en '%s' - redirigiendo a aggregate", field)
                         return self._translate_select_aggregate()
         
         # Si llegamos aquí, es una consulta simple sin funciones
@@ -197,6 +307,10 @@ class SQLToMongoDBTranslator:
         if order_by:
             result["sort"] = order_by
         
+        offset = self.sql_parser.get_offset()
+        if offset:
+            result["skip"] = offset
+        
         limit = self.sql_parser.get_limit()
         if limit is not None:
             result["limit"] = limit
@@ -204,7 +318,7 @@ class SQLToMongoDBTranslator:
         if self.warnings:
             result["warnings"] = self.warnings
                 
-        logger.debug(f"Consulta MongoDB generada: {result}")
+        logger.debug("Consulta MongoDB generada: %s", truncated(result))
         return result
 
 
@@ -241,7 +355,7 @@ class SQLToMongoDBTranslator:
             for field_name in order_by.keys():
                 if any(numeric_field in field_name.lower() for numeric_field in numeric_fields):
                     needs_numeric_conversion = True
-                    logger.info(f" Campo numérico detectado para ORDER BY: {field_name}")
+                    logger.debug(" Campo numérico detectado para ORDER BY: %s", field_name)
                     break
         
         # 🔧 NUEVO: 2.5. Agregar conversión de tipos si es necesario para ORDER BY
@@ -260,7 +374,7 @@ class SQLToMongoDBTranslator:
                             "onNull": 0    # Si es null, usar 0
                         }
                     }
-                    logger.info(f" Conversión agregada: {field_name} -> {field_name}_numeric")
+                    logger.debug(" Conversión agregada: %s -> %s_numeric", field_name, field_name)
             
             if conversion_stage["$addFields"]:
                 pipeline.append(conversion_stage)
@@ -290,7 +404,7 @@ class SQLToMongoDBTranslator:
         
         # ✅ 7. CORREGIDO: Etapa $sort para ORDER BY con conversión numérica
         if order_by:
-            logger.info(f" ORDER BY en aggregate detectado: {order_by}, tipo: {type(order_by)}")
+            logger.debug(" ORDER BY en aggregate detectado: %s, tipo: %s", order_by, type(order_by))
             
             sort_stage = {"$sort": {}}
             
@@ -303,7 +417,7 @@ class SQLToMongoDBTranslator:
                         numeric_fields = ['salario', 'precio', 'cantidad', 'edad', 'id', 'numero', 'monto', 'total']
                         if any(numeric_field in field_name.lower() for numeric_field in numeric_fields):
                             sort_field = f"{field_name}_numeric"
-                            logger.info(f" Usando campo convertido para ORDER BY: {sort_field}")
+                            logger.debug(" Usando campo convertido para ORDER BY: %s", sort_field)
                         else:
                             sort_field = field_name
                     else:
@@ -311,7 +425,7 @@ class SQLToMongoDBTranslator:
                     
                     sort_stage["$sort"][sort_field] = direction
                 
-                logger.info(f" ORDER BY aplicado: {sort_stage['$sort']}")
+                logger.debug(" ORDER BY aplicado: %s", sort_stage['$sort'])
                 
             elif isinstance(order_by, list):
                 # Si es una lista de objetos [{"field": "salario", "order": "DESC"}]
@@ -335,12 +449,12 @@ class SQLToMongoDBTranslator:
                         # Si es un string simple
                         sort_stage["$sort"][order_info] = 1
                 
-                logger.info(f" ORDER BY procesado desde lista: {sort_stage['$sort']}")
+                logger.debug(" ORDER BY procesado desde lista: %s", sort_stage['$sort'])
             
             # Solo agregar si se configuró correctamente
             if sort_stage["$sort"]:
                 pipeline.append(sort_stage)
-                logger.info(f" $sort agregado al pipeline: {sort_stage}")
+                logger.debug(" $sort agregado al pipeline: %s", truncated(sort_stage))
         
         # 🔧 NUEVO: 7.5. Limpiar campos temporales de conversión si se agregaron
         if needs_numeric_conversion and order_by:
@@ -353,7 +467,12 @@ class SQLToMongoDBTranslator:
             
             if cleanup_stage["$unset"]:
                 pipeline.append(cleanup_stage)
-                logger.info(f" Limpiando campos temporales: {cleanup_stage['$unset']}")
+                logger.debug(" Limpiando campos temporales: %s", cleanup_stage['$unset'])
+        
+        # OFFSET siempre antes de $limit
+        offset = self.sql_parser.get_offset()
+        if offset:
+            pipeline.append({"$skip": offset})
         
         # ✅ 8. CORREGIDO: Etapa $limit para LIMIT
         if hasattr(self.sql_parser, 'get_limit'):
@@ -362,7 +481,7 @@ class SQLToMongoDBTranslator:
                 pipeline.append({
                     "$limit": limit
                 })
-                logger.info(f" $limit agregado: {limit}")
+                logger.debug(" $limit agregado: %s", limit)
         
         result = {
             "operation": "aggregate",
@@ -374,7 +493,7 @@ class SQLToMongoDBTranslator:
         if self.warnings:
             result["warnings"] = self.warnings
         
-        logger.info(f" Pipeline completo generado: {len(pipeline)} etapas")
+        logger.debug(" Pipeline completo generado: %s etapas", len(pipeline))
         return result
 
     
@@ -397,36 +516,57 @@ class SQLToMongoDBTranslator:
         
         # Obtener tabla principal
         collection = self.sql_parser.get_table_name()
+        main_table = self.sql_parser.get_main_table() or {}
+        main_alias = main_table.get("alias") or collection
+        join_aliases = {join.get("alias", join.get("table")) for join in joins}
         
-        # 1. $match inicial para WHERE en tabla principal
+        # 1. $match inicial con las condiciones del WHERE que solo usan la tabla principal;
+        #    las que usan tablas unidas se aplican tras el $lookup (p.total -> p_joined.total)
+        main_conditions, joined_conditions = [], []
         where_clause = self.sql_parser.get_where_clause()
-        if where_clause:
-            pipeline.append({"$match": where_clause})
+        for condition in self._split_conjuncts(where_clause or {}):
+            aliases = self._filter_aliases(condition) & join_aliases
+            rewritten = self._rewrite_join_filter(condition, main_alias, join_aliases)
+            (joined_conditions if aliases else main_conditions).append(rewritten)
+        
+        if main_conditions:
+            pipeline.append({"$match": self._merge_conjuncts(main_conditions)})
         
         # 2. Generar pipeline de JOINs
-        join_pipeline = join_parser.translate_joins_to_mongodb(self.sql_parser.sql_query, joins)
+        join_pipeline = join_parser.translate_joins_to_mongodb(self.sql_parser.sql_query, joins, main_alias)
         pipeline.extend(join_pipeline)
         
-        # 3. Proyección final
+        if joined_conditions:
+            pipeline.append({"$match": self._merge_conjuncts(joined_conditions)})
+        
         project_stage = self._build_project_stage_for_joins(joins)
-        if project_stage:
-            pipeline.append(project_stage)
         
-        # 4. ORDER BY y LIMIT
-        if hasattr(self.sql_parser, 'get_order_by'):
-            order_by = self.sql_parser.get_order_by()
-            if order_by:
-                sort_stage = {"$sort": {}}
-                for order_info in order_by:
-                    field = order_info.get("field")
-                    direction = -1 if order_info.get("order") == "DESC" else 1
-                    sort_stage["$sort"][field] = direction
-                pipeline.append(sort_stage)
+        # 3. ORDER BY, OFFSET y LIMIT antes de la proyección, sobre los campos originales
+        order_by = self.sql_parser.get_order_by()
+        if order_by:
+            projection = project_stage["$project"] if project_stage else {}
+            sort_stage = {"$sort": {}}
+            for field, direction in order_by.items():
+                source = projection.get(field)
+                if isinstance(source, str) and source.startswith("$") and not source.startswith("$$"):
+                    # Alias del SELECT: ordenar por la expresión de origen
+                    path = source[1:]
+                else:
+                    path = self._join_field_path(field, main_alias, join_aliases)
+                sort_stage["$sort"][path] = direction
+            pipeline.append(sort_stage)
         
-        if hasattr(self.sql_parser, 'get_limit'):
-            limit = self.sql_parser.get_limit()
-            if limit is not None:
-                pipeline.append({"$limit": limit})
+        offset = self.sql_parser.get_offset()
+        if offset:
+            pipeline.append({"$skip": offset})
+        
+        limit = self.sql_parser.get_limit()
+        if limit is not None:
+            pipeline.append({"$limit": limit})
+        
+        # 4. Proyección final
+        if project_stage:
+            pipeline.append(project_stage)
         
         return {
             "operation": "aggregate",
@@ -439,31 +579,247 @@ class SQLToMongoDBTranslator:
             }
         }
     
+    def _split_conjuncts(self, condition):
+        """Divide un filtro en las condiciones que se combinan con AND."""
+        conjuncts = []
+        for key, value in condition.items():
+            if key == "$and" and isinstance(value, list):
+                for item in value:
+                    conjuncts.extend(self._split_conjuncts(item))
+            else:
+                conjuncts.append({key: value})
+        return conjuncts
+    
+    def _merge_conjuncts(self, conjuncts):
+        """Une condiciones en un filtro, con $and si algún campo se repite."""
+        merged = {}
+        for conjunct in conjuncts:
+            if any(key in merged for key in conjunct):
+                return {"$and": conjuncts}
+            merged.update(conjunct)
+        return merged
+    
+    def _filter_aliases(self, condition):
+        """Prefijos de tabla (u, p...) de los campos usados en un filtro."""
+        aliases = set()
+        for key, value in condition.items():
+            if key in ("$and", "$or", "$nor") and isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        aliases |= self._filter_aliases(item)
+            elif not key.startswith("$") and "." in key:
+                aliases.add(key.split(".", 1)[0])
+        return aliases
+    
+    def _join_field_path(self, field, main_alias, join_aliases):
+        """
+        Ruta de un campo SQL (alias.campo) en los documentos del pipeline de JOINs.
+        
+        Args:
+            field (str): Campo con o sin prefijo de tabla
+            main_alias (str): Alias de la tabla principal
+            join_aliases (set): Alias de las tablas unidas
+            
+        Returns:
+            str: campo (tabla principal) o alias_joined.campo (tabla unida)
+        """
+        if "." not in field:
+            return field
+        prefix, name = field.split(".", 1)
+        if prefix == main_alias:
+            return name
+        if prefix in join_aliases:
+            return f"{prefix}_joined.{name}"
+        return field
+    
+    def _rewrite_join_filter(self, condition, main_alias, join_aliases):
+        """Reescribe las rutas de campo de un filtro con _join_field_path."""
+        rewritten = {}
+        for key, value in condition.items():
+            if key in ("$and", "$or", "$nor") and isinstance(value, list):
+                rewritten[key] = [
+                    self._rewrite_join_filter(item, main_alias, join_aliases) if isinstance(item, dict) else item
+                    for item in value
+                ]
+            elif key.startswith("$"):
+                rewritten[key] = value
+            else:
+                rewritten[self._join_field_path(key, main_alias, join_aliases)] = value
+        return rewritten
+    
     def _translate_select_union(self):
         """
-        Traduce una consulta SELECT con UNION.
+        Traduce una consulta SELECT con UNION / UNION ALL a un único pipeline.
+        
+        Cada rama se traduce por separado; la primera se ejecuta sobre su colección y
+        las demás se añaden con $unionWith. Los operadores se evalúan de izquierda a
+        derecha, así que un UNION elimina los duplicados de todas las ramas anteriores:
+        un $group por el documento completo tras el último UNION cubre ese prefijo y
+        las ramas UNION ALL posteriores se añaden sin eliminar duplicados. ORDER BY,
+        LIMIT y OFFSET de la última rama se aplican al resultado combinado, como en SQL.
         
         Returns:
-            dict: Información sobre cómo manejar UNION
+            dict: Operación aggregate con el pipeline combinado y, en "union", las
+                ramas por separado para ejecutarlas en paralelo si el servidor no
+                admite $unionWith (MongoDB < 4.4); distinct_branches es el número de
+                ramas iniciales cuyos documentos se combinan sin duplicados
         """
         union_info = self.sql_parser.get_union_info()
         
         if "error" in union_info:
             raise ValueError(f"Error procesando UNION: {union_info['error']}")
         
-        # UNION en MongoDB requiere $unionWith (4.4+) o queries separadas
-        return {
-            "operation": "union",
-            "collection": self.sql_parser.get_table_name(),
-            "union_type": "union_all" if union_info.get("union_all") else "union",
-            "queries": union_info.get("queries", []),
-            "warnings": self.warnings + [
-                "UNION requiere MongoDB 4.4+ con $unionWith",
-                "Alternativamente, ejecutar queries separadas y unir resultados"
-            ],
-            "mongodb_version_required": "4.4+",
-            "alternative_strategy": "separate_queries"
+        queries = list(union_info.get("queries", []))
+        queries[-1], sort, skip, limit = self._split_union_tail(queries[-1])
+        branches = [self._translate_union_branch(query) for query in queries]
+        union_all_flags = union_info.get("union_all_flags") or [union_info.get("union_all")] * (len(branches) - 1)
+        # El operador i une la rama i + 1 con el resultado de las anteriores
+        distinct_branches = max((i + 2 for i, union_all in enumerate(union_all_flags) if not union_all), default=0)
+        
+        pipeline = list(branches[0]["pipeline"])
+        for position, branch in enumerate(branches[1:], start=1):
+            if position == distinct_branches:
+                pipeline.extend(UNION_DEDUP_STAGES)
+            pipeline.append({"$unionWith": {"coll": branch["collection"], "pipeline": branch["pipeline"]}})
+        if distinct_branches == len(branches):
+            pipeline.extend(UNION_DEDUP_STAGES)
+        if sort:
+            pipeline.append({"$sort": sort})
+        if skip:
+            pipeline.append({"$skip": skip})
+        if limit is not None:
+            pipeline.append({"$limit": limit})
+        
+        result = {
+            "operation": "aggregate",
+            "collection": branches[0]["collection"],
+            "pipeline": pipeline,
+            "union": {
+                "distinct": distinct_branches > 0,
+                "distinct_branches": distinct_branches,
+                "branches": branches,
+                "sort": sort,
+                "skip": skip,
+                "limit": limit
+            }
+        }
+        if self.warnings:
+            result["warnings"] = self.warnings
+        return result
+    
+    @staticmethod
+    def _split_union_tail(query):
+        """
+        Separa de la última rama de un UNION las cláusulas ORDER BY, LIMIT y OFFSET,
+        que en SQL se aplican al resultado combinado.
+        
+        Args:
+            query (str): Última rama del UNION
+            
+        Returns:
+            tuple: (rama sin esas cláusulas, orden, desplazamiento, límite)
+        """
+        statement = parse_sql(query)
+        starts = [clause.start for keyword, clause in statement.clauses.items() if keyword in ("ORDER BY", "LIMIT", "OFFSET")]
+        if not starts:
+            return query, None, None, None
+        
+        parser = SQLParser(query)
+        return query[:min(starts)].strip(), parser.get_order_by() or None, parser.get_offset() or None, parser.get_limit()
+    
+    def _translate_union_branch(self, query):
+        """
+        Traduce una rama de un UNION a un pipeline sobre su colección.
+        
+        Args:
+            query (str): Consulta SELECT de la rama
+            
+        Returns:
+            dict: collection y pipeline de la rama
+        """
+        branch = SQLToMongoDBTranslator(SQLParser(query))
+        result = branch.translate_select()
+        self.warnings.extend(warning for warning in branch.warnings if warning not in self.warnings)
+        
+        if result.get("operation") == "find":
+            pipeline = find_as_pipeline(result)
+        elif result.get("operation") == "aggregate" and not result.get("union"):
+            pipeline = optimize_pipeline(result["pipeline"])
+        else:
+            raise ValueError(f"Rama de UNION no soportada: {query}")
+        
+        # Sin _id las filas iguales de distintos documentos se reconocen como duplicadas
+        if pipeline and "$project" in pipeline[-1] and "_id" not in pipeline[-1]["$project"]:
+            pipeline[-1] = {"$project": {**pipeline[-1]["$project"], "_id": 0}}
+        
+        return {"collection": result.get("collection") or branch.sql_parser.get_table_name(), "pipeline": pipeline}
+    
+    def _translate_select_with_subqueries(self):
+        """
+        Traduce un SELECT cuyo WHERE contiene subconsultas [NOT] IN (SELECT ...) o
+        [NOT] EXISTS (SELECT ...) unidas con AND.
+        
+        La consulta externa se traduce sin esas condiciones y cada subconsulta se añade
+        como semi-join ($lookup con $limit: 1) tras sus $match iniciales. Las
+        subconsultas IN sin correlación se indican además en "subqueries" para que el
+        conector las ejecute una vez y, si devuelven pocos valores, las sustituya por $in.
+        
+        Returns:
+            dict: Operación aggregate, o None si alguna subconsulta no se puede traducir
+        """
+        statement = self.sql_parser.ast
+        sql = statement.sql
+        where = statement.clause("WHERE")
+        if where is None or any(start < where.start or end > where.end for start, end in statement.subquery_spans):
+            return None
+        conjuncts = split_conjuncts(where.tokens)
+        _, outer_qualifiers = table_qualifiers(statement.clause_text("FROM"))
+        if conjuncts is None or not outer_qualifiers:
+            return None
+        
+        semi_joins, kept = [], []
+        for tokens in conjuncts:
+            predicate = parse_subquery_predicate(sql, tokens)
+            if predicate is None:
+                if any(token.upper == "SELECT" for token in tokens):
+                    return None
+                kept.append(sql[tokens[0].start:tokens[-1].end])
+                continue
+            semi_join = build_semi_join(predicate, len(semi_joins), outer_qualifiers)
+            if semi_join is None:
+                return None
+            semi_joins.append(semi_join)
+        
+        outer_sql = sql[:where.start] + (f"WHERE {' AND '.join(kept)} " if kept else "") + sql[where.end:]
+        outer = SQLToMongoDBTranslator(SQLParser(outer_sql))
+        result = outer.translate_select()
+        self.warnings.extend(warning for warning in outer.warnings if warning not in self.warnings)
+        
+        if result.get("operation") == "find":
+            pipeline = find_as_pipeline(result)
+        elif result.get("operation") == "aggregate" and not result.get("union"):
+            pipeline = result["pipeline"]
+        else:
+            return None
+        
+        # Las subconsultas correlacionadas suelen usar alias (u.edad): el filtro externo va sin prefijo
+        pipeline = [
+            {"$match": strip_filter_qualifiers(stage["$match"], outer_qualifiers)} if "$match" in stage else stage
+            for stage in pipeline
+        ]
+        
+        logger.debug("%s subconsultas traducidas a semi-join", len(semi_joins))
+        translated = {
+            key: value for key, value in result.items()
+            if key not in ("query", "projection", "sort", "skip", "limit", "pipeline", "warnings")
         }
+        translated.update(operation="aggregate", pipeline=insert_semi_joins(pipeline, semi_joins))
+        inline = [semi_join["inline"] for semi_join in semi_joins if semi_join["inline"]]
+        if inline:
+            translated["subqueries"] = inline
+        if self.warnings:
+            translated["warnings"] = self.warnings
+        return translated
     
     def _build_distinct_pipeline(self):
         """
@@ -476,7 +832,10 @@ class SQLToMongoDBTranslator:
         if not advanced_parser:
             return []
         
-        return advanced_parser.translate_distinct_to_mongodb(self.sql_parser.sql_query)
+        return advanced_parser.translate_distinct_to_mongodb(
+            self.sql_parser.sql_query,
+            distinct_info=self.sql_parser.get_distinct_info()
+        )
     
 
     def _build_group_stage(self):
@@ -515,13 +874,13 @@ class SQLToMongoDBTranslator:
                     field_upper = field.upper().strip()
                     alias = field_info.get("alias", field)
                     
-                    logger.info(f" Procesando campo de agregación: {field}")
+                    logger.debug(" Procesando campo de agregación: %s", field)
                     
                     # 🔧 COUNT(*) - Conteo total
                     if field_upper == "COUNT(*)":
                         group_field_name = alias if alias != field else "count_all"
                         group_stage["$group"][group_field_name] = {"$sum": 1}
-                        logger.info(f" COUNT(*) configurado: {group_field_name}")
+                        logger.debug(" COUNT(*) configurado: %s", group_field_name)
                     
                     # 🔧 COUNT(DISTINCT campo) - Conteo de valores únicos
                     elif "COUNT(DISTINCT " in field_upper:
@@ -532,7 +891,7 @@ class SQLToMongoDBTranslator:
                             
                             # Para COUNT DISTINCT, usar $addToSet seguido de $size
                             group_stage["$group"][f"{group_field_name}_set"] = {"$addToSet": f"${distinct_field}"}
-                            logger.info(f" COUNT(DISTINCT {distinct_field}) configurado: {group_field_name}")
+                            logger.debug(" COUNT(DISTINCT %s) configurado: %s", distinct_field, group_field_name)
                     
                     # 🔧 COUNT(campo) - Conteo con condición
                     elif "COUNT(" in field_upper:
@@ -546,7 +905,7 @@ class SQLToMongoDBTranslator:
                                 }
                             else:
                                 group_stage["$group"][group_field_name] = {"$sum": 1}
-                            logger.info(f" COUNT({inner_field}) configurado: {group_field_name}")
+                            logger.debug(" COUNT(%s) configurado: %s", inner_field, group_field_name)
                     
                     # 🔧 SUM(campo) - CORREGIDO PARA OPERACIONES MATEMÁTICAS
                     elif "SUM(" in field_upper:
@@ -555,7 +914,7 @@ class SQLToMongoDBTranslator:
                             inner_expression = match.group(1).strip()
                             group_field_name = alias if alias != field else f"sum_{inner_expression.replace(' ', '_').replace('*', '_mult_')}"
                             
-                            logger.info(f" Analizando expresión SUM: '{inner_expression}'")
+                            logger.debug(" Analizando expresión SUM: '%s'", inner_expression)
                             
                             # 🔧 CRÍTICO: Detectar multiplicación precio * stock
                             if '*' in inner_expression:
@@ -573,11 +932,11 @@ class SQLToMongoDBTranslator:
                                             ]
                                         }
                                     }
-                                    logger.info(f" SUM con multiplicación: {field1} * {field2} -> {group_field_name}")
+                                    logger.debug(" SUM con multiplicación: %s * %s -> %s", field1, field2, group_field_name)
                                 else:
                                     # Más de 2 campos - manejo básico
                                     group_stage["$group"][group_field_name] = {"$sum": f"${inner_expression}"}
-                                    logger.warning(f" Multiplicación compleja: {inner_expression}")
+                                    logger.warning(" Multiplicación compleja: %s", inner_expression)
                             
                             # 🔧 Detectar suma: campo1 + campo2
                             elif '+' in inner_expression:
@@ -593,7 +952,7 @@ class SQLToMongoDBTranslator:
                                             ]
                                         }
                                     }
-                                    logger.info(f" SUM con suma: {field1} + {field2} -> {group_field_name}")
+                                    logger.debug(" SUM con suma: %s + %s -> %s", field1, field2, group_field_name)
                                 else:
                                     group_stage["$group"][group_field_name] = {"$sum": f"${inner_expression}"}
                             
@@ -611,7 +970,7 @@ class SQLToMongoDBTranslator:
                                             ]
                                         }
                                     }
-                                    logger.info(f" SUM con resta: {field1} - {field2} -> {group_field_name}")
+                                    logger.debug(" SUM con resta: %s - %s -> %s", field1, field2, group_field_name)
                                 else:
                                     group_stage["$group"][group_field_name] = {"$sum": f"${inner_expression}"}
                             
@@ -624,7 +983,7 @@ class SQLToMongoDBTranslator:
                                     }
                                 else:
                                     group_stage["$group"][group_field_name] = {"$sum": 1}
-                                logger.info(f" SUM simple: {inner_expression} -> {group_field_name}")
+                                logger.debug(" SUM simple: %s -> %s", inner_expression, group_field_name)
                     
                     # 🔧 AVG(campo)
                     elif "AVG(" in field_upper:
@@ -636,7 +995,7 @@ class SQLToMongoDBTranslator:
                             group_stage["$group"][group_field_name] = {
                                 "$avg": {"$toDouble": f"${inner_field}"}
                             }
-                            logger.info(f" AVG({inner_field}) configurado: {group_field_name}")
+                            logger.debug(" AVG(%s) configurado: %s", inner_field, group_field_name)
                     
                     # 🔧 MIN(campo)
                     elif "MIN(" in field_upper:
@@ -648,7 +1007,7 @@ class SQLToMongoDBTranslator:
                             group_stage["$group"][group_field_name] = {
                                 "$min": {"$toDouble": f"${inner_field}"}
                             }
-                            logger.info(f" MIN({inner_field}) configurado: {group_field_name}")
+                            logger.debug(" MIN(%s) configurado: %s", inner_field, group_field_name)
                     
                     # 🔧 MAX(campo)
                     elif "MAX(" in field_upper:
@@ -660,9 +1019,9 @@ class SQLToMongoDBTranslator:
                             group_stage["$group"][group_field_name] = {
                                 "$max": {"$toDouble": f"${inner_field}"}
                             }
-                            logger.info(f" MAX({inner_field}) configurado: {group_field_name}")
+                            logger.debug(" MAX(%s) configurado: %s", inner_field, group_field_name)
             
-            logger.info(f" Etapa $group con múltiples agregaciones generada: {group_stage}")
+            logger.debug(" Etapa $group con múltiples agregaciones generada: %s", truncated(group_stage))
         
         return group_stage
 
@@ -703,7 +1062,7 @@ class SQLToMongoDBTranslator:
                     field_upper = field.upper().strip()
                     alias = field_info.get("alias", field)
                     
-                    logger.info(f" Procesando campo de proyección: '{field}' con alias: '{alias}'")
+                    logger.debug(" Procesando campo de proyección: '%s' con alias: '%s'", field, alias)
                     
                     # 🔧 COUNT(DISTINCT campo) - Proyección especial
                     if "COUNT(DISTINCT " in field_upper:
@@ -714,19 +1073,19 @@ class SQLToMongoDBTranslator:
                             
                             # Proyectar el tamaño del set creado en $group
                             project_stage["$project"][alias] = {"$size": f"${group_field_name}_set"}
-                            logger.info(f" COUNT(DISTINCT) proyectado: {alias} = $size(${group_field_name}_set)")
+                            logger.debug(" COUNT(DISTINCT) proyectado: %s = $size($%s_set)", alias, group_field_name)
                     
                     # 🔧 COUNT(*) y otras agregaciones simples
                     elif field_upper == "COUNT(*)":
                         group_field_name = alias if alias != field else "count_all"
                         project_stage["$project"][alias] = f"${group_field_name}"
-                        logger.info(f" COUNT(*) proyectado: {alias} = ${group_field_name}")
+                        logger.debug(" COUNT(*) proyectado: %s = $%s", alias, group_field_name)
                     
                     elif any(func in field_upper for func in ["COUNT(", "SUM(", "AVG(", "MIN(", "MAX("]):
                         # Usar el alias como nombre del campo en $group
                         group_field_name = alias if alias != field else alias
                         project_stage["$project"][alias] = f"${group_field_name}"
-                        logger.info(f" Función de agregación proyectada: {alias} = ${group_field_name}")
+                        logger.debug(" Función de agregación proyectada: %s = $%s", alias, group_field_name)
                     
                     # 🔧 FUNCIONES DE TRANSFORMACIÓN (sin cambios del código anterior)
                     elif "UPPER(" in field_upper:
@@ -734,37 +1093,37 @@ class SQLToMongoDBTranslator:
                         if match:
                             inner_field = match.group(1).strip()
                             project_stage["$project"][alias] = {"$toUpper": f"${inner_field}"}
-                            logger.info(f" UPPER({inner_field}) traducido a $toUpper")
+                            logger.debug(" UPPER(%s) traducido a $toUpper", inner_field)
                     
                     elif "LOWER(" in field_upper:
                         match = regex.search(r'LOWER\s*\(\s*([^)]+)\s*\)', field, regex.IGNORECASE)
                         if match:
                             inner_field = match.group(1).strip()
                             project_stage["$project"][alias] = {"$toLower": f"${inner_field}"}
-                            logger.info(f" LOWER({inner_field}) traducido a $toLower")
+                            logger.debug(" LOWER(%s) traducido a $toLower", inner_field)
                     
                     elif "LENGTH(" in field_upper:
                         match = regex.search(r'LENGTH\s*\(\s*([^)]+)\s*\)', field, regex.IGNORECASE)
                         if match:
                             inner_field = match.group(1).strip()
                             project_stage["$project"][alias] = {"$strLenCP": f"${inner_field}"}
-                            logger.info(f" LENGTH({inner_field}) traducido a $strLenCP")
+                            logger.debug(" LENGTH(%s) traducido a $strLenCP", inner_field)
                     
                     elif "CONCAT(" in field_upper:
                         concat_expression = self._translate_concat_function(field)
                         if concat_expression:
                             project_stage["$project"][alias] = concat_expression
-                            logger.info(f" CONCAT traducido: {alias} = {concat_expression}")
+                            logger.debug(" CONCAT traducido: %s = %s", alias, concat_expression)
                         else:
                             project_stage["$project"][alias] = f"${field}"
-                            logger.warning(f" CONCAT fallback para: {field}")
+                            logger.warning(" CONCAT fallback para: %s", field)
                     
                     else:
                         # Campo normal sin función
                         project_stage["$project"][alias] = f"${field}"
-                        logger.info(f"Campo normal: {field}")
+                        logger.debug("Campo normal: %s", field)
             
-            logger.info(f" Etapa $project generada: {project_stage}")
+            logger.debug(" Etapa $project generada: %s", truncated(project_stage))
             return project_stage
         
         return None
@@ -785,16 +1144,16 @@ class SQLToMongoDBTranslator:
             # Extraer contenido entre paréntesis de CONCAT
             match = regex.search(r'CONCAT\s*\(\s*(.*)\s*\)', field, regex.IGNORECASE)
             if not match:
-                logger.error(f"No se pudo extraer contenido de CONCAT: {field}")
+                logger.error("No se pudo extraer contenido de CONCAT: %s", field)
                 return None
             
             # Obtener argumentos de CONCAT
             args_str = match.group(1).strip()
-            logger.info(f"Argumentos de CONCAT extraídos: '{args_str}'")
+            logger.debug("Argumentos de CONCAT extraídos: '%s'", args_str)
             
             # Dividir argumentos respetando comillas
             args = self._parse_concat_arguments(args_str)
-            logger.info(f"Argumentos parseados: {args}")
+            logger.debug("Argumentos parseados: %s", truncated(args))
             
             if not args:
                 logger.error("No se pudieron parsear argumentos de CONCAT")
@@ -809,7 +1168,7 @@ class SQLToMongoDBTranslator:
                 if (arg.startswith("'") and arg.endswith("'")) or (arg.startswith('"') and arg.endswith('"')):
                     literal = arg[1:-1]  # Quitar comillas externas
                     mongo_args.append(literal)  # Agregar SOLO el literal, SIN $
-                    logger.info(f"   Literal: '{literal}'")
+                    logger.debug("   Literal: '%s'", literal)
                 
                 # NUEVO: Detectar funciones anidadas como UPPER()
                 elif "UPPER(" in arg.upper():
@@ -818,32 +1177,32 @@ class SQLToMongoDBTranslator:
                     if upper_match:
                         inner_field = upper_match.group(1).strip()
                         mongo_args.append({"$toUpper": f"${inner_field}"})
-                        logger.info(f"   UPPER anidado: UPPER({inner_field})")
+                        logger.debug("   UPPER anidado: UPPER(%s)", inner_field)
                     else:
                         mongo_args.append(f"${arg}")
-                        logger.warning(f"   UPPER fallback: ${arg}")
+                        logger.warning("   UPPER fallback: $%s", arg)
                 
                 elif "LOWER(" in arg.upper():
                     lower_match = regex.search(r'LOWER\s*\(\s*([^)]+)\s*\)', arg, regex.IGNORECASE)
                     if lower_match:
                         inner_field = lower_match.group(1).strip()
                         mongo_args.append({"$toLower": f"${inner_field}"})
-                        logger.info(f"   LOWER anidado: LOWER({inner_field})")
+                        logger.debug("   LOWER anidado: LOWER(%s)", inner_field)
                     else:
                         mongo_args.append(f"${arg}")
-                        logger.warning(f"   LOWER fallback: ${arg}")
+                        logger.warning("   LOWER fallback: $%s", arg)
                 
                 else:
                     # Es un campo de la base de datos normal
                     mongo_args.append(f"${arg}")
-                    logger.info(f"   Campo: ${arg}")
+                    logger.debug("   Campo: $%s", arg)
             
             result = {"$concat": mongo_args}
-            logger.info(f" CONCAT traducido exitosamente: {result}")
+            logger.debug(" CONCAT traducido exitosamente: %s", truncated(result))
             return result
             
         except Exception as e:
-            logger.error(f" Error traduciendo CONCAT: {e}")
+            logger.error(" Error traduciendo CONCAT: %s", e)
             import traceback
             logger.error(traceback.format_exc())
             return None
@@ -889,7 +1248,7 @@ class SQLToMongoDBTranslator:
             else:
                 current_arg += char
         
-        logger.info(f" Argumentos finales parseados: {args}")
+        logger.debug(" Argumentos finales parseados: %s", truncated(args))
         return args
 
 
@@ -960,7 +1319,7 @@ class SQLToMongoDBTranslator:
         
         # 🆕 DETECTAR COUNT(*) específicamente
         if field_upper == "COUNT(*)":
-            logger.info("COUNT(*) detectado")
+            logger.debug("COUNT(*) detectado")
             return True
         
         # 🆕 Lista de funciones de AGREGACIÓN (requieren $group)
@@ -980,13 +1339,13 @@ class SQLToMongoDBTranslator:
         # 🔧 CRÍTICO: Solo detectar funciones de AGREGACIÓN para _translate_select_aggregate
         for func in aggregate_functions:
             if func in field_upper:
-                logger.info(f"Función de AGREGACIÓN detectada: {func} en '{field}'")
+                logger.debug("Función de AGREGACIÓN detectada: %s en '%s'", func, field)
                 return True
         
         # 🔧 NUEVO: Las funciones de transformación NO van a aggregate
         for func in transformation_functions:
             if func in field_upper:
-                logger.info(f"Función de TRANSFORMACIÓN detectada: {func} en '{field}' - usando find con projection especial")
+                logger.debug("Función de TRANSFORMACIÓN detectada: %s en '%s' - usando find con projection especial", func, field)
                 return False  # ← CRÍTICO: retornar False para funciones de transformación
         
         return False
@@ -1020,7 +1379,7 @@ class SQLToMongoDBTranslator:
                     if match:
                         inner_field = match.group(1).strip()
                         project_stage["$project"][alias] = {"$toUpper": f"${inner_field}"}
-                        logger.info(f"UPPER({inner_field}) traducido a $toUpper")
+                        logger.debug("UPPER(%s) traducido a $toUpper", inner_field)
                 
                 elif "LOWER(" in field.upper():
                     # LOWER(campo) -> {$toLower: "$campo"}
@@ -1028,7 +1387,7 @@ class SQLToMongoDBTranslator:
                     if match:
                         inner_field = match.group(1).strip()
                         project_stage["$project"][alias] = {"$toLower": f"${inner_field}"}
-                        logger.info(f"LOWER({inner_field}) traducido a $toLower")
+                        logger.debug("LOWER(%s) traducido a $toLower", inner_field)
                 
                 else:
                     # Campo normal
@@ -1042,6 +1401,10 @@ class SQLToMongoDBTranslator:
         if order_by:
             pipeline.append({"$sort": order_by})
         
+        offset = self.sql_parser.get_offset()
+        if offset:
+            pipeline.append({"$skip": offset})
+        
         limit = self.sql_parser.get_limit()
         if limit is not None:
             pipeline.append({"$limit": limit})
@@ -1070,7 +1433,7 @@ class SQLToMongoDBTranslator:
         if not insert_values:
             raise ValueError("No se pudieron extraer valores para insertar")
         
-        logger.info(f"Datos de inserción recibidos: {insert_values}")
+        logger.debug("Datos de inserción recibidos para la tabla %s", insert_values.get('table'))
         
         # 🔧 NUEVO: Manejar INSERT_MANY vs INSERT simple
         operation_type = insert_values.get("operation")
@@ -1082,7 +1445,7 @@ class SQLToMongoDBTranslator:
             if not documents:
                 raise ValueError("No se encontraron documentos para insertar")
             
-            logger.info(f"INSERT múltiple: {len(documents)} documentos")
+            logger.debug("INSERT múltiple: %s documentos", len(documents))
             
             return {
                 "operation": "INSERT_MANY",
@@ -1097,7 +1460,7 @@ class SQLToMongoDBTranslator:
             if not document:
                 raise ValueError("No se encontraron valores para insertar")
             
-            logger.info(f"INSERT simple: 1 documento")
+            logger.debug("INSERT simple: 1 documento")
             
             return {
                 "operation": "insert",
@@ -1109,7 +1472,11 @@ class SQLToMongoDBTranslator:
     def translate_update(self):
         """
         Traduce una consulta UPDATE a operaciones de MongoDB.
-        🔧 CORREGIDO: Usa aggregate + $merge para operaciones matemáticas complejas
+        
+        Los SET con valores fijos usan un update con $set. Si alguna asignación es una
+        expresión (aritmética, funciones o referencias a otros campos) se compila a
+        un update con pipeline, update_many(filtro, [{"$set": ...}]): una sola pasada
+        en el servidor que devuelve los documentos encontrados y modificados.
         
         Returns:
             dict: Diccionario con la operación MongoDB
@@ -1126,12 +1493,24 @@ class SQLToMongoDBTranslator:
         if not update_values:
             raise ValueError("No se pudieron extraer valores para actualizar")
         
-        # 🔧 NUEVO: Detectar si hay operaciones matemáticas que requieren cálculo
-        has_math_operations = self._has_math_operations(update_values["values"])
+        assignments = compile_set_clause(self.sql_parser.ast.clause_text("SET") or "")
         
-        if has_math_operations:
-            # Usar aggregate + $merge para operaciones matemáticas
-            return self._translate_update_with_aggregate(collection, update_values["values"], where_clause)
+        if not all(is_constant(value) for value in assignments.values()):
+            # Los textos fijos van en $literal: un valor ligado después que empiece por $ no es una ruta.
+            # Las rutas de campo ("$b") y variables ("$$NOW") se dejan tal cual
+            set_stage = {
+                field: {"$literal": value} if isinstance(value, str) and is_constant(value) else value
+                for field, value in assignments.items()
+            }
+            logger.debug("UPDATE con expresiones: %s", truncated(set_stage))
+            return {
+                "operation": "update",
+                "collection": collection,
+                "query": {
+                    "query": where_clause or {},
+                    "update": [{"$set": set_stage}]
+                }
+            }
         else:
             # Usar update normal para valores simples
             return {
@@ -1143,289 +1522,6 @@ class SQLToMongoDBTranslator:
                 }
             }
 
-    def _has_math_operations(self, update_values):
-        """
-        Detecta si hay operaciones matemáticas en los valores de UPDATE.
-        
-        Args:
-            update_values (dict): Valores a actualizar
-            
-        Returns:
-            bool: True si hay operaciones matemáticas
-        """
-        for field, value in update_values.items():
-            value_str = str(value).strip()
-            if any(op in value_str for op in [" * ", " + ", " - ", " / "]):
-                return True
-        return False
-
-    def _translate_update_with_aggregate(self, collection, update_values, where_clause):
-        """
-        🔧 NUEVO: Traduce UPDATE con operaciones matemáticas usando aggregate + $merge.
-        
-        Args:
-            collection (str): Nombre de la colección
-            update_values (dict): Valores a actualizar
-            where_clause (dict): Condición WHERE
-            
-        Returns:
-            dict: Operación usando aggregate con $merge
-        """
-        pipeline = []
-        
-        # 1. $match para filtrar documentos a actualizar
-        if where_clause:
-            pipeline.append({"$match": where_clause})
-        
-        # 2. $addFields para calcular nuevos valores
-        add_fields_stage = {"$addFields": {}}
-        
-        for field, value in update_values.items():
-            value_str = str(value).strip()
-            
-            logger.info(f"Procesando operación matemática: {field} = {value_str}")
-            
-            # 🔧 DETECTAR MULTIPLICACIÓN: campo * número
-            if " * " in value_str:
-                multiplication_pattern = r'(\w+)\s*\*\s*([\d.]+)'
-                match = regex.search(multiplication_pattern, value_str, regex.IGNORECASE)
-                
-                if match:
-                    source_field = match.group(1).strip()
-                    multiplier = float(match.group(2).strip())
-                    
-                    if source_field.lower() == field.lower():
-                        # salario = salario * 1.15
-                        add_fields_stage["$addFields"][field] = {
-                            "$multiply": [
-                                {"$toDouble": f"${source_field}"},
-                                multiplier
-                            ]
-                        }
-                        logger.info(f" Multiplicación: {field} = {source_field} * {multiplier}")
-            
-            # 🔧 DETECTAR SUMA: campo + número
-            elif " + " in value_str:
-                addition_pattern = r'(\w+)\s*\+\s*([\d.]+)'
-                match = regex.search(addition_pattern, value_str, regex.IGNORECASE)
-                
-                if match:
-                    source_field = match.group(1).strip()
-                    increment = float(match.group(2).strip())
-                    
-                    add_fields_stage["$addFields"][field] = {
-                        "$add": [
-                            {"$toDouble": f"${source_field}"},
-                            increment
-                        ]
-                    }
-                    logger.info(f" Suma: {field} = {source_field} + {increment}")
-            
-            # 🔧 DETECTAR RESTA: campo - número
-            elif " - " in value_str:
-                subtraction_pattern = r'(\w+)\s*-\s*([\d.]+)'
-                match = regex.search(subtraction_pattern, value_str, regex.IGNORECASE)
-                
-                if match:
-                    source_field = match.group(1).strip()
-                    decrement = float(match.group(2).strip())
-                    
-                    add_fields_stage["$addFields"][field] = {
-                        "$subtract": [
-                            {"$toDouble": f"${source_field}"},
-                            decrement
-                        ]
-                    }
-                    logger.info(f" Resta: {field} = {source_field} - {decrement}")
-            
-            # 🔧 DETECTAR DIVISIÓN: campo / número
-            elif " / " in value_str:
-                division_pattern = r'(\w+)\s*/\s*([\d.]+)'
-                match = regex.search(division_pattern, value_str, regex.IGNORECASE)
-                
-                if match:
-                    source_field = match.group(1).strip()
-                    divisor = float(match.group(2).strip())
-                    
-                    add_fields_stage["$addFields"][field] = {
-                        "$divide": [
-                            {"$toDouble": f"${source_field}"},
-                            divisor
-                        ]
-                    }
-                    logger.info(f" División: {field} = {source_field} / {divisor}")
-            
-            else:
-                # Valor literal
-                try:
-                    if '.' in value_str:
-                        numeric_value = float(value_str)
-                    else:
-                        numeric_value = int(value_str)
-                    add_fields_stage["$addFields"][field] = numeric_value
-                    logger.info(f" Valor literal: {field} = {numeric_value}")
-                except ValueError:
-                    add_fields_stage["$addFields"][field] = value_str
-                    logger.info(f" Valor string: {field} = '{value_str}'")
-        
-        if add_fields_stage["$addFields"]:
-            pipeline.append(add_fields_stage)
-        
-        # 3. $merge para actualizar los documentos en la misma colección
-        merge_stage = {
-            "$merge": {
-                "into": collection,
-                "whenMatched": "replace",
-                "whenNotMatched": "discard"
-            }
-        }
-        pipeline.append(merge_stage)
-        
-        logger.info(f"Pipeline UPDATE con cálculo: {pipeline}")
-        
-        return {
-            "operation": "aggregate",
-            "collection": collection,
-            "pipeline": pipeline,
-            "update_type": "math_operations"
-        }
-
-    def _process_update_operations(self, update_values):
-        """
-        🔧 CORREGIDO: Procesa operaciones matemáticas en UPDATE SET.
-        Incluye conversión automática de string a número para operaciones matemáticas.
-        
-        Args:
-            update_values (dict): Valores a actualizar del parser
-            
-        Returns:
-            dict: Operaciones MongoDB procesadas
-        """
-        mongo_update = {}
-        set_operations = {}
-        
-        for field, value in update_values.items():
-            # Convertir a string para procesar
-            value_str = str(value).strip()
-            
-            logger.info(f" Procesando actualización: {field} = {value_str}")
-            
-            # 🔧 DETECTAR MULTIPLICACIÓN: campo * número
-            if " * " in value_str:
-                # Patrón: salario * 1.15, precio * 0.9, etc.
-                multiplication_pattern = r'(\w+)\s*\*\s*([\d.]+)'
-                match = regex.search(multiplication_pattern, value_str, regex.IGNORECASE)
-                
-                if match:
-                    source_field = match.group(1).strip()
-                    multiplier = float(match.group(2).strip())
-                    
-                    # Verificar que el campo fuente sea el mismo que se está actualizando
-                    if source_field.lower() == field.lower():
-                        # 🔧 CLAVE: Usar $set con conversión y multiplicación para manejar strings
-                        set_operations[field] = {
-                            "$multiply": [
-                                {"$toDouble": f"${source_field}"},  # Convertir string a número
-                                multiplier
-                            ]
-                        }
-                        logger.info(f" Multiplicación con conversión: {field} = toDouble(${source_field}) * {multiplier}")
-                    else:
-                        # Si es diferente, usar $set con $multiply
-                        set_operations[field] = {
-                            "$multiply": [
-                                {"$toDouble": f"${source_field}"},
-                                multiplier
-                            ]
-                        }
-                        logger.info(f" Multiplicación cruzada con conversión: {field} = toDouble(${source_field}) * {multiplier}")
-                    continue
-            
-            # 🔧 DETECTAR SUMA: campo + número
-            elif " + " in value_str:
-                addition_pattern = r'(\w+)\s*\+\s*([\d.]+)'
-                match = regex.search(addition_pattern, value_str, regex.IGNORECASE)
-                
-                if match:
-                    source_field = match.group(1).strip()
-                    increment = float(match.group(2).strip())
-                    
-                    set_operations[field] = {
-                        "$add": [
-                            {"$toDouble": f"${source_field}"},
-                            increment
-                        ]
-                    }
-                    logger.info(f" Suma con conversión: {field} = toDouble(${source_field}) + {increment}")
-                    continue
-            
-            # 🔧 DETECTAR RESTA: campo - número
-            elif " - " in value_str:
-                subtraction_pattern = r'(\w+)\s*-\s*([\d.]+)'
-                match = regex.search(subtraction_pattern, value_str, regex.IGNORECASE)
-                
-                if match:
-                    source_field = match.group(1).strip()
-                    decrement = float(match.group(2).strip())
-                    
-                    set_operations[field] = {
-                        "$subtract": [
-                            {"$toDouble": f"${source_field}"},
-                            decrement
-                        ]
-                    }
-                    logger.info(f" Resta con conversión: {field} = toDouble(${source_field}) - {decrement}")
-                    continue
-            
-            # 🔧 DETECTAR DIVISIÓN: campo / número
-            elif " / " in value_str:
-                division_pattern = r'(\w+)\s*/\s*([\d.]+)'
-                match = regex.search(division_pattern, value_str, regex.IGNORECASE)
-                
-                if match:
-                    source_field = match.group(1).strip()
-                    divisor = float(match.group(2).strip())
-                    
-                    set_operations[field] = {
-                        "$divide": [
-                            {"$toDouble": f"${source_field}"},
-                            divisor
-                        ]
-                    }
-                    logger.info(f" División con conversión: {field} = toDouble(${source_field}) / {divisor}")
-                    continue
-            
-            # Si no es una operación matemática, es un valor literal
-            else:
-                # Intentar convertir a número si es posible
-                try:
-                    if '.' in value_str:
-                        numeric_value = float(value_str)
-                    else:
-                        numeric_value = int(value_str)
-                    set_operations[field] = numeric_value
-                    logger.info(f" Valor numérico: {field} = {numeric_value}")
-                except ValueError:
-                    # Es un string
-                    set_operations[field] = value_str
-                    logger.info(f" Valor string: {field} = '{value_str}'")
-        
-        # 🔧 CONSTRUIR OPERACIÓN MONGODB FINAL
-        # Solo usar $set ya que estamos manejando las conversiones manualmente
-        
-        if set_operations:
-            mongo_update["$set"] = set_operations
-            logger.info(f" Operaciones $set: {set_operations}")
-        
-        # Si no hay operaciones específicas, usar $set por defecto
-        if not mongo_update:
-            mongo_update["$set"] = update_values
-            logger.warning(" No se detectaron operaciones matemáticas, usando $set por defecto")
-        
-        logger.info(f" Operación UPDATE final: {mongo_update}")
-        return mongo_update
-
-
     def translate_delete(self):
         """
         Traduce una consulta DELETE a operaciones de MongoDB.
@@ -1475,7 +1571,7 @@ class SQLToMongoDBTranslator:
         constraints = create_info["constraints"]
         schema = create_info.get("schema")  # Usar get() por seguridad
         
-        logger.info(f"Creando colección '{collection}' con {len(columns)} columnas")
+        logger.debug("Creando colección '%s' con %s columnas", collection, len(columns))
         
         # Construir opciones de MongoDB
         options = {}
@@ -1485,7 +1581,7 @@ class SQLToMongoDBTranslator:
             options["validator"] = schema
             options["validationLevel"] = "moderate"  # moderate|strict|off
             options["validationAction"] = "warn"     # warn|error
-            logger.info("Schema de validación agregado")
+            logger.debug("Schema de validación agregado")
         
         # 2. Agregar información de índices
         indexes_to_create = []
@@ -1498,7 +1594,7 @@ class SQLToMongoDBTranslator:
                 "name": "primary_key_index"
             }
             indexes_to_create.append(pk_index)
-            logger.info(f"Índice PRIMARY KEY: {constraints['primary_keys']}")
+            logger.debug("Índice PRIMARY KEY: %s", constraints['primary_keys'])
         
         # Índices para campos UNIQUE
         for i, column in enumerate(columns):
@@ -1559,7 +1655,7 @@ class SQLToMongoDBTranslator:
             result["warnings"] = warnings
             self.warnings.extend(warnings)
         
-        logger.info(f"Traducción CREATE TABLE completada: {len(columns)} columnas, {len(indexes_to_create)} índices")
+        logger.debug("Traducción CREATE TABLE completada: %s columnas, %s índices", len(columns), len(indexes_to_create))
         return result
 
     def translate_drop_table(self):
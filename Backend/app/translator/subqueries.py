@@ -0,0 +1,308 @@
+import re
+import logging
+
+from app.parser.sql_ast import parse_sql
+from app.parser.sql_parser import SQLParser
+from app.translator.pipeline_optimizer import optimize_pipeline, pipeline_as_find
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Prefijo del array auxiliar que añade cada semi-join ($lookup) al documento
+SUBQUERY_FIELD_PREFIX = "_subquery"
+
+# Operadores de comparación admitidos en la correlación con la consulta externa
+_EXPR_OPERATORS = {"=": "$eq", "<>": "$ne", "!=": "$ne", ">": "$gt", ">=": "$gte", "<": "$lt", "<=": "$lte"}
+
+# Operador equivalente al intercambiar los lados de la comparación
+_SWAPPED = {"$gt": "$lt", "$gte": "$lte", "$lt": "$gt", "$lte": "$gte", "$eq": "$eq", "$ne": "$ne"}
+
+# Cláusulas de la subconsulta que cambian qué filas devuelve más allá de su filtro
+_UNSUPPORTED_INNER_CLAUSES = ("GROUP BY", "HAVING", "ORDER BY", "LIMIT", "OFFSET")
+
+_COMPARISON = re.compile(r'^([\w.]+)\s*(<>|!=|>=|<=|=|>|<)\s*([\w.]+)$')
+_FROM_TABLE = re.compile(r'^\s*([\w.]+)(?:\s+(?:AS\s+)?(\w+))?\s*$', re.IGNORECASE)
+_PLAIN_FIELD = re.compile(r'^(?:DISTINCT\s+)?([\w.]+)$', re.IGNORECASE)
+
+
+def split_conjuncts(tokens):
+    """
+    Divide los tokens de una cláusula WHERE en las condiciones unidas por AND de
+    nivel superior (el AND de BETWEEN no separa condiciones).
+
+    Args:
+        tokens (list): Tokens de la cláusula
+
+    Returns:
+        list: Listas de tokens de cada condición, o None si hay un OR de nivel superior
+    """
+    if not tokens:
+        return []
+    depth = tokens[0].depth
+    conjuncts, current, in_between = [], [], False
+    for token in tokens:
+        if token.depth == depth and token.kind == "word":
+            if token.upper == "OR":
+                return None
+            if token.upper == "BETWEEN":
+                in_between = True
+            elif token.upper == "AND":
+                if in_between:
+                    in_between = False
+                else:
+                    conjuncts.append(current)
+                    current = []
+                    continue
+        current.append(token)
+    conjuncts.append(current)
+    return [conjunct for conjunct in conjuncts if conjunct]
+
+
+def parse_subquery_predicate(sql, tokens):
+    """
+    Reconoce una condición [NOT] EXISTS (SELECT ...) o campo [NOT] IN (SELECT ...).
+
+    Args:
+        sql (str): Consulta de la que proceden los tokens
+        tokens (list): Tokens de la condición
+
+    Returns:
+        dict: kind ("exists" o "in"), field, negate y subquery (SQL interno), o None
+    """
+    opening = next((i for i, token in enumerate(tokens) if token.value == "("), None)
+    if opening is None or opening + 1 >= len(tokens) or tokens[opening + 1].upper != "SELECT":
+        return None
+    depth = tokens[opening].depth
+    closing = tokens[-1]
+    if closing.value != ")" or closing.depth != depth or any(t.depth <= depth for t in tokens[opening + 1:-1]):
+        return None
+
+    words = [token.upper for token in tokens[:opening]]
+    subquery = sql[tokens[opening].end:closing.start].strip()
+    if words in (["EXISTS"], ["NOT", "EXISTS"]):
+        return {"kind": "exists", "field": None, "negate": words[0] == "NOT", "subquery": subquery}
+
+    negate = words[-2:] == ["NOT", "IN"]
+    keyword_count = 2 if negate else 1
+    if words[-1:] != ["IN"] or opening <= keyword_count:
+        return None
+    field_tokens = tokens[:opening - keyword_count]
+    field = sql[field_tokens[0].start:field_tokens[-1].end]
+    if not re.fullmatch(r'[\w.]+', field):
+        return None
+    return {"kind": "in", "field": field, "negate": negate, "subquery": subquery}
+
+
+def table_qualifiers(from_text):
+    """
+    Nombre y alias de la tabla de una cláusula FROM sin JOINs.
+
+    Returns:
+        tuple: (tabla, conjunto de prefijos válidos) o (None, set()) si no es una tabla simple
+    """
+    match = _FROM_TABLE.match(from_text or "")
+    if not match:
+        return None, set()
+    table = match.group(1)
+    qualifiers = {table}
+    if match.group(2):
+        qualifiers.add(match.group(2))
+    return table, qualifiers
+
+
+def strip_qualifier(field, qualifiers):
+    """Quita el prefijo de tabla (u.campo -> campo) si es uno de los indicados."""
+    prefix, _, name = field.partition(".")
+    return name if name and prefix in qualifiers else field
+
+
+def strip_filter_qualifiers(condition, qualifiers):
+    """Quita los prefijos de tabla de las rutas de campo de un filtro."""
+    stripped = {}
+    for key, value in condition.items():
+        if key in ("$and", "$or", "$nor") and isinstance(value, list):
+            stripped[key] = [strip_filter_qualifiers(item, qualifiers) if isinstance(item, dict) else item for item in value]
+        elif key.startswith("$"):
+            stripped[key] = value
+        else:
+            stripped[strip_qualifier(key, qualifiers)] = value
+    return stripped
+
+
+def _references(text, qualifiers):
+    return any(re.search(rf'\b{re.escape(qualifier)}\.\w', text) for qualifier in qualifiers)
+
+
+def build_semi_join(predicate, index, outer_qualifiers):
+    """
+    Traduce una subconsulta IN / EXISTS a un semi-join con $lookup.
+
+    La sub-pipeline se detiene en la primera coincidencia ($limit: 1), porque solo
+    importa si existe alguna. Las condiciones que comparan con columnas de la consulta
+    externa (subconsultas correlacionadas) se pasan con let y se evalúan con $expr;
+    en IN la columna comparada usa localField/foreignField, que aprovecha índices
+    (sintaxis concisa de MongoDB 5.0+; el conector la convierte en servidores anteriores).
+
+    Args:
+        predicate (dict): Resultado de parse_subquery_predicate
+        index (int): Posición de la subconsulta (da nombre al array auxiliar)
+        outer_qualifiers (set): Nombre y alias de la tabla externa
+
+    Returns:
+        dict: stages (etapas del semi-join), as (array auxiliar) e inline (datos para
+            sustituir el $lookup por $in al ejecutar, solo IN sin correlación), o None
+            si la subconsulta no se puede traducir
+    """
+    statement = parse_sql(predicate["subquery"])
+    if statement.query_type != "SELECT" or statement.has_union or statement.has_joins or statement.has_subquery:
+        return None
+    if any(statement.has_clause(keyword) for keyword in _UNSUPPORTED_INNER_CLAUSES):
+        return None
+    inner_table, inner_qualifiers = table_qualifiers(statement.clause_text("FROM"))
+    if not inner_table:
+        return None
+    # Un alias de la subconsulta oculta al de la consulta externa
+    outer_qualifiers = outer_qualifiers - inner_qualifiers
+
+    inner_field = None
+    if predicate["kind"] == "in":
+        select_match = _PLAIN_FIELD.match(statement.clause_text("SELECT") or "")
+        if not select_match or select_match.group(1) == "*":
+            return None
+        inner_field = strip_qualifier(select_match.group(1), inner_qualifiers)
+
+    where = statement.clause("WHERE")
+    conjuncts = split_conjuncts(where.tokens) if where else []
+    if conjuncts is None:
+        # Un OR de nivel superior solo se admite si no hace referencia a la consulta externa
+        if _references(where.text, outer_qualifiers):
+            return None
+        conjuncts = [where.tokens]
+
+    let, expressions, plain = {}, [], []
+    for tokens in conjuncts:
+        text = predicate["subquery"][tokens[0].start:tokens[-1].end]
+        if not _references(text, outer_qualifiers):
+            plain.append(text)
+            continue
+        comparison = _COMPARISON.match(text)
+        if not comparison:
+            return None
+        left, operator, right = comparison.groups()
+        operator = _EXPR_OPERATORS[operator]
+        if _references(left, outer_qualifiers) and not _references(right, outer_qualifiers):
+            left, right, operator = right, left, _SWAPPED[operator]
+        elif _references(left, outer_qualifiers) or not _references(right, outer_qualifiers):
+            return None
+        variable = f"ref{len(let)}"
+        let[variable] = f"${strip_qualifier(right, outer_qualifiers)}"
+        expressions.append({operator: [f"${strip_qualifier(left, inner_qualifiers)}", f"$${variable}"]})
+
+    filter_query = {}
+    if plain:
+        filter_query = SQLParser(f"SELECT * FROM {inner_table} WHERE {' AND '.join(plain)}").get_where_clause()
+        filter_query = strip_filter_qualifiers(filter_query, inner_qualifiers)
+
+    match = dict(filter_query)
+    if expressions:
+        match["$expr"] = expressions[0] if len(expressions) == 1 else {"$and": expressions}
+
+    field_name = f"{SUBQUERY_FIELD_PREFIX}{index}"
+    lookup = {"from": inner_table}
+    outer_field = None
+    if predicate["kind"] == "in":
+        outer_field = strip_qualifier(predicate["field"], outer_qualifiers)
+        lookup["localField"] = outer_field
+        lookup["foreignField"] = inner_field
+    if let:
+        lookup["let"] = let
+    lookup["pipeline"] = ([{"$match": match}] if match else []) + [{"$limit": 1}, {"$project": {"_id": 1}}]
+    lookup["as"] = field_name
+
+    semi_join = {
+        "as": field_name,
+        "stages": [
+            {"$lookup": lookup},
+            {"$match": {field_name: {"$eq": []} if predicate["negate"] else {"$ne": []}}}
+        ],
+        "inline": None
+    }
+    if predicate["kind"] == "in" and not let:
+        values_pipeline = [{"$match": filter_query}] if filter_query else []
+        values_pipeline.append({"$group": {"_id": f"${inner_field}"}})
+        semi_join["inline"] = {
+            "as": field_name,
+            "field": outer_field,
+            "negate": predicate["negate"],
+            "collection": inner_table,
+            "pipeline": values_pipeline
+        }
+    return semi_join
+
+
+def insert_semi_joins(pipeline, semi_joins):
+    """
+    Inserta los semi-joins tras los $match iniciales del pipeline externo, de modo que
+    se evalúan sobre los documentos originales y ya filtrados, y elimina después los
+    arrays auxiliares.
+    """
+    position = 0
+    while position < len(pipeline) and "$match" in pipeline[position]:
+        position += 1
+    stages = [stage for semi_join in semi_joins for stage in semi_join["stages"]]
+    stages.append({"$unset": [semi_join["as"] for semi_join in semi_joins]})
+    return pipeline[:position] + stages + pipeline[position:]
+
+
+def inline_subqueries(query, values_by_field):
+    """
+    Sustituye los semi-joins de subconsultas IN ya ejecutadas por $in / $nin con sus
+    valores. Si el pipeline resultante es una consulta simple, devuelve la operación
+    find equivalente.
+
+    Args:
+        query (dict): Operación aggregate con "subqueries"
+        values_by_field (dict): Valores de cada subconsulta por su array auxiliar ("as")
+
+    Returns:
+        dict: Operación con los valores en línea
+    """
+    inlined = {subquery["as"]: subquery for subquery in query["subqueries"] if subquery["as"] in values_by_field}
+    if not inlined:
+        return query
+
+    pipeline = []
+    for stage in query["pipeline"]:
+        lookup = stage.get("$lookup")
+        if lookup and lookup.get("as") in inlined:
+            subquery = inlined[lookup["as"]]
+            operator = "$nin" if subquery["negate"] else "$in"
+            pipeline.append({"$match": {subquery["field"]: {operator: list(values_by_field[lookup["as"]])}}})
+            continue
+        match = stage.get("$match")
+        if match and len(match) == 1 and next(iter(match)) in inlined:
+            continue
+        if "$unset" in stage:
+            remaining = [field for field in stage["$unset"] if field not in inlined]
+            if remaining:
+                pipeline.append({"$unset": remaining})
+            continue
+        pipeline.append(stage)
+
+    result = {key: value for key, value in query.items() if key not in ("pipeline", "subqueries")}
+    remaining = [subquery for subquery in query["subqueries"] if subquery["as"] not in inlined]
+    if remaining:
+        result["subqueries"] = remaining
+    result["pipeline"] = optimize_pipeline(pipeline)
+
+    find_spec = None if remaining else pipeline_as_find(result["pipeline"])
+    if find_spec is None:
+        return result
+    result.pop("pipeline")
+    result.update(find_spec, operation="find")
+    return result
+
+
+def subquery_values(documents):
+    """Valores distintos devueltos por el pipeline de una subconsulta IN (sin NULL, que IN nunca iguala)."""
+    return [document["_id"] for document in documents if document.get("_id") is not None]
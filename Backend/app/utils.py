@@ -1,37 +1,28 @@
 import re
+import json
 import logging
 
+from app.serialization import dumps
+from app.log_config import configure_logging
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
 def setup_logging(log_level=logging.INFO, log_file=None):
     """
-    Configura el sistema de logging para la aplicación.
+    Configura el sistema de logging para la aplicación. La escritura a consola y archivo
+    se hace en segundo plano (ver app.log_config); LOG_FORMAT, LOG_LEVELS y
+    LOG_SAMPLE_RATES ajustan el formato, los niveles por módulo y el muestreo.
     
     Args:
         log_level (int): Nivel de logging (default: INFO)
         log_file (str, optional): Ruta al archivo de log
     """
-    # Configurar formato de log
-    log_format = '%(asctime)s [%(levelname)s] - %(name)s - %(message)s'
-    
-    # Crear manejadores
-    handlers = [logging.StreamHandler()]
-    
-    # Añadir manejador de archivo si se proporcionó
-    if log_file:
-        handlers.append(logging.FileHandler(log_file))
-    
-    # Aplicar configuración
-    logging.basicConfig(
-        level=log_level,
-        format=log_format,
-        handlers=handlers
-    )
+    configure_logging(log_level=log_level, log_file=log_file)
     
-    logger.info(f"Logging configurado con nivel {logging.getLevelName(log_level)}")
+    logger.info("Logging configurado con nivel %s", logging.getLevelName(log_level))
     if log_file:
-        logger.info(f"Logs se escribirán en {log_file}")
+        logger.info("Logs se escribirán en %s", log_file)
 
 def is_valid_mongo_db_name(name):
     """
@@ -114,6 +105,64 @@ def format_error_response(error_message, status_code=400):
         "status": "error"
     }, status_code
 
+def generate_ndjson(documents, chunk_size=100):
+    """
+    Genera un flujo NDJSON (un documento JSON por línea) a partir de un iterable.
+    Los documentos se agrupan en bloques para no emitir escrituras diminutas.
+    
+    Args:
+        documents (iterable): Documentos (se admiten tipos BSON)
+        chunk_size (int): Documentos por bloque emitido
+        
+    Yields:
+        str: Bloque de líneas NDJSON
+    """
+    buffer = []
+    try:
+        for document in documents:
+            buffer.append(dumps(document))
+            if len(buffer) >= chunk_size:
+                yield "\n".join(buffer) + "\n"
+                buffer = []
+    except Exception as e:
+        logger.error("Error durante el streaming de resultados: %s", e)
+        buffer.append(json.dumps({"error": str(e)}))
+    
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+def generate_json_array(documents, chunk_size=100):
+    """
+    Genera un array JSON de forma incremental a partir de un iterable. Si la
+    lectura falla a mitad, el array se cierra con un último elemento {"error": ...}
+    (como la línea de error de generate_ndjson), ya que el código de estado ya se envió.
+    
+    Args:
+        documents (iterable): Documentos (se admiten tipos BSON)
+        chunk_size (int): Documentos por bloque emitido
+        
+    Yields:
+        str: Fragmento del array JSON
+    """
+    yield "["
+    buffer = []
+    first = True
+    try:
+        for document in documents:
+            buffer.append(dumps(document))
+            if len(buffer) >= chunk_size:
+                yield ("" if first else ",") + ",".join(buffer)
+                first = False
+                buffer = []
+    except Exception as e:
+        # El código de estado ya se envió: el error va dentro del array, que se cierra igual
+        logger.error("Error durante el streaming de resultados: %s", e)
+        buffer.append(json.dumps({"error": str(e)}))
+    
+    if buffer:
+        yield ("" if first else ",") + ",".join(buffer)
+    yield "]"
+
 def parse_connection_string(connection_string):
     """
     Parsea una cadena de conexión MongoDB y extrae sus componentes.
@@ -176,7 +225,7 @@ def parse_connection_string(connection_string):
         
         return result
     except Exception as e:
-        logger.error(f"Error al parsear cadena de conexión: {e}")
+        logger.error("Error al parsear cadena de conexión: %s", e)
         return None
 
 def deep_compare_objects(obj1, obj2):
@@ -0,0 +1,35 @@
+"""
+Punto de entrada ASGI del endpoint /translate asíncrono.
+
+Se ejecuta junto a la API Flask (main.py) con cualquier servidor ASGI, por ejemplo:
+    uvicorn asgi:app --port 5001
+"""
+from dotenv import load_dotenv
+import os
+import logging
+
+from app.async_server import create_asgi_app
+from app.translator.cache import TranslationCache
+from app.utils import setup_logging
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Configurar logging
+setup_logging(log_level=logging.INFO, log_file='app.log')
+logger = logging.getLogger(__name__)
+
+app = create_asgi_app(
+    os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'),
+    os.environ.get('JWT_SECRET_KEY', 'dev-secret-key-change-in-production'),
+    database_name=os.environ.get('DEFAULT_DATABASE') or None,
+    count_mode=os.environ.get('COUNT_MODE'),
+    cache=TranslationCache(
+        max_size=int(os.environ.get('TRANSLATION_CACHE_SIZE', 512)),
+        ttl=float(os.environ.get('TRANSLATION_CACHE_TTL', 300))
+    ),
+    allowed_origins=["http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:3000"],
+    auto_parameterize=os.environ.get('AUTO_PARAMETERIZE', 'True').lower() in ('true', '1', 't')
+)
+
+logger.info("Aplicación ASGI inicializada")
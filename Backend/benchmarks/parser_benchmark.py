@@ -0,0 +1,76 @@
+"""
+Mide el tiempo por consulta del análisis y la traducción SQL→MongoDB, y compara la
+detección de funciones con un patrón por función frente a la alternativa única.
+
+Uso:
+    python benchmarks/parser_benchmark.py [repeticiones]
+"""
+import os
+import re
+import sys
+import time
+import logging
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.parser.sql_parser import SQLParser
+from app.parser.function_parser import FunctionParser
+from app.translator.sql_to_mongodb import SQLToMongoDBTranslator
+
+QUERIES = [
+    "SELECT * FROM usuarios WHERE id = 5",
+    "SELECT nombre, edad FROM usuarios WHERE edad > 30 AND activo = 1 ORDER BY edad DESC LIMIT 10",
+    "SELECT UPPER(nombre), ROUND(salario, 2) FROM empleados WHERE YEAR(alta) = 2024",
+    "SELECT departamento, COUNT(*) AS total FROM empleados GROUP BY departamento HAVING COUNT(*) > 5",
+    "SELECT DISTINCT ciudad FROM clientes WHERE pais IN ('ES', 'MX', 'AR')",
+    "SELECT u.nombre, p.total FROM usuarios u INNER JOIN pedidos p ON u.id = p.usuario_id WHERE p.total > 100",
+    "INSERT INTO usuarios (nombre, edad) VALUES ('Ana', 30), ('Luis', 25)",
+    "UPDATE usuarios SET edad = 31 WHERE nombre = 'Ana'",
+    "DELETE FROM usuarios WHERE edad BETWEEN 18 AND 21",
+    "CREATE TABLE productos (id INT PRIMARY KEY, nombre VARCHAR(100) NOT NULL, precio DECIMAL(10,2) DEFAULT 0)",
+]
+
+
+def legacy_has_functions(function_parser, query):
+    """Detección original: un patrón por cada función del catálogo."""
+    query_upper = query.upper()
+    for func_name in function_parser.all_functions.keys():
+        if re.search(rf'\b{func_name}\s*\(', query_upper):
+            return True
+    return False
+
+
+def best_of(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def translate_all():
+    for query in QUERIES:
+        SQLToMongoDBTranslator(SQLParser(query)).translate()
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    logging.disable(logging.CRITICAL)
+
+    translate_all()  # calentar caches de módulos y patrones
+    total = best_of(translate_all, repeat)
+    print(f"Análisis + traducción: {total / len(QUERIES) * 1e6:8.1f} µs/consulta ({len(QUERIES)} consultas)")
+
+    function_parser = FunctionParser()
+    loops = 200
+
+    legacy = best_of(lambda: [legacy_has_functions(function_parser, q) for q in QUERIES * loops], repeat)
+    combined = best_of(lambda: [function_parser.has_functions(q) for q in QUERIES * loops], repeat)
+    calls = len(QUERIES) * loops
+    print(f"Detección de funciones (por patrón): {legacy / calls * 1e6:6.2f} µs/consulta")
+    print(f"Detección de funciones (alternativa): {combined / calls * 1e6:6.2f} µs/consulta (x{legacy / combined:.1f})")
+
+
+if __name__ == "__main__":
+    main()
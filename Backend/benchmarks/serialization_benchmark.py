@@ -0,0 +1,90 @@
+"""
+Compara el coste de convertir resultados de MongoDB a JSON:
+
+- legacy: recorrido recursivo previo (solo ObjectId) + json.dumps de jsonify
+- dispatch: app.serialization.dumps en una sola pasada (orjson si está instalado)
+
+Uso:
+    python benchmarks/serialization_benchmark.py [documentos] [campos] [repeticiones]
+"""
+import os
+import sys
+import copy
+import json
+import time
+import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId, Decimal128
+from app import serialization
+
+
+def build_documents(count, width):
+    """Genera documentos anchos con subdocumentos, listas y tipos BSON."""
+    documents = []
+    for i in range(count):
+        document = {"_id": ObjectId(), "creado": datetime.datetime(2024, 1, 1, 12, 0, i % 60)}
+        for j in range(width):
+            document[f"campo_{j}"] = f"valor {i}-{j}" if j % 3 else i * j
+        document["precio"] = Decimal128("19.99")
+        document["direccion"] = {"calle": "Mayor", "numero": i, "ref": ObjectId()}
+        document["etiquetas"] = [{"id": ObjectId(), "nombre": "a"}, {"id": ObjectId(), "nombre": "b"}]
+        documents.append(document)
+    return documents
+
+
+def legacy_serialize(document):
+    """Recorrido recursivo equivalente al _serialize_dict original."""
+    for key, value in list(document.items()):
+        if isinstance(value, ObjectId):
+            document[key] = str(value)
+        elif isinstance(value, dict):
+            legacy_serialize(value)
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                if isinstance(item, dict):
+                    legacy_serialize(item)
+                elif isinstance(item, ObjectId):
+                    value[i] = str(item)
+
+
+def legacy_path(documents):
+    for document in documents:
+        legacy_serialize(document)
+    # jsonify (proveedor por defecto de Flask) usaba default=str para fechas/Decimal128
+    return json.dumps(documents, default=str, sort_keys=True)
+
+
+def dispatch_path(documents):
+    return serialization.dumps(documents, sort_keys=True)
+
+
+def measure(function, documents, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        batch = copy.deepcopy(documents)
+        start = time.perf_counter()
+        function(batch)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    documents = build_documents(count, width)
+    encoder = "orjson" if serialization.orjson is not None else "json"
+
+    legacy = measure(legacy_path, documents, repeat)
+    dispatch = measure(dispatch_path, documents, repeat)
+
+    print(f"{count} documentos x {width} campos (mejor de {repeat})")
+    print(f"  legacy   : {legacy * 1000:8.1f} ms")
+    print(f"  dispatch : {dispatch * 1000:8.1f} ms  ({encoder}, x{legacy / dispatch:.1f})")
+
+
+if __name__ == "__main__":
+    main()
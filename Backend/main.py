@@ -1,22 +1,34 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context, g
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
 import os
 import logging
+import itertools
+import tempfile
 
 # Importar módulos de la aplicación existentes
-from app.parser.sql_parser import SQLParser
-from app.translator.sql_to_mongodb import SQLToMongoDBTranslator
-from app.connector import MongoDBConnector
+from app.translator.cache import TranslationCache, SCHEMA_CHANGING_TYPES, normalize_sql
+from app.translator.parameterizer import prepare_statement, translate_prepared, translate_sql
+from app.translator.pagination import KeysetPaginator
+from app.parser.insert_stream import InsertStream
+from app.parser import patterns
+from app.connector import MongoDBConnector, STREAMABLE_OPERATIONS, DEFAULT_COUNT_MODE
+from app.services.batch_executor import BatchExecutor
+from app.services.sql_importer import ImportJobManager
+from app.services.index_advisor import IndexAdvisor
 from app.mongo_shell import MongoShellQueryGenerator
-from app.utils import setup_logging, format_error_response
+from app.utils import setup_logging, format_error_response, generate_ndjson, generate_json_array, is_valid_mongo_db_name
+from app.serialization import BSONJSONProvider
+from app.instrumentation import start_request, finish_request, current_timer, stage, ShapeLatencyStats
+from app.metrics import REGISTRY, CONTENT_TYPE, Counter, Gauge, HTTP_REQUESTS, HTTP_LATENCY, QUERY_REQUESTS
+from app.log_config import truncated
 
 # Importar módulos de autenticación nuevos
 from app.models.user import UserModel
 from app.auth.routes import create_auth_blueprint
 from app.admin.routes import create_admin_blueprint
-from app.auth.middleware import auth_required, permission_required, get_current_user_claims
+from app.auth.middleware import auth_required, admin_required, permission_required, get_current_user_claims, QUERY_TYPE_PERMISSIONS
 
 import traceback
 
@@ -29,6 +41,9 @@ logger = logging.getLogger(__name__)
 
 # Inicializar Flask
 app = Flask(__name__)
+
+# jsonify codifica los documentos de MongoDB (ObjectId, fechas, Decimal128...) en una sola pasada
+app.json = BSONJSONProvider(app)
 CORS(app, 
      origins=["http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:3000"],
      methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
@@ -45,11 +60,66 @@ MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
 AUTH_DB_NAME = os.environ.get('AUTH_DB_NAME', 'sql_middleware_auth')
 DEFAULT_DB = None  # No seleccionar base de datos por defecto
 
+# Cache de traducciones compartido por /translate y /generate-shell-query
+translation_cache = TranslationCache(
+    max_size=int(os.environ.get('TRANSLATION_CACHE_SIZE', 512)),
+    ttl=float(os.environ.get('TRANSLATION_CACHE_TTL', 300))
+)
+
+# Estadísticas del cache de traducciones exportadas en /metrics (se leen al exportar)
+def _translation_cache_lookups():
+    stats = translation_cache.get_stats()
+    return [({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])]
+
+Counter("sqlmongo_translation_cache_lookups_total", "Búsquedas en el cache de traducciones", ("result",)) \
+    .set_function(_translation_cache_lookups)
+Gauge("sqlmongo_translation_cache_entries", "Traducciones guardadas en el cache") \
+    .set_function(lambda: translation_cache.get_stats()["size"])
+Gauge("sqlmongo_translation_cache_hit_ratio", "Proporción de aciertos del cache de traducciones") \
+    .set_function(lambda: translation_cache.get_stats()["hit_rate"])
+
+# Token opcional que deben enviar los recolectores de /metrics (Authorization: Bearer ...)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Asesor de índices: formas de filtro/orden de las consultas traducidas en este proceso
+index_advisor = IndexAdvisor(max_shapes=int(os.environ.get('INDEX_ADVISOR_MAX_SHAPES', 2000)))
+
+# Histogramas de latencia por etapa para cada forma de consulta de /translate
+latency_stats = ShapeLatencyStats(max_shapes=int(os.environ.get('TIMING_MAX_SHAPES', 500)))
+
+# Extraer literales automáticamente para reutilizar traducciones entre consultas con la misma forma
+AUTO_PARAMETERIZE = os.environ.get('AUTO_PARAMETERIZE', 'True').lower() in ('true', '1', 't')
+
+# Tamaño de lote del cursor cuando se piden resultados en streaming
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 500))
+
+# Tamaño de página cuando se continúa una paginación sin indicar page_size
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 50))
+
+# Número máximo de sentencias aceptadas por /translate/batch
+MAX_BATCH_STATEMENTS = int(os.environ.get('MAX_BATCH_STATEMENTS', 1000))
+
+# INSERT a partir de este tamaño (caracteres) se insertan por lotes sin traducirse completos
+BULK_INSERT_THRESHOLD = int(os.environ.get('BULK_INSERT_THRESHOLD', 256 * 1024))
+
+# Documentos por insert_many en la inserción por lotes
+BULK_INSERT_BATCH_SIZE = int(os.environ.get('BULK_INSERT_BATCH_SIZE', 1000))
+
+# Directorio donde se guardan los scripts y checkpoints de /import/sql
+IMPORT_DIR = os.environ.get('IMPORT_DIR', os.path.join(tempfile.gettempdir(), 'sql_imports'))
+
+# Sentencias INSERT que se cargan en paralelo en cada importación
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 4))
+
+# SELECT COUNT(*) sin WHERE: "approximate" (metadatos de la colección) o "exact"
+COUNT_MODE = os.environ.get('COUNT_MODE', DEFAULT_COUNT_MODE)
+
 # Inicializar conexiones
 try:
     # Conector para queries SQL (tu código existente)
     mongo_connector = MongoDBConnector.get_instance(MONGO_URI)
-    logger.info(f"Conector MongoDB inicializado correctamente. URI: {MONGO_URI}")
+    mongo_connector.count_mode = COUNT_MODE
+    logger.info("Conector MongoDB inicializado correctamente. URI: %s", MONGO_URI)
     
     # Conexión separada para autenticación (nuevo)
     auth_client = mongo_connector.client
@@ -59,10 +129,13 @@ try:
     # Crear usuario admin por defecto si no existe (nuevo)
     user_model.create_admin_user()
     
-    logger.info(f"Sistema de autenticación inicializado en DB: {AUTH_DB_NAME}")
+    logger.info("Sistema de autenticación inicializado en DB: %s", AUTH_DB_NAME)
+    
+    # Importaciones de scripts SQL en segundo plano
+    import_manager = ImportJobManager(mongo_connector, IMPORT_DIR, workers=IMPORT_WORKERS, batch_size=BULK_INSERT_BATCH_SIZE)
     
 except Exception as e:
-    logger.error(f"Error al inicializar el sistema: {e}")
+    logger.error("Error al inicializar el sistema: %s", e)
     logger.error(traceback.format_exc())
 
 # Registrar blueprints de autenticación (nuevo)
@@ -82,6 +155,48 @@ def invalid_token_callback(error):
 def missing_token_callback(error):
     return jsonify({"error": "Token de autorización requerido"}), 401
 
+# Tiempos por etapa de cada petición: cabecera Server-Timing e histogramas por forma de consulta
+@app.before_request
+def start_request_timer():
+    g.request_timer, g.request_timer_token = start_request()
+
+@app.after_request
+def add_server_timing(response):
+    timer = g.get('request_timer')
+    if timer is not None:
+        response.headers['Server-Timing'] = timer.server_timing()
+        latency_stats.record(timer)
+        
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        HTTP_LATENCY.observe(timer.total_ms() / 1000, endpoint=endpoint)
+    
+    query_type = g.get('query_type')
+    if query_type:
+        QUERY_REQUESTS.inc(
+            query_type=query_type,
+            permission=QUERY_TYPE_PERMISSIONS.get(query_type, "none"),
+            status=response.status_code
+        )
+    return response
+
+@app.teardown_request
+def finish_request_timer(error=None):
+    token = g.pop('request_timer_token', None)
+    if token is not None:
+        finish_request(token)
+
+def _timed_json_response(payload, data):
+    """
+    Codifica la respuesta JSON midiendo la etapa "encode". Con timings en el cuerpo
+    de la petición, el resultado se devuelve en "results" junto a los tiempos por etapa.
+    """
+    timer = current_timer()
+    if data.get('timings') and timer is not None:
+        payload = {"results": payload, "timings": timer.as_dict()}
+    with stage("encode"):
+        return jsonify(payload)
+
 # Endpoints existentes con autenticación añadida
 
 @app.route('/health', methods=['GET'])
@@ -106,10 +221,10 @@ def get_databases():
     """
     try:
         databases = mongo_connector.get_available_databases()
-        logger.info(f"Obtenidas {len(databases)} bases de datos")
+        logger.info("Obtenidas %s bases de datos", len(databases))
         return jsonify({"databases": databases})
     except Exception as e:
-        logger.error(f"Error al obtener bases de datos: {e}")
+        logger.error("Error al obtener bases de datos: %s", e)
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
@@ -121,10 +236,10 @@ def get_collections(database_name):
     """
     try:
         collections = mongo_connector.get_collections(database_name)
-        logger.info(f"Obtenidas {len(collections)} colecciones de la base de datos {database_name}")
+        logger.info("Obtenidas %s colecciones de la base de datos %s", len(collections), database_name)
         return jsonify({"collections": collections})
     except Exception as e:
-        logger.error(f"Error al obtener colecciones: {e}")
+        logger.error("Error al obtener colecciones: %s", e)
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
@@ -142,13 +257,13 @@ def connect_database():
         database_name = data['database']
         collections = mongo_connector.set_database(database_name)
         
-        logger.info(f"Conexión establecida con la base de datos {database_name}")
+        logger.info("Conexión establecida con la base de datos %s", database_name)
         return jsonify({
             "message": f"Conectado a la base de datos {database_name}",
             "collections": collections
         })
     except Exception as e:
-        logger.error(f"Error al conectar a la base de datos: {e}")
+        logger.error("Error al conectar a la base de datos: %s", e)
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
@@ -163,38 +278,42 @@ def translate_sql_to_mongodb():
         # Obtener la consulta SQL del JSON recibido
         data = request.get_json()
         
-        # Verificar si se proporciona una base de datos específica para esta consulta
-        if 'database' in data:
-            database_name = data['database']
-            mongo_connector.set_database(database_name)
-            logger.info(f"Base de datos seleccionada para esta consulta: {database_name}")
-        else:
-            # Verificar si hay una base de datos seleccionada
-            if not mongo_connector.is_database_selected():
-                return jsonify({"error": "No hay una base de datos seleccionada. Proporcione una base de datos en la solicitud o use el endpoint /connect primero"}), 400
+        # La base de datos se resuelve por petición, sin cambiar la seleccionada por defecto
+        database_name = data.get('database') or mongo_connector.get_current_database()
+        if not database_name:
+            return jsonify({"error": "No hay una base de datos seleccionada. Proporcione una base de datos en la solicitud o use el endpoint /connect primero"}), 400
+        if not is_valid_mongo_db_name(database_name):
+            return jsonify({"error": f"Nombre de base de datos no válido: {database_name}"}), 400
+        logger.debug("Base de datos para esta consulta: %s", database_name)
         
         if not data or 'query' not in data:
             logger.error("Error: No se proporcionó la consulta SQL en el JSON")
             return jsonify({"error": "Se requiere una consulta SQL en el campo 'query'"}), 400
         
         sql_query = data['query']
-        logger.info(f"Consulta SQL recibida: {sql_query}")
         
-        # Parsear la consulta SQL para determinar el tipo (tu código existente)
-        parser = SQLParser(sql_query)
-        query_type = parser.get_query_type()
+        # INSERT masivos: lectura incremental de VALUES e inserción por lotes
+        if data.get('bulk') or (len(sql_query) >= BULK_INSERT_THRESHOLD and patterns.INSERT_HEADER.match(sql_query)):
+            return _insert_stream_response(sql_query, data, database_name)
         
-        # Nuevo: Verificar permisos según el tipo de consulta
-        permission_map = {
-            "SELECT": "select",
-            "INSERT": "insert", 
-            "UPDATE": "update",
-            "DELETE": "delete",
-            "CREATE": "create_table",
-            "DROP": "drop_table"
-        }
+        logger.info("Consulta SQL recibida: %s", truncated(sql_query))
+        
+        # Separar literales/marcadores para reutilizar la traducción por forma de consulta
+        with stage("prepare"):
+            prepared = prepare_statement(
+                sql_query,
+                params=data.get('params'),
+                auto_parameterize=data.get('parameterize', AUTO_PARAMETERIZE)
+            )
+        query_type = prepared.query_type
+        g.query_type = query_type
         
-        required_permission = permission_map.get(query_type)
+        timer = current_timer()
+        if timer is not None:
+            timer.shape = normalize_sql(prepared.template_sql)
+        
+        # Nuevo: Verificar permisos según el tipo de consulta
+        required_permission = QUERY_TYPE_PERMISSIONS.get(query_type)
         if not required_permission:
             return jsonify({"error": f"Tipo de consulta no soportado: {query_type}"}), 400
         
@@ -207,31 +326,284 @@ def translate_sql_to_mongodb():
                 "error": f"No tienes permisos para realizar operaciones de tipo {query_type}"
             }), 403
         
-        # Tu código existente continúa igual...
-        # Obtener el nombre de la tabla/colección
-        collection_name = parser.get_table_name()
-        logger.info(f"Nombre de colección detectado: {collection_name}")
+        # Traducir la consulta a formato MongoDB (o reutilizar la plantilla cacheada)
+        translation = translate_prepared(prepared, database_name, translation_cache)
+        collection_name = translation["collection"]
+        mongo_query = translation["mongo_query"]
+        logger.debug("Consulta MongoDB %s: %s", 'obtenida del cache' if translation['from_cache'] else 'generada', truncated(mongo_query))
+        index_advisor.record(database_name, collection_name, mongo_query)
+        
+        # EXPLAIN [ANALYZE]: resumen del plan; explain_raw añade la salida completa del servidor
+        if mongo_query.get("operation") == "explain":
+            mongo_query["include_raw"] = bool(data.get('explain_raw'))
+            return _timed_json_response(
+                mongo_connector.execute_query(collection_name, mongo_query, database_name=database_name), data
+            )
+        
+        # count_mode ("exact" o "approximate") elige cómo contar un COUNT(*) sin WHERE
+        if mongo_query.get("operation") == "count" and data.get('count_mode'):
+            mongo_query["mode"] = data['count_mode']
         
-        if not collection_name:
-            logger.error("Error: No se pudo determinar el nombre de la colección")
-            return jsonify({"error": "No se pudo determinar el nombre de la colección"}), 400
+        # Paginación keyset: page_size inicia la paginación y cursor pide la página siguiente
+        if data.get('page_size') or data.get('cursor'):
+            paginator = KeysetPaginator(
+                collection_name,
+                mongo_query,
+                data.get('page_size', DEFAULT_PAGE_SIZE),
+                data.get('cursor')
+            )
+            return _timed_json_response(mongo_connector.execute_paginated(
+                collection_name, paginator, serialize=False, database_name=database_name
+            ), data)
         
-        # Traducir la consulta a formato MongoDB
-        translator = SQLToMongoDBTranslator(parser)
-        mongo_query = translator.translate()
-        logger.info(f"Consulta MongoDB generada: {mongo_query}")
+        # Lecturas en streaming: los documentos se envían a medida que llegan del cursor
+        if data.get('stream') and mongo_query.get("operation") in STREAMABLE_OPERATIONS:
+            return _stream_query_response(collection_name, mongo_query, data, database_name)
         
         # Ejecutar la consulta en MongoDB
-        result = mongo_connector.execute_query(collection_name, mongo_query)
-        logger.info(f"Consulta ejecutada. Resultados: {len(result) if isinstance(result, list) else 1} documentos")
+        result = mongo_connector.execute_query(
+            collection_name, mongo_query, serialize=False, database_name=database_name
+        )
+        logger.info("Consulta ejecutada. Resultados: %s documentos", len(result) if isinstance(result, list) else 1)
         
+        # CREATE/DROP cambian el esquema: descartar traducciones previas de la colección
+        if query_type in SCHEMA_CHANGING_TYPES:
+            translation_cache.invalidate_collection(database_name, collection_name)
+        
+        return _timed_json_response(result, data)
+    except ValueError as e:
+        logger.error("Error de valor: %s", str(e))
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error inesperado: %s", str(e))
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+def _stream_query_response(collection_name, mongo_query, data, database_name):
+    """
+    Construye la respuesta en streaming (NDJSON o array JSON) de una consulta de lectura.
+    
+    Args:
+        collection_name (str): Colección a consultar
+        mongo_query (dict): Operación find o aggregate traducida
+        data (dict): Cuerpo de la petición (format, batch_size)
+        database_name (str): Base de datos de la petición
+        
+    Returns:
+        Response: Respuesta Flask que se genera a medida que avanza el cursor
+    """
+    batch_size = int(data.get('batch_size', STREAM_BATCH_SIZE))
+    if batch_size <= 0:
+        raise ValueError("batch_size debe ser un entero positivo")
+    
+    stream_format = data.get('format', 'ndjson')
+    if stream_format not in ('ndjson', 'json'):
+        raise ValueError(f"Formato de streaming no soportado: {stream_format}")
+    
+    documents = mongo_connector.stream_query(
+        collection_name, mongo_query, batch_size, serialize=False, database_name=database_name
+    )
+    
+    # Obtener el primer documento aquí para que los errores de ejecución
+    # se devuelvan con su código HTTP antes de empezar a enviar la respuesta
+    first = next(documents, None)
+    if first is not None:
+        documents = itertools.chain([first], documents)
+    
+    if stream_format == 'ndjson':
+        return Response(stream_with_context(generate_ndjson(documents)), mimetype='application/x-ndjson')
+    return Response(stream_with_context(generate_json_array(documents)), mimetype='application/json')
+
+def _insert_stream_response(sql_query, data, database_name):
+    """
+    Ejecuta un INSERT multi-fila leyendo sus tuplas de forma incremental e insertando
+    los documentos por lotes (insert_many no ordenado).
+    
+    Args:
+        sql_query (str): Sentencia INSERT
+        data (dict): Cuerpo de la petición (batch_size, stream)
+        database_name (str): Base de datos de la petición
+        
+    Returns:
+        Response: Resumen JSON o, con stream, progreso NDJSON por lote y resumen final
+    """
+    if not get_current_user_claims().get("permissions", {}).get(QUERY_TYPE_PERMISSIONS["INSERT"], False):
+        return jsonify({"error": "No tienes permisos para realizar operaciones de tipo INSERT"}), 403
+    
+    stream = InsertStream(sql_query, int(data.get('batch_size', BULK_INSERT_BATCH_SIZE)))
+    logger.info(
+        "INSERT por lotes recibido: %s caracteres para %s (lotes de %s documentos)",
+        len(sql_query), stream.table, stream.batch_size
+    )
+    
+    if not data.get('stream'):
+        return jsonify(mongo_connector.execute_insert_stream(stream.table, stream, database_name=database_name))
+    
+    def progress():
+        yield from mongo_connector.iter_insert_stream(stream.table, stream, database_name=database_name)
+        yield {
+            "done": True,
+            "rows_read": stream.rows_read,
+            "rows_rejected": stream.rows_rejected,
+            "row_errors": stream.errors
+        }
+    
+    return Response(stream_with_context(generate_ndjson(progress(), chunk_size=1)), mimetype='application/x-ndjson')
+
+@app.route('/translate/batch', methods=['POST'])
+@auth_required
+def translate_batch():
+    """
+    Endpoint para traducir y ejecutar varias sentencias SQL en una sola petición.
+    Las escrituras consecutivas sobre la misma colección se envían en un único bulk_write.
+    
+    Cuerpo: {"statements": [sql | {"query", "params"}], "database", "ordered" (default True)}
+    """
+    try:
+        data = request.get_json()
+        
+        statements = data.get('statements') if data else None
+        if not isinstance(statements, list) or not statements:
+            return jsonify({"error": "Se requiere una lista de sentencias SQL en el campo 'statements'"}), 400
+        if len(statements) > MAX_BATCH_STATEMENTS:
+            return jsonify({"error": f"El lote supera el máximo de {MAX_BATCH_STATEMENTS} sentencias"}), 400
+        
+        database_name = data.get('database') or mongo_connector.get_current_database()
+        if not database_name:
+            return jsonify({"error": "No hay una base de datos seleccionada. Proporcione una base de datos en la solicitud o use el endpoint /connect primero"}), 400
+        if not is_valid_mongo_db_name(database_name):
+            return jsonify({"error": f"Nombre de base de datos no válido: {database_name}"}), 400
+        
+        ordered = data.get('ordered', True)
+        if not isinstance(ordered, bool):
+            return jsonify({"error": "El campo 'ordered' debe ser booleano"}), 400
+        
+        claims = get_current_user_claims()
+        executor = BatchExecutor(
+            mongo_connector,
+            translation_cache,
+            auto_parameterize=data.get('parameterize', AUTO_PARAMETERIZE)
+        )
+        logger.info("Lote recibido: %s sentencias sobre %s (ordered=%s)", len(statements), database_name, ordered)
+        
+        result = executor.run(statements, database_name, claims.get("permissions", {}), ordered=ordered)
         return jsonify(result)
     except ValueError as e:
-        logger.error(f"Error de valor: {str(e)}")
+        logger.error("Error de valor: %s", str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error inesperado: %s", str(e))
         logger.error(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/import/sql', methods=['POST'])
+@auth_required
+def import_sql_script():
+    """
+    Endpoint para importar un script SQL (CREATE TABLE + INSERT) en segundo plano.
+    
+    Formulario multipart: file (script .sql), database, workers, batch_size.
+    Para reanudar un trabajo interrumpido se envía job_id en lugar de file.
+    """
+    try:
+        claims = get_current_user_claims()
+        user_permissions = claims.get("permissions", {})
+        if not (user_permissions.get("insert") and user_permissions.get("create_table")):
+            return jsonify({"error": "La importación requiere permisos de insert y create_table"}), 403
+        
+        database_name = request.form.get('database') or mongo_connector.get_current_database()
+        if not database_name:
+            return jsonify({"error": "No hay una base de datos seleccionada. Proporcione una base de datos en la solicitud o use el endpoint /connect primero"}), 400
+        if not is_valid_mongo_db_name(database_name):
+            return jsonify({"error": f"Nombre de base de datos no válido: {database_name}"}), 400
+        
+        workers = request.form.get('workers', type=int)
+        batch_size = request.form.get('batch_size', type=int)
+        if (workers is not None and workers <= 0) or (batch_size is not None and batch_size <= 0):
+            return jsonify({"error": "workers y batch_size deben ser enteros positivos"}), 400
+        
+        state = import_manager.start(
+            database_name,
+            upload=request.files.get('file'),
+            job_id=request.form.get('job_id'),
+            owner=claims.get("sub"),
+            workers=workers,
+            batch_size=batch_size
+        )
+        logger.info("Importación %s lanzada sobre %s", state['job_id'], state['database'])
+        return jsonify(state), 202
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        logger.error("Error de valor: %s", str(e))
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error inesperado: {str(e)}")
+        logger.error("Error inesperado: %s", str(e))
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/import/sql/<job_id>', methods=['GET'])
+@auth_required
+def import_sql_status(job_id):
+    """
+    Endpoint para consultar el progreso de una importación.
+    """
+    try:
+        claims = get_current_user_claims()
+        owner = None if claims.get("role") == "admin" else claims.get("sub")
+        return jsonify(import_manager.status(job_id, owner=owner))
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        logger.error("Error inesperado: %s", str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/indexes/advise', methods=['POST'])
+@auth_required
+def advise_indexes():
+    """
+    Endpoint que propone índices compuestos (orden ESR) para las consultas traducidas
+    sobre una base de datos y, opcionalmente, los crea.
+    
+    Cuerpo: {"database", "collection", "queries" (SQL adicionales), "min_count", "create"}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        database_name = data.get('database') or mongo_connector.get_current_database()
+        if not database_name:
+            return jsonify({"error": "No hay una base de datos seleccionada. Proporcione una base de datos en la solicitud o use el endpoint /connect primero"}), 400
+        if not is_valid_mongo_db_name(database_name):
+            return jsonify({"error": f"Nombre de base de datos no válido: {database_name}"}), 400
+        
+        min_count = data.get('min_count', 1)
+        if not isinstance(min_count, int) or min_count <= 0:
+            return jsonify({"error": "min_count debe ser un entero positivo"}), 400
+        
+        queries = data.get('queries') or []
+        if not isinstance(queries, list):
+            return jsonify({"error": "El campo 'queries' debe ser una lista de consultas SQL"}), 400
+        extra = [translate_sql(sql_query) for sql_query in queries]
+        
+        claims = get_current_user_claims()
+        if data.get('create') and not claims.get("permissions", {}).get("create_table"):
+            return jsonify({"error": "Crear índices requiere el permiso create_table"}), 403
+        
+        advice = index_advisor.advise(
+            mongo_connector, database_name, collection=data.get('collection'), min_count=min_count, extra=extra
+        )
+        if data.get('create'):
+            advice["created"] = index_advisor.create_indexes(mongo_connector, database_name, advice["recommendations"])
+        
+        return jsonify(advice)
+    except ValueError as e:
+        logger.error("Error de valor: %s", str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error inesperado: %s", str(e))
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
@@ -249,33 +621,26 @@ def generate_shell_query():
             logger.error("Error: No se proporcionó la consulta SQL en el JSON")
             return jsonify({"error": "Se requiere una consulta SQL en el campo 'query'"}), 400
         
-        # Verificar si se proporciona una base de datos específica para esta consulta
-        if 'database' in data:
-            database_name = data['database']
-            mongo_connector.set_database(database_name)
-            logger.info(f"Base de datos seleccionada para esta consulta: {database_name}")
-        else:
-            # Verificar si hay una base de datos seleccionada
-            if not mongo_connector.is_database_selected():
-                return jsonify({"error": "No hay una base de datos seleccionada. Proporcione una base de datos en la solicitud o use el endpoint /connect primero"}), 400
+        # La base de datos se resuelve por petición, sin cambiar la seleccionada por defecto
+        database_name = data.get('database') or mongo_connector.get_current_database()
+        if not database_name:
+            return jsonify({"error": "No hay una base de datos seleccionada. Proporcione una base de datos en la solicitud o use el endpoint /connect primero"}), 400
+        if not is_valid_mongo_db_name(database_name):
+            return jsonify({"error": f"Nombre de base de datos no válido: {database_name}"}), 400
+        logger.debug("Base de datos para esta consulta: %s", database_name)
         
         sql_query = data['query']
-        logger.info(f"Consulta SQL recibida para generar query shell: {sql_query}")
+        logger.info("Consulta SQL recibida para generar query shell: %s", truncated(sql_query))
         
         # Nuevo: Verificar permisos igual que en translate
-        parser = SQLParser(sql_query)
-        query_type = parser.get_query_type()
-        
-        permission_map = {
-            "SELECT": "select",
-            "INSERT": "insert", 
-            "UPDATE": "update",
-            "DELETE": "delete",
-            "CREATE": "create_table",
-            "DROP": "drop_table"
-        }
+        prepared = prepare_statement(
+            sql_query,
+            params=data.get('params'),
+            auto_parameterize=data.get('parameterize', AUTO_PARAMETERIZE)
+        )
+        query_type = prepared.query_type
         
-        required_permission = permission_map.get(query_type)
+        required_permission = QUERY_TYPE_PERMISSIONS.get(query_type)
         if not required_permission:
             return jsonify({"error": f"Tipo de consulta no soportado: {query_type}"}), 400
         
@@ -287,37 +652,78 @@ def generate_shell_query():
                 "error": f"No tienes permisos para realizar operaciones de tipo {query_type}"
             }), 403
         
-        # Tu código existente continúa igual...
-        # Obtener el nombre de la tabla/colección
-        collection_name = parser.get_table_name()
-        logger.info(f"Nombre de colección detectado: {collection_name}")
-        
-        if not collection_name:
-            logger.error("Error: No se pudo determinar el nombre de la colección")
-            return jsonify({"error": "No se pudo determinar el nombre de la colección"}), 400
-        
-        # Traducir la consulta a formato MongoDB
-        translator = SQLToMongoDBTranslator(parser)
-        mongo_query = translator.translate()
-        logger.info(f"Consulta MongoDB generada: {mongo_query}")
+        # Traducir la consulta a formato MongoDB (o reutilizar la plantilla cacheada)
+        translation = translate_prepared(prepared, database_name, translation_cache)
+        collection_name = translation["collection"]
+        mongo_query = translation["mongo_query"]
+        logger.debug("Consulta MongoDB %s: %s", 'obtenida del cache' if translation['from_cache'] else 'generada', truncated(mongo_query))
         
         # Generar la consulta para la shell de MongoDB
-        shell_query = MongoShellQueryGenerator.generate_shell_query(collection_name, mongo_query)
-        logger.info(f"Consulta para la shell de MongoDB generada")
+        shell_query = translation.get("shell_query")
+        if not shell_query:
+            shell_query = MongoShellQueryGenerator.generate_shell_query(collection_name, mongo_query)
+            translation_cache.set_shell_query(prepared.inline_sql, database_name, shell_query)
+            logger.info("Consulta para la shell de MongoDB generada")
         
         return jsonify({
             "shell_query": shell_query,
             "mongo_query": mongo_query
         })
     except ValueError as e:
-        logger.error(f"Error de valor: {str(e)}")
+        logger.error("Error de valor: %s", str(e))
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error inesperado: {str(e)}")
+        logger.error("Error inesperado: %s", str(e))
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
+@app.route('/translation-cache/stats', methods=['GET'])
+@auth_required
+def get_translation_cache_stats():
+    """
+    Endpoint para consultar las estadísticas del cache de traducciones.
+    """
+    return jsonify(translation_cache.get_stats())
+
+@app.route('/translation-cache', methods=['DELETE'])
+@admin_required
+def clear_translation_cache():
+    """
+    Endpoint para vaciar el cache de traducciones.
+    """
+    translation_cache.clear()
+    logger.info("Cache de traducciones vaciado")
+    return jsonify({"message": "Cache de traducciones vaciado"})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Endpoint con las métricas del proceso en formato de texto de Prometheus.
+    Si METRICS_TOKEN está definido, se requiere en la cabecera Authorization.
+    """
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Token de métricas no válido"}), 401
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
+@app.route('/translate/timings', methods=['GET'])
+@auth_required
+def get_translate_timings():
+    """
+    Endpoint con los histogramas de latencia por etapa de cada forma de consulta.
+    Parámetro opcional: limit (número de formas, de la más usada a la menos).
+    """
+    return jsonify({"shapes": latency_stats.snapshot(limit=request.args.get('limit', type=int))})
+
+@app.route('/translate/timings', methods=['DELETE'])
+@admin_required
+def clear_translate_timings():
+    """
+    Endpoint para reiniciar los histogramas de latencia.
+    """
+    latency_stats.clear()
+    return jsonify({"message": "Histogramas de latencia reiniciados"})
+
 @app.route('/test-connection', methods=['GET'])
 @auth_required  # Nuevo: requiere autenticación
 def test_connection():
@@ -333,7 +739,7 @@ def test_connection():
             "current_database": mongo_connector.get_current_database()
         })
     except Exception as e:
-        logger.error(f"Error al probar conexión: {e}")
+        logger.error("Error al probar conexión: %s", e)
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
@@ -361,5 +767,5 @@ if __name__ == "__main__":
     # Obtener modo de depuración de variable de entorno o usar False por defecto
     debug = os.environ.get('DEBUG', 'False').lower() in ('true', '1', 't')
     
-    logger.info(f"Iniciando servidor en puerto {port} (Debug: {debug})")
+    logger.info("Iniciando servidor en puerto %s (Debug: %s)", port, debug)
     app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
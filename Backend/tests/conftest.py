@@ -1,8 +1,16 @@
 import pytest
+import sys
 import os
 import time
-from pymongo import MongoClient
 import logging
+from types import SimpleNamespace
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, OperationFailure
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.connector import MongoDBConnector
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -47,4 +55,158 @@ def users_collection(test_db):
 def products_collection(test_db):
     """Proporciona una colección de productos para pruebas."""
     collection = test_db["productos"]
-    yield collection
\ No newline at end of file
+    yield collection
+
+
+# Base de datos de los conectores falsos
+FAKE_DATABASE_NAME = "pruebas"
+
+# Error de un servidor anterior a 4.4 al recibir $unionWith
+_UNRECOGNIZED_STAGE_CODE = 40324
+
+
+class FakeCursor:
+    """Cursor en memoria: se recorre una vez y registra si se ha cerrado."""
+
+    def __init__(self, documents):
+        self._documents = iter(documents)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._documents)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCollection:
+    """
+    Colección en memoria para probar el conector sin servidor.
+
+    Cada llamada se registra en calls como (método, argumentos...) y, si se indica
+    log, también en ese registro compartido entre colecciones como
+    (colección, método, argumentos...).
+
+    Args:
+        name (str): Nombre de la colección
+        documents (iterable): Documentos que devuelven find y aggregate (un $limit final se respeta)
+        log (list, optional): Registro compartido de llamadas
+        errors (dict, optional): Excepción que lanza cada método
+        unsupported_stages (tuple): Etapas que el servidor no reconoce (simula versiones antiguas)
+        rejects (callable, optional): Documentos que insert_many rechaza con BulkWriteError
+    """
+
+    def __init__(self, name="usuarios", documents=(), log=None, errors=None, unsupported_stages=(), rejects=None):
+        self.name = name
+        self.database = SimpleNamespace(name=FAKE_DATABASE_NAME)
+        self.documents = [dict(document) for document in documents]
+        self.calls = []
+        self.log = log
+        self.errors = errors or {}
+        self.unsupported_stages = unsupported_stages
+        self.rejects = rejects
+
+    def _record(self, method, *args):
+        self.calls.append((method,) + args)
+        if self.log is not None:
+            self.log.append((self.name, method) + args)
+        if method in self.errors:
+            raise self.errors[method]
+
+    def _read(self, limit=None):
+        return FakeCursor([dict(document) for document in self.documents][:limit])
+
+    def find(self, filter_query=None, projection=None):
+        self._record("find", filter_query)
+        return self._read()
+
+    def aggregate(self, pipeline, **kwargs):
+        unsupported = [name for stage in pipeline for name in stage if name in self.unsupported_stages]
+        if unsupported:
+            raise OperationFailure(f"Unrecognized pipeline stage name: '{unsupported[0]}'", code=_UNRECOGNIZED_STAGE_CODE)
+        self._record("aggregate", pipeline, kwargs)
+        limit = pipeline[-1]["$limit"] if pipeline and "$limit" in pipeline[-1] else None
+        return self._read(limit)
+
+    def distinct(self, field, filter_query=None):
+        self._record("distinct", field, filter_query)
+        values = []
+        for document in self.documents:
+            if field in document and document[field] not in values:
+                values.append(document[field])
+        return values
+
+    def count_documents(self, filter_query):
+        self._record("count_documents", filter_query)
+        return len(self.documents)
+
+    def estimated_document_count(self):
+        self._record("estimated_document_count")
+        return len(self.documents)
+
+    def insert_many(self, documents, ordered=True):
+        documents = list(documents)
+        self._record("insert_many", documents, ordered)
+        rejected = [i for i, document in enumerate(documents) if self.rejects and self.rejects(document)]
+        self.documents.extend(document for i, document in enumerate(documents) if i not in rejected)
+        if rejected:
+            raise BulkWriteError({
+                "nInserted": len(documents) - len(rejected),
+                "writeErrors": [{"index": i, "code": 11000, "errmsg": "duplicado"} for i in rejected]
+            })
+        return SimpleNamespace(inserted_ids=list(range(len(documents))))
+
+    def update_many(self, filter_query, update):
+        self._record("update_many", filter_query, update)
+        return SimpleNamespace(matched_count=len(self.documents), modified_count=len(self.documents), upserted_id=None)
+
+    def bulk_write(self, requests, ordered=True):
+        self._record("bulk_write", list(requests), ordered)
+        return SimpleNamespace(
+            acknowledged=True, inserted_count=len(requests), matched_count=0, modified_count=0,
+            deleted_count=0, upserted_count=0
+        )
+
+
+class FakeDatabase(dict):
+    """Base de datos falsa: diccionario de colecciones con nombre."""
+    name = FAKE_DATABASE_NAME
+
+
+def make_fake_connector(collections=(), server_version=(7, 0), **attributes):
+    """
+    MongoDBConnector sin cliente real sobre colecciones falsas, con el mismo estado
+    inicial que deja __init__.
+
+    Args:
+        collections (iterable): Colecciones falsas (se accede a ellas por su nombre)
+        server_version (tuple): Versión que devuelve buildInfo
+        **attributes: Atributos que se sustituyen en el conector (count_mode...)
+
+    Returns:
+        MongoDBConnector: Conector cuyo get_database devuelve las colecciones falsas
+    """
+    connector = MongoDBConnector.__new__(MongoDBConnector)
+    connector._init_state()
+    build_info = {"versionArray": list(server_version) + [0, 0]}
+    connector.client = SimpleNamespace(admin=SimpleNamespace(command=lambda name: build_info))
+    db = FakeDatabase((collection.name, collection) for collection in collections)
+    connector.get_database = lambda database_name=None: db
+    for name, value in attributes.items():
+        setattr(connector, name, value)
+    return connector
+
+
+@pytest.fixture
+def fake_collection():
+    """Fábrica de colecciones falsas (ver FakeCollection)."""
+    return FakeCollection
+
+
+@pytest.fixture
+def fake_connector():
+    """Fábrica de conectores sin cliente real (ver make_fake_connector)."""
+    return make_fake_connector
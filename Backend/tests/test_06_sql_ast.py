@@ -0,0 +1,91 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.parser.sql_ast import parse_sql, tokenize
+from app.parser.sql_parser import SQLParser
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+@pytest.mark.order(6)
+class TestSQLAst:
+    """Pruebas para el árbol sintáctico compartido por los parsers."""
+
+    def test_clauses_split_at_top_level(self):
+        """Las cláusulas se separan solo en palabras clave de nivel superior."""
+        sql = ("SELECT nombre, edad FROM usuarios "
+               "WHERE id IN (SELECT usuario_id FROM pedidos WHERE total > 10) "
+               "ORDER BY edad DESC LIMIT 5;")
+        ast = parse_sql(sql)
+
+        assert ast.query_type == "SELECT"
+        assert ast.table == "usuarios"
+        assert ast.clause_text("SELECT") == "nombre, edad"
+        assert ast.clause_text("WHERE") == "id IN (SELECT usuario_id FROM pedidos WHERE total > 10)"
+        assert ast.clause_text("ORDER BY") == "edad DESC"
+        assert ast.clause_text("LIMIT") == "5"
+        assert ast.has_subquery
+        assert not ast.has_union
+
+    def test_keywords_inside_strings_are_ignored(self):
+        """Las palabras clave dentro de literales no abren cláusulas."""
+        ast = parse_sql("SELECT * FROM notas WHERE texto = 'ORDER BY x; UPPER(y)'")
+
+        assert "ORDER BY" not in ast.clauses
+        assert ast.clause_text("WHERE") == "texto = 'ORDER BY x; UPPER(y)'"
+        assert not ast.function_names
+
+        kinds = [token.kind for token in tokenize("a = 'b'")]
+        assert kinds == ["word", "op", "string"]
+
+    def test_features_detected_in_single_pass(self):
+        """DISTINCT, JOIN, UNION y funciones se detectan al construir el árbol."""
+        ast = parse_sql("SELECT DISTINCT UPPER(u.nombre) FROM usuarios u "
+                        "LEFT JOIN pedidos p ON u.id = p.usuario_id "
+                        "UNION ALL SELECT nombre FROM clientes")
+
+        assert ast.distinct
+        assert ast.has_joins
+        assert ast.union_all
+        assert len(ast.union_branches) == 2
+        assert ast.function_names == {"UPPER"}
+        assert ast.clause_text("FROM") == "usuarios u LEFT JOIN pedidos p ON u.id = p.usuario_id"
+
+    def test_sql_parser_reads_from_ast(self):
+        """Los accesores de SQLParser se alimentan del árbol ya construido."""
+        parser = SQLParser("INSERT INTO `Usuarios` (nombre, edad) VALUES ('Ana', 30), ('Luis', 40)")
+
+        assert parser.get_query_type() == "INSERT"
+        assert parser.get_table_name() == "usuarios"
+        assert parser.ast.insert_columns == "nombre, edad"
+
+        result = parser.get_insert_values()
+        assert result["operation"] == "INSERT_MANY"
+        assert result["documents"][1] == {"nombre": "Luis", "edad": 40}
+
+        parser = SQLParser("UPDATE usuarios SET edad = 31 WHERE id = 5")
+        result = parser.get_update_values()
+        assert result["values"] == {"edad": 31}
+        assert result["condition"] == {"id": 5}
+
+    def test_accessor_results_are_memoized(self):
+        """Los accesores se calculan una vez por instancia y devuelven copias."""
+        parser = SQLParser("SELECT nombre FROM usuarios WHERE edad > 30")
+
+        first = parser.get_where_clause()
+        first["edad"] = "modificado"
+        second = parser.get_where_clause()
+
+        assert second == {"edad": {"$gt": 30}}
+        stats = parser.get_cache_stats()
+        assert stats["by_accessor"]["get_where_clause"] == {"hits": 1, "misses": 1}
+        assert stats["hit_rate"] == 0.5
+
+        parser.clear_cache()
+        assert parser.get_cache_stats()["hits"] == 0
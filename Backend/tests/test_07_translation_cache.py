@@ -0,0 +1,57 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.translator.cache import TranslationCache, normalize_sql
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+@pytest.mark.order(7)
+class TestTranslationCache:
+    """Pruebas para el cache de traducciones."""
+
+    def test_normalization_keeps_literals_and_identifiers(self):
+        """Se pliegan espacios y palabras reservadas, no literales ni identificadores."""
+        assert normalize_sql("select  Nombre\n from usuarios where ciudad = 'Madrid';") == \
+            "SELECT Nombre FROM usuarios WHERE ciudad = 'Madrid'"
+        assert normalize_sql("SELECT * FROM t WHERE a = 'x'") != normalize_sql("SELECT * FROM t WHERE a = 'X'")
+
+    def test_hits_are_isolated_copies(self):
+        """Las entradas se comparten entre consultas equivalentes y se devuelven copias."""
+        cache = TranslationCache(max_size=10, ttl=0)
+        cache.put("SELECT * FROM usuarios", "tienda", "SELECT", "usuarios", {"operation": "find", "query": {}})
+
+        entry = cache.get("select *   from usuarios;", "tienda")
+        entry["mongo_query"]["query"]["edad"] = 1
+
+        assert cache.get("SELECT * FROM usuarios", "tienda")["mongo_query"]["query"] == {}
+        assert cache.get("SELECT * FROM usuarios", "otra_db") is None
+        assert cache.get_stats()["hits"] == 2
+
+    def test_eviction_expiration_and_invalidation(self):
+        """El cache respeta el tamaño máximo, el TTL y la invalidación por colección."""
+        cache = TranslationCache(max_size=2, ttl=0)
+        for table in ("a", "b", "c"):
+            cache.put(f"SELECT * FROM {table}", "db", "SELECT", table, {"operation": "find"})
+
+        assert cache.get("SELECT * FROM a", "db") is None
+        assert cache.get_stats()["evictions"] == 1
+
+        assert cache.invalidate_collection("db", "b") == 1
+        assert cache.get("SELECT * FROM b", "db") is None
+
+        # Las sentencias DDL nunca se cachean
+        cache.put("DROP TABLE c", "db", "DROP", "c", {"operation": "drop_collection"})
+        assert cache.get("DROP TABLE c", "db") is None
+
+        expiring = TranslationCache(max_size=2, ttl=1)
+        expiring.put("SELECT * FROM a", "db", "SELECT", "a", {"operation": "find"})
+        expiring._entries[next(iter(expiring._entries))]["created_at"] -= 5
+        assert expiring.get("SELECT * FROM a", "db") is None
+        assert expiring.get_stats()["expirations"] == 1
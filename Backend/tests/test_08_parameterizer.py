@@ -0,0 +1,62 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.translator.cache import TranslationCache
+from app.translator.parameterizer import prepare_statement, translate_prepared
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+@pytest.mark.order(8)
+class TestParameterizer:
+    """Pruebas para consultas preparadas y extracción de literales."""
+
+    def test_literals_are_lifted_from_value_positions(self):
+        """Solo se extraen literales en posición de valor; LIKE y LIMIT se conservan."""
+        prepared = prepare_statement(
+            "SELECT * FROM usuarios WHERE edad > 30 AND nombre LIKE 'A%' AND id IN (1, 2) LIMIT 5"
+        )
+
+        assert prepared.values == [30, 1, 2]
+        assert prepared.template_sql == (
+            "SELECT * FROM usuarios WHERE edad > '__qp0__' AND nombre LIKE 'A%' "
+            "AND id IN ('__qp1__', '__qp2__') LIMIT 5"
+        )
+
+    def test_same_shape_reuses_template(self):
+        """Consultas que solo difieren en literales comparten una única traducción."""
+        cache = TranslationCache()
+
+        first = translate_prepared(prepare_statement("SELECT * FROM usuarios WHERE id = 17"), "db", cache)
+        second = translate_prepared(prepare_statement("SELECT * FROM usuarios WHERE id = 42"), "db", cache)
+
+        assert not first["from_cache"]
+        assert second["from_cache"]
+        assert first["mongo_query"]["query"] == {"id": 17}
+        assert second["mongo_query"]["query"] == {"id": 42}
+        assert cache.get_stats()["size"] == 1
+
+    def test_client_placeholders(self):
+        """Los marcadores '?' y ':nombre' se ligan con params."""
+        cache = TranslationCache()
+
+        positional = prepare_statement("UPDATE usuarios SET edad = ? WHERE nombre = ?", params=[31, "Ana"])
+        result = translate_prepared(positional, "db", cache)["mongo_query"]
+        assert result["query"] == {"query": {"nombre": "Ana"}, "update": {"$set": {"edad": 31}}}
+
+        named = prepare_statement("DELETE FROM usuarios WHERE id = :id", params={"id": 3})
+        assert translate_prepared(named, "db", cache)["mongo_query"]["query"] == {"id": 3}
+
+        # Un marcador dentro de LIKE no sobrevive como valor: se traduce en línea
+        like = prepare_statement("SELECT * FROM usuarios WHERE nombre LIKE ?", params=["%an%"])
+        query = translate_prepared(like, "db", cache)["mongo_query"]["query"]
+        assert query == {"nombre": {"$regex": ".*an.*", "$options": "i"}}
+
+        with pytest.raises(ValueError):
+            prepare_statement("SELECT * FROM usuarios WHERE id = ?", params=[])
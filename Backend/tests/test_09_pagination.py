@@ -0,0 +1,93 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+from app.parser.sql_parser import SQLParser
+from app.translator.sql_to_mongodb import SQLToMongoDBTranslator
+from app.translator.pagination import KeysetPaginator, build_keyset_match, decode_cursor, encode_cursor
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def translate(sql):
+    return SQLToMongoDBTranslator(SQLParser(sql)).translate()
+
+
+@pytest.mark.order(9)
+class TestPagination:
+    """Pruebas para OFFSET y la paginación keyset."""
+
+    def test_offset_and_limit_forms(self):
+        """LIMIT n OFFSET m y LIMIT m, n se traducen a skip/limit."""
+        assert SQLParser("SELECT * FROM usuarios LIMIT 10 OFFSET 20").get_offset() == 20
+        assert SQLParser("SELECT * FROM usuarios LIMIT 20, 10").get_limit() == 10
+
+        query = translate("SELECT * FROM usuarios LIMIT 20, 10")
+        assert query["skip"] == 20 and query["limit"] == 10
+
+        pipeline = translate("SELECT * FROM usuarios ORDER BY edad LIMIT 5 OFFSET 15")["pipeline"]
+        stages = [next(iter(stage)) for stage in pipeline]
+        assert stages.index("$skip") < stages.index("$limit")
+
+    def test_cursor_round_trip_preserves_bson_types(self):
+        """El token conserva los tipos BSON y rechaza tokens manipulados."""
+        oid = ObjectId()
+        payload = {"v": 1, "shape": "abc", "last": [30, oid], "remaining": None}
+        assert decode_cursor(encode_cursor(payload)) == payload
+
+        with pytest.raises(ValueError):
+            decode_cursor("no-es-un-token")
+
+    def test_keyset_match_for_compound_order(self):
+        """El filtro de rango respeta el orden compuesto y la dirección de cada clave."""
+        match = build_keyset_match([["edad", -1], ["_id", 1]], [30, 7])
+        assert match == {"$or": [
+            {"$or": [{"edad": {"$lt": 30}}, {"edad": None}]},
+            {"$and": [{"edad": 30}, {"_id": {"$gt": 7}}]},
+        ]}
+
+    def test_find_pages_follow_the_last_key(self):
+        """Cada página pide page_size + 1 filas y continúa tras la última clave."""
+        mongo_query = translate("SELECT nombre FROM usuarios WHERE activo = 1")
+        first = KeysetPaginator("usuarios", mongo_query, 2)
+        assert first.query["limit"] == 3
+        assert first.query["sort"] == {"_id": 1}
+
+        page = first.build_page([{"_id": 1, "nombre": "a"}, {"_id": 2, "nombre": "b"}, {"_id": 3, "nombre": "c"}])
+        assert page["has_more"] and len(page["results"]) == 2
+
+        second = KeysetPaginator("usuarios", mongo_query, 2, page["next_cursor"])
+        assert second.query["query"] == {"$and": [{"activo": 1}, {"_id": {"$gt": 2}}]}
+
+        other_query = translate("SELECT nombre FROM usuarios WHERE activo = 0")
+        with pytest.raises(ValueError):
+            KeysetPaginator("usuarios", other_query, 2, page["next_cursor"])
+
+    def test_join_pages_keep_sort_keys(self):
+        """El $project de un JOIN conserva las claves de orden y se ocultan en la respuesta."""
+        mongo_query = translate(
+            "SELECT u.nombre FROM usuarios u JOIN pedidos p ON u.id = p.usuario_id ORDER BY p.total"
+        )
+        first = KeysetPaginator("usuarios", mongo_query, 2)
+        assert first.query["pipeline"][-2] == {"$project": {"u.nombre": "$nombre", "p_joined.total": 1}}
+
+        rows = [{"_id": i, "u": {"nombre": name}, "p_joined": {"total": total}}
+                for i, name, total in ((1, "a", 5), (2, "b", 7), (3, "c", 9))]
+        page = first.build_page(rows)
+        assert page["results"] == [{"u": {"nombre": "a"}}, {"u": {"nombre": "b"}}]
+        assert decode_cursor(page["next_cursor"])["last"] == [7, 2]
+
+        second = KeysetPaginator("usuarios", mongo_query, 2, page["next_cursor"])
+        assert {"$match": build_keyset_match([["p_joined.total", 1], ["_id", 1]], [7, 2])} in second.query["pipeline"]
+
+        redefined = translate("SELECT p.total * 2 AS x FROM usuarios u JOIN pedidos p ON u.id = p.usuario_id ORDER BY u.id")
+        redefined["pipeline"][-1]["$project"]["id"] = "$p_joined.total"
+        with pytest.raises(ValueError, match="campo de orden id"):
+            KeysetPaginator("usuarios", redefined, 2)
@@ -0,0 +1,66 @@
+import pytest
+import sys
+import os
+import json
+import uuid
+import logging
+import datetime
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId, Decimal128, Binary
+from app.serialization import dumps, to_json_compatible
+from app.utils import generate_json_array, generate_ndjson
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+OID = ObjectId("0123456789ab0123456789ab")
+
+
+def sample_document():
+    return {
+        "_id": OID,
+        "creado": datetime.datetime(2024, 1, 2, 3, 4, 5),
+        "precio": Decimal128("1.50"),
+        "token": Binary.from_uuid(uuid.UUID(int=1)),
+        "datos": Binary(b"ab", 0),
+        "lineas": [{"producto": OID, "cantidad": 2}],
+    }
+
+
+EXPECTED = {
+    "_id": "0123456789ab0123456789ab",
+    "creado": "2024-01-02T03:04:05",
+    "precio": "1.50",
+    "token": "00000000-0000-0000-0000-000000000001",
+    "datos": "YWI=",
+    "lineas": [{"producto": "0123456789ab0123456789ab", "cantidad": 2}],
+}
+
+
+@pytest.mark.order(10)
+class TestSerialization:
+    """Pruebas para la codificación de documentos BSON a JSON."""
+
+    def test_dumps_handles_bson_types_in_one_pass(self):
+        """ObjectId, fechas, Decimal128 y Binary se codifican sin preprocesar el documento."""
+        assert json.loads(dumps([sample_document()])) == [EXPECTED]
+
+    def test_to_json_compatible_matches_dumps(self):
+        """La conversión en sitio produce el mismo resultado que dumps."""
+        assert to_json_compatible([sample_document()]) == [EXPECTED]
+
+    def test_stream_failure_leaves_error_element(self):
+        """Un fallo a mitad del streaming deja un último elemento de error, no un resultado truncado."""
+        def documents():
+            yield {"_id": OID, "n": 1}
+            raise RuntimeError("cursor perdido")
+
+        array = json.loads("".join(generate_json_array(documents(), chunk_size=1)))
+        assert array == [{"_id": str(OID), "n": 1}, {"error": "cursor perdido"}]
+
+        lines = "".join(generate_ndjson(documents())).splitlines()
+        assert json.loads(lines[-1]) == {"error": "cursor perdido"}
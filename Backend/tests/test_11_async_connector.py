@@ -0,0 +1,188 @@
+import pytest
+import sys
+import os
+import json
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import jwt
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.async_connector import AsyncMongoDBConnector
+from app.async_server import AsyncTranslatorApp
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SECRET = "test-secret"
+
+
+class InMemoryCursor:
+    """Cursor asíncrono en memoria (solo lo que usa el conector)."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.documents.sort(key=lambda doc: doc.get(field), reverse=direction == -1)
+        return self
+
+    def skip(self, count):
+        self.documents = self.documents[count:]
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.documents)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+    async def close(self):
+        pass
+
+
+class InMemoryCollection:
+    """Colección en memoria con filtros de igualdad."""
+
+    def __init__(self):
+        self.documents = []
+
+    def _matches(self, document, query):
+        return all(document.get(field) == value for field, value in query.items())
+
+    def find(self, query, projection=None):
+        return InMemoryCursor([dict(doc) for doc in self.documents if self._matches(doc, query)])
+
+    async def aggregate(self, pipeline):
+        documents = [dict(doc) for doc in self.documents]
+        for stage in pipeline:
+            if "$match" in stage:
+                documents = [doc for doc in documents if self._matches(doc, stage["$match"])]
+        return InMemoryCursor(documents)
+
+    async def insert_one(self, document):
+        document.setdefault("_id", len(self.documents) + 1)
+        self.documents.append(document)
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    async def insert_many(self, documents):
+        ids = [(await self.insert_one(document)).inserted_id for document in documents]
+        return SimpleNamespace(acknowledged=True, inserted_ids=ids)
+
+    async def update_many(self, query, update):
+        matched = [doc for doc in self.documents if self._matches(doc, query)]
+        for doc in matched:
+            doc.update(update.get("$set", {}))
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched), upserted_id=None)
+
+    async def delete_many(self, query):
+        before = len(self.documents)
+        self.documents = [doc for doc in self.documents if not self._matches(doc, query)]
+        return SimpleNamespace(deleted_count=before - len(self.documents))
+
+
+class InMemoryDatabase(dict):
+    def __missing__(self, name):
+        self[name] = InMemoryCollection()
+        return self[name]
+
+
+class InMemoryClient(dict):
+    """Sustituto en memoria de AsyncMongoClient."""
+
+    def __missing__(self, name):
+        self[name] = InMemoryDatabase()
+        return self[name]
+
+
+def call_asgi(app, method, path, body=None, token=None):
+    """Ejecuta una petición contra la aplicación ASGI y devuelve (estado, JSON)."""
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    messages = [{"type": "http.request", "body": json.dumps(body or {}).encode(), "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": headers}
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+@pytest.mark.order(11)
+class TestAsyncConnector:
+    """Pruebas para el conector asíncrono y el endpoint ASGI."""
+
+    def test_execute_query_operations(self):
+        """insert, find, update y delete se ejecutan con la misma forma de resultado que el conector síncrono."""
+        connector = AsyncMongoDBConnector(client=InMemoryClient(), database_name="tienda")
+
+        async def scenario():
+            await connector.execute_query("usuarios", {"operation": "INSERT_MANY", "documents": [
+                {"nombre": "Ana", "edad": 30}, {"nombre": "Luis", "edad": 25}
+            ]})
+            updated = await connector.execute_query("usuarios", {
+                "operation": "update", "query": {"query": {"nombre": "Ana"}, "update": {"edad": 31}}
+            })
+            found = await connector.execute_query("usuarios", {
+                "operation": "find", "query": {}, "sort": {"edad": 1}, "limit": 1
+            })
+            deleted = await connector.execute_query("usuarios", {"operation": "delete", "query": {"nombre": "Luis"}})
+            return updated, found, deleted
+
+        updated, found, deleted = asyncio.run(scenario())
+        assert updated["modified_count"] == 1
+        assert [doc["nombre"] for doc in found] == ["Luis"]
+        assert deleted == {"deleted_count": 1}
+
+    def test_asgi_translate_checks_jwt_and_permissions(self):
+        """El endpoint ASGI exige JWT y permisos, y ejecuta la traducción."""
+        client = InMemoryClient()
+        client["tienda"]["usuarios"].documents = [{"_id": 1, "nombre": "Ana", "edad": 30}]
+        app = AsyncTranslatorApp(AsyncMongoDBConnector(client=client), SECRET)
+
+        reader = jwt.encode({"type": "access", "permissions": {"select": True}}, SECRET, algorithm="HS256")
+        body = {"query": "SELECT * FROM usuarios WHERE edad = 30", "database": "tienda"}
+
+        assert call_asgi(app, "POST", "/translate", body)[0] == 401
+
+        status, result = call_asgi(app, "POST", "/translate", body, token=reader)
+        assert status == 200
+        assert result == [{"_id": 1, "nombre": "Ana", "edad": 30}]
+
+        status, _ = call_asgi(app, "POST", "/translate", {"query": "DELETE FROM usuarios", "database": "tienda"}, reader)
+        assert status == 403
+
+    def test_union_branches_without_union_with(self):
+        """Sin $unionWith las ramas se combinan en orden y UNION elimina los duplicados."""
+        client = InMemoryClient()
+        client["tienda"]["usuarios"].documents = [{"nombre": "Luis"}, {"nombre": "Ana"}]
+        client["tienda"]["clientes"].documents = [{"nombre": "Ana"}, {"nombre": "Bea"}]
+        connector = AsyncMongoDBConnector(client=client, database_name="tienda")
+        connector._union_with_supported = False
+        connector._concise_lookup_supported = True
+        branches = [{"collection": name, "pipeline": []} for name in ("usuarios", "clientes")]
+
+        union = {"distinct_branches": 2, "branches": branches, "sort": None, "skip": None, "limit": None}
+        result = asyncio.run(connector.execute_query("usuarios", {"operation": "aggregate", "pipeline": [], "union": union}))
+        assert [doc["nombre"] for doc in result] == ["Luis", "Ana", "Bea"]
+
+        union = dict(union, distinct_branches=0, limit=3)
+        result = asyncio.run(connector.execute_query("usuarios", {"operation": "aggregate", "pipeline": [], "union": union}))
+        assert [doc["nombre"] for doc in result] == ["Luis", "Ana", "Ana"]
@@ -0,0 +1,85 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pymongo import InsertOne, UpdateMany
+from app.services.batch_executor import BatchExecutor
+from app.translator.cache import TranslationCache
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ALL_PERMISSIONS = {"select": True, "insert": True, "update": True, "delete": True}
+
+
+class RecordingConnector:
+    """Conector que registra las llamadas en lugar de ejecutarlas."""
+
+    def __init__(self, write_errors=None):
+        self.calls = []
+        self.write_errors = write_errors or []
+
+    def execute_bulk_write(self, collection_name, requests, ordered=True, database_name=None):
+        self.calls.append(("bulk", collection_name, requests, ordered))
+        return {"acknowledged": True, "inserted_count": 0, "write_errors": self.write_errors}
+
+    def execute_query(self, collection_name, query, serialize=True, database_name=None):
+        self.calls.append(("single", collection_name, query))
+        return []
+
+
+@pytest.mark.order(12)
+class TestBatchExecutor:
+    """Pruebas para la ejecución de lotes con bulk_write."""
+
+    def test_consecutive_writes_share_one_bulk_write(self):
+        """Las escrituras consecutivas sobre la misma colección se agrupan en un bulk_write."""
+        connector = RecordingConnector()
+        result = BatchExecutor(connector, TranslationCache()).run([
+            "INSERT INTO usuarios (nombre) VALUES ('Ana')",
+            "INSERT INTO usuarios (nombre) VALUES ('Luis'), ('Eva')",
+            "UPDATE usuarios SET edad = 30 WHERE nombre = 'Ana'",
+            "SELECT * FROM usuarios",
+            "DELETE FROM pedidos WHERE id = 1",
+        ], "tienda", ALL_PERMISSIONS)
+
+        assert [call[0] for call in connector.calls] == ["bulk", "single", "bulk"]
+        _, collection, requests, ordered = connector.calls[0]
+        assert collection == "usuarios" and ordered
+        assert [type(request) for request in requests] == [InsertOne, InsertOne, InsertOne, UpdateMany]
+        assert result["bulk_writes"] == 2
+        assert result["summary"] == {"ok": 5, "error": 0, "skipped": 0}
+
+    def test_ordered_stops_at_first_error_and_unordered_continues(self):
+        """En modo ordenado el lote se detiene en el primer error; sin orden se ejecuta todo."""
+        statements = [
+            "INSERT INTO usuarios (nombre) VALUES ('Ana')",
+            "DELETE FROM usuarios",
+            "INSERT INTO usuarios (nombre) VALUES ('Luis')",
+        ]
+        permissions = {"insert": True}
+
+        ordered = BatchExecutor(RecordingConnector(), TranslationCache()).run(statements, "tienda", permissions)
+        assert [item["status"] for item in ordered["results"]] == ["ok", "error", "skipped"]
+
+        unordered = BatchExecutor(RecordingConnector(), TranslationCache()).run(
+            statements, "tienda", permissions, ordered=False
+        )
+        assert [item["status"] for item in unordered["results"]] == ["ok", "error", "ok"]
+
+    def test_write_errors_are_mapped_to_statements(self):
+        """Un error de escritura del bulk se atribuye a su sentencia y omite las siguientes."""
+        connector = RecordingConnector(write_errors=[{"index": 1, "code": 11000, "errmsg": "duplicate key"}])
+        result = BatchExecutor(connector, TranslationCache()).run([
+            "INSERT INTO usuarios (id) VALUES (1)",
+            "INSERT INTO usuarios (id) VALUES (1)",
+            "INSERT INTO usuarios (id) VALUES (2)",
+        ], "tienda", ALL_PERMISSIONS)
+
+        assert [item["status"] for item in result["results"]] == ["ok", "error", "skipped"]
+        assert result["results"][1]["error"] == "duplicate key"
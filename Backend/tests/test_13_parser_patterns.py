@@ -0,0 +1,37 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.parser import patterns
+from app.parser.function_parser import FunctionParser
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.order(13)
+class TestParserPatterns:
+    """Pruebas del registro de patrones precompilados."""
+
+    def setup_method(self):
+        self.function_parser = FunctionParser()
+
+    def test_detects_nested_and_prefixed_functions(self):
+        """Una sola pasada encuentra funciones anidadas y no confunde LOG10 con LOG."""
+        names = self.function_parser.find_function_names("SELECT UPPER(LOWER(nombre)), LOG10(x) FROM t")
+        assert names == {"UPPER", "LOWER", "LOG10"}
+
+    def test_plain_query_has_no_functions(self):
+        """Una consulta sin llamadas a funciones no se detecta como tal."""
+        assert not self.function_parser.has_functions("SELECT nombre, upper_case FROM usuarios WHERE id = 5")
+        assert self.function_parser.has_functions("select round(precio, 2) from productos")
+
+    def test_parameterized_patterns_are_compiled_once(self):
+        """Los patrones con parámetro se reutilizan entre llamadas."""
+        assert patterns.spaced_operator("AND") is patterns.spaced_operator("AND")
+        assert patterns.function_arguments("UPPER") is patterns.function_arguments("UPPER")
@@ -0,0 +1,71 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.parser.crud_parser import CRUDParser
+from app.parser.insert_stream import InsertStream, iter_value_tuples
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.order(14)
+class TestInsertStream:
+    """Pruebas de la inserción por lotes de INSERT multi-fila."""
+
+    def test_tokenizer_respects_quotes_and_parentheses(self):
+        """Las comas dentro de cadenas o paréntesis no separan valores."""
+        sql = "INSERT INTO t VALUES (1, 'a, b', 'it''s', CONCAT('x', 'y')), (2, 'c)', NULL);"
+        position = sql.index("VALUES") + len("VALUES")
+        assert list(iter_value_tuples(sql, position)) == [
+            ["1", "'a, b'", "'it''s'", "CONCAT('x', 'y')"],
+            ["2", "'c)'", "NULL"],
+        ]
+
+    def test_unterminated_string_raises(self):
+        """Una cadena sin cerrar se informa en lugar de ignorarse."""
+        stream = InsertStream("INSERT INTO t (a) VALUES ('abc)")
+        with pytest.raises(ValueError):
+            list(stream.iter_documents())
+
+    def test_documents_match_crud_parser(self):
+        """Los documentos coinciden con los del parser CRUD para la misma sentencia."""
+        sql = "INSERT INTO Usuarios (nombre, edad, activo) VALUES ('Ana', 30, TRUE), ('Luis', 25.5, NULL), ('Eva', 41, FALSE)"
+        expected = CRUDParser().parse_insert(sql)["documents"]
+
+        stream = InsertStream(sql, batch_size=2)
+        batches = list(stream.iter_batches())
+
+        assert stream.table == "usuarios"
+        assert [rows for rows, _ in batches] == [[1, 2], [3]]
+        assert [document for _, documents in batches for document in documents] == expected
+
+    def test_rejected_rows_are_reported(self):
+        """Las filas con un número de valores distinto se descartan y se informan."""
+        stream = InsertStream("INSERT INTO t (a, b) VALUES (1, 2), (3), (4, 5)")
+        documents = [document for _, document in stream.iter_documents()]
+
+        assert documents == [{"a": 1, "b": 2}, {"a": 4, "b": 5}]
+        assert stream.rows_read == 3
+        assert stream.rows_rejected == 1
+        assert stream.errors[0]["row"] == 2
+
+    def test_connector_inserts_unordered_batches(self, fake_connector, fake_collection):
+        """Cada lote se envía con insert_many no ordenado y los errores se mapean a su fila."""
+        rows = ", ".join(f"('u{i}', {'TRUE' if i == 4 else 'FALSE'})" for i in range(1, 6))
+        stream = InsertStream(f"INSERT INTO usuarios (nombre, rechazar) VALUES {rows}", batch_size=2)
+        collection = fake_collection(rejects=lambda document: document.get("rechazar"))
+
+        summary = fake_connector([collection]).execute_insert_stream("usuarios", stream)
+
+        assert [len(documents) for _, documents, _ in collection.calls] == [2, 2, 1]
+        assert all(not ordered for _, _, ordered in collection.calls)
+        assert summary["batches"] == 3
+        assert summary["inserted_count"] == 4
+        assert summary["rows_read"] == 5
+        assert summary["write_errors"] == [{"row": 4, "code": 11000, "errmsg": "duplicado"}]
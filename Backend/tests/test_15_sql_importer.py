@@ -0,0 +1,113 @@
+import pytest
+import sys
+import os
+import io
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.parser.script_splitter import SQLScriptSplitter
+from app.services.sql_importer import ImportCheckpoint, SQLDumpImporter, compress_ranges, expand_ranges
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DUMP = r"""-- MySQL dump
+/*!40101 SET NAMES utf8mb4 */;
+DROP TABLE IF EXISTS `usuarios`;
+CREATE TABLE `usuarios` (
+  `id` int(11) NOT NULL,
+  `nombre` varchar(100) DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_nombre` (`nombre`)
+) ENGINE=InnoDB;
+LOCK TABLES `usuarios` WRITE;
+INSERT INTO `usuarios` VALUES (1,'Ana; \'A\''),(2,'Luis'),(3,'Eva');
+UNLOCK TABLES;
+CREATE TABLE `pedidos` (`id` int, `total` decimal(10,2));
+INSERT INTO `pedidos` (`id`, `total`) VALUES (10, 5.5),(11, 7.25);
+INSERT INTO `usuarios` VALUES (4,'Juan');
+"""
+
+
+@pytest.fixture
+def importer_connector(fake_connector):
+    """Conector falso que además registra los CREATE TABLE ejecutados."""
+    def build(collections):
+        connector = fake_connector(collections, created=[])
+        connector.execute_query = lambda name, query, serialize=True, database_name=None: connector.created.append(name)
+        return connector
+    return build
+
+
+@pytest.fixture
+def dump_path(tmp_path):
+    path = tmp_path / "dump.sql"
+    path.write_text(DUMP, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.order(15)
+class TestSQLImporter:
+    """Pruebas del divisor de scripts y de la importación con checkpoints."""
+
+    def test_splitter_ignores_separators_in_strings_and_comments(self):
+        """Los ';' de cadenas y comentarios no cortan sentencias, lea como lea el fichero."""
+        expected = list(SQLScriptSplitter(io.StringIO(DUMP)))
+        assert len(expected) == 8
+        assert expected[3].endswith("(3,'Eva')")
+        for read_size in (1, 2, 3, 7):
+            assert list(SQLScriptSplitter(io.StringIO(DUMP), read_size=read_size)) == expected
+
+    def test_ranges_round_trip(self):
+        """Las sentencias completadas se guardan como rangos."""
+        assert compress_ranges({5, 1, 2, 3, 7}) == [[1, 3], [5, 5], [7, 7]]
+        assert expand_ranges([[1, 3], [7, 7]]) == {1, 2, 3, 7}
+
+    def test_import_creates_tables_and_loads_rows(self, dump_path, tmp_path, importer_connector, fake_collection):
+        """CREATE TABLE antes de sus INSERT, columnas del CREATE y escapes de MySQL."""
+        collections = {"usuarios": fake_collection("usuarios"), "pedidos": fake_collection("pedidos")}
+        connector = importer_connector(collections.values())
+        checkpoint = ImportCheckpoint.create(str(tmp_path / "job.json"), "a" * 32, "destino")
+
+        state = SQLDumpImporter(connector, checkpoint, dump_path, workers=2, batch_size=2).run()
+
+        assert state["status"] == "completed"
+        assert connector.created == ["usuarios", "pedidos"]
+        assert state["inserted_count"] == 6
+        assert state["skipped"] == {"DROP": 1, "LOCK": 1, "UNLOCK": 1}
+        assert sorted(collections["usuarios"].documents, key=lambda d: d["id"])[0] == {"id": 1, "nombre": "Ana; 'A'"}
+        assert collections["pedidos"].documents[1] == {"id": 11, "total": 7.25}
+
+    def test_resume_skips_completed_statements(self, dump_path, tmp_path, importer_connector, fake_collection):
+        """Al reanudar solo se cargan las sentencias que fallaron."""
+        usuarios = fake_collection("usuarios")
+        pedidos = fake_collection("pedidos", errors={"insert_many": ConnectionError("servidor no disponible")})
+        connector = importer_connector([usuarios, pedidos])
+        path = str(tmp_path / "job.json")
+
+        first = SQLDumpImporter(connector, ImportCheckpoint.create(path, "b" * 32, "destino"), dump_path).run()
+        assert first["status"] == "failed"
+        assert first["failed_statements"] == 1
+        assert len(usuarios.documents) == 4
+
+        pedidos.errors = {}
+        second = SQLDumpImporter(connector, ImportCheckpoint.load(path), dump_path).run()
+
+        assert second["status"] == "completed"
+        assert len(usuarios.documents) == 4
+        assert len(pedidos.documents) == 2
+        assert second["inserted_count"] == 6
+
+    def test_every_batch_is_saved(self, tmp_path):
+        """Los lotes y las sentencias completadas se guardan sin esperar a CHECKPOINT_INTERVAL."""
+        path = str(tmp_path / "job.json")
+        checkpoint = ImportCheckpoint.create(path, "c" * 32, "destino")
+        checkpoint.record_batch(5, 1)
+        checkpoint.record_batch(5, 2)
+        assert ImportCheckpoint.load(path).batches_done(5) == 2
+
+        checkpoint.complete_statement(5, "usuarios", 4, 0, 0)
+        assert ImportCheckpoint.load(path).is_completed(5)
@@ -0,0 +1,164 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.translator.pipeline_optimizer import expand_concise_lookups, optimize_pipeline, pipeline_as_find
+from app.translator.sql_to_mongodb import SQLToMongoDBTranslator
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LOOKUP = {"$lookup": {"from": "pedidos", "localField": "id", "foreignField": "usuario_id", "as": "p_joined"}}
+INNER_UNWIND = {"$unwind": {"path": "$p_joined", "preserveNullAndEmptyArrays": False}}
+LEFT_UNWIND = {"$unwind": {"path": "$p_joined", "preserveNullAndEmptyArrays": True}}
+
+
+@pytest.mark.order(16)
+class TestPipelineOptimizer:
+    """Pruebas de referencia de cada regla del optimizador de pipelines."""
+
+    def test_match_pushed_into_inner_lookup(self):
+        """Las condiciones sobre el array unido se filtran dentro del $lookup."""
+        pipeline = [LOOKUP, INNER_UNWIND, {"$match": {"p_joined.total": {"$gt": 100}, "edad": 30}}]
+        assert optimize_pipeline(pipeline) == [
+            {"$lookup": {**LOOKUP["$lookup"], "pipeline": [{"$match": {"total": {"$gt": 100}}}]}},
+            INNER_UNWIND,
+            {"$match": {"edad": 30}},
+        ]
+
+    def test_concise_lookup_expanded_for_old_servers(self):
+        """Antes de MongoDB 5.0 el $lookup con pipeline pasa a let + $expr; el $lookup simple no cambia."""
+        concise = {"$lookup": {**LOOKUP["$lookup"], "pipeline": [{"$match": {"total": {"$gt": 100}}}]}}
+        query = {"operation": "aggregate", "pipeline": [LOOKUP, {"$unionWith": {"coll": "c", "pipeline": [concise]}}]}
+        expanded = expand_concise_lookups(query)
+        assert expanded["pipeline"][0] == LOOKUP
+        assert expanded["pipeline"][1]["$unionWith"]["pipeline"][0] == {"$lookup": {
+            "from": "pedidos",
+            "let": {"local_key": "$id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$usuario_id", "$$local_key"]}}},
+                {"$match": {"total": {"$gt": 100}}},
+            ],
+            "as": "p_joined",
+        }}
+        assert query["pipeline"][1]["$unionWith"]["pipeline"][0] == concise
+
+    def test_match_not_pushed_into_left_lookup(self):
+        """Con LEFT JOIN filtrar antes cambiaría las filas sin coincidencias."""
+        pipeline = [LOOKUP, LEFT_UNWIND, {"$match": {"p_joined.total": {"$gt": 100}}}]
+        assert optimize_pipeline(pipeline) == pipeline
+
+    def test_project_pushed_into_lookup(self):
+        """Solo se traen del documento unido los campos que se usan después."""
+        pipeline = [LOOKUP, INNER_UNWIND, {"$project": {"_id": 0, "nombre": 1, "total": "$p_joined.total"}}]
+        optimized = optimize_pipeline(pipeline)
+        assert optimized[0]["$lookup"]["pipeline"] == [{"$project": {"total": 1, "_id": 0}}]
+
+    def test_project_not_pushed_when_whole_document_used(self):
+        """SELECT * usa el documento unido completo."""
+        pipeline = [LOOKUP, INNER_UNWIND, {"$project": {"_id": 1, "p_data": "$p_joined"}}]
+        assert optimize_pipeline(pipeline) == pipeline
+
+    def test_adjacent_stages_fused(self):
+        """$match, $limit y $project consecutivos se fusionan."""
+        pipeline = [
+            {"$match": {"a": 1}},
+            {"$match": {"a": {"$lt": 5}, "b": 2}},
+            {"$project": {"_id": 0, "x": "$a", "y": {"$toUpper": "$b"}}},
+            {"$project": {"y": 1, "z": "$x"}},
+            {"$limit": 10},
+            {"$limit": 3},
+        ]
+        assert optimize_pipeline(pipeline) == [
+            {"$match": {"$and": [{"a": 1}, {"a": {"$lt": 5}}, {"b": 2}]}},
+            {"$project": {"y": {"$toUpper": "$b"}, "z": "$a", "_id": 0}},
+            {"$limit": 3},
+        ]
+
+    def test_limit_moved_before_lookup(self):
+        """El $limit se adelanta al $lookup; tras un $unwind que preserva se conserva también."""
+        pipeline = [LOOKUP, LEFT_UNWIND, {"$skip": 5}, {"$limit": 10}]
+        assert optimize_pipeline(pipeline) == [{"$limit": 15}, LOOKUP, LEFT_UNWIND, {"$skip": 5}, {"$limit": 10}]
+
+        # Un $sort o un INNER JOIN pueden reordenar o descartar documentos
+        for blocking in ({"$sort": {"edad": 1}}, INNER_UNWIND):
+            pipeline = [LOOKUP, blocking, {"$limit": 10}]
+            assert optimize_pipeline(pipeline) == pipeline
+
+    def test_noop_stages_removed(self):
+        """Etapas vacías, $skip 0 y claves auxiliares de $lookup se eliminan."""
+        lookup = {"$lookup": {**LOOKUP["$lookup"], "_index_hint": "Consider index"}}
+        pipeline = [{"$match": {}}, {"$skip": 0}, lookup, {"$sort": {}}, LEFT_UNWIND]
+        assert optimize_pipeline(pipeline) == [LOOKUP, LEFT_UNWIND]
+
+    def test_input_pipeline_not_modified(self):
+        """El optimizador trabaja sobre una copia."""
+        pipeline = [LOOKUP, INNER_UNWIND, {"$match": {"p_joined.total": 1}}]
+        optimize_pipeline(pipeline)
+        assert "pipeline" not in LOOKUP["$lookup"]
+
+    def test_join_translation_is_optimized(self):
+        """El WHERE de una consulta con JOIN se reparte entre la colección y el $lookup."""
+        result = SQLToMongoDBTranslator().translate(
+            "SELECT u.nombre, p.total FROM usuarios u INNER JOIN pedidos p ON p.usuario_id = u.id "
+            "LEFT JOIN productos pr ON p.producto_id = pr.id "
+            "WHERE p.total > 100 AND u.edad >= 18 ORDER BY p.total DESC"
+        )
+        pipeline = result["pipeline"]
+
+        assert pipeline[0] == {"$match": {"edad": {"$gte": 18}}}
+        assert pipeline[1]["$lookup"]["localField"] == "id"
+        assert pipeline[1]["$lookup"]["foreignField"] == "usuario_id"
+        assert pipeline[1]["$lookup"]["pipeline"] == [
+            {"$match": {"total": {"$gt": 100}}},
+            {"$project": {"producto_id": 1, "total": 1, "_id": 0}},
+        ]
+        # El JOIN encadenado lee el campo local del documento ya unido
+        assert pipeline[4]["$lookup"]["localField"] == "p_joined.producto_id"
+        assert {"$sort": {"p_joined.total": -1}} in pipeline
+        assert pipeline[-1] == {"$project": {"_id": 0, "u.nombre": "$nombre", "p.total": "$p_joined.total"}}
+
+    def test_simple_pipeline_as_find(self):
+        """$match, $sort, $skip, $limit y un $project de campos equivalen a find()."""
+        pipeline = [
+            {"$match": {"edad": {"$gt": 30}}},
+            {"$project": {"_id": 0, "nombre": 1, "edad": 1}},
+            {"$sort": {"nombre": 1}},
+            {"$skip": 5},
+            {"$limit": 10},
+        ]
+        assert pipeline_as_find(pipeline) == {
+            "query": {"edad": {"$gt": 30}},
+            "projection": {"_id": 0, "nombre": 1, "edad": 1},
+            "sort": {"nombre": 1},
+            "skip": 5,
+            "limit": 10,
+        }
+
+    def test_pipelines_that_are_not_find(self):
+        """Expresiones, etapas en otro orden o un orden por campos ya descartados requieren aggregate."""
+        for pipeline in (
+            [{"$project": {"n": {"$toUpper": "$nombre"}}}],
+            [{"$limit": 10}, {"$skip": 5}],
+            [{"$limit": 10}, {"$match": {"edad": 30}}],
+            [{"$project": {"nombre": 1}}, {"$sort": {"edad": 1}}],
+            [{"$addFields": {"edad_numeric": "$edad"}}, {"$sort": {"edad_numeric": 1}}],
+            [LOOKUP],
+        ):
+            assert pipeline_as_find(pipeline) is None
+
+    def test_order_by_translation_downgraded_to_find(self):
+        """Un SELECT con ORDER BY por un campo de texto se ejecuta con find()."""
+        result = SQLToMongoDBTranslator().translate(
+            "SELECT * FROM productos WHERE categoria = 'MAX' ORDER BY nombre LIMIT 5"
+        )
+        assert result["operation"] == "find"
+        assert "pipeline" not in result
+        assert result["query"] == {"categoria": "MAX"}
+        assert result["sort"] == {"nombre": 1}
+        assert result["limit"] == 5
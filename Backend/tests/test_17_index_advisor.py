@@ -0,0 +1,88 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.index_advisor import IndexAdvisor, build_esr_key, extract_access_patterns, index_serves
+from app.translator.parameterizer import translate_sql
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class FakeCollection:
+    def __init__(self):
+        self.created = []
+
+    def create_index(self, keys, name=None):
+        self.created.append(keys)
+        return name
+
+
+class FakeConnector:
+    """Conector con índices fijos por colección."""
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+        self.collections = {}
+
+    def get_collection_indexes(self, collection_name, database_name=None):
+        return self.indexes.get(collection_name, [{"name": "_id_", "key": {"_id": 1}}])
+
+    def get_database(self, database_name=None):
+        return self
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+
+@pytest.mark.order(17)
+class TestIndexAdvisor:
+    """Pruebas del asesor de índices."""
+
+    def test_esr_key_order(self):
+        """Igualdad, después orden y por último rango."""
+        collection, mongo_query = translate_sql(
+            "SELECT * FROM usuarios WHERE edad > 30 AND ciudad = 'Madrid' ORDER BY nombre DESC LIMIT 5"
+        )
+        patterns = extract_access_patterns(collection, mongo_query)
+        assert build_esr_key(patterns[0]) == [["ciudad", 1], ["nombre", -1], ["edad", 1]]
+
+    def test_lookup_foreign_field_is_recorded(self):
+        """Cada JOIN propone un índice en el campo de la colección unida."""
+        collection, mongo_query = translate_sql(
+            "SELECT u.nombre, p.total FROM usuarios u INNER JOIN pedidos p ON u.id = p.usuario_id WHERE p.total > 100"
+        )
+        keys = {pattern["collection"]: build_esr_key(pattern) for pattern in extract_access_patterns(collection, mongo_query)}
+        assert keys["pedidos"] == [["usuario_id", 1], ["total", 1]]
+
+    def test_existing_index_prefix_covers(self):
+        """Un índice sirve si la clave propuesta es su prefijo, con direcciones iguales o invertidas."""
+        assert index_serves([["a", 1], ["b", -1]], [["a", -1], ["b", 1]])
+        assert not index_serves([["a", 1], ["b", -1]], [["a", 1], ["b", 1]])
+        assert not index_serves([["a", 1]], [["a", 1], ["b", 1]])
+
+    def test_advise_groups_and_skips_covered(self):
+        """Las formas que son prefijo de otra se agrupan y las ya indexadas no se proponen."""
+        advisor = IndexAdvisor()
+        for sql in (
+            "SELECT * FROM usuarios WHERE ciudad = 'Madrid' AND edad > 30",
+            "SELECT * FROM usuarios WHERE ciudad = 'Sevilla'",
+            "DELETE FROM pedidos WHERE estado = 'cancelado'",
+        ):
+            advisor.record("tienda", *translate_sql(sql))
+
+        connector = FakeConnector({"pedidos": [{"name": "estado_1_fecha_1", "key": {"estado": 1, "fecha": 1}}]})
+        advice = advisor.advise(connector, "tienda")
+
+        assert [(item["collection"], item["key"], item["queries"]) for item in advice["recommendations"]] == [
+            ("usuarios", [["ciudad", 1], ["edad", 1]], 2)
+        ]
+        assert advice["covered"][0]["covered_by"] == "estado_1_fecha_1"
+
+        created = advisor.create_indexes(connector, "tienda", advice["recommendations"])
+        assert created == [{"collection": "usuarios", "name": "ciudad_1_edad_1", "created": True}]
@@ -0,0 +1,101 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.explain import build_explain_command, summarize_explain
+from app.parser.sql_parser import SQLParser
+from app.translator.parameterizer import prepare_statement, translate_sql
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Salida de explain("executionStats") de un find con índice
+FIND_EXPLAIN = {
+    "queryPlanner": {
+        "winningPlan": {
+            "stage": "PROJECTION_SIMPLE",
+            "inputStage": {
+                "stage": "FETCH",
+                "inputStage": {"stage": "IXSCAN", "indexName": "ciudad_1_edad_1", "keyPattern": {"ciudad": 1, "edad": 1}},
+            },
+        },
+        "rejectedPlans": [{"stage": "COLLSCAN"}],
+    },
+    "executionStats": {
+        "nReturned": 4,
+        "executionTimeMillis": 3,
+        "totalKeysExamined": 8,
+        "totalDocsExamined": 80,
+        "executionStages": {
+            "stage": "PROJECTION_SIMPLE", "nReturned": 4, "executionTimeMillisEstimate": 2,
+            "inputStage": {
+                "stage": "FETCH", "nReturned": 4, "executionTimeMillisEstimate": 2,
+                "inputStage": {"stage": "IXSCAN", "nReturned": 8, "executionTimeMillisEstimate": 0, "indexName": "ciudad_1_edad_1"},
+            },
+        },
+    },
+}
+
+# Salida de explain("queryPlanner") de una agregación con $lookup (motor SBE)
+AGGREGATE_EXPLAIN = {
+    "stages": [
+        {"$cursor": {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "COLLSCAN"}}, "rejectedPlans": []}}},
+        {"$lookup": {"from": "pedidos"}, "nReturned": 10, "executionTimeMillisEstimate": 7},
+    ]
+}
+
+
+@pytest.mark.order(18)
+class TestExplain:
+    """Pruebas de EXPLAIN [ANALYZE]."""
+
+    def test_explain_prefix_detected(self):
+        """El prefijo no cambia el tipo ni la tabla de la sentencia explicada."""
+        parser = SQLParser("EXPLAIN ANALYZE SELECT nombre FROM usuarios WHERE edad > 30")
+        assert parser.get_query_type() == "SELECT"
+        assert parser.get_table_name() == "usuarios"
+        assert parser.get_explain_mode() == "executionStats"
+        assert SQLParser("explain select * from usuarios").get_explain_mode() == "queryPlanner"
+        assert SQLParser("SELECT * FROM usuarios").get_explain_mode() is None
+
+    def test_explain_translation(self):
+        """La traducción envuelve el find o aggregate generado en una operación explain."""
+        collection, mongo_query = translate_sql("EXPLAIN SELECT nombre FROM usuarios WHERE edad > 30")
+        assert mongo_query["operation"] == "explain"
+        assert mongo_query["verbosity"] == "queryPlanner"
+        assert build_explain_command(collection, mongo_query["query"]) == {
+            "find": "usuarios", "filter": {"edad": {"$gt": 30}}, "projection": {"nombre": 1}
+        }
+
+        with pytest.raises(ValueError):
+            translate_sql("EXPLAIN DELETE FROM usuarios WHERE id = 3")
+
+    def test_explain_keeps_parameterization(self):
+        """Los literales se extraen igual que en la consulta sin EXPLAIN."""
+        prepared = prepare_statement("EXPLAIN ANALYZE SELECT * FROM usuarios WHERE edad > 30")
+        assert prepared.query_type == "SELECT"
+        assert prepared.values == [30]
+        assert prepared.template_sql.startswith("EXPLAIN ANALYZE SELECT")
+
+    def test_summary_of_indexed_find(self):
+        """Plan ganador, índice usado, ratios de examinados y tiempos por etapa."""
+        summary = summarize_explain(FIND_EXPLAIN)
+        assert summary["winning_plan"] == "PROJECTION_SIMPLE <- FETCH <- IXSCAN"
+        assert summary["indexes_used"] == ["ciudad_1_edad_1"]
+        assert summary["collection_scan"] is False
+        assert summary["docs_examined_per_key"] == 10.0
+        assert summary["docs_examined_per_returned"] == 20.0
+        assert [stage["stage"] for stage in summary["stages"]] == ["PROJECTION_SIMPLE", "FETCH", "IXSCAN"]
+        assert len(summary["warnings"]) == 1
+
+    def test_summary_of_aggregate_collscan(self):
+        """Las agregaciones resumen la consulta inicial y cada etapa del pipeline."""
+        summary = summarize_explain(AGGREGATE_EXPLAIN)
+        assert summary["collection_scan"] is True
+        assert [stage["stage"] for stage in summary["pipeline_stages"]] == ["$cursor", "$lookup"]
+        assert "COLLSCAN" in summary["warnings"][0]
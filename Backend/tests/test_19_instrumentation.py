@@ -0,0 +1,67 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.instrumentation import (
+    LatencyHistogram, ShapeLatencyStats, current_timer, finish_request, stage, start_request
+)
+from app.translator.parameterizer import translate_sql
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.order(19)
+class TestInstrumentation:
+    """Pruebas de la medición de tiempos por etapa."""
+
+    def test_stages_outside_request_are_not_measured(self):
+        """Sin temporizador activo las etapas no registran nada."""
+        assert current_timer() is None
+        with stage("parse"):
+            pass
+        assert current_timer() is None
+
+    def test_translation_stages_are_recorded(self):
+        """El análisis, los sub-parsers y la traducción se miden por separado."""
+        timer, token = start_request()
+        try:
+            translate_sql("SELECT nombre FROM usuarios WHERE edad > 30 ORDER BY nombre")
+        finally:
+            finish_request(token)
+
+        assert {"parse", "parse.where_clause", "parse.order_by", "translate"} <= set(timer.stages)
+        assert timer.stages["translate"][1] == 1
+        header = timer.server_timing()
+        assert header.startswith("parse;dur=") and ", total;dur=" in header
+        assert current_timer() is None
+
+    def test_histogram_quantiles(self):
+        """Los cuantiles se estiman con el límite superior de su bucket."""
+        histogram = LatencyHistogram()
+        for value in [0.3] * 90 + [40] * 10:
+            histogram.observe(value)
+        assert histogram.quantile(0.5) == 0.5
+        assert histogram.quantile(0.95) == 50
+        assert histogram.summary()["count"] == 100
+
+    def test_shape_stats_keep_most_used_shapes(self):
+        """Cada forma de consulta tiene su histograma y se descartan las menos usadas."""
+        stats = ShapeLatencyStats(max_shapes=2)
+        for shape, repeat in (("SELECT a", 3), ("SELECT b", 1), ("SELECT c", 2)):
+            for _ in range(repeat):
+                timer, token = start_request()
+                with stage("translate"):
+                    pass
+                timer.shape = shape
+                finish_request(token)
+                stats.record(timer)
+
+        snapshot = stats.snapshot()
+        assert [entry["shape"] for entry in snapshot] == ["SELECT a", "SELECT c"]
+        assert snapshot[0]["stages"]["translate"]["count"] == 3
@@ -0,0 +1,87 @@
+import pytest
+import sys
+import os
+import logging
+from types import SimpleNamespace
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.metrics import (
+    Counter, Gauge, Histogram, MetricsRegistry, POOL_CONNECTIONS, POOL_LISTENER, TRANSLATION_LATENCY
+)
+from app.translator.parameterizer import translate_sql
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.order(20)
+class TestMetrics:
+    """Pruebas del registro de métricas y su exportación."""
+
+    def test_counter_render(self):
+        """Cada combinación de etiquetas es una serie con HELP y TYPE."""
+        registry = MetricsRegistry()
+        counter = Counter("pruebas_total", "Contador de prueba", ("query_type",), registry=registry)
+        counter.inc(query_type="SELECT")
+        counter.inc(2, query_type='IN"SERT')
+
+        text = registry.render()
+        assert "# HELP pruebas_total Contador de prueba" in text
+        assert "# TYPE pruebas_total counter" in text
+        assert 'pruebas_total{query_type="SELECT"} 1' in text
+        assert 'pruebas_total{query_type="IN\\"SERT"} 2' in text
+
+        with pytest.raises(ValueError):
+            counter.inc(tipo="SELECT")
+        with pytest.raises(ValueError):
+            Counter("pruebas_total", "Duplicada", registry=registry)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Los buckets acumulan las observaciones hasta +Inf."""
+        registry = MetricsRegistry()
+        histogram = Histogram("pruebas_seconds", "Latencia", buckets=(0.1, 1), registry=registry)
+        for value in (0.05, 0.5, 3):
+            histogram.observe(value)
+
+        text = registry.render()
+        assert 'pruebas_seconds_bucket{le="0.1"} 1' in text
+        assert 'pruebas_seconds_bucket{le="1"} 2' in text
+        assert 'pruebas_seconds_bucket{le="+Inf"} 3' in text
+        assert "pruebas_seconds_sum 3.55" in text
+        assert "pruebas_seconds_count 3" in text
+
+    def test_callback_metrics(self):
+        """Las métricas calculadas leen su valor al exportar; si fallan se omiten."""
+        registry = MetricsRegistry()
+        Gauge("pruebas_entries", "Entradas", registry=registry).set_function(lambda: 7)
+        Counter("pruebas_lookups_total", "Búsquedas", ("result",), registry=registry) \
+            .set_function(lambda: [({"result": "hit"}, 3), ({"result": "miss"}, 1)])
+        Gauge("pruebas_rota", "Falla", registry=registry).set_function(lambda: 1 / 0)
+
+        text = registry.render()
+        assert "pruebas_entries 7" in text
+        assert 'pruebas_lookups_total{result="miss"} 1' in text
+        assert "pruebas_rota" not in text
+
+    def test_translation_latency_by_query_type(self):
+        """Cada traducción se observa en el histograma de su tipo de consulta."""
+        before = TRANSLATION_LATENCY.value(query_type="DELETE")
+        translate_sql("DELETE FROM usuarios WHERE id = 3")
+        assert TRANSLATION_LATENCY.value(query_type="DELETE") == before + 1
+
+    def test_pool_listener_tracks_connections(self):
+        """El listener del pool cuenta conexiones abiertas y en uso."""
+        event = SimpleNamespace(address=("pruebas", 27017))
+        POOL_LISTENER.connection_created(event)
+        POOL_LISTENER.connection_created(event)
+        POOL_LISTENER.connection_checked_out(event)
+        assert POOL_CONNECTIONS.value(address="pruebas:27017", state="open") == 2
+        assert POOL_CONNECTIONS.value(address="pruebas:27017", state="checked_out") == 1
+
+        POOL_LISTENER.connection_checked_in(event)
+        POOL_LISTENER.connection_closed(event)
+        assert POOL_CONNECTIONS.value(address="pruebas:27017", state="open") == 1
+        assert POOL_CONNECTIONS.value(address="pruebas:27017", state="checked_out") == 0
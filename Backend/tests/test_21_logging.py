@@ -0,0 +1,95 @@
+import pytest
+import sys
+import os
+import json
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.log_config import (
+    JsonFormatter, SamplingFilter, configure_logging, parse_logger_settings, shutdown_logging, truncated
+)
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _record(name, level=logging.INFO, msg="mensaje", args=()):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class _Expensive:
+    """Valor cuya representación cuenta las veces que se formatea."""
+    calls = 0
+
+    def __repr__(self):
+        _Expensive.calls += 1
+        return "caro"
+
+
+@pytest.mark.order(21)
+class TestLogging:
+    """Pruebas del logging perezoso, muestreado y estructurado."""
+
+    def test_truncated_payloads(self):
+        """Los textos largos se recortan y de las listas solo se muestran los primeros elementos."""
+        assert str(truncated("SELECT 1")) == "SELECT 1"
+        assert str(truncated("x" * 50, limit=10)) == "xxxxxxxxxx... (50 caracteres)"
+        documents = [{"id": i} for i in range(1000)]
+        assert str(truncated(documents)) == "[{'id': 0}, {'id': 1}, {'id': 2}]... (1000 elementos)"
+
+    def test_formatting_is_lazy(self):
+        """Un registro por debajo del nivel activo no formatea sus argumentos."""
+        quiet = logging.getLogger("pruebas.lazy")
+        quiet.setLevel(logging.WARNING)
+        _Expensive.calls = 0
+        quiet.debug("Pipeline: %s", truncated(_Expensive()))
+        assert _Expensive.calls == 0
+        assert _record("pruebas.lazy", msg="Pipeline: %s", args=(truncated(_Expensive()),)).getMessage() == "Pipeline: caro"
+
+    def test_sampling_filter(self):
+        """Se conserva uno de cada N registros INFO; los avisos nunca se descartan."""
+        sampler = SamplingFilter({"app.parser": 0.25, "app.connector": 0})
+        kept = [sampler.filter(_record("app.parser.where_parser")) for _ in range(8)]
+        assert kept.count(True) == 2
+        assert sampler.filter(_record("app.parser.where_parser", logging.WARNING))
+        assert not sampler.filter(_record("app.connector"))
+        assert sampler.filter(_record("app.translator"))
+
+    def test_logger_settings_from_env(self):
+        """LOG_LEVELS y LOG_SAMPLE_RATES se leen como listas logger=valor."""
+        assert parse_logger_settings("app.parser=0.1, app.connector=1", float) == {"app.parser": 0.1, "app.connector": 1.0}
+        assert parse_logger_settings("", float) == {}
+        assert parse_logger_settings("app.parser=mucho", float) == {}
+
+    def test_json_formatter(self):
+        """Cada registro es una línea JSON con los campos extra."""
+        record = _record("app.connector", msg="Consulta %s", args=("lenta",))
+        record.duration_ms = 12.5
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry["message"] == "Consulta lenta"
+        assert entry["level"] == "INFO" and entry["logger"] == "app.connector"
+        assert entry["duration_ms"] == 12.5
+
+    def test_queue_handler_writes_file(self, tmp_path):
+        """Los registros pasan por la cola y se escriben al vaciarla, con niveles por módulo."""
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        log_file = tmp_path / "app.log"
+        try:
+            configure_logging(log_file=str(log_file), log_format="json", levels={"pruebas.ruidoso": logging.WARNING}, sample_rates={})
+            logging.getLogger("pruebas.cola").info("Consulta recibida: %s", truncated("SELECT * FROM usuarios"))
+            logging.getLogger("pruebas.ruidoso").info("No debe aparecer")
+            shutdown_logging()
+        finally:
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
+            logging.getLogger("pruebas.ruidoso").setLevel(logging.NOTSET)
+
+        lines = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+        assert [line["message"] for line in lines] == ["Consulta recibida: SELECT * FROM usuarios"]
@@ -0,0 +1,78 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.explain import build_explain_command
+from app.mongo_shell import MongoShellQueryGenerator
+from app.translator.parameterizer import translate_sql
+from app.translator.pipeline_optimizer import pipeline_as_count
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.order(22)
+class TestCountFastPath:
+    """Pruebas del conteo directo de SELECT COUNT(*)."""
+
+    def test_count_translation(self):
+        """COUNT(*) sin agrupar se traduce a la operación count con su filtro y alias."""
+        _, mongo_query = translate_sql("SELECT COUNT(*) AS total FROM usuarios WHERE edad > 30")
+        assert mongo_query == {
+            "operation": "count", "collection": "usuarios", "query": {"edad": {"$gt": 30}}, "field": "total"
+        }
+        _, mongo_query = translate_sql("SELECT COUNT(*) FROM usuarios")
+        assert mongo_query["operation"] == "count"
+        assert mongo_query["query"] == {} and mongo_query["field"] == "COUNT(*)"
+
+    def test_other_aggregations_keep_group(self):
+        """GROUP BY, varias funciones o un $skip siguen necesitando el pipeline."""
+        assert translate_sql("SELECT COUNT(*), MAX(edad) FROM usuarios")[1]["operation"] == "aggregate"
+        group = {"$group": {"_id": None, "c": {"$sum": 1}}}
+        project = {"$project": {"_id": 0, "c": "$c"}}
+        assert pipeline_as_count([group, project, {"$limit": 1}]) == {"query": {}, "field": "c"}
+        assert pipeline_as_count([group, project, {"$skip": 1}]) is None
+        assert pipeline_as_count([{"$group": {"_id": "$ciudad", "c": {"$sum": 1}}}, project]) is None
+
+    def test_group_by_and_having_keep_pipeline(self):
+        """COUNT(*) con GROUP BY o HAVING no se reduce a un único conteo de la colección."""
+        for sql in ("SELECT COUNT(*) FROM usuarios GROUP BY ciudad",
+                    "SELECT COUNT(*) FROM usuarios WHERE edad > 30 GROUP BY ciudad",
+                    "SELECT COUNT(*) FROM usuarios HAVING COUNT(*) > 1"):
+            assert translate_sql(sql)[1]["operation"] == "aggregate", sql
+
+    def test_unfiltered_count_uses_metadata(self, fake_connector, fake_collection):
+        """Sin filtro y en modo approximate se usa estimated_document_count."""
+        collection = fake_collection(documents=[{"edad": 30}] * 3)
+        result = fake_connector([collection]).execute_query(
+            "usuarios", {"operation": "count", "query": {}, "field": "COUNT(*)"}, serialize=False
+        )
+        assert result == [{"COUNT(*)": 3}]
+        assert collection.calls == [("estimated_document_count",)]
+
+    def test_exact_and_filtered_counts(self, fake_connector, fake_collection):
+        """El modo exact y los conteos con filtro usan count_documents."""
+        collection = fake_collection(documents=[{"edad": 30}] * 3)
+        connector = fake_connector([collection], count_mode="exact")
+        connector.execute_query("usuarios", {"operation": "count", "query": {}, "field": "n"})
+
+        connector.count_mode = "approximate"
+        result = connector.execute_query("usuarios", {"operation": "count", "query": {"edad": 30}, "field": "n"})
+        assert result == [{"n": 3}]
+        assert collection.calls == [("count_documents", {}), ("count_documents", {"edad": 30})]
+
+        with pytest.raises(ValueError):
+            connector._execute_count(collection, {"operation": "count", "query": {}, "mode": "aproximado"})
+
+    def test_explain_and_shell(self):
+        """EXPLAIN usa el comando count y la shell muestra el método equivalente."""
+        query = {"operation": "count", "query": {"edad": 30}, "field": "n"}
+        assert build_explain_command("usuarios", query) == {"count": "usuarios", "query": {"edad": 30}}
+        assert "countDocuments" in MongoShellQueryGenerator.generate_shell_query("usuarios", query)
+        unfiltered = {"operation": "count", "query": {}, "field": "n"}
+        assert "estimatedDocumentCount()" in MongoShellQueryGenerator.generate_shell_query("usuarios", unfiltered)
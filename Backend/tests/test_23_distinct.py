@@ -0,0 +1,92 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pymongo.errors import OperationFailure
+from app.connector import build_distinct_pipeline
+from app.explain import build_explain_command
+from app.translator.parameterizer import translate_sql
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+CIUDADES = [{"ciudad": "Madrid"}, {"ciudad": "Lima"}]
+
+
+@pytest.mark.order(23)
+class TestDistinctFastPath:
+    """Pruebas de la ejecución directa de SELECT DISTINCT de una columna."""
+
+    def test_distinct_translation(self):
+        """Una columna con WHERE, alias, orden y paginación se traduce a distinct."""
+        _, mongo_query = translate_sql("SELECT DISTINCT ciudad AS c FROM usuarios WHERE edad > 30 ORDER BY c DESC LIMIT 5")
+        assert mongo_query == {
+            "operation": "distinct", "collection": "usuarios", "query": {"edad": {"$gt": 30}},
+            "field": "ciudad", "output": "c", "sort": -1, "limit": 5,
+        }
+        assert translate_sql("SELECT DISTINCT ciudad, pais FROM usuarios")[1]["operation"] == "aggregate"
+
+    def test_parenthesized_field(self):
+        """DISTINCT(campo) se traduce igual que DISTINCT campo."""
+        assert translate_sql("SELECT DISTINCT(ciudad) FROM usuarios")[1] == translate_sql("SELECT DISTINCT ciudad FROM usuarios")[1]
+        _, mongo_query = translate_sql("SELECT DISTINCT (ciudad) AS c FROM usuarios")
+        assert mongo_query["field"] == "ciudad" and mongo_query["output"] == "c"
+
+    def test_distinct_command_without_order(self, fake_connector, fake_collection):
+        """Sin orden ni paginación se usa el comando distinct con el filtro."""
+        collection = fake_collection(documents=CIUDADES)
+        result = fake_connector([collection]).execute_query(
+            "usuarios", {"operation": "distinct", "query": {"edad": 30}, "field": "ciudad", "output": "c"}
+        )
+        assert result == [{"c": "Madrid"}, {"c": "Lima"}]
+        assert collection.calls == [("distinct", "ciudad", {"edad": 30})]
+
+    def test_paginated_distinct_uses_pipeline(self, fake_connector, fake_collection):
+        """Con LIMIT se usa el pipeline, que separa los arrays y omite los campos ausentes como distinct."""
+        collection = fake_collection(documents=CIUDADES)
+        fake_connector([collection]).execute_query(
+            "usuarios", {"operation": "distinct", "query": {}, "field": "ciudad", "limit": 2}
+        )
+
+        operation, pipeline, options = collection.calls[0]
+        assert operation == "aggregate" and options == {"allowDiskUse": True}
+        assert pipeline == [
+            {"$unwind": {"path": "$ciudad", "preserveNullAndEmptyArrays": True}},
+            {"$match": {"ciudad": {"$exists": True}}},
+            {"$group": {"_id": "$ciudad"}},
+            {"$limit": 2},
+            {"$project": {"_id": 0, "ciudad": "$_id"}},
+        ]
+
+    def test_too_large_result_falls_back_to_pipeline(self, fake_connector, fake_collection):
+        """Si distinct supera los 16MB se repite con un pipeline sin ese límite."""
+        too_large = OperationFailure("distinct too big, 16mb cap", code=17217)
+        collection = fake_collection(documents=CIUDADES, errors={"distinct": too_large})
+        result = fake_connector([collection]).execute_query(
+            "usuarios", {"operation": "distinct", "query": {}, "field": "ciudad"}, serialize=False
+        )
+        assert [call[0] for call in collection.calls] == ["distinct", "aggregate"]
+        assert result == CIUDADES
+
+    def test_sorted_paginated_pipeline(self):
+        """El orden y la paginación se aplican a los valores ya agrupados."""
+        query = {"query": {"edad": 30}, "field": "ciudad", "output": "c", "sort": -1, "skip": 2, "limit": 5}
+        assert build_distinct_pipeline(query) == [
+            {"$match": {"edad": 30}},
+            {"$unwind": {"path": "$ciudad", "preserveNullAndEmptyArrays": True}},
+            {"$match": {"ciudad": {"$exists": True}}},
+            {"$group": {"_id": "$ciudad"}},
+            {"$sort": {"_id": -1}},
+            {"$skip": 2},
+            {"$limit": 5},
+            {"$project": {"_id": 0, "c": "$_id"}},
+        ]
+        assert build_explain_command("usuarios", {"operation": "distinct", **query}) == {
+            "distinct": "usuarios", "key": "ciudad", "query": {"edad": 30}
+        }
@@ -0,0 +1,117 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app.connector as connector_module
+from app.connector import apply_union_tail, combine_union_branches, unique_documents
+from app.services.index_advisor import extract_access_patterns
+from app.translator.parameterizer import translate_sql
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+UNION_SQL = "SELECT nombre FROM usuarios WHERE edad > 30 UNION SELECT nombre FROM clientes ORDER BY nombre LIMIT 3"
+
+
+@pytest.mark.order(24)
+class TestUnion:
+    """Pruebas de UNION / UNION ALL con $unionWith y ejecución por ramas."""
+
+    def test_union_translates_to_union_with(self):
+        """Las ramas se encadenan con $unionWith y UNION elimina duplicados en el servidor."""
+        collection, mongo_query = translate_sql(UNION_SQL)
+        assert collection == "usuarios" and mongo_query["operation"] == "aggregate"
+        pipeline = mongo_query["pipeline"]
+        assert pipeline[0] == {"$match": {"edad": {"$gt": 30}}}
+        assert pipeline[2] == {"$unionWith": {"coll": "clientes", "pipeline": [{"$project": {"nombre": 1, "_id": 0}}]}}
+        assert pipeline[3:] == [
+            {"$group": {"_id": "$$ROOT"}}, {"$replaceRoot": {"newRoot": "$_id"}},
+            {"$sort": {"nombre": 1}}, {"$limit": 3}
+        ]
+        union = mongo_query["union"]
+        assert union["distinct"] is True
+        assert [branch["collection"] for branch in union["branches"]] == ["usuarios", "clientes"]
+        assert union["sort"] == {"nombre": 1} and union["limit"] == 3
+
+    def test_union_all_keeps_duplicates(self):
+        """UNION ALL no añade la etapa de eliminación de duplicados."""
+        _, mongo_query = translate_sql("SELECT nombre FROM usuarios UNION ALL SELECT nombre FROM clientes")
+        assert mongo_query["union"]["distinct"] is False
+        assert not any("$group" in stage for stage in mongo_query["pipeline"])
+
+    def test_mixed_union_dedups_left_prefix(self):
+        """UNION y UNION ALL mezclados se evalúan de izquierda a derecha."""
+        _, mongo_query = translate_sql(
+            "SELECT nombre FROM a UNION SELECT nombre FROM b UNION ALL SELECT nombre FROM c"
+        )
+        stages = [next(iter(stage)) for stage in mongo_query["pipeline"]]
+        assert stages == ["$project", "$unionWith", "$group", "$replaceRoot", "$unionWith"]
+        assert mongo_query["union"]["distinct_branches"] == 2
+
+        _, mongo_query = translate_sql(
+            "SELECT nombre FROM a UNION ALL SELECT nombre FROM b UNION SELECT nombre FROM c"
+        )
+        stages = [next(iter(stage)) for stage in mongo_query["pipeline"]]
+        assert stages == ["$project", "$unionWith", "$unionWith", "$group", "$replaceRoot"]
+        assert mongo_query["union"]["distinct_branches"] == 3
+
+        # Combinación rama a rama: solo se eliminan duplicados hasta el último UNION
+        branch_results = [[{"n": 1}], [{"n": 1}, {"n": 2}], [{"n": 2}]]
+        assert list(combine_union_branches(branch_results, {"distinct_branches": 2})) == [{"n": 1}, {"n": 2}, {"n": 2}]
+        assert list(combine_union_branches(branch_results, {"distinct_branches": 3})) == [{"n": 1}, {"n": 2}]
+
+    def test_branch_fallback(self, fake_connector, fake_collection):
+        """Si el servidor rechaza $unionWith, las ramas se ejecutan por separado y se combinan."""
+        _, mongo_query = translate_sql(UNION_SQL)
+        calls = []
+        connector = fake_connector([
+            fake_collection("usuarios", [{"nombre": "Luis"}, {"nombre": "Ana"}], calls, unsupported_stages=("$unionWith",)),
+            fake_collection("clientes", [{"nombre": "Ana"}, {"nombre": "Carla"}, {"nombre": "Bea"}], calls),
+        ])
+        result = connector.execute_query("usuarios", mongo_query, serialize=False)
+        assert result == [{"nombre": "Ana"}, {"nombre": "Bea"}, {"nombre": "Carla"}]
+        assert sorted(call[0] for call in calls) == ["clientes", "usuarios"]
+        assert connector._union_with_supported is False
+
+        # Las siguientes consultas van directamente por ramas
+        connector.execute_query("usuarios", mongo_query, serialize=False)
+        assert len(calls) == 4
+
+    def test_branch_fallback_reads_lazily(self, fake_connector, fake_collection, monkeypatch):
+        """Las ramas se leen por colas acotadas, se adaptan al servidor y el LIMIT corta la lectura."""
+        monkeypatch.setattr(connector_module, "UNION_BRANCH_BUFFER", 2)
+        _, mongo_query = translate_sql(
+            "SELECT nombre FROM usuarios WHERE id IN (SELECT usuario_id FROM pedidos) "
+            "UNION ALL SELECT nombre FROM clientes LIMIT 3"
+        )
+        usuarios = fake_collection("usuarios", [{"nombre": f"u{i}"} for i in range(50)])
+        clientes = fake_collection("clientes", [{"nombre": f"c{i}"} for i in range(50)])
+        connector = fake_connector([usuarios, clientes], server_version=(4, 4), _union_with_supported=False)
+        db = connector.get_database()
+
+        result = connector._execute_union(db, usuarios, mongo_query, serialize=False)
+        assert result == [{"nombre": "u0"}, {"nombre": "u1"}, {"nombre": "u2"}]
+        lookup = usuarios.calls[0][1][0]["$lookup"]
+        assert "localField" not in lookup and lookup["let"] == {"local_key": "$id"}
+
+    def test_dedup_and_tail(self):
+        """La eliminación de duplicados conserva el primero y el final ordena con tipos mezclados."""
+        documents = [{"a": 1}, {"a": 2}, {"a": 1}, {"a": None}, {"a": "x"}]
+        assert list(unique_documents(documents)) == [{"a": 1}, {"a": 2}, {"a": None}, {"a": "x"}]
+        tail = {"sort": {"a": -1}, "skip": 1, "limit": 2}
+        assert apply_union_tail(unique_documents(documents), tail) == [{"a": 2}, {"a": 1}]
+        assert apply_union_tail(documents, {"limit": 2}) == [{"a": 1}, {"a": 2}]
+
+    def test_index_advisor_sees_branches(self):
+        """Los filtros de cada rama $unionWith se analizan sobre su colección."""
+        _, mongo_query = translate_sql(
+            "SELECT nombre FROM usuarios UNION SELECT nombre FROM clientes WHERE ciudad = 'Madrid'"
+        )
+        patterns = extract_access_patterns("usuarios", mongo_query)
+        assert [pattern["collection"] for pattern in patterns] == ["clientes"]
+        assert patterns[0]["equality"] == ["ciudad"]
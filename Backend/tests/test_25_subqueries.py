@@ -0,0 +1,152 @@
+import pytest
+import sys
+import os
+import logging
+import threading
+from pymongo import InsertOne
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.connector import SUBQUERY_INLINE_MAX
+from app.parser.insert_stream import InsertStream
+from app.services.index_advisor import extract_access_patterns
+from app.translator.parameterizer import translate_sql
+from app.translator.subqueries import inline_subqueries
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+IN_SQL = "SELECT nombre FROM usuarios u WHERE u.edad > 30 AND u.id IN (SELECT p.usuario_id FROM pedidos p WHERE p.total > 100)"
+
+
+@pytest.fixture
+def subquery_connector(fake_connector, fake_collection):
+    """Conector falso con usuarios y pedidos; la subconsulta sobre pedidos devuelve values."""
+    def build(values, **attributes):
+        calls = []
+        connector = fake_connector([
+            fake_collection("usuarios", [{"nombre": "Ana"}], calls),
+            fake_collection("pedidos", [{"_id": value} for value in values], calls),
+        ], **attributes)
+        return connector, calls
+    return build
+
+
+@pytest.mark.order(25)
+class TestSubqueries:
+    """Pruebas de subconsultas IN / EXISTS como semi-join o valores en línea."""
+
+    def test_in_subquery_semi_join(self):
+        """IN (SELECT ...) se traduce a un $lookup que se detiene en la primera coincidencia."""
+        collection, mongo_query = translate_sql(IN_SQL)
+        assert collection == "usuarios" and mongo_query["operation"] == "aggregate"
+        pipeline = mongo_query["pipeline"]
+        assert pipeline[0] == {"$match": {"edad": {"$gt": 30}}}
+        assert pipeline[1] == {"$lookup": {
+            "from": "pedidos", "localField": "id", "foreignField": "usuario_id",
+            "pipeline": [{"$match": {"total": {"$gt": 100}}}, {"$limit": 1}, {"$project": {"_id": 1}}],
+            "as": "_subquery0"
+        }}
+        assert pipeline[2] == {"$match": {"_subquery0": {"$ne": []}}}
+        assert mongo_query["subqueries"][0]["pipeline"] == [
+            {"$match": {"total": {"$gt": 100}}}, {"$group": {"_id": "$usuario_id"}}
+        ]
+
+    def test_correlated_exists(self):
+        """EXISTS correlacionado pasa la columna externa con let y la compara con $expr."""
+        _, mongo_query = translate_sql(
+            "SELECT nombre FROM usuarios u WHERE NOT EXISTS (SELECT 1 FROM pedidos p WHERE p.usuario_id = u.id)"
+        )
+        lookup = mongo_query["pipeline"][0]["$lookup"]
+        assert lookup["let"] == {"ref0": "$id"}
+        assert lookup["pipeline"][0] == {"$match": {"$expr": {"$eq": ["$usuario_id", "$$ref0"]}}}
+        assert mongo_query["pipeline"][1] == {"$match": {"_subquery0": {"$eq": []}}}
+        assert "subqueries" not in mongo_query
+
+        patterns = extract_access_patterns("usuarios", mongo_query)
+        assert patterns[0]["collection"] == "pedidos" and patterns[0]["equality"] == ["usuario_id"]
+
+    def test_unsupported_subquery_keeps_warning(self):
+        """Una subconsulta dentro de un OR no se traduce a semi-join y se avisa."""
+        _, mongo_query = translate_sql("SELECT * FROM usuarios WHERE id IN (SELECT usuario_id FROM pedidos) OR edad > 3")
+        assert any("Subconsulta no soportada" in warning for warning in mongo_query["warnings"])
+
+    def test_inline_values_become_find(self):
+        """Con los valores de la subconsulta el semi-join se sustituye por $in y queda un find."""
+        _, mongo_query = translate_sql(IN_SQL)
+        inlined = inline_subqueries(mongo_query, {"_subquery0": [1, 2]})
+        assert inlined["operation"] == "find"
+        assert inlined["query"] == {"edad": {"$gt": 30}, "id": {"$in": [1, 2]}}
+        assert inlined["projection"] == {"nombre": 1}
+
+    def test_small_subquery_runs_once(self, subquery_connector):
+        """La subconsulta se ejecuta una vez; después se reutilizan sus valores hasta una escritura."""
+        _, mongo_query = translate_sql(IN_SQL)
+        connector, calls = subquery_connector([1, 2, None])
+        connector.execute_query("usuarios", mongo_query, serialize=False)
+        connector.execute_query("usuarios", mongo_query, serialize=False)
+        assert [call[:2] for call in calls] == [("pedidos", "aggregate"), ("usuarios", "find"), ("usuarios", "find")]
+        assert calls[1][2]["id"] == {"$in": [1, 2]}
+
+        connector._forget_subquery_values("pruebas", "pedidos")
+        connector.execute_query("usuarios", mongo_query, serialize=False)
+        assert calls[3][:2] == ("pedidos", "aggregate")
+
+    def test_bulk_writes_forget_values(self, subquery_connector):
+        """bulk_write y los INSERT por lotes sobre la colección de la subconsulta descartan sus valores."""
+        _, mongo_query = translate_sql(IN_SQL)
+        connector, calls = subquery_connector([1, 2])
+        connector.execute_query("usuarios", mongo_query, serialize=False)
+        connector.execute_bulk_write("pedidos", [InsertOne({"_id": 3})])
+        connector.execute_query("usuarios", mongo_query, serialize=False)
+        connector.execute_insert_stream("pedidos", InsertStream("INSERT INTO pedidos (_id) VALUES (4)"))
+        connector.execute_query("usuarios", mongo_query, serialize=False)
+
+        assert [call[:2] for call in calls].count(("pedidos", "aggregate")) == 3
+        assert calls[-1][:2] == ("usuarios", "find") and 4 in calls[-1][2]["id"]["$in"]
+
+    def test_large_subquery_keeps_lookup(self, subquery_connector):
+        """Si la subconsulta devuelve demasiados valores se ejecuta el semi-join."""
+        _, mongo_query = translate_sql(IN_SQL)
+        connector, calls = subquery_connector(range(SUBQUERY_INLINE_MAX + 5))
+        connector.execute_query("usuarios", mongo_query, serialize=False)
+        assert calls[-1][:2] == ("usuarios", "aggregate")
+        assert any("$lookup" in stage for stage in calls[-1][2])
+
+    def test_old_server_gets_let_lookup(self, subquery_connector):
+        """En un servidor anterior a 5.0 el semi-join se envía con let y $expr."""
+        _, mongo_query = translate_sql(IN_SQL)
+        connector, calls = subquery_connector(range(SUBQUERY_INLINE_MAX + 5), server_version=(4, 4))
+        connector.execute_query("usuarios", mongo_query, serialize=False)
+        lookup = next(stage["$lookup"] for stage in calls[-1][2] if "$lookup" in stage)
+        assert "localField" not in lookup and lookup["let"] == {"local_key": "$id"}
+        assert connector._concise_lookup_supported is False
+
+    def test_cache_shared_between_threads(self, subquery_connector):
+        """Las escrituras pueden vaciar la caché mientras otros hilos la rellenan."""
+        _, mongo_query = translate_sql(IN_SQL)
+        connector, _ = subquery_connector([1, 2])
+        errors = []
+
+        def fill():
+            try:
+                for _ in range(200):
+                    connector.execute_query("usuarios", mongo_query, serialize=False)
+            except Exception as e:
+                errors.append(e)
+
+        def forget():
+            try:
+                for _ in range(200):
+                    connector._forget_subquery_values("pruebas", "pedidos")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=target) for target in (fill, fill, forget, forget)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
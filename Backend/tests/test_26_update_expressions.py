@@ -0,0 +1,85 @@
+import pytest
+import sys
+import os
+import logging
+
+# Agregar el directorio raíz al PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.translator.cache import TranslationCache
+from app.translator.expression_compiler import compile_expression, compile_set_clause
+from app.translator.parameterizer import prepare_statement, translate_prepared, translate_sql
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.order(26)
+class TestUpdateExpressions:
+    """Pruebas de UPDATE con expresiones como update con pipeline."""
+
+    def test_arithmetic_precedence(self):
+        """Se respeta la precedencia y los campos de operaciones aritméticas se convierten a número."""
+        assert compile_expression("precio * 1.1") == {"$multiply": [{"$toDouble": "$precio"}, 1.1]}
+        assert compile_expression("(stock + 2) * -1.5 - descuento") == {"$subtract": [
+            {"$multiply": [{"$add": [{"$toDouble": "$stock"}, 2]}, -1.5]}, {"$toDouble": "$descuento"}
+        ]}
+        assert compile_expression("a + b + 1") == {"$add": [{"$toDouble": "$a"}, {"$toDouble": "$b"}, 1]}
+
+    def test_functions_and_literals(self):
+        """Funciones de texto y numéricas, NOW() y literales que empiezan por $."""
+        assert compile_expression("UPPER(nombre)") == {"$toUpper": "$nombre"}
+        assert compile_expression("CONCAT(nombre, ' - ', apellido)") == {"$concat": ["$nombre", " - ", "$apellido"]}
+        assert compile_expression("ROUND(precio / 3, 2)") == {"$round": [{"$divide": [{"$toDouble": "$precio"}, 3]}, 2]}
+        assert compile_expression("SUBSTRING(codigo, 2, 3)") == {"$substrCP": ["$codigo", 1, 3]}
+        assert compile_expression("NOW()") == "$$NOW"
+        assert compile_expression("'$5'") == {"$literal": "$5"}
+        with pytest.raises(ValueError):
+            compile_expression("MD5(nombre)")
+
+    def test_set_clause_split(self):
+        """Las comas dentro de funciones o textos no separan asignaciones."""
+        assignments = compile_set_clause("nombre = CONCAT(a, ', ', b), nota = 'x, y', total = NULL")
+        assert assignments == {"nombre": {"$concat": ["$a", ", ", "$b"]}, "nota": "x, y", "total": None}
+
+    def test_expression_update_translation(self):
+        """Un SET con expresiones se traduce a update con pipeline; los textos fijos van en $literal."""
+        _, mongo_query = translate_sql("UPDATE productos SET precio = precio * 1.1, nombre = 'Bo' WHERE categoria = 'x'")
+        assert mongo_query == {
+            "operation": "update",
+            "collection": "productos",
+            "query": {
+                "query": {"categoria": "x"},
+                "update": [{"$set": {"precio": {"$multiply": [{"$toDouble": "$precio"}, 1.1]}, "nombre": {"$literal": "Bo"}}}]
+            }
+        }
+
+        # Con valores fijos se mantiene el update clásico
+        _, mongo_query = translate_sql("UPDATE usuarios SET edad = 31 WHERE id = 5")
+        assert mongo_query["query"]["update"] == {"$set": {"edad": 31}}
+
+    def test_prepared_values_bind_into_pipeline(self):
+        """Los literales extraídos a la plantilla se ligan dentro del $literal."""
+        prepared = prepare_statement("UPDATE productos SET nombre = '$oferta', precio = precio * 0.9 WHERE id = 3")
+        mongo_query = translate_prepared(prepared, "db", TranslationCache())["mongo_query"]
+        assert mongo_query["query"]["query"] == {"id": 3}
+        assert mongo_query["query"]["update"][0]["$set"]["nombre"] == {"$literal": "$oferta"}
+
+    def test_field_reference_not_literal(self):
+        """Una columna a la derecha del SET se copia como ruta de campo, no como texto."""
+        _, mongo_query = translate_sql("UPDATE productos SET a = b WHERE id = 3")
+        assert mongo_query["query"]["update"] == [{"$set": {"a": "$b"}}]
+
+    def test_now_in_pipeline_update(self):
+        """NOW() se traduce a la variable $$NOW junto a los textos fijos en $literal."""
+        _, mongo_query = translate_sql("UPDATE pedidos SET fecha = NOW(), estado = 'ok' WHERE id = 3")
+        assert mongo_query["query"]["update"] == [{"$set": {"fecha": "$$NOW", "estado": {"$literal": "ok"}}}]
+
+    def test_update_many_reports_counts(self, fake_connector, fake_collection):
+        """El update con pipeline se ejecuta con update_many y devuelve los recuentos reales."""
+        _, mongo_query = translate_sql("UPDATE productos SET precio = precio * 1.1 WHERE categoria = 'x'")
+        collection = fake_collection("productos", [{"categoria": "x", "precio": 1}] * 2)
+        result = fake_connector([collection])._execute_update(collection, mongo_query)
+        assert result == {"matched_count": 2, "modified_count": 2, "upserted_id": None}
+        assert collection.calls == [("update_many", {"categoria": "x"}, mongo_query["query"]["update"])]